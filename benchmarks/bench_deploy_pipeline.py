@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+部署流程基准测试（离线）
+在 PATH 最前面放入模拟的 git、conda、pip（按配置输出指定行数、耗时），不访问网络，
+在无界面的情况下执行完整部署、状态检查（sweep）和更新检查（check_updates），报告:
+日志吞吐量（行/秒）、检查延迟、模拟命令的并行程度（重叠系数）和状态文件写入次数。
+
+用法:
+    python benchmarks/bench_deploy_pipeline.py [--shims fast|realistic] [--probes 5] [--json]
+    python benchmarks/bench_deploy_pipeline.py --save-baseline base.json
+    python benchmarks/bench_deploy_pipeline.py --baseline base.json [--tolerance 0.25]   # 退化时返回码为1
+
+--shim-config 可以用JSON文件覆盖单个命令的配置，例如 {"pip install": {"lines": 5000, "seconds": 10}}。
+模拟命令为shell脚本，只支持Linux和macOS（CI使用Linux）。
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from panda_deploy_core import DeployPipeline, ProfileManager, check_updates  # noqa: E402
+
+# 模拟命令的配置: 命令（程序 + 子命令）-> 输出行数、总耗时（秒）；未列出的命令立即返回
+SHIM_PROFILES = {
+    "realistic": {
+        "git --version": {"lines": 0, "seconds": 0.005},
+        "git clone": {"lines": 150, "seconds": 1.0},
+        "git fetch": {"lines": 5, "seconds": 0.3},
+        "git ls-remote": {"lines": 0, "seconds": 0.2},
+        "conda --version": {"lines": 0, "seconds": 0.2},
+        "conda info": {"lines": 0, "seconds": 0.5},
+        "conda env": {"lines": 0, "seconds": 0.3},
+        "conda create": {"lines": 400, "seconds": 2.0},
+        "conda list": {"lines": 0, "seconds": 0.4},
+        "conda run": {"lines": 0, "seconds": 0.6},
+        "pip install": {"lines": 1500, "seconds": 3.0},
+    },
+}
+SHIM_PROFILES["fast"] = {command: {"lines": config["lines"], "seconds": config["seconds"] / 10}
+                         for command, config in SHIM_PROFILES["realistic"].items()}
+
+# 模拟的仓库中每个子模块的Python文件数（预编译步骤会真正编译）
+FILES_PER_MODULE = 20
+
+# 模拟命令的实现（由 git/conda/pip 包装脚本调用），调用记录写入 trace.jsonl
+SHIM_SCRIPT = r'''
+import glob, json, os, subprocess, sys, time
+started = time.time()
+program, args = sys.argv[1], sys.argv[2:]
+state = os.environ["PANDA_SHIM_STATE"]
+config = json.loads(os.environ.get("PANDA_SHIM_CONFIG", "{}"))
+words = [arg for arg in args if not arg.startswith("-")]
+if program == "git" and args[:1] == ["-C"]:
+    os.chdir(args[1])
+    args = args[2:]
+    words = [arg for arg in args if not arg.startswith("-")]
+key = f"{program} {args[0]}" if args and args[0].startswith("--") else f"{program} {words[0] if words else ''}".strip()
+if program == "conda" and args[:1] == ["run"]:
+    key = "conda run"
+settings = config.get(key, {})
+lines, seconds = settings.get("lines", 0), settings.get("seconds", 0.0)
+code = 0
+output = []
+envs_dir = os.path.join(state, "envs")
+sha = "0123456789abcdef0123456789abcdef01234567"
+
+def make_repo(url, target):
+    os.makedirs(os.path.join(target, ".git"), exist_ok=True)
+    if "quantflow" in url:
+        modules = [os.path.join("src", "panda_server")]
+        projects = [""]
+    else:
+        modules = ["panda_common", "panda_factor", "panda_data", "panda_data_hub", "panda_llm",
+                   os.path.join("panda_factor_server", "panda_factor_server")]
+        projects = [module.split(os.sep)[0] for module in modules]
+        with open(os.path.join(target, "requirements.txt"), "w") as f:
+            f.write("requests==2.31.0\n")
+    for project in projects:
+        os.makedirs(os.path.join(target, project), exist_ok=True)
+        with open(os.path.join(target, project, "setup.py"), "w") as f:
+            f.write(f"from setuptools import setup, find_packages\n"
+                    f"setup(name={os.path.basename(project) or 'panda_quantflow'!r}, version='0.1.0', packages=find_packages())\n")
+    for module in modules:
+        os.makedirs(os.path.join(target, module), exist_ok=True)
+        for index in range(int(os.environ.get("PANDA_SHIM_FILES", "20"))):
+            with open(os.path.join(target, module, f"module_{index}.py"), "w") as f:
+                f.write("import os\n" + "".join(f"def function_{n}(x):\n    return x + {n}\n" for n in range(50)))
+    entry = "main.py" if "quantflow" in url else "__main__.py"
+    open(os.path.join(target, modules[-1], entry), "w").close()
+
+if program == "git":
+    if args[:1] == ["--version"]:
+        output = ["git version 2.43.0"]
+    elif words[:1] == ["clone"]:
+        make_repo(words[1], words[2])
+        output = [f"Receiving objects: {n * 100 // max(lines, 1)}% ({n}/{lines})" for n in range(lines)]
+    elif words[:1] == ["rev-parse"]:
+        if "--abbrev-ref" in args:
+            output = ["main", "origin/main"]
+        elif not os.path.isdir(".git"):
+            code = 128
+        else:
+            output = [sha] * sum(1 for word in words[1:] if word in ("HEAD", "@{u}"))
+    elif words[:1] == ["rev-list"]:
+        output = ["0\t0"]
+    elif words[:1] == ["log"]:
+        output = [f"{sha}\x1f{sha[:7]} 模拟提交"] if "%x1f" in " ".join(args) else [sha]
+    elif words[:1] == ["ls-remote"]:
+        output = [f"{sha}\trefs/heads/main"]
+    elif words[:1] == ["symbolic-ref"]:
+        output = ["origin/main"]
+    else:
+        output = [f"{key}: ok {n}" for n in range(lines)]
+elif program == "conda":
+    env_name = args[args.index("-n") + 1] if "-n" in args else None
+    if args[:1] == ["--version"]:
+        output = ["conda 24.1.2"]
+    elif words[:1] == ["info"]:
+        envs = [os.path.join(envs_dir, name) for name in sorted(os.listdir(envs_dir))] if os.path.isdir(envs_dir) else []
+        output = [json.dumps({"envs": envs, "pkgs_dirs": [os.path.join(state, "pkgs")], "root_prefix": state})]
+    elif words[:2] == ["env", "list"]:
+        output = ["# conda environments:", f"base                     {state}"]
+        if os.path.isdir(envs_dir):
+            output += [f"{name:<25}{os.path.join(envs_dir, name)}" for name in sorted(os.listdir(envs_dir))]
+    elif words[:1] == ["create"]:
+        prefix = os.path.join(envs_dir, env_name)
+        # 独立的虚拟环境，部署步骤在其中写入的文件不会影响运行测试的Python；
+        # 其中的 pip 模块转到模拟的pip，python -m pip 不访问网络
+        subprocess.run([os.environ["PANDA_SHIM_PYTHON"], "-m", "venv", "--without-pip", prefix], check=True)
+        os.makedirs(os.path.join(prefix, "conda-meta"), exist_ok=True)
+        pip_dir = os.path.join(glob.glob(os.path.join(prefix, "lib", "python*", "site-packages"))[0], "pip")
+        os.makedirs(pip_dir, exist_ok=True)
+        open(os.path.join(pip_dir, "__init__.py"), "w").close()
+        with open(os.path.join(pip_dir, "__main__.py"), "w") as f:
+            f.write(f"import subprocess, sys\n"
+                    f"sys.exit(subprocess.call([{sys.executable!r}, {os.path.abspath(__file__)!r}, 'pip'] + sys.argv[1:]))\n")
+        output = [f"  package-{n:<20} 1.0.{n}  h0_0" for n in range(lines)]
+    elif args[:1] == ["run"]:
+        # 在环境中执行命令（bin 目录加到 PATH 最前面，与激活后相同）
+        command = [arg for arg in args[1:] if arg != "--no-capture-output"]
+        command = command[2:] if command[:1] == ["-n"] else command
+        prefix = os.path.join(envs_dir, env_name)
+        env = dict(os.environ, CONDA_PREFIX=prefix, CONDA_DEFAULT_ENV=env_name,
+                   PATH=os.path.join(prefix, "bin") + os.pathsep + os.environ["PATH"])
+        if seconds:
+            time.sleep(seconds)
+            seconds = 0
+        code = subprocess.run(command, env=env).returncode
+    elif words[:2] == ["env", "remove"]:
+        import shutil
+        shutil.rmtree(os.path.join(envs_dir, env_name), ignore_errors=True)
+    elif words[:1] == ["list"]:
+        output = ["[]"] if "--json" in args else ["@EXPLICIT"]
+    else:
+        output = [f"{key}: ok {n}" for n in range(lines)]
+else:
+    output = [f"Collecting package-{n}==1.0.{n}" for n in range(lines)]
+
+# 按配置的耗时均匀输出
+delay = seconds / max(len(output), 1)
+for line in output:
+    if delay:
+        time.sleep(delay)
+    print(line, flush=True)
+if not output and seconds:
+    time.sleep(seconds)
+with open(os.path.join(state, "trace.jsonl"), "a") as f:
+    f.write(json.dumps({"command": key, "start": started, "end": time.time()}) + "\n")
+sys.exit(code)
+'''
+
+def install_shims(shim_dir, state_dir, config):
+    """写入模拟命令并设置环境变量，返回原来的环境变量（用于恢复）"""
+    os.makedirs(shim_dir, exist_ok=True)
+    os.makedirs(state_dir, exist_ok=True)
+    script = os.path.join(shim_dir, "shim.py")
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write(SHIM_SCRIPT)
+    for program in ("git", "conda", "pip"):
+        path = os.path.join(shim_dir, program)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" {program} "$@"\n')
+        os.chmod(path, 0o755)
+    
+    saved = dict(os.environ)
+    os.environ["PATH"] = shim_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["PANDA_SHIM_STATE"] = state_dir
+    os.environ["PANDA_SHIM_CONFIG"] = json.dumps(config)
+    os.environ["PANDA_SHIM_PYTHON"] = sys.executable
+    os.environ["PANDA_SHIM_FILES"] = str(FILES_PER_MODULE)
+    return saved
+
+def read_trace(state_dir, since=0.0, until=float("inf")):
+    """读取时间范围内的模拟命令调用记录"""
+    path = os.path.join(state_dir, "trace.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [record for record in records if record["start"] >= since and record["end"] <= until]
+
+def measure_overlap(records):
+    """命令的并行程度: 重叠系数（命令总耗时 / 至少有一个命令运行的时间）和最大并发数"""
+    if not records:
+        return {"commands": 0, "overlap": 0.0, "max_concurrency": 0}
+    busy = sum(record["end"] - record["start"] for record in records)
+    events = sorted([(record["start"], 1) for record in records] + [(record["end"], -1) for record in records])
+    running = peak = 0
+    covered = 0.0
+    previous = events[0][0]
+    for timestamp, change in events:
+        if running:
+            covered += timestamp - previous
+        running += change
+        peak = max(peak, running)
+        previous = timestamp
+    return {"commands": len(records), "overlap": round(busy / covered, 2) if covered else 0.0, "max_concurrency": peak}
+
+def count_status_writes(project_status, counter):
+    """统计状态文件写入次数"""
+    save_status = project_status.save_status
+    
+    def counted():
+        counter[0] += 1
+        return save_status()
+    project_status.save_status = counted
+
+def run_benchmark(config, probes, workdir):
+    """执行一次完整部署和若干次检查，返回指标"""
+    state_dir = os.path.join(workdir, "shim_state")
+    saved_environ = install_shims(os.path.join(workdir, "shims"), state_dir, config)
+    try:
+        status_file = os.path.join(workdir, "project_status.json")
+        profiles = ProfileManager(status_file)
+        project_status = profiles.get()
+        mongodb_path = os.path.join(workdir, "mongodb")
+        os.makedirs(os.path.join(mongodb_path, "bin"), exist_ok=True)
+        for name in ("mongod", "mongosh"):
+            open(os.path.join(mongodb_path, "bin", name), 'w').close()
+        project_status.update_status(
+            project_path=os.path.join(workdir, "install"),
+            conda_env="bench_env",
+            git_url="https://example.invalid/panda_factor.git",
+            quantflow_git_url="https://example.invalid/panda_quantflow.git",
+            mongodb_path=mongodb_path,
+            env_snapshot_keep=0,
+            deployment_status="in_progress",
+        )
+        writes = [0]
+        count_status_writes(project_status, writes)
+        
+        # 部署：日志吞吐量、步骤耗时
+        lines = [0]
+        
+        def log(message):
+            lines[0] += 1
+        
+        started = time.time()
+        ok = DeployPipeline(project_status, log=log).run()
+        deploy_elapsed = time.time() - started
+        deploy_records = read_trace(state_dir, started, time.time())
+        deploy = {
+            "ok": ok,
+            "seconds": round(deploy_elapsed, 2),
+            "log_lines": lines[0],
+            "lines_per_second": round(lines[0] / deploy_elapsed, 1),
+            "status_writes": writes[0],
+            "steps": {step: telemetry["duration"]
+                      for step, telemetry in project_status.get_status("step_telemetry").items()},
+        }
+        deploy.update(measure_overlap(deploy_records))
+        
+        # 状态检查（所有配置并行）和更新检查
+        results = {}
+        for name, probe in (("sweep", profiles.sweep),
+                            ("check_updates", lambda: check_updates(project_status.get_status("project_path"),
+                                                                    project_status, log=log))):
+            writes[0] = 0
+            latencies = []
+            started = time.time()
+            for _ in range(probes):
+                probe_started = time.perf_counter()
+                probe()
+                latencies.append(time.perf_counter() - probe_started)
+            results[name] = {
+                "median_ms": round(statistics.median(latencies) * 1000, 1),
+                "max_ms": round(max(latencies) * 1000, 1),
+                "status_writes_per_probe": round(writes[0] / probes, 1),
+            }
+            results[name].update(measure_overlap(read_trace(state_dir, started, time.time())))
+        return {"deploy": deploy, **results}
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_environ)
+
+def compare(current, baseline, tolerance):
+    """和基准结果比较，返回退化项的说明"""
+    regressions = []
+    checks = [
+        ("deploy", "lines_per_second", -1),
+        ("deploy", "status_writes", 1),
+        ("sweep", "median_ms", 1),
+        ("check_updates", "median_ms", 1),
+    ]
+    for section, key, direction in checks:
+        old = baseline.get(section, {}).get(key)
+        new = current.get(section, {}).get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * direction
+        if change > tolerance:
+            regressions.append(f"{section}.{key}: {old} → {new}")
+    return regressions
+
+def print_report(result):
+    """输出文字报告"""
+    deploy = result["deploy"]
+    print(f"部署: {'成功' if deploy['ok'] else '失败'}，用时 {deploy['seconds']} 秒")
+    print(f"  日志 {deploy['log_lines']} 行，{deploy['lines_per_second']} 行/秒，状态文件写入 {deploy['status_writes']} 次")
+    print(f"  模拟命令 {deploy['commands']} 次，重叠系数 {deploy['overlap']}，最大并发 {deploy['max_concurrency']}")
+    for step, duration in deploy["steps"].items():
+        print(f"    {step:<24}{duration:>8} 秒")
+    for name in ("sweep", "check_updates"):
+        item = result[name]
+        print(f"{name}: 中位数 {item['median_ms']} 毫秒，最长 {item['max_ms']} 毫秒，"
+              f"每次写入状态文件 {item['status_writes_per_probe']} 次，"
+              f"模拟命令 {item['commands']} 次，重叠系数 {item['overlap']}，最大并发 {item['max_concurrency']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="PandaAI部署流程离线基准测试")
+    parser.add_argument("--shims", choices=sorted(SHIM_PROFILES), default="fast", help="模拟命令的耗时配置（默认fast）")
+    parser.add_argument("--shim-config", help="覆盖模拟命令配置的JSON文件")
+    parser.add_argument("--probes", type=int, default=5, help="状态检查和更新检查的次数（默认5次）")
+    parser.add_argument("--workdir", help="工作目录（默认为临时目录，结束后删除）")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    parser.add_argument("--save-baseline", help="把结果保存为基准文件")
+    parser.add_argument("--baseline", help="和基准文件比较，有退化时返回码为1")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的退化比例（默认0.25）")
+    args = parser.parse_args()
+    if os.name == 'nt':
+        print("模拟命令为shell脚本，请在Linux或macOS上运行")
+        return 1
+    
+    config = dict(SHIM_PROFILES[args.shims])
+    if args.shim_config:
+        with open(args.shim_config, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    
+    workdir = args.workdir or tempfile.mkdtemp(prefix="panda_bench_")
+    try:
+        result = run_benchmark(config, args.probes, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    result["shims"] = args.shims
+    
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print_report(result)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if not result["deploy"]["ok"]:
+        return 1
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ 退化: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图形界面启动基准测试
+测量导入、界面构建、首次绘制（time-to-first-paint）、可交互（time-to-interactive）
+以及后台状态检查完成的时间。每次运行都在新进程中进行，结果取中位数。
+
+用法:
+    python benchmarks/bench_gui_startup.py [--runs 5] [--workdir 目录]
+
+workdir 中的 project_status.json 会被工具读取（影响缓存的检查结果），默认为当前目录。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ["import", "construct", "first_paint", "interactive", "probes_done"]
+
+def run_child(timeout):
+    """在当前进程中启动一次图形界面并输出各阶段耗时（秒）"""
+    start = time.perf_counter()
+    import tkinter as tk
+    sys.path.insert(0, REPO_ROOT)
+    import panda_deploy_tool_v2 as gui
+    imported = time.perf_counter()
+    
+    root = tk.Tk()
+    app = gui.PandaDeployToolV2(root)
+    constructed = time.perf_counter()
+    deadline = constructed + timeout
+    
+    def poll():
+        marks = app.startup_marks
+        finished = marks.get("interactive") and marks.get("probes_done")
+        if finished or time.perf_counter() > deadline:
+            root.destroy()
+        else:
+            root.after(5, poll)
+    
+    root.after(5, poll)
+    root.mainloop()
+    
+    marks = app.startup_marks
+    result = {"import": imported - start, "construct": constructed - start}
+    for phase in ("first_paint", "interactive", "probes_done"):
+        if marks.get(phase):
+            result[phase] = marks[phase] - start
+    print(json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description="PandaAI工具管理助手启动基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="运行次数（默认5次）")
+    parser.add_argument("--workdir", default=os.getcwd(), help="运行目录（读取其中的project_status.json）")
+    parser.add_argument("--timeout", type=float, default=30.0, help="单次运行等待状态检查完成的最长时间（秒）")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        run_child(args.timeout)
+        return 0
+    
+    runs = []
+    for i in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--timeout", str(args.timeout)],
+            cwd=args.workdir, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"第{i + 1}次运行失败:\n{output.stderr}")
+            return 1
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    
+    print(f"运行次数: {len(runs)}   (单位: 毫秒，从子进程开始导入tkinter计时)")
+    print(f"{'阶段':<14}{'最小':>10}{'中位数':>10}{'最大':>10}")
+    for phase in PHASES:
+        values = [run[phase] * 1000 for run in runs if phase in run]
+        if not values:
+            print(f"{phase:<14}{'-':>10}{'-':>10}{'-':>10}")
+            continue
+        print(f"{phase:<14}{min(values):>10.1f}{statistics.median(values):>10.1f}{max(values):>10.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 归档工具
+流式tar打包 + 多线程gzip压缩，以及解包后的路径重定位，用于Conda环境快照和MongoDB数据快照
+"""
+
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tarfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# 归档中最后一个成员，记录元数据和包含原路径的文件
+MANIFEST_NAME = ".panda_snapshot.json"
+# 每个压缩块的大小，块之间独立压缩，可以并行
+BLOCK_SIZE = 4 * 1024 * 1024
+
+class ParallelGzipWriter(io.RawIOBase):
+    """多线程gzip写入
+
+    写入的数据按块切分，每块在线程池中独立压缩为一个gzip成员并按顺序写出。
+    多个gzip成员首尾相接仍是合法的gzip文件，tar、gzip和Python的tarfile都可以直接读取。
+    zlib压缩时会释放GIL，因此多个线程可以同时压缩。
+    """
+    def __init__(self, fileobj, level=6, workers=None, block_size=BLOCK_SIZE):
+        super().__init__()
+        self.fileobj = fileobj
+        self.level = level
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.pending = deque()
+        self.buffer = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.buffer += data
+        self.bytes_in += len(data)
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+    
+    def _submit(self, block):
+        self.pending.append(self.executor.submit(self._compress, block))
+        # 限制等待写出的块数，内存占用约为 2 × 线程数 × 块大小
+        while len(self.pending) > self.workers * 2:
+            self._write_next()
+    
+    def _compress(self, block):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # wbits=31: gzip格式
+        return compressor.compress(block) + compressor.flush()
+    
+    def _write_next(self):
+        data = self.pending.popleft().result()
+        self.fileobj.write(data)
+        self.bytes_out += len(data)
+    
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer:
+                self._submit(bytes(self.buffer))
+                self.buffer = bytearray()
+            while self.pending:
+                self._write_next()
+        finally:
+            self.executor.shutdown()
+            super().close()
+
+class MatchingReader:
+    """读取文件的同时查找指定的字节串（可以跨读取块匹配），打包时顺便找出包含原路径的文件"""
+    def __init__(self, fileobj, needles):
+        self.fileobj = fileobj
+        self.needles = [needle for needle in needles if needle]
+        self.overlap = max((len(needle) for needle in self.needles), default=1) - 1
+        self.tail = b""
+        self.found = set()
+        self.binary = None
+    
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        if data:
+            if self.binary is None:
+                self.binary = b"\0" in data[:8192]
+            window = self.tail + data
+            for needle in self.needles:
+                if needle not in self.found and needle in window:
+                    self.found.add(needle)
+            self.tail = window[-self.overlap:] if self.overlap else b""
+        return data
+
+def pack_directory(root, archive_path, needles=(), metadata=None, level=6, workers=None, log=None):
+    """把目录流式打包为 .tar.gz，返回清单
+
+    needles 为需要在解包时替换的路径（例如环境路径和项目路径），包含这些路径的文件记录在清单中。
+    指向目录内部的绝对符号链接改为相对链接。先写入 .part 文件，完成后再改名，中断时不会留下不完整的归档。
+    """
+    log = log or (lambda message: None)
+    root = os.path.abspath(root)
+    encoded = [needle.encode("utf-8") for needle in needles if needle]
+    manifest = dict(metadata or {}, root=root, needles=list(needles), files=[])
+    part_path = archive_path + ".part"
+    started = time.time()
+    file_count = 0
+    
+    with open(part_path, "wb") as raw, ParallelGzipWriter(raw, level=level, workers=workers) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for name in sorted(dirnames) + sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    arcname = os.path.relpath(path, root).replace(os.sep, "/")
+                    tarinfo = tar.gettarinfo(path, arcname)
+                    if tarinfo is None:
+                        continue  # 套接字等特殊文件
+                    if tarinfo.issym() and os.path.isabs(tarinfo.linkname) and \
+                            os.path.commonpath([root, os.path.abspath(tarinfo.linkname)]) == root:
+                        tarinfo.linkname = os.path.relpath(tarinfo.linkname, os.path.dirname(path))
+                    if not tarinfo.isreg():
+                        tar.addfile(tarinfo)
+                        continue
+                    with open(path, "rb") as f:
+                        reader = MatchingReader(f, encoded)
+                        tar.addfile(tarinfo, reader)
+                    file_count += 1
+                    if reader.found:
+                        manifest["files"].append({"path": arcname, "binary": bool(reader.binary)})
+            
+            manifest["file_count"] = file_count
+            manifest_data = json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+            tarinfo = tarfile.TarInfo(MANIFEST_NAME)
+            tarinfo.size = len(manifest_data)
+            tarinfo.mtime = int(time.time())
+            tar.addfile(tarinfo, io.BytesIO(manifest_data))
+        bytes_in = compressed.bytes_in
+    
+    os.replace(part_path, archive_path)
+    elapsed = max(time.time() - started, 0.001)
+    log(f"📦 已打包 {file_count} 个文件: {bytes_in / 1024 / 1024:.1f} MB → "
+        f"{os.path.getsize(archive_path) / 1024 / 1024:.1f} MB，用时 {elapsed:.1f} 秒 "
+        f"({bytes_in / 1024 / 1024 / elapsed:.1f} MB/s)")
+    return manifest
+
+def unpack_archive(archive_path, target_dir, log=None):
+    """流式解包到 target_dir，返回清单"""
+    log = log or (lambda message: None)
+    started = time.time()
+    manifest = None
+    # 支持解包过滤器的Python版本中禁止写到目标目录之外
+    extract_options = {"filter": "tar"} if hasattr(tarfile, "tar_filter") else {}
+    os.makedirs(target_dir, exist_ok=True)
+    # tarfile的 "r|gz" 只能读取第一个gzip成员，多成员的归档用gzip模块解压
+    with gzip.open(archive_path, "rb") as compressed, tarfile.open(fileobj=compressed, mode="r|") as tar:
+        for member in tar:
+            if member.name == MANIFEST_NAME:
+                manifest = json.load(tar.extractfile(member))
+            else:
+                tar.extract(member, target_dir, **extract_options)
+    if manifest is None:
+        raise ValueError(f"归档中没有清单文件: {archive_path}")
+    log(f"📦 已解包 {manifest.get('file_count', 0)} 个文件，用时 {time.time() - started:.1f} 秒")
+    return manifest
+
+def compress_file(source_path, target_path, level=6, workers=None):
+    """把单个文件流式压缩为gzip（先写 .part 再改名），返回压缩后的大小"""
+    part_path = target_path + ".part"
+    with open(source_path, "rb") as source, open(part_path, "wb") as raw, \
+            ParallelGzipWriter(raw, level=level, workers=workers) as compressed:
+        shutil.copyfileobj(source, compressed, BLOCK_SIZE)
+    os.replace(part_path, target_path)
+    return os.path.getsize(target_path)
+
+def extract_file(source_path, target_path):
+    """把 compress_file 写入的gzip文件流式解压到 target_path（先写 .part 再改名）"""
+    part_path = target_path + ".part"
+    with gzip.open(source_path, "rb") as compressed, open(part_path, "wb") as target:
+        shutil.copyfileobj(compressed, target, BLOCK_SIZE)
+    os.replace(part_path, target_path)
+
+def replace_in_binary(data, old, new):
+    """替换二进制文件中以NUL结尾的字符串里的路径，用NUL补齐以保持长度不变；新路径太长时抛出ValueError"""
+    pattern = re.compile(re.escape(old) + rb"([^\0]*)(\0+)")
+    
+    def replace(match):
+        text = (old + match.group(1)).replace(old, new)
+        padding = len(match.group(0)) - len(text)
+        if padding < 1:
+            raise ValueError("新路径比原路径长，无法在二进制文件中替换")
+        return text + b"\0" * padding
+    
+    return pattern.sub(replace, data)
+
+def relocate_files(target_dir, manifest, replacements):
+    """把清单中记录的文件里的原路径替换为新路径，返回无法处理的文件列表
+
+    replacements 为 [(原路径, 新路径)]，按原路径长度从长到短替换，避免较短的路径先替换掉较长路径的一部分
+    """
+    pairs = sorted(((old.encode("utf-8"), new.encode("utf-8")) for old, new in replacements if old and old != new),
+                   key=lambda pair: len(pair[0]), reverse=True)
+    failed = []
+    if not pairs:
+        return failed
+    for entry in manifest.get("files", []):
+        path = os.path.join(target_dir, entry["path"])
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            for old, new in pairs:
+                if old in data:
+                    data = replace_in_binary(data, old, new) if entry.get("binary") else data.replace(old, new)
+            with open(path, "wb") as f:
+                f.write(data)
+        except (OSError, ValueError):
+            failed.append(entry["path"])
+    return failed
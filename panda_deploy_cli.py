@@ -0,0 +1,745 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 命令行模式
+无需图形界面，可在SSH、计划任务和无显示器的Linux服务器上使用
+
+用法:
+    python panda_deploy_cli.py deploy --path D:/PandaAI --mongodb-path D:/mongodb
+    python panda_deploy_cli.py update [--check]
+    python panda_deploy_cli.py launch
+    python panda_deploy_cli.py stop
+    python panda_deploy_cli.py status [--json]
+    python panda_deploy_cli.py watch [--interval 分钟] [--once]
+    python panda_deploy_cli.py profile list|check|add|use|remove [名称]
+    python panda_deploy_cli.py env-snapshot list|create|restore [归档或序号]
+    python panda_deploy_cli.py lock show|write
+    python panda_deploy_cli.py env-fingerprint diff|record
+    python panda_deploy_cli.py db-snapshot list|create|restore|prune [快照ID或序号]
+    python panda_deploy_cli.py db-advisor show|profile|create-index [序号|all]
+    python panda_deploy_cli.py disk show|prune [策略 ...|all] [--full]
+    python panda_deploy_cli.py logs list|search [关键词] [--service factor]
+    python panda_deploy_cli.py startup-profile run|history [factor|quantflow]
+    python panda_deploy_cli.py launch-bench run|history [--runs 3] [--no-cold]
+    python panda_deploy_cli.py metrics show|serve [--port 9464]
+    python panda_deploy_cli.py data-hub list|enable|disable|run|history|schedule [任务ID ...] [--time 02:00]
+    python panda_deploy_cli.py --profile 名称 launch
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from panda_deploy_core import (
+    DeployError,
+    DeployPipeline,
+    EnvLockManager,
+    EnvSnapshotManager,
+    ProfileManager,
+    RemoteWatcher,
+    ServiceSupervisor,
+    check_env_drift,
+    check_updates,
+    collect_environment_status,
+    collect_service_status,
+    describe_remote_updates,
+    log_to_stdout,
+    record_env_fingerprint,
+)
+from panda_deploy_datahub import DataHubScheduler, describe_data_hub_run, get_data_hub_jobs, parse_schedule_time
+from panda_deploy_disk import PRUNE_POLICIES, DiskFootprint, format_size
+from panda_deploy_fingerprint import describe_env_drift
+from panda_deploy_logs import LogSearcher, list_segments
+from panda_deploy_metrics import MetricsCollector, MetricsServer, format_metrics
+from panda_deploy_mongo import MongoAdvisor, MongoSnapshotManager
+from panda_deploy_perf import (
+    PROFILE_SERVICES,
+    LaunchBenchmark,
+    StartupProfiler,
+    describe_benchmark,
+    describe_profile,
+    previous_benchmark,
+)
+
+# 命令行参数与状态文件字段的对应关系
+CONFIG_OPTIONS = [
+    ("--path", "project_path", "安装路径"),
+    ("--env", "conda_env", "Conda环境名称"),
+    ("--git-url", "git_url", "PandaFactor Git地址"),
+    ("--quantflow-git-url", "quantflow_git_url", "QuantFlow Git地址"),
+    ("--mongodb-path", "mongodb_path", "MongoDB安装目录"),
+    ("--mongodb-data-path", "mongodb_data_path", "MongoDB数据目录（默认为安装目录下的data/db）"),
+    ("--mongodb-port", "mongodb_port", "MongoDB端口"),
+    ("--factor-port", "factor_port", "PandaFactor服务器端口"),
+    ("--quantflow-port", "quantflow_port", "QuantFlow服务器端口"),
+    ("--env-snapshot", "env_snapshot_source", "创建Conda环境时直接解包的环境快照（.tar.gz）"),
+    ("--lock-dir", "env_lock_dir", "环境锁定文件目录（默认为安装路径下的locks）"),
+    ("--mongodb-snapshot-dir", "mongodb_snapshot_dir", "MongoDB数据快照库目录（默认为安装路径下的snapshots/mongodb）"),
+]
+
+def apply_config_options(project_status, args):
+    """把命令行中指定的配置写入状态文件"""
+    updates = {}
+    for _, key, _ in CONFIG_OPTIONS:
+        value = getattr(args, key)
+        if value:
+            updates[key] = value
+    if updates:
+        project_status.update_status(**updates)
+
+def require_project_path(project_status):
+    """检查是否已设置项目安装路径（快照、日志等都保存在安装目录下），未设置时输出与 deploy 相同的错误"""
+    if project_status.get_status("project_path"):
+        return True
+    log_to_stdout("❌ 请设置项目安装路径 (deploy --path)")
+    return False
+
+def cmd_deploy(project_status, args):
+    """部署项目"""
+    apply_config_options(project_status, args)
+    for key, message in (("project_path", "请设置项目安装路径 (--path)"),
+                         ("conda_env", "请设置Conda环境名称 (--env)"),
+                         ("git_url", "请设置Git仓库地址 (--git-url)")):
+        if not project_status.get_status(key):
+            log_to_stdout(f"❌ {message}")
+            return 1
+    project_status.update_status(deployment_status="in_progress")
+    return 0 if DeployPipeline(project_status).run() else 1
+
+def cmd_update(project_status, args):
+    """检查更新，未指定 --check 时更新仓库并重新安装依赖"""
+    apply_config_options(project_status, args)
+    try:
+        result = check_updates(project_status.get_status("project_path"), project_status)
+    except DeployError as e:
+        log_to_stdout(f"❌ {e}")
+        return 1
+    if result is None:
+        return 1
+    if args.check:
+        # 有可用更新时返回2，便于脚本判断
+        return 2 if result["factor_behind"] or result["quantflow_behind"] else 0
+    if not (result["factor_behind"] or result["quantflow_behind"] or args.force):
+        log_to_stdout("✅ 没有可用更新")
+        return 0
+    return 0 if DeployPipeline(project_status).update() else 1
+
+def cmd_launch(project_status, args):
+    """启动所有服务"""
+    if project_status.get_status("deployment_status") != "completed":
+        log_to_stdout("❌ 项目尚未完成部署，请先执行 deploy")
+        return 1
+    return 0 if ServiceSupervisor(project_status).launch() else 1
+
+def cmd_stop(project_status, args):
+    """停止所有服务"""
+    return 0 if ServiceSupervisor(project_status).stop() else 1
+
+def cmd_status(project_status, args):
+    """输出环境、部署和服务状态"""
+    status = {
+        "project_path": project_status.get_status("project_path"),
+        "conda_env": project_status.get_status("conda_env"),
+        "mongodb_path": project_status.get_status("mongodb_path"),
+        "mongodb_data_path": project_status.get_mongodb_data_path(),
+        "ports": project_status.get_ports(),
+        "deployment_status": project_status.get_status("deployment_status"),
+        "completed_steps": project_status.get_status("completed_steps"),
+        "git_commit": project_status.get_status("git_commit"),
+        "quantflow_commit": project_status.get_status("quantflow_commit"),
+        "last_update": project_status.get_status("last_update"),
+        "environment": collect_environment_status(
+            project_status.get_status("conda_env"),
+            project_status.get_status("project_path"),
+            project_status.get_status("mongodb_path")),
+        "services": collect_service_status(project_status.get_ports()),
+        "env_drift": check_env_drift(project_status),
+    }
+    if args.json:
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+    else:
+        drift = status.pop("env_drift")
+        status["env_drift"] = "未记录环境指纹" if drift is None else (describe_env_drift(drift) or "与部署时一致")
+        for key, value in status.items():
+            if isinstance(value, dict):
+                print(f"{key}:")
+                for sub_key, sub_value in value.items():
+                    print(f"  {sub_key}: {sub_value}")
+            else:
+                print(f"{key}: {value}")
+    return 0
+
+def cmd_watch(project_status, args):
+    """用 git ls-remote 轮询远程分支，发现更新时输出提示"""
+    if args.interval is not None:
+        project_status.update_status(remote_watch_interval=args.interval)
+    watcher = RemoteWatcher(project_status, log=log_to_stdout)
+    if args.once:
+        updates = describe_remote_updates(watcher.poll_once())
+        log_to_stdout(f"🔔 发现更新: {updates}" if updates else "✅ 没有可用更新")
+        return 2 if updates else 0
+    
+    if watcher.interval <= 0:
+        log_to_stdout("❌ 检查间隔为0，请使用 --interval 指定间隔（分钟）")
+        return 1
+    log_to_stdout(f"👀 开始监视远程更新，间隔 {watcher.interval / 60:g} 分钟，按 Ctrl+C 退出")
+    last_reported = None
+    try:
+        while True:
+            updates = describe_remote_updates(watcher.poll_once())
+            if updates != last_reported:
+                log_to_stdout(f"🔔 发现更新: {updates}" if updates else "✅ 没有可用更新")
+                last_reported = updates
+            time.sleep(watcher.interval)
+    except KeyboardInterrupt:
+        return 0
+
+def cmd_profile(profiles, args):
+    """管理多套部署配置"""
+    if args.action in ("add", "use", "remove") and not args.name:
+        log_to_stdout("❌ 请指定配置名称")
+        return 1
+    try:
+        if args.action == "add":
+            project_status = profiles.create(args.name, copy_from=args.copy_from)
+            ports = project_status.get_ports()
+            log_to_stdout(f"✅ 已创建配置 {args.name}: Conda环境 {project_status.get_status('conda_env')}，"
+                          f"端口 MongoDB {ports['mongodb']} / Factor {ports['factor']} / QuantFlow {ports['quantflow']}")
+            log_to_stdout(f"💡 使用 --profile {args.name} deploy --path 安装路径 完成部署")
+        elif args.action == "use":
+            profiles.switch(args.name)
+            log_to_stdout(f"✅ 当前配置: {args.name}")
+        elif args.action == "remove":
+            profiles.delete(args.name)
+            log_to_stdout(f"✅ 已删除配置 {args.name}（安装目录未删除）")
+    except DeployError as e:
+        log_to_stdout(f"❌ {e}")
+        return 1
+    if args.action != "list" and args.action != "check":
+        return 0
+    
+    results = profiles.sweep() if args.action == "check" else {}
+    if args.json:
+        summary = {}
+        for name in profiles.names():
+            project_status = profiles.get(name)
+            summary[name] = {
+                "active": name == profiles.active,
+                "project_path": project_status.get_status("project_path"),
+                "conda_env": project_status.get_status("conda_env"),
+                "ports": project_status.get_ports(),
+                "deployment_status": project_status.get_status("deployment_status"),
+            }
+            summary[name].update(results.get(name, {}))
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+    
+    for name in profiles.names():
+        project_status = profiles.get(name)
+        ports = project_status.get_ports()
+        marker = "*" if name == profiles.active else " "
+        print(f"{marker} {name:<16}{project_status.get_status('deployment_status'):<14}"
+              f"{project_status.get_status('conda_env'):<20}{project_status.get_status('project_path') or '-'}  "
+              f"(MongoDB {ports['mongodb']} / Factor {ports['factor']} / QuantFlow {ports['quantflow']})")
+        if name in results:
+            environment, services = results[name]["environment"], results[name]["services"]
+            checks = "  ".join(f"{'✅' if ok else '❌'} {key}" for key, ok in environment.items())
+            print(f"    环境: {checks}")
+            print(f"    服务: MongoDB {services['mongodb']}  Factor {services['factor']}  QuantFlow {services['quantflow']}")
+            if results[name]["env_drift"]:
+                print(f"    环境变化: {describe_env_drift(results[name]['env_drift'])}")
+    return 0
+
+def cmd_env_snapshot(project_status, args):
+    """创建、列出和恢复Conda环境快照"""
+    snapshots = EnvSnapshotManager(project_status)
+    if args.action == "create":
+        return 0 if snapshots.create() else 1
+    
+    items = snapshots.list_snapshots()
+    if args.action == "list":
+        if not items:
+            print("没有环境快照")
+        for index, item in enumerate(items, 1):
+            print(f"{index}. {item['created_at']}  {item['env_name']:<16}{item['size'] / 1024 / 1024:>8.1f} MB  "
+                  f"{item.get('git_commit', '')[:8]}  {item['path']}")
+        return 0
+    
+    # restore: 默认恢复最新的快照，可以指定序号或归档路径
+    if args.archive and args.archive.isdigit():
+        if not 0 < int(args.archive) <= len(items):
+            log_to_stdout(f"❌ 快照序号不存在: {args.archive}")
+            return 1
+        archive = items[int(args.archive) - 1]["path"]
+    else:
+        archive = args.archive or (items[-1]["path"] if items else None)
+    if not archive:
+        log_to_stdout("❌ 没有可以恢复的环境快照")
+        return 1
+    try:
+        snapshots.restore(archive)
+    except DeployError as e:
+        log_to_stdout(f"❌ {e}")
+        return 1
+    return 0
+
+def cmd_lock(project_status, args):
+    """查看或写入环境锁定文件"""
+    # 设置了锁定文件目录时不需要安装路径也能查看
+    needs_project = args.action == "write" or not project_status.get_status("env_lock_dir")
+    if needs_project and not require_project_path(project_status):
+        return 1
+    locks = EnvLockManager(project_status)
+    if args.action == "write":
+        pipeline = DeployPipeline(project_status)
+        return 0 if locks.write(pipeline.get_pip_env()) else 1
+    
+    info = locks.load_info()
+    if not info:
+        print(f"没有当前平台的锁定文件 ({locks.lock_dir})")
+        return 0
+    for key, value in info.items():
+        print(f"{key}: {value}")
+    for name, path in locks.get_paths().items():
+        print(f"{name}文件: {path}")
+    return 0
+
+def cmd_env_fingerprint(project_status, args):
+    """比较Conda环境与部署时的指纹，或把当前环境记录为新的基准"""
+    if args.action == "record":
+        fingerprint = record_env_fingerprint(project_status)
+        if not fingerprint:
+            log_to_stdout(f"❌ 未找到Conda环境 {project_status.get_status('conda_env')}")
+            return 1
+        log_to_stdout(f"✅ 已记录环境指纹: {len(fingerprint['packages'])} 个包 ({fingerprint['digest'][:12]})")
+        return 0
+    
+    started = time.perf_counter()
+    drift = check_env_drift(project_status)
+    elapsed = time.perf_counter() - started
+    if drift is None:
+        print("没有记录环境指纹（部署完成时自动记录，也可以使用 env-fingerprint record）")
+        return 0
+    if args.json:
+        print(json.dumps(drift, ensure_ascii=False, indent=2))
+        return 2 if any(drift.values()) else 0
+    if not drift:
+        print(f"✅ 环境与部署时一致 ({elapsed * 1000:.0f} 毫秒)")
+        return 0
+    for title, key in (("新增", "added"), ("删除", "removed")):
+        for package, version in drift[key].items():
+            print(f"{title}  {package:<40}{version}")
+    for package, (old, new) in drift["changed"].items():
+        print(f"变化  {package:<40}{old} → {new}")
+    print(f"（{elapsed * 1000:.0f} 毫秒，版本后的 * 表示版本相同但文件被修改）")
+    return 2
+
+def cmd_db_snapshot(project_status, args):
+    """MongoDB数据目录的增量快照和恢复"""
+    snapshots = MongoSnapshotManager(project_status)
+    try:
+        if args.action == "create":
+            snapshots.create(label=args.label or "")
+        elif args.action == "restore":
+            snapshots.restore(args.snapshot, backup=not args.no_backup)
+        elif args.action == "prune":
+            snapshots.prune()
+        else:
+            items = snapshots.list_snapshots()
+            if not items:
+                print(f"没有MongoDB数据快照 ({snapshots.store_dir})")
+            for index, item in enumerate(items, 1):
+                print(f"{index}. {item['id']}  {item['created_at']}  {item['total_size'] / 1024 / 1024:>10.1f} MB  "
+                      f"新复制 {item['copied_size'] / 1024 / 1024:.1f} MB  {item.get('label', '')}")
+    except DeployError as e:
+        log_to_stdout(f"❌ {e}")
+        return 1
+    return 0
+
+def print_advice(advice):
+    """输出索引和慢查询诊断结果"""
+    profiling = f"开启，超过 {advice['slowms']} 毫秒" if advice["profiling_level"] else "关闭"
+    print(f"数据库: {advice['database']}  (慢查询分析器: {profiling})")
+    print("集合（按占用空间排序）:")
+    for item in advice["collections"]:
+        print(f"  {item['name']:<32}{item['count']:>12} 条  数据 {item['storage_size'] / 1024 / 1024:>9.1f} MB  "
+              f"索引 {item['index_size'] / 1024 / 1024:>8.1f} MB ({len(item['indexes'])} 个)")
+    print("未使用的索引（自MongoDB启动或索引创建以来）:")
+    for item in advice["unused_indexes"] or [None]:
+        print(f"  {item['collection']}.{item['name']}  {json.dumps(item['key'])}" if item else "  无")
+    print("全表扫描（COLLSCAN）的查询:")
+    for index, shape in enumerate(advice["scan_shapes"], 1):
+        recommended = json.dumps(shape["recommended"]) if shape["recommended"] else "-"
+        print(f"  {index}. {shape['collection']}  条件 {json.dumps(shape['filter'])}  排序 {shape['sort']}  "
+              f"{shape['count']} 次，共 {shape['total_millis']} 毫秒，最多扫描 {shape['max_docs_examined']} 条  "
+              f"推荐索引 {recommended}")
+    if not advice["scan_shapes"]:
+        print("  无")
+        if not advice["profiling_level"]:
+            print("💡 使用 db-advisor profile 开启慢查询分析器，使用一段时间后再查看")
+
+def cmd_db_advisor(project_status, args):
+    """MongoDB索引和慢查询诊断"""
+    advisor = MongoAdvisor(project_status)
+    try:
+        if args.action == "profile":
+            advisor.set_profiling(0 if args.off else 1, args.slowms)
+            return 0
+        advice = advisor.analyze()
+        if args.action == "show":
+            if args.json:
+                print(json.dumps(advice, ensure_ascii=False, indent=2))
+            else:
+                print_advice(advice)
+            return 0
+        
+        # create-index: 创建指定序号（或全部）查询形状的推荐索引
+        shapes = advice["scan_shapes"]
+        if args.target == "all":
+            selected = [shape for shape in shapes if shape["recommended"]]
+        elif args.target and args.target.isdigit() and 0 < int(args.target) <= len(shapes):
+            selected = [shapes[int(args.target) - 1]]
+        else:
+            log_to_stdout("❌ 请指定查询序号（见 db-advisor show）或 all")
+            return 1
+        if not any(shape["recommended"] for shape in selected):
+            log_to_stdout("✅ 没有需要创建的索引")
+        for shape in selected:
+            if shape["recommended"]:
+                advisor.create_index(shape["collection"], shape["recommended"])
+    except DeployError as e:
+        log_to_stdout(f"❌ {e}")
+        return 1
+    return 0
+
+def cmd_disk(project_status, args):
+    """查看磁盘占用，按策略清理缓存和残留文件"""
+    footprint = DiskFootprint(project_status, profiles=ProfileManager(args.status_file))
+    policy_ids = [policy[0] for policy in PRUNE_POLICIES]
+    if args.action == "prune":
+        selected = policy_ids if "all" in args.policies else args.policies
+        unknown = [policy for policy in selected if policy not in policy_ids]
+        if not selected or unknown:
+            log_to_stdout(f"❌ 请指定清理策略: {', '.join(policy_ids)} 或 all")
+            return 1
+        reclaimed = footprint.prune(selected)
+        log_to_stdout(f"✅ 共释放 {format_size(reclaimed)}")
+        return 0
+    
+    report = footprint.analyze(full=args.full)
+    plan = footprint.plan()
+    if args.json:
+        print(json.dumps({"usage": report, "policies": plan}, ensure_ascii=False, indent=2))
+        return 0
+    for area in report["areas"]:
+        print(f"{area['title']}: {format_size(area['size'])}")
+        for item in area["paths"]:
+            print(f"  {item['path']}  {format_size(item['size'])}  ({item['files']} 个文件)")
+            for name, size in item["children"][:5]:
+                print(f"    {name:<30}{format_size(size):>12}")
+    print(f"合计: {format_size(report['total'])}  (统计 {report['dirs']} 个目录，重新列出 {report['rescanned']} 个，"
+          f"用时 {report['elapsed']:.2f} 秒)")
+    print()
+    print("清理策略:")
+    for item in plan:
+        state = f"不可用: {item['blocked']}" if item["blocked"] else f"可释放 {format_size(item['size'])}"
+        print(f"  {item['id']:<22}{item['title']:<16}{state}")
+    return 0
+
+def cmd_logs(project_status, args):
+    """列出或搜索服务日志"""
+    log_dir = os.path.join(project_status.get_status("project_path"), "logs")
+    if args.action == "list":
+        for name, _, path in list_segments(log_dir):
+            print(f"{name:<12}{format_size(os.path.getsize(path)):>12}  {path}")
+        return 0
+    if not args.query:
+        log_to_stdout("❌ 请指定搜索关键词")
+        return 1
+    result = LogSearcher(log_dir).search(args.query, services=args.service, limit=args.limit)
+    for name, line in reversed(result["matches"]):
+        print(f"[{name}] {line}")
+    print(f"找到 {len(result['matches'])} 行  (搜索 {result['segments']} 个日志文件，读取 {result['blocks_read']} 个数据块 "
+          f"{format_size(result['bytes_read'])}，用时 {result['elapsed'] * 1000:.0f} 毫秒)")
+    return 0 if result["matches"] else 2
+
+def cmd_startup_profile(project_status, args):
+    """分析服务器启动的导入耗时，或查看各提交的分析结果"""
+    profiler = StartupProfiler(project_status)
+    services = [args.service] if args.service else None
+    if args.action == "history":
+        for name, title in PROFILE_SERVICES:
+            if services and name not in services:
+                continue
+            print(f"{title}:")
+            for result in profiler.history(name):
+                ready = f"{result['ready_seconds']} 秒" if result["ready_seconds"] is not None else "未就绪"
+                print(f"  {result['profiled_at']}  {result['total_ms']:>10} 毫秒  端口 {ready:<10}{result['commit_desc']}")
+        return 0
+    
+    try:
+        results = profiler.run(services)
+    except DeployError as e:
+        log_to_stdout(f"❌ {e}")
+        return 1
+    for result in results:
+        print("\n".join(describe_profile(result, profiler.previous(result), count=args.top)))
+    return 0
+
+def cmd_launch_bench(project_status, args):
+    """反复冷启动、热启动整套服务，测量各服务就绪的时间"""
+    benchmark = LaunchBenchmark(project_status)
+    if args.action == "run":
+        try:
+            result = benchmark.run(warm_runs=args.runs, cold=not args.no_cold)
+        except DeployError as e:
+            log_to_stdout(f"❌ {e}")
+            return 1
+        results = [result]
+    else:
+        results = benchmark.history()
+    history = benchmark.history()
+    for result in results:
+        print("\n".join(describe_benchmark(result, previous_benchmark(history, result))))
+    return 0
+
+def cmd_metrics(project_status, args):
+    """输出一次Prometheus指标，或在前台提供 /metrics"""
+    collector = MetricsCollector(project_status, interval=args.interval)
+    if args.action == "show":
+        print(format_metrics(collector.sample()), end="")
+        return 0
+    
+    if args.port is not None:
+        project_status.update_status(metrics_port=args.port)
+    port = int(project_status.get_status("metrics_port") or 0)
+    if port <= 0:
+        log_to_stdout("❌ 没有设置指标端口，请使用 --port 指定（会保存到状态文件，图形界面启动时也会提供）")
+        return 1
+    server = MetricsServer(collector, port)
+    try:
+        server.start()
+    except OSError as e:
+        log_to_stdout(f"❌ 无法监听端口 {port}: {e}")
+        return 1
+    log_to_stdout(f"📊 监控指标: http://127.0.0.1:{port}/metrics，每 {args.interval:g} 秒采集一次，按 Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        server.stop()
+        return 0
+
+def cmd_data_hub(project_status, args):
+    """定时数据更新：查看和设置任务、立即执行、查看记录，或在前台按设置的时间执行"""
+    jobs = get_data_hub_jobs(project_status)
+    job_ids = [job["id"] for job in jobs]
+    unknown = [job_id for job_id in args.jobs if job_id not in job_ids]
+    if unknown:
+        log_to_stdout(f"❌ 未知的任务: {', '.join(unknown)}（可用: {', '.join(job_ids)}）")
+        return 1
+    
+    if args.action == "list":
+        last_runs = {}
+        for run in project_status.get_status("data_hub_runs") or []:
+            last_runs[run["job"]] = run
+        for job in jobs:
+            state = f"每天 {job.get('time')}" if job.get("enabled") else "未启用"
+            print(f"{job['id']:<16}{job.get('title', ''):<12}{state:<14}{job['start']}")
+            if job["id"] in last_runs:
+                print(f"{'':<16}上次: {describe_data_hub_run(last_runs[job['id']])}")
+        return 0
+    
+    if args.action in ("enable", "disable"):
+        if not args.jobs:
+            log_to_stdout("❌ 请指定任务ID")
+            return 1
+        if args.time:
+            try:
+                parse_schedule_time(args.time)
+            except ValueError:
+                log_to_stdout(f"❌ 无效的时间: {args.time}（格式为 HH:MM）")
+                return 1
+        schedule = dict(project_status.get_status("data_hub_schedule") or {})
+        for job_id in args.jobs:
+            settings = dict(schedule.get(job_id, {}), enabled=args.action == "enable")
+            if args.time:
+                settings["time"] = args.time
+            schedule[job_id] = settings
+        project_status.update_status(data_hub_schedule=schedule)
+        log_to_stdout(f"✅ 已{'启用' if args.action == 'enable' else '停用'}: {', '.join(args.jobs)}")
+        return 0
+    
+    if args.action == "history":
+        runs = [run for run in project_status.get_status("data_hub_runs") or [] if not args.jobs or run["job"] in args.jobs]
+        if args.json:
+            print(json.dumps(runs, ensure_ascii=False, indent=2))
+            return 0
+        if not runs:
+            print("没有数据更新记录")
+        for run in runs[-args.limit:]:
+            print(describe_data_hub_run(run))
+        return 0
+    
+    scheduler = DataHubScheduler(project_status, log=log_to_stdout)
+    if args.action == "run":
+        selected = [job for job in jobs if job["id"] in args.jobs] if args.jobs else \
+            [job for job in jobs if job.get("enabled")] or jobs
+        runs = scheduler.run_jobs(selected)
+        return 0 if all(run["result"] == "ok" for run in runs) else 1
+    
+    enabled = [f"{job['id']} {job.get('time')}" for job in jobs if job.get("enabled")]
+    if not enabled:
+        log_to_stdout("❌ 没有启用的任务，请先使用 data-hub enable 任务ID --time HH:MM")
+        return 1
+    log_to_stdout(f"⏰ 开始定时数据更新（{', '.join(enabled)}），按 Ctrl+C 退出")
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        scheduler.stop()
+        return 0
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="panda_deploy_cli", description="PandaAI工具管理助手（命令行模式）")
+    parser.add_argument("--status-file", default="project_status.json", help="状态文件路径（默认: project_status.json）")
+    parser.add_argument("--profile", help="使用的配置名称（默认为当前配置）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    deploy_parser = subparsers.add_parser("deploy", help="部署PandaFactor和QuantFlow")
+    update_parser = subparsers.add_parser("update", help="检查并安装项目更新")
+    for sub_parser in (deploy_parser, update_parser):
+        for option, key, help_text in CONFIG_OPTIONS:
+            sub_parser.add_argument(option, dest=key, help=help_text, type=int if key.endswith("_port") else str)
+    update_parser.add_argument("--check", action="store_true", help="只检查更新，有更新时返回码为2")
+    update_parser.add_argument("--force", action="store_true", help="没有新提交时也重新安装依赖")
+    
+    subparsers.add_parser("launch", help="启动MongoDB、PandaFactor和QuantFlow")
+    subparsers.add_parser("stop", help="停止所有服务")
+    
+    status_parser = subparsers.add_parser("status", help="查看环境和服务状态")
+    status_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    
+    watch_parser = subparsers.add_parser("watch", help="轮询远程仓库，发现更新时提示")
+    watch_parser.add_argument("--interval", type=float, help="检查间隔（分钟），会保存到状态文件")
+    watch_parser.add_argument("--once", action="store_true", help="只检查一次，有更新时返回码为2")
+    
+    snapshot_parser = subparsers.add_parser("env-snapshot", help="Conda环境快照（打包、恢复、回滚）")
+    snapshot_parser.add_argument("action", choices=["list", "create", "restore"], help="列出、创建或恢复快照")
+    snapshot_parser.add_argument("archive", nargs="?", help="restore时使用的快照序号或归档路径（默认最新）")
+    
+    lock_parser = subparsers.add_parser("lock", help="环境锁定文件（精确版本，创建环境时不解析依赖）")
+    lock_parser.add_argument("action", choices=["show", "write"], help="查看锁定文件信息或根据当前环境写入")
+    
+    fingerprint_parser = subparsers.add_parser("env-fingerprint", help="检查Conda环境中手动安装、升级或删除的包")
+    fingerprint_parser.add_argument("action", choices=["diff", "record"],
+                                    help="与部署时的环境比较（有变化时返回码为2），或把当前环境记录为基准")
+    fingerprint_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    
+    db_snapshot_parser = subparsers.add_parser("db-snapshot", help="MongoDB数据目录的增量快照和恢复")
+    db_snapshot_parser.add_argument("action", choices=["list", "create", "restore", "prune"],
+                                    help="列出、创建、恢复快照，或按保留数量清理快照库")
+    db_snapshot_parser.add_argument("snapshot", nargs="?", help="restore时的快照ID或序号（默认最新）")
+    db_snapshot_parser.add_argument("--label", help="create时的快照说明")
+    db_snapshot_parser.add_argument("--no-backup", action="store_true", help="restore前不自动备份当前数据")
+    
+    advisor_parser = subparsers.add_parser("db-advisor", help="MongoDB索引和慢查询诊断")
+    advisor_parser.add_argument("action", choices=["show", "profile", "create-index"],
+                                help="查看诊断结果、开启慢查询分析器或在后台创建推荐索引")
+    advisor_parser.add_argument("target", nargs="?", help="create-index时的查询序号，all 为全部推荐索引")
+    advisor_parser.add_argument("--slowms", type=int, default=100, help="慢查询阈值（毫秒，默认100）")
+    advisor_parser.add_argument("--off", action="store_true", help="profile时关闭慢查询分析器")
+    advisor_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    
+    disk_parser = subparsers.add_parser("disk", help="磁盘占用统计和缓存清理")
+    disk_parser.add_argument("action", choices=["show", "prune"], help="查看占用和可释放空间，或执行清理策略")
+    disk_parser.add_argument("policies", nargs="*", help="prune时执行的策略ID，all 为全部")
+    disk_parser.add_argument("--full", action="store_true", help="重新统计所有文件（不使用目录缓存）")
+    disk_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    
+    logs_parser = subparsers.add_parser("logs", help="列出或搜索服务日志（安装路径下的logs）")
+    logs_parser.add_argument("action", choices=["list", "search"], help="列出日志文件或搜索关键词")
+    logs_parser.add_argument("query", nargs="?", help="搜索内容（不区分大小写的子串匹配）")
+    logs_parser.add_argument("--service", action="append", choices=["mongodb", "factor", "quantflow"],
+                             help="只搜索指定服务，可重复指定")
+    logs_parser.add_argument("--limit", type=int, default=200, help="最多显示的行数（默认200）")
+    
+    startup_parser = subparsers.add_parser("startup-profile", help="用 -X importtime 分析服务器启动的导入耗时")
+    startup_parser.add_argument("action", choices=["run", "history"], help="分析一次（需要先停止服务）或查看各提交的结果")
+    startup_parser.add_argument("service", nargs="?", choices=[name for name, _ in PROFILE_SERVICES],
+                                help="只分析指定服务（默认为全部）")
+    startup_parser.add_argument("--top", type=int, default=15, help="显示最慢的导入数量（默认15）")
+    
+    bench_parser = subparsers.add_parser("launch-bench", help="启动基准测试：反复启动、停止服务，测量各服务就绪时间")
+    bench_parser.add_argument("action", choices=["run", "history"], help="执行基准测试（需要先停止服务）或查看历史结果")
+    bench_parser.add_argument("--runs", type=int, default=3, help="热启动次数（默认3）")
+    bench_parser.add_argument("--no-cold", action="store_true", help="不进行冷启动")
+    
+    metrics_parser = subparsers.add_parser("metrics", help="Prometheus格式的工具和服务监控指标")
+    metrics_parser.add_argument("action", choices=["show", "serve"], help="输出一次指标，或在前台提供 /metrics")
+    metrics_parser.add_argument("--port", type=int, help="serve时监听的本机端口，会保存到状态文件（0为关闭）")
+    metrics_parser.add_argument("--interval", type=float, default=15, help="采集间隔（秒，默认15）")
+    
+    data_hub_parser = subparsers.add_parser("data-hub", help="定时调用PandaFactor数据中心的数据更新接口")
+    data_hub_parser.add_argument("action", choices=["list", "enable", "disable", "run", "history", "schedule"],
+                                 help="查看任务、启用或停用定时执行、立即执行（失败时返回码为1）、"
+                                      "查看执行记录，或在前台按设置的时间执行")
+    data_hub_parser.add_argument("jobs", nargs="*", help="任务ID（run 默认为已启用的任务）")
+    data_hub_parser.add_argument("--time", help="enable时设置每天执行的时间（HH:MM）")
+    data_hub_parser.add_argument("--limit", type=int, default=20, help="history显示的记录数量（默认20）")
+    data_hub_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    
+    profile_parser = subparsers.add_parser("profile", help="管理多套部署配置（安装路径、Conda环境、端口）")
+    profile_parser.add_argument("action", choices=["list", "check", "add", "use", "remove"],
+                                help="list 列出配置，check 并行检查所有配置，add/use/remove 新建、切换、删除配置")
+    profile_parser.add_argument("name", nargs="?", help="配置名称")
+    profile_parser.add_argument("--copy-from", help="新建配置时复制设置的来源配置（默认为当前配置）")
+    profile_parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    
+    return parser
+
+# 需要项目安装路径的命令（lock 在命令中单独检查）
+PROJECT_COMMANDS = {"watch", "env-snapshot", "env-fingerprint", "db-snapshot", "db-advisor", "logs", "startup-profile",
+                    "launch-bench"}
+
+COMMANDS = {
+    "deploy": cmd_deploy,
+    "update": cmd_update,
+    "launch": cmd_launch,
+    "stop": cmd_stop,
+    "status": cmd_status,
+    "watch": cmd_watch,
+    "env-snapshot": cmd_env_snapshot,
+    "lock": cmd_lock,
+    "env-fingerprint": cmd_env_fingerprint,
+    "db-snapshot": cmd_db_snapshot,
+    "db-advisor": cmd_db_advisor,
+    "disk": cmd_disk,
+    "logs": cmd_logs,
+    "startup-profile": cmd_startup_profile,
+    "launch-bench": cmd_launch_bench,
+    "metrics": cmd_metrics,
+    "data-hub": cmd_data_hub,
+}
+
+def main(argv=None):
+    """主函数"""
+    args = build_parser().parse_args(argv)
+    profiles = ProfileManager(args.status_file)
+    if args.command == "profile":
+        return cmd_profile(profiles, args)
+    try:
+        project_status = profiles.get(args.profile)
+    except DeployError as e:
+        log_to_stdout(f"❌ {e}")
+        return 1
+    if args.command in PROJECT_COMMANDS and not require_project_path(project_status):
+        return 1
+    return COMMANDS[args.command](project_status, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
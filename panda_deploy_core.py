@@ -0,0 +1,2538 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 核心逻辑
+部署流程、服务启停和状态探测，不依赖tkinter，可供图形界面和命令行共用
+"""
+
+import subprocess
+import os
+import time
+import json
+import copy
+import ctypes
+import glob
+import queue
+import hashlib
+import random
+import re
+import shlex
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import urllib.request
+import urllib.error
+import webbrowser
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from panda_deploy_archive import pack_directory, relocate_files, unpack_archive
+from panda_deploy_fingerprint import diff_fingerprints, get_fingerprinter
+from panda_deploy_logs import capture_command, stop_request_path
+
+MONGODB_PORT = 27017
+FACTOR_PORT = 8111
+QUANTFLOW_PORT = 8000
+
+# PandaFactor的子模块（按照官方文档一次性安装为可编辑包）
+FACTOR_SUBMODULES = [
+    "./panda_common",
+    "./panda_factor",
+    "./panda_data",
+    "./panda_data_hub",
+    "./panda_llm",
+    "./panda_factor_server"
+]
+
+# 部署步骤: (步骤ID, 执行时标题, 已完成时标题, 完成后进度)
+DEPLOY_STEPS = [
+    ("check_environment", "步骤1: 检查环境", "步骤1: 环境检查", 15),
+    ("create_directory", "步骤2: 创建安装目录", "步骤2: 创建安装目录", 30),
+    ("clone_project", "步骤3: 下载PandaFactor项目", "步骤3: 下载PandaFactor项目", 50),
+    ("setup_conda_env", "步骤4: 配置Conda环境", "步骤4: 配置Conda环境", 65),
+    ("install_dependencies", "步骤5: 安装项目依赖", "步骤5: 安装项目依赖", 70),
+    ("deploy_quantflow", "步骤6: 部署PandaQuantFlow", "步骤6: 部署PandaQuantFlow", 85),
+    ("precompile_bytecode", "步骤7: 预编译Python字节码", "步骤7: 预编译Python字节码", 92),
+    ("create_scripts", "步骤8: 完成部署配置", "步骤8: 完成部署配置", 100),
+]
+
+# 更新项目时需要重新执行的步骤
+UPDATE_STEPS = ["clone_project", "install_dependencies", "deploy_quantflow", "precompile_bytecode"]
+
+class DeployError(Exception):
+    """部署配置或前置条件错误"""
+
+def exe_name(name):
+    """平台相关的可执行文件名"""
+    return f"{name}.exe" if os.name == 'nt' else name
+
+def log_to_stdout(message):
+    """默认日志输出"""
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+class ProjectStatus:
+    """项目状态管理类"""
+    # 区分多套配置的字段，清除状态时保留
+    PROFILE_KEYS = ["profile_name", "mongodb_data_path", "mongodb_port", "factor_port", "quantflow_port"]
+    
+    def __init__(self, status_file="project_status.json"):
+        self.status_file = status_file
+        self.default_status = {
+            "profile_name": "",  # 配置名称，默认配置为空
+            "project_path": "",
+            "conda_env": "pandaaitool",
+            "git_url": "https://github.com/PandaAI-Tech/panda_factor.git",
+            "quantflow_git_url": "https://github.com/PandaAI-Tech/panda_quantflow.git",
+            "mongodb_path": "",
+            "mongodb_data_path": "",  # MongoDB数据目录，留空时使用 MongoDB安装目录/data/db（其他配置为 data/db_配置名称）
+            # 启动时按这些端口启动MongoDB和两个服务器，并把MongoDB端口写入PandaFactor的 config.yaml
+            "mongodb_port": MONGODB_PORT,
+            "factor_port": FACTOR_PORT,
+            "quantflow_port": QUANTFLOW_PORT,
+            "mongodb_status": "unknown",  # unknown, ok, error, not_configured
+            "deployment_status": "not_started",  # not_started, in_progress, completed, failed
+            "last_update": "",
+            "git_commit": "",
+            "quantflow_commit": "",
+            "environment_status": "unknown",  # unknown, ok, error
+            "server_status": "stopped",  # stopped, running, error
+            "completed_steps": [],
+            "step_telemetry": {},  # step_id -> {attempts, duration, result, finished_at}
+            "probe_cache": {},  # 上次的状态检查结果，启动时立即显示
+            "remote_watch_interval": 30,  # 后台检查远程更新的间隔（分钟），0表示关闭
+            "remote_updates": {},  # 后台检查发现的远程更新: factor/quantflow -> {upstream, ahead, behind, ...}
+            "last_update_check": "",  # 上次检查远程更新的时间（后台检查或手动检查）
+            "env_snapshot_keep": 2,  # 部署成功后自动保留的Conda环境快照数量，0表示不自动创建
+            "env_snapshots": [],  # 已创建的环境快照: [{path, created_at, env_name, git_commit, size}]
+            "env_snapshot_source": "",  # 下次创建环境时优先使用的快照（例如从其他电脑复制的归档）
+            "use_env_locks": True,  # 部署成功后写入锁定文件，之后按锁定文件创建环境和安装依赖
+            "env_lock_dir": "",  # 锁定文件目录，留空时为 安装路径/locks
+            "mongodb_snapshot_dir": "",  # MongoDB数据快照库，留空时为 安装路径/snapshots/mongodb
+            "mongodb_snapshot_keep": 7,  # 保留的MongoDB数据快照数量
+            "log_max_mb": 20,  # 服务日志每个文件的大小（MB），写满后轮转
+            "log_keep": 50,  # 每个服务保留的日志文件数量
+            "precompile_site_packages": False,  # 预编译字节码时是否同时编译Conda环境的 site-packages
+            "precompile_stats": {},  # 上次预编译的结果: {files, compiled, failed, workers, elapsed, cpu, import_before, import_after, finished_at}
+            "fast_editable_install": True,  # 子模块直接写入 .pth 和 dist-info，不构建wheel（无法处理的子模块仍使用pip）
+            "env_activation": {},  # 缓存的Conda环境解释器和激活后的环境变量: {env_name, prefix, python, variables, path, stamp}
+            "env_fingerprint": {},  # 部署完成时Conda环境的指纹: {prefix, digest, packages, created_at}
+            "data_hub_schedule": {},  # 定时数据更新任务的设置，按任务ID覆盖默认值: {enabled, time, weekdays, start, progress, params}
+            "data_hub_max_concurrent": 1,  # 同时执行的数据更新任务数量
+            "data_hub_retries": 2,  # 数据更新失败后的重试次数
+            "data_hub_poll_retries": 5,  # 查询数据更新进度失败后的重试次数（不会重新提交任务）
+            "data_hub_window_minutes": 120,  # 超过设置时间多久后不再补执行（分钟）
+            "data_hub_health_timeout": 600,  # 执行前等待PandaFactor服务器就绪的最长时间（秒）
+            "data_hub_last_runs": {},  # 每个任务最后一次定时执行的日期，避免同一天重复执行
+            "metrics_port": 0,  # 本机Prometheus指标端口（/metrics），0表示关闭
+            "data_hub_runs": [],  # 最近的数据更新记录: [{job, started_at, duration, result, attempts, rows, error}]
+            "last_check": ""
+        }
+        self.status = self.load_status()
+    
+    def load_status(self):
+        """加载状态"""
+        try:
+            if os.path.exists(self.status_file):
+                with open(self.status_file, 'r', encoding='utf-8') as f:
+                    status = json.load(f)
+                # 合并默认状态和已保存状态
+                merged_status = copy.deepcopy(self.default_status)
+                merged_status.update(status)
+                return merged_status
+            return copy.deepcopy(self.default_status)
+        except Exception as e:
+            print(f"加载状态失败: {e}")
+            return copy.deepcopy(self.default_status)
+    
+    def save_status(self):
+        """保存状态"""
+        try:
+            self.status["last_check"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with open(self.status_file, 'w', encoding='utf-8') as f:
+                json.dump(self.status, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存状态失败: {e}")
+    
+    def update_status(self, **kwargs):
+        """更新状态"""
+        self.status.update(kwargs)
+        self.save_status()
+    
+    def get_status(self, key):
+        """获取状态"""
+        return self.status.get(key, self.default_status.get(key))
+    
+    def reset(self):
+        """恢复默认状态（保留配置名称、端口和数据目录，避免与其他配置冲突）"""
+        kept = {key: self.status[key] for key in self.PROFILE_KEYS if key in self.status}
+        self.status = copy.deepcopy(self.default_status)
+        self.status.update(kept)
+        self.save_status()
+    
+    def record_step_telemetry(self, step_id, **fields):
+        """记录部署步骤的遥测数据（尝试次数、耗时、结果）"""
+        telemetry = dict(self.get_status("step_telemetry") or {})
+        telemetry[step_id] = dict(fields, finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self.update_status(step_telemetry=telemetry)
+    
+    def get_ports(self):
+        """本配置使用的端口: {mongodb, factor, quantflow}"""
+        return {
+            "mongodb": int(self.get_status("mongodb_port")),
+            "factor": int(self.get_status("factor_port")),
+            "quantflow": int(self.get_status("quantflow_port")),
+        }
+    
+    def get_mongodb_data_path(self):
+        """MongoDB数据目录，未单独设置时使用安装目录下的 data/db，其他配置使用 data/db_配置名称"""
+        data_path = self.get_status("mongodb_data_path")
+        if data_path:
+            return data_path
+        mongodb_path = self.get_status("mongodb_path")
+        if not mongodb_path:
+            return ""
+        profile_name = self.get_status("profile_name")
+        return os.path.join(mongodb_path, "data", f"db_{profile_name}" if profile_name else "db")
+
+class RetryPolicy:
+    """网络命令重试策略：识别网络错误并按带抖动的指数退避重试"""
+    # git/conda/pip 在网络异常时输出的错误信息（不区分大小写）；只根据错误输出判断，返回码在不同工具间含义不同
+    NETWORK_ERROR_PATTERNS = [
+        r"could not resolve host",
+        r"temporary failure in name resolution",
+        r"name or service not known",
+        r"failed to connect to",
+        r"failed to establish a new connection",
+        r"connection timed out",
+        r"connection reset by peer",
+        r"connection refused",
+        r"connection was aborted",
+        r"network is unreachable",
+        r"operation timed out after",
+        r"read ?timed ?out",
+        r"readtimeouterror",
+        r"connecttimeouterror",
+        r"early eof",
+        r"the remote end hung up unexpectedly",
+        r"rpc failed",
+        r"unexpected disconnect",
+        r"gnutls_handshake",
+        r"ssl_connect",
+        r"condahttperror",
+        r"max retries exceeded",
+        r"proxyerror",
+        r"remote ?disconnected",
+        r"incompleteread",
+        r"\bhttp[ /]?(?:error )?5\d\d\b",
+        r"\berror:? 5\d\d\b",
+        r"\b5\d\d server error\b",
+    ]
+    NETWORK_ERROR_PATTERN = re.compile("|".join(NETWORK_ERROR_PATTERNS), re.IGNORECASE)
+    
+    def __init__(self, max_attempts=4, base_delay=2.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def is_network_failure(self, return_code, output_lines):
+        """命令失败时根据输出中的错误信息判断是否为网络错误"""
+        if return_code == 0:
+            return False
+        return any(self.NETWORK_ERROR_PATTERN.search(line) for line in output_lines)
+    
+    def get_delay(self, attempt):
+        """第attempt次失败后的等待时间（指数退避，一半固定一半随机抖动）"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+class CommandRunner:
+    """执行外部命令并逐行输出日志，记录命令尝试次数"""
+    def __init__(self, log=log_to_stdout, retry_policy=None):
+        self.log = log
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.attempts = 0
+    
+    def run(self, command, cwd=None, retry=False, prepare_retry=None, env=None):
+        """执行命令并实时显示输出，retry=True时网络错误按重试策略退避重试
+
+        prepare_retry: 重试前调用，根据已有的部分结果返回续传命令
+        """
+        policy = self.retry_policy if retry else None
+        attempt = 0
+        while True:
+            attempt += 1
+            self.attempts += 1
+            return_code, output_tail = self.run_once(command, cwd, env)
+            
+            if return_code == 0:
+                self.log("✅ 命令执行成功")
+                return True
+            
+            self.log(f"❌ 命令执行失败，返回码: {return_code}")
+            if (policy is None or attempt >= policy.max_attempts
+                    or not policy.is_network_failure(return_code, output_tail)):
+                return False
+            
+            delay = policy.get_delay(attempt)
+            self.log(f"🌐 检测到网络错误，{delay:.1f}秒后重试 ({attempt + 1}/{policy.max_attempts})")
+            time.sleep(delay)
+            if prepare_retry:
+                command = prepare_retry(command)
+    
+    def run_once(self, command, cwd=None, env=None):
+        """执行一次命令，返回 (返回码, 最后若干行输出)"""
+        output_tail = deque(maxlen=50)
+        try:
+            self.log(f"执行命令: {command}")
+            
+            process = subprocess.Popen(
+                command,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                cwd=cwd,
+                env=env,
+                encoding='utf-8',
+                errors='replace'
+            )
+            
+            while True:
+                output = process.stdout.readline()
+                if output == '' and process.poll() is not None:
+                    break
+                if output:
+                    line = output.strip()
+                    output_tail.append(line)
+                    self.log(line)
+            
+            return process.poll(), list(output_tail)
+        
+        except Exception as e:
+            self.log(f"❌ 执行命令时出错: {str(e)}")
+            return -1, list(output_tail) + [str(e)]
+
+def check_git_installed():
+    """检查Git是否可用"""
+    try:
+        result = subprocess.run(['git', '--version'], capture_output=True, text=True)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+def check_conda_installed():
+    """检查Conda是否可用"""
+    try:
+        result = subprocess.run(['conda', '--version'], capture_output=True, text=True)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+def list_conda_envs():
+    """conda env list 的输出，失败时返回空字符串"""
+    try:
+        result = subprocess.run(['conda', 'env', 'list'], capture_output=True, text=True)
+        return result.stdout
+    except Exception:
+        return ""
+
+def check_conda_env(env_name, env_list=None):
+    """检查Conda环境是否存在，env_list 为已获取的 conda env list 输出"""
+    if not env_name:
+        return False
+    if env_list is None:
+        env_list = list_conda_envs()
+    return env_name in env_list
+
+# PandaFactor服务器入口（相对factor目录），按顺序查找
+FACTOR_SERVER_ENTRIES = [
+    "./panda_factor_server/panda_factor_server/__main__.py",
+    "./panda_factor_server/__main__.py",
+]
+
+def find_factor_server_entry(factor_path):
+    """查找PandaFactor服务器入口，返回相对factor目录的路径，不存在返回None"""
+    for candidate in FACTOR_SERVER_ENTRIES:
+        if os.path.exists(os.path.join(factor_path, candidate)):
+            return candidate
+    return None
+
+def check_project_files(base_path):
+    """检查项目文件（base_path/panda_factor 下的服务器入口）"""
+    if not base_path or not os.path.exists(base_path):
+        return False
+    project_path = os.path.join(base_path, "panda_factor")
+    if not os.path.exists(project_path):
+        return False
+    return find_factor_server_entry(project_path) is not None
+
+def check_mongodb_install(mongodb_path):
+    """检查MongoDB可执行文件"""
+    if not mongodb_path or not os.path.exists(mongodb_path):
+        return False
+    bin_path = os.path.join(mongodb_path, "bin")
+    mongod_path = os.path.join(bin_path, exe_name("mongod"))
+    mongo_path = os.path.join(bin_path, exe_name("mongo"))
+    mongosh_path = os.path.join(bin_path, exe_name("mongosh"))
+    return os.path.exists(mongod_path) and (os.path.exists(mongo_path) or os.path.exists(mongosh_path))
+
+def environment_watch_paths(base_path, mongodb_path):
+    """文件检查依赖的路径，供文件监视使用: {检查项: (检查函数, 根目录, [路径])}"""
+    paths = {}
+    if base_path:
+        factor_path = os.path.join(base_path, "panda_factor")
+        paths["project_files"] = (lambda: check_project_files(base_path), base_path,
+                                  [os.path.normpath(os.path.join(factor_path, entry)) for entry in FACTOR_SERVER_ENTRIES])
+    if mongodb_path:
+        bin_path = os.path.join(mongodb_path, "bin")
+        paths["mongodb"] = (lambda: check_mongodb_install(mongodb_path), mongodb_path,
+                            [os.path.join(bin_path, exe_name(name)) for name in ("mongod", "mongo", "mongosh")])
+    return paths
+
+def probe_url(url, timeout=3):
+    """探测HTTP服务，返回 (状态, 说明)，状态为 ok / error / down"""
+    try:
+        response = urllib.request.urlopen(url, timeout=timeout)
+        if response.getcode() == 200:
+            return "ok", "运行正常"
+        return "error", f"响应异常: {response.getcode()}"
+    except urllib.error.HTTPError as e:
+        return "error", f"响应异常: {e.code}"
+    except urllib.error.URLError:
+        return "down", "未启动"
+    except Exception as e:
+        return "down", str(e)
+
+def probe_port(port, host="127.0.0.1", timeout=1):
+    """检查TCP端口是否在监听"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+def process_exists(pid):
+    """进程是否仍在运行（Windows下 os.kill 会结束进程，因此用 tasklist 查询）"""
+    if not pid:
+        return False
+    if os.name == 'nt':
+        result = subprocess.run(['tasklist', '/fi', f'PID eq {pid}', '/fo', 'csv', '/nh'],
+                                capture_output=True, text=True)
+        return f'"{pid}"' in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def process_created(pid):
+    """进程的创建时间，用来确认进程号没有被其他进程复用；进程不存在或无法查询时返回None
+
+    Windows下为 GetProcessTimes 返回的创建时间（FILETIME），Linux下为 /proc/<pid>/stat 中的启动时间（时钟节拍）
+    """
+    if not pid:
+        return None
+    if os.name == 'nt':
+        from ctypes import wintypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return None
+        try:
+            created, exited, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+            if not kernel32.GetProcessTimes(handle, ctypes.byref(created), ctypes.byref(exited),
+                                            ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            return created.value
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        with open(f"/proc/{pid}/stat", 'r', encoding='utf-8', errors='replace') as f:
+            # 进程名中可能有空格和括号，从最后一个右括号之后开始数（第22项为启动时间）
+            return int(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+def collect_environment_status(env_name, base_path, mongodb_path):
+    """一次性检查所有环境状态"""
+    return {
+        "git": check_git_installed(),
+        "conda": check_conda_installed(),
+        "python_env": check_conda_env(env_name),
+        "project_files": check_project_files(base_path),
+        "mongodb": check_mongodb_install(mongodb_path),
+    }
+
+def collect_service_status(ports=None):
+    """检查MongoDB端口和两个服务器的HTTP状态，ports 为 {mongodb, factor, quantflow}"""
+    ports = ports or {"mongodb": MONGODB_PORT, "factor": FACTOR_PORT, "quantflow": QUANTFLOW_PORT}
+    factor_state, factor_detail = probe_url(f"http://localhost:{ports['factor']}")
+    quantflow_state, quantflow_detail = probe_url(f"http://localhost:{ports['quantflow']}")
+    return {
+        "mongodb": "ok" if probe_port(ports["mongodb"]) else "down",
+        "factor": factor_state,
+        "factor_detail": factor_detail,
+        "quantflow": quantflow_state,
+        "quantflow_detail": quantflow_detail,
+    }
+
+class ProfileManager:
+    """多套部署配置（profile）管理
+    
+    每个配置有独立的状态文件（安装路径、Conda环境、端口、MongoDB数据目录和部署状态）。
+    新配置分配与其他配置都不冲突的端口，多套配置的服务可以同时运行。
+    索引文件 profiles.json 记录配置名称和当前配置；没有索引文件时只有一个使用
+    project_status.json 的 default 配置，与旧版本兼容。已加载的配置保存在内存中，切换时无需重新读取。
+    """
+    DEFAULT_PROFILE = "default"
+    # 新建配置时从来源配置复制的字段，部署状态等其他字段使用默认值
+    COPIED_KEYS = ["conda_env", "git_url", "quantflow_git_url", "mongodb_path", "remote_watch_interval"]
+    
+    def __init__(self, default_status_file="project_status.json"):
+        self.default_status_file = default_status_file
+        self.base_dir = os.path.dirname(os.path.abspath(default_status_file))
+        self.index_file = os.path.join(self.base_dir, "profiles.json")
+        self.statuses = {}
+        self.index = self.load_index()
+    
+    def load_index(self):
+        """加载配置索引"""
+        index = {"active": self.DEFAULT_PROFILE, "profiles": {self.DEFAULT_PROFILE: self.default_status_file}}
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                index["profiles"].update(saved.get("profiles", {}))
+                # 默认配置始终使用指定的状态文件
+                index["profiles"][self.DEFAULT_PROFILE] = self.default_status_file
+                if saved.get("active") in index["profiles"]:
+                    index["active"] = saved["active"]
+        except Exception as e:
+            print(f"加载配置索引失败: {e}")
+        return index
+    
+    def save_index(self):
+        """保存配置索引"""
+        try:
+            with open(self.index_file, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存配置索引失败: {e}")
+    
+    @property
+    def active(self):
+        """当前配置名称"""
+        return self.index["active"]
+    
+    def names(self):
+        """所有配置名称，default 在最前"""
+        return sorted(self.index["profiles"], key=lambda name: (name != self.DEFAULT_PROFILE, name))
+    
+    def get(self, name=None):
+        """返回配置的 ProjectStatus，加载后缓存"""
+        name = name or self.active
+        if name not in self.index["profiles"]:
+            raise DeployError(f"配置不存在: {name}")
+        if name not in self.statuses:
+            status_file = self.index["profiles"][name]
+            if not os.path.isabs(status_file):
+                status_file = os.path.join(self.base_dir, status_file)
+            self.statuses[name] = ProjectStatus(status_file)
+        return self.statuses[name]
+    
+    def switch(self, name):
+        """切换当前配置"""
+        project_status = self.get(name)
+        self.index["active"] = name
+        self.save_index()
+        return project_status
+    
+    def create(self, name, copy_from=None):
+        """新建配置：复制来源配置的基本设置，使用单独的Conda环境名，并分配与其他配置不冲突的端口"""
+        name = name.strip()
+        if not re.fullmatch(r"[\w.-]+", name):
+            raise DeployError("配置名称只能包含字母、数字、下划线、点和短横线")
+        if name in self.index["profiles"]:
+            raise DeployError(f"配置已存在: {name}")
+        
+        source = self.get(copy_from)
+        used = {port for other in self.index["profiles"] for port in self.get(other).get_ports().values()}
+        offset = 1
+        while used & {MONGODB_PORT + offset, FACTOR_PORT + offset, QUANTFLOW_PORT + offset}:
+            offset += 1
+        settings = {key: source.get_status(key) for key in self.COPIED_KEYS}
+        settings.update(
+            profile_name=name,
+            conda_env=f"{source.get_status('conda_env')}_{name}",
+            mongodb_port=MONGODB_PORT + offset,
+            factor_port=FACTOR_PORT + offset,
+            quantflow_port=QUANTFLOW_PORT + offset,
+        )
+        
+        os.makedirs(os.path.join(self.base_dir, "profiles"), exist_ok=True)
+        self.index["profiles"][name] = os.path.join("profiles", f"{name}.json")
+        project_status = self.get(name)
+        project_status.update_status(**settings)
+        self.save_index()
+        return project_status
+    
+    def delete(self, name):
+        """删除配置（default 和当前配置不能删除），只删除状态文件，不删除安装目录"""
+        if name == self.DEFAULT_PROFILE or name == self.active:
+            raise DeployError("不能删除默认配置或当前正在使用的配置")
+        project_status = self.get(name)
+        del self.index["profiles"][name]
+        self.statuses.pop(name, None)
+        self.save_index()
+        if os.path.exists(project_status.status_file):
+            os.remove(project_status.status_file)
+    
+    def sweep(self, overrides=None, max_workers=8):
+        """并行检查所有配置的环境和服务状态
+        
+        Git/Conda 是否可用和 conda env list 只检查一次，其余按配置并行检查；
+        结果写入各配置的 probe_cache 并返回 {配置名称: {environment, services, env_drift}}。
+        overrides 可以为某个配置临时指定 project_path/conda_env/mongodb_path（例如界面中尚未保存的输入）
+        """
+        overrides = overrides or {}
+        names = self.names()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            shared = {
+                "git": executor.submit(check_git_installed),
+                "conda": executor.submit(check_conda_installed),
+                "env_list": executor.submit(list_conda_envs),
+            }
+            
+            def check_profile(name):
+                project_status = self.get(name)
+                config = {key: project_status.get_status(key) for key in ("project_path", "conda_env", "mongodb_path")}
+                config.update({key: value for key, value in overrides.get(name, {}).items() if value})
+                services = collect_service_status(project_status.get_ports())
+                environment = {
+                    "git": shared["git"].result(),
+                    "conda": shared["conda"].result(),
+                    "python_env": check_conda_env(config["conda_env"], shared["env_list"].result()),
+                    "project_files": check_project_files(config["project_path"]),
+                    "mongodb": check_mongodb_install(config["mongodb_path"]),
+                }
+                env_drift = check_env_drift(project_status, config["conda_env"]) if environment["python_env"] else None
+                return {"environment": environment, "services": services, "env_drift": env_drift}
+            
+            futures = {name: executor.submit(check_profile, name) for name in names}
+            results = {name: future.result() for name, future in futures.items()}
+        
+        checked_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for name, result in results.items():
+            project_status = self.get(name)
+            cache = dict(project_status.get_status("probe_cache") or {})
+            services = result["services"]
+            cache.update(environment=result["environment"], services=services, checked_at=checked_at,
+                         env_drift=result["env_drift"],
+                         factor_server={"state": services["factor"], "detail": services["factor_detail"]})
+            project_status.update_status(probe_cache=cache)
+        return results
+
+def get_update_targets(base_path):
+    """返回需要检查更新的 (factor路径, quantflow路径或None)，路径无效时抛出DeployError"""
+    if not base_path or not os.path.exists(base_path):
+        raise DeployError("项目路径不存在")
+    
+    # 实际的Git仓库路径应该是 base_path/panda_factor
+    panda_factor_path = os.path.join(base_path, "panda_factor")
+    if not os.path.exists(panda_factor_path):
+        raise DeployError(f"PandaFactor项目目录不存在: {panda_factor_path}")
+    if not os.path.exists(os.path.join(panda_factor_path, ".git")):
+        raise DeployError(f"目录不是Git仓库: {panda_factor_path}")
+    
+    panda_quantflow_path = os.path.join(base_path, "panda_quantflow")
+    if not os.path.exists(os.path.join(panda_quantflow_path, ".git")):
+        panda_quantflow_path = None
+    return panda_factor_path, panda_quantflow_path
+
+def run_git(repo_path, *args):
+    """在仓库中执行git命令，返回 (成功与否, 标准输出, 错误输出)"""
+    try:
+        result = subprocess.run(['git', *args], cwd=repo_path, capture_output=True, text=True,
+                                encoding='utf-8', errors='replace')
+        return result.returncode == 0, result.stdout.strip(), result.stderr.strip()
+    except Exception as e:
+        return False, "", str(e)
+
+def inspect_repository(repo_path, fetch=True):
+    """获取仓库当前版本以及相对上游分支的领先/落后提交数
+
+    使用真实的上游分支（@{u}）而不是固定的 origin/main，落后时用一次 git log 取出待更新的提交
+    """
+    info = {
+        "path": repo_path,
+        "fetch_ok": True,
+        "error": "",
+        "branch": "",
+        "upstream": "",
+        "ahead": 0,
+        "behind": 0,
+        "incoming": [],
+        "commit": "",
+        "commit_desc": "",
+    }
+    
+    if fetch:
+        ok, _, stderr = run_git(repo_path, 'fetch')
+        if not ok:
+            info["fetch_ok"] = False
+            info["error"] = stderr
+    
+    ok, stdout, _ = run_git(repo_path, 'log', '-1', '--format=%H%x1f%h %s')
+    if ok and stdout:
+        info["commit"], info["commit_desc"] = stdout.split("\x1f", 1)
+    
+    ok, stdout, stderr = run_git(repo_path, 'rev-parse', '--abbrev-ref', 'HEAD', '@{u}')
+    if not ok:
+        # 没有上游分支（例如分离HEAD或未设置跟踪）
+        info["error"] = info["error"] or stderr
+        return info
+    info["branch"], info["upstream"] = stdout.splitlines()[:2]
+    
+    ok, stdout, _ = run_git(repo_path, 'rev-list', '--left-right', '--count', 'HEAD...@{u}')
+    if ok and stdout:
+        ahead, behind = stdout.split()
+        info["ahead"], info["behind"] = int(ahead), int(behind)
+    
+    if info["behind"]:
+        ok, stdout, _ = run_git(repo_path, 'log', '--oneline', 'HEAD..@{u}')
+        if ok:
+            info["incoming"] = stdout.splitlines()
+    return info
+
+def inspect_repositories(repo_paths, fetch=True):
+    """并行检查多个仓库，返回与 repo_paths 顺序一致的结果列表"""
+    if len(repo_paths) <= 1:
+        return [inspect_repository(path, fetch) for path in repo_paths]
+    with ThreadPoolExecutor(max_workers=len(repo_paths)) as executor:
+        return list(executor.map(lambda path: inspect_repository(path, fetch), repo_paths))
+
+def describe_divergence(info):
+    """领先/落后情况的说明文字"""
+    text = f"{info['branch']} → {info['upstream']}"
+    if info["ahead"]:
+        text += f"，本地领先 {info['ahead']} 个提交"
+    if info["behind"]:
+        text += f"，落后 {info['behind']} 个提交"
+    return text
+
+def check_updates(base_path, project_status, log=log_to_stdout):
+    """并行检查PandaFactor和QuantFlow的远程更新并刷新状态文件中的提交信息
+
+    返回 {"factor_behind": bool, "quantflow_behind": bool, "deployed": bool, "repositories": {...}}，
+    PandaFactor获取远程更新失败时返回None
+    """
+    panda_factor_path, panda_quantflow_path = get_update_targets(base_path)
+    result_info = {"factor_behind": False, "quantflow_behind": False, "deployed": False, "repositories": {}}
+    
+    log("检查Git更新...")
+    log(f"检查路径: {panda_factor_path}")
+    if panda_quantflow_path:
+        log(f"检查路径: {panda_quantflow_path}")
+    else:
+        log("ℹ️ 未找到QuantFlow项目，跳过检查")
+    
+    # 同时获取两个仓库的远程更新
+    log("正在获取远程更新...")
+    repo_paths = [panda_factor_path] + ([panda_quantflow_path] if panda_quantflow_path else [])
+    repositories = inspect_repositories(repo_paths)
+    factor_info = repositories[0]
+    quantflow_info = repositories[1] if panda_quantflow_path else None
+    result_info["repositories"]["factor"] = factor_info
+    
+    if not factor_info["fetch_ok"]:
+        log(f"获取远程更新失败: {factor_info['error']}")
+        return None
+    project_status.update_status(last_update_check=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    
+    # 检查是否有更新
+    if not factor_info["upstream"]:
+        log(f"⚠️ 当前分支没有跟踪的远程分支: {factor_info['error']}")
+    elif factor_info["behind"]:
+        result_info["factor_behind"] = True
+        log(f"发现新版本，可以更新（{describe_divergence(factor_info)}）")
+        log("更新内容:\n" + "\n".join(factor_info["incoming"]))
+    else:
+        log(f"项目已是最新版本（{describe_divergence(factor_info)}）")
+    
+    # 更新当前提交信息
+    if factor_info["commit"]:
+        project_status.update_status(
+            git_commit=factor_info["commit"],
+            project_path=base_path,  # 确保路径被保存
+            last_update=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        log(f"✅ 当前版本: {factor_info['commit'][:8]} - {factor_info['commit_desc']}")
+        log("✅ 项目状态已更新到 project_status.json")
+    else:
+        log("⚠️ 无法获取当前版本信息")
+    
+    if quantflow_info:
+        result_info["repositories"]["quantflow"] = quantflow_info
+        if not quantflow_info["fetch_ok"]:
+            log("⚠️ QuantFlow更新检查失败")
+        elif quantflow_info["behind"]:
+            result_info["quantflow_behind"] = True
+            log(f"📦 QuantFlow发现新版本（{describe_divergence(quantflow_info)}）")
+            log("更新内容:\n" + "\n".join(quantflow_info["incoming"]))
+        elif quantflow_info["upstream"]:
+            log(f"✅ QuantFlow已是最新版本（{describe_divergence(quantflow_info)}）")
+        else:
+            log(f"⚠️ QuantFlow当前分支没有跟踪的远程分支: {quantflow_info['error']}")
+        
+        if quantflow_info["commit"]:
+            project_status.update_status(quantflow_commit=quantflow_info["commit"])
+            log(f"✅ QuantFlow版本: {quantflow_info['commit'][:8]} - {quantflow_info['commit_desc']}")
+    
+    # 检查完成
+    log("")
+    log("🎉 Git更新检查完成！")
+    
+    # 智能检查部署状态（不仅检查状态文件，还检查实际项目文件）
+    deployment_status = project_status.get_status("deployment_status")
+    actual_deployed = check_project_files(base_path)
+    
+    # 如果实际已部署但状态文件显示未部署，更新状态
+    if actual_deployed and deployment_status != "completed":
+        log("🔍 检测到项目已手动部署，更新状态...")
+        project_status.update_status(deployment_status="completed")
+        deployment_status = "completed"
+    
+    result_info["deployed"] = actual_deployed or deployment_status == "completed"
+    return result_info
+
+class TaskRunner:
+    """后台任务执行器：所有后台操作共用一个有界的线程池
+    
+    同名（或同 key）的任务还在排队或执行时不会再次执行，新的调用者拿到同一个 Future，
+    结果由所有调用者共享；记录排队数量和每类任务的等待、执行时间，用于排查卡顿。
+    快速检查（quick=True，例如状态和端口探测）使用单独的线程，不会排在部署、快照等长任务后面
+    """
+    SLOW_WAIT = 2.0  # 排队超过这个时间（秒）时记录日志，说明线程池已满
+    
+    def __init__(self, max_workers=4, quick_workers=2, log=None):
+        self.max_workers = max_workers
+        self.quick_workers = quick_workers
+        self.log = log or (lambda message: None)
+        self.queues = {False: queue.Queue(), True: queue.Queue()}  # quick -> 任务队列
+        self.lock = threading.Lock()
+        self.workers = {False: [], True: []}
+        self.load = {False: 0, True: 0}  # quick -> 排队和执行中的任务数
+        self.inflight = {}  # key -> Future
+        self.stats = {}  # 任务名 -> 执行次数、合并次数、出错次数和耗时
+        self.pending = 0
+        self.running = 0
+        self.profiler = None  # 设置后由它执行任务: profiler(任务名, func, args)，用于诊断时分析后台任务
+    
+    def submit(self, name, func, *args, key=None, single_flight=True, quick=False):
+        """提交后台任务，返回 Future；key 默认为任务名，single_flight=False 时总是重新执行，
+        quick=True 时在快速检查的线程中执行（只用于几秒内结束的任务）"""
+        flight_key = (key if key is not None else name) if single_flight else None
+        with self.lock:
+            stats = self.stats.setdefault(name, {"count": 0, "coalesced": 0, "errors": 0,
+                                                 "wait": 0.0, "run": 0.0, "max_run": 0.0})
+            if flight_key in self.inflight:
+                stats["coalesced"] += 1
+                return self.inflight[flight_key]
+            future = Future()
+            if flight_key is not None:
+                self.inflight[flight_key] = future
+            self.pending += 1
+            self.load[quick] += 1
+            # 按需创建线程，线程数不超过上限，空闲线程一直保留
+            workers = self.workers[quick]
+            if len(workers) < min(self.quick_workers if quick else self.max_workers, self.load[quick]):
+                prefix = "panda-quick" if quick else "panda-task"
+                worker = threading.Thread(target=self._work, args=(quick,), name=f"{prefix}-{len(workers) + 1}",
+                                          daemon=True)
+                workers.append(worker)
+                worker.start()
+        self.queues[quick].put((name, func, args, flight_key, future, time.perf_counter()))
+        return future
+    
+    def _work(self, quick):
+        while True:
+            name, func, args, flight_key, future, submitted = self.queues[quick].get()
+            started = time.perf_counter()
+            with self.lock:
+                self.pending -= 1
+                self.running += 1
+            if started - submitted > self.SLOW_WAIT:
+                self.log(f"🐢 后台任务 {name} 排队 {started - submitted:.1f} 秒（{self.running} 个任务正在执行）")
+            error = None
+            result = None
+            if future.set_running_or_notify_cancel():
+                try:
+                    profiler = self.profiler
+                    result = profiler(name, func, args) if profiler else func(*args)
+                except Exception as e:
+                    error = e
+                    self.log(f"❌ 后台任务 {name} 出错: {str(e)}")
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.running -= 1
+                self.load[quick] -= 1
+                if flight_key is not None:
+                    self.inflight.pop(flight_key, None)
+                stats = self.stats[name]
+                stats["count"] += 1
+                stats["errors"] += 1 if error else 0
+                stats["wait"] += started - submitted
+                stats["run"] += elapsed
+                stats["max_run"] = max(stats["max_run"], elapsed)
+            # 先移出 inflight 再设置结果，回调中再次提交时会重新执行
+            if error:
+                future.set_exception(error)
+            elif not future.cancelled():
+                future.set_result(result)
+    
+    def describe(self):
+        """当前的排队数量、执行中数量和每类任务的平均等待、执行时间（秒）"""
+        with self.lock:
+            tasks = {}
+            for name, stats in self.stats.items():
+                count = stats["count"] or 1
+                tasks[name] = {
+                    "count": stats["count"],
+                    "coalesced": stats["coalesced"],
+                    "errors": stats["errors"],
+                    "avg_wait": stats["wait"] / count,
+                    "avg_run": stats["run"] / count,
+                    "max_run": stats["max_run"],
+                }
+            return {"pending": self.pending, "running": self.running, "workers": len(self.workers[False]),
+                    "quick_workers": len(self.workers[True]), "tasks": tasks}
+
+class RemoteWatcher:
+    """后台轮询远程仓库的更新
+
+    每次只用 git ls-remote 读取跟踪分支在远程的提交，与本地的远程跟踪分支和HEAD比较；
+    只有远程分支移动后才执行一次真正的 git fetch，因此可以全天保持运行
+    """
+    def __init__(self, project_status, on_change=None, log=None):
+        self.project_status = project_status
+        self.on_change = on_change or (lambda updates: None)
+        self.log = log or (lambda message: None)
+        self.updates = dict(project_status.get_status("remote_updates") or {})
+        self.last_poll = ""
+        self.upstreams = {}  # (仓库路径, 本地分支) -> (远程名, 远程分支引用)
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+    
+    @property
+    def interval(self):
+        """轮询间隔（秒），0表示关闭"""
+        try:
+            return max(0.0, float(self.project_status.get_status("remote_watch_interval"))) * 60
+        except (TypeError, ValueError):
+            return 0.0
+    
+    def start(self):
+        """启动后台轮询线程"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """停止后台轮询"""
+        self.stop_event.set()
+        self.wake_event.set()
+    
+    def poll_now(self):
+        """立即进行一次轮询（例如修改间隔或手动检查更新之后）"""
+        self.wake_event.set()
+    
+    def _run(self):
+        while not self.stop_event.is_set():
+            interval = self.interval
+            if interval > 0:
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    self.log(f"⚠️ 后台检查远程更新失败: {str(e)}")
+            # 关闭时每分钟检查一次间隔设置是否被修改
+            self.wake_event.wait(interval or 60)
+            self.wake_event.clear()
+    
+    def poll_once(self):
+        """检查一次所有仓库，有变化时调用 on_change 并保存到状态文件"""
+        try:
+            factor_path, quantflow_path = get_update_targets(self.project_status.get_status("project_path"))
+        except DeployError:
+            return self.updates
+        
+        repositories = {"factor": factor_path}
+        if quantflow_path:
+            repositories["quantflow"] = quantflow_path
+        
+        updates = {}
+        for name, repo_path in repositories.items():
+            state = self.check_repository(repo_path, self.updates.get(name))
+            if state:
+                updates[name] = state
+        
+        self.last_poll = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        changed = updates != self.updates
+        self.updates = updates
+        self.project_status.update_status(remote_updates=updates, last_update_check=self.last_poll)
+        if changed:
+            self.on_change(dict(updates))
+        return self.updates
+    
+    def resolve_upstream(self, repo_path, branch):
+        """当前分支跟踪的 (远程名, 远程分支引用)，结果按分支缓存"""
+        key = (repo_path, branch)
+        if key not in self.upstreams:
+            ok, stdout, _ = run_git(repo_path, 'for-each-ref', '--format=%(upstream:remotename) %(upstream:remoteref)',
+                                    f'refs/heads/{branch}')
+            parts = stdout.split()
+            self.upstreams[key] = tuple(parts) if ok and len(parts) == 2 else None
+        return self.upstreams[key]
+    
+    def check_repository(self, repo_path, previous):
+        """检查单个仓库，返回 {upstream, remote_commit, head, ahead, behind}，无法检查时返回None"""
+        ok, branch, _ = run_git(repo_path, 'symbolic-ref', '-q', '--short', 'HEAD')
+        if not ok:
+            return None
+        upstream = self.resolve_upstream(repo_path, branch)
+        if not upstream:
+            return None
+        remote_name, remote_ref = upstream
+        
+        ok, stdout, _ = run_git(repo_path, 'rev-parse', 'HEAD', '@{u}')
+        if not ok:
+            return None
+        head, tracking = stdout.splitlines()[:2]
+        
+        # 只读取一个远程引用，不下载任何对象
+        ok, stdout, _ = run_git(repo_path, 'ls-remote', remote_name, remote_ref)
+        if not ok or not stdout:
+            return previous
+        remote_commit = stdout.split()[0]
+        
+        if previous and previous.get("head") == head and previous.get("remote_commit") == remote_commit:
+            return previous
+        
+        if remote_commit != tracking:
+            # 远程分支已移动，执行一次真正的fetch
+            self.log(f"🔔 检测到远程分支更新: {repo_path} ({remote_name}/{remote_ref.replace('refs/heads/', '')})")
+            run_git(repo_path, 'fetch', remote_name)
+        
+        info = inspect_repository(repo_path, fetch=False)
+        return {
+            "upstream": info["upstream"],
+            "remote_commit": remote_commit,
+            "head": head,
+            "ahead": info["ahead"],
+            "behind": info["behind"],
+        }
+
+def describe_remote_updates(updates):
+    """远程更新的说明文字，没有更新时返回空字符串"""
+    names = {"factor": "PandaFactor", "quantflow": "QuantFlow"}
+    parts = [f"{names.get(name, name)} 落后 {info['behind']} 个提交 ({info['upstream']})"
+             for name, info in updates.items() if info.get("behind")]
+    return "；".join(parts)
+
+def get_conda_info():
+    """conda info --json 的结果，失败时返回空字典"""
+    try:
+        result = subprocess.run(['conda', 'info', '--json'], capture_output=True, text=True)
+        return json.loads(result.stdout) if result.returncode == 0 else {}
+    except Exception:
+        return {}
+
+def env_python_path(prefix):
+    """Conda环境中的Python解释器"""
+    return os.path.join(prefix, "python.exe") if os.name == 'nt' else os.path.join(prefix, "bin", "python")
+
+def find_conda_env_prefix(env_name, conda_info=None):
+    """Conda环境的安装目录，不存在时返回None"""
+    conda_info = conda_info if conda_info is not None else get_conda_info()
+    for prefix in conda_info.get("envs", []):
+        if os.path.basename(os.path.normpath(prefix)) == env_name:
+            return prefix
+    return None
+
+# 在 conda run 中执行，输出激活后的解释器和环境变量
+ACTIVATION_DUMP = "import json, os, sys; print(json.dumps({'prefix': sys.prefix, 'python': sys.executable, 'environ': dict(os.environ)}))"
+
+# 由shell或 conda run 本身产生、与激活无关的变量
+ACTIVATION_IGNORED = {"PWD", "OLDPWD", "SHLVL", "_", "PATH"}
+
+def conda_env_stamp(prefix):
+    """环境内容的标记：conda每次安装或删除包都会追加 conda-meta/history"""
+    try:
+        stat = os.stat(os.path.join(prefix, "conda-meta", "history"))
+        return [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return None
+
+def resolve_env_activation(project_status, log=log_to_stdout, refresh=False):
+    """Conda环境的解释器和激活后的环境变量，缓存在状态文件中，环境有变化时才重新解析（执行一次 conda run）
+    
+    返回 {env_name, prefix, python, variables: {变量: 值}, path: [加到PATH最前面的目录], stamp, resolved_at}，
+    找不到环境或解析失败时返回None
+    """
+    env_name = project_status.get_status("conda_env")
+    cached = project_status.get_status("env_activation") or {}
+    if (not refresh and cached.get("env_name") == env_name and os.path.exists(cached.get("python", ""))
+            and cached.get("stamp") == conda_env_stamp(cached["prefix"])):
+        return cached
+    
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(['conda', 'run', '-n', env_name, 'python', '-c', ACTIVATION_DUMP],
+                                capture_output=True, text=True, encoding='utf-8', errors='replace')
+        dumped = json.loads(result.stdout.strip().splitlines()[-1])
+    except (OSError, ValueError, IndexError):
+        log(f"⚠️ 无法解析Conda环境 {env_name} 的激活变量，改用 conda run")
+        return None
+    
+    environ = dumped["environ"]
+    current_path = os.environ.get("PATH", "").split(os.pathsep)
+    activation = {
+        "env_name": env_name,
+        "prefix": dumped["prefix"],
+        "python": dumped["python"],
+        "variables": {key: value for key, value in environ.items()
+                      if key not in ACTIVATION_IGNORED and os.environ.get(key) != value},
+        "path": [entry for entry in environ.get("PATH", "").split(os.pathsep) if entry and entry not in current_path],
+        "stamp": conda_env_stamp(dumped["prefix"]),
+        "resolved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    project_status.update_status(env_activation=activation)
+    log(f"🔑 已缓存Conda环境 {env_name} 的解释器和激活变量（用时 {time.perf_counter() - started:.1f} 秒）")
+    return activation
+
+def activated_environ(activation, base=None):
+    """在 base（默认为当前进程的环境变量）上应用缓存的激活变量"""
+    env = dict(os.environ if base is None else base)
+    env.update(activation["variables"])
+    env["PATH"] = os.pathsep.join(activation["path"] + ([env["PATH"]] if env.get("PATH") else []))
+    return env
+
+def env_python_command(project_status, base=None, log=log_to_stdout):
+    """在Conda环境中运行Python的命令前缀和环境变量：直接使用环境的解释器，无法解析时退回 conda run"""
+    activation = resolve_env_activation(project_status, log=log)
+    if activation:
+        return [activation["python"]], activated_environ(activation, base)
+    env_name = project_status.get_status("conda_env")
+    return ['conda', 'run', '-n', env_name, '--no-capture-output', 'python'], dict(os.environ if base is None else base)
+
+def activation_bat_lines(activation):
+    """批处理脚本中设置激活变量的命令（% 需要转义），未解析时为空"""
+    if not activation:
+        return ""
+    lines = [f'set "{key}={value.replace("%", "%%")}"' for key, value in sorted(activation["variables"].items())]
+    if activation["path"]:
+        lines.append(f'set "PATH={";".join(activation["path"]).replace("%", "%%")};%PATH%"')
+    return "\n".join(lines)
+
+def shell_join(args):
+    """把参数列表拼成当前系统shell的命令"""
+    return subprocess.list2cmdline(args) if os.name == 'nt' else shlex.join(args)
+
+def file_sha256(path):
+    """文件的SHA256，文件不存在时返回空字符串"""
+    if not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def env_fingerprint_cache_file(project_status):
+    """环境指纹的文件哈希缓存"""
+    return os.path.join(project_status.get_status("project_path"), ".cache", "env_fingerprint.json")
+
+def record_env_fingerprint(project_status, prefix=None):
+    """记录Conda环境当前的指纹，作为之后状态检查的比较基准；找不到环境时返回None"""
+    prefix = prefix or find_conda_env_prefix(project_status.get_status("conda_env"))
+    if not prefix:
+        return None
+    fingerprint = get_fingerprinter(env_fingerprint_cache_file(project_status)).fingerprint(prefix)
+    project_status.update_status(env_fingerprint=fingerprint)
+    return fingerprint
+
+def check_env_drift(project_status, env_name=None):
+    """与部署时的指纹比较，返回 {added, removed, changed}；环境一致时返回空字典
+    
+    没有记录过指纹、环境已不存在或检查的是另一个环境时返回None
+    """
+    baseline = project_status.get_status("env_fingerprint") or {}
+    prefix = baseline.get("prefix")
+    env_name = env_name or project_status.get_status("conda_env")
+    if not prefix or not os.path.isdir(prefix) or os.path.basename(os.path.normpath(prefix)) != env_name:
+        return None
+    current = get_fingerprinter(env_fingerprint_cache_file(project_status)).fingerprint(prefix)
+    if current["digest"] == baseline.get("digest"):
+        return {}
+    return diff_fingerprints(baseline, current)
+
+def install_helper_script(project_path, file_name):
+    """把由环境的解释器运行的辅助脚本复制到安装目录的 tools/ 下，返回脚本路径
+    
+    服务在工具退出后继续运行，打包后的工具中也没有单独的脚本文件，因此使用前复制一份
+    """
+    source = os.path.join(getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__))), file_name)
+    target = os.path.join(project_path, "tools", file_name)
+    if file_sha256(source) != file_sha256(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(source, target)
+    return target
+
+def apply_mongodb_port(factor_path, port):
+    """把PandaFactor配置（panda_common 的 config.yaml，QuantFlow也使用它）中的MongoDB端口改为 port，
+    返回修改过的文件；MONGO_URI 中的本机地址和 MONGO_PORT 都会替换"""
+    changed = []
+    for path in glob.glob(os.path.join(factor_path, "panda_common", "**", "config.yaml"), recursive=True):
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        updated = re.sub(r"^(\s*MONGO_URI\s*:.*?(?:127\.0\.0\.1|localhost)):\d+", rf"\g<1>:{port}", text, flags=re.M)
+        updated = re.sub(r"^(\s*MONGO_PORT\s*:\s*['\"]?)\d+", rf"\g<1>{port}", updated, flags=re.M)
+        if updated != text:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(updated)
+            changed.append(path)
+    return changed
+
+def install_log_capture(project_path):
+    """把日志捕获脚本复制到安装目录的 tools/ 下，返回脚本路径"""
+    return install_helper_script(project_path, "panda_deploy_logs.py")
+
+def get_log_capture_command(project_status, script_path, name, python=None, echo=False, stop_file=None):
+    """按当前配置的日志大小和保留数量生成捕获命令"""
+    log_dir = os.path.join(project_status.get_status("project_path"), "logs")
+    return capture_command(script_path, log_dir, name, python=python, echo=echo, stop_file=stop_file,
+                           max_mb=int(project_status.get_status("log_max_mb")),
+                           keep=int(project_status.get_status("log_keep")))
+
+class EnvSnapshotManager:
+    """Conda环境快照：把部署好的环境打包为可重定位的归档，新电脑部署或回滚时直接解包
+    
+    打包时记录包含环境路径和项目路径的文件，解包到其他位置时替换这些路径；
+    二进制文件只能替换为不长于原路径的新路径，无法处理的文件会在日志中列出。
+    """
+    BUSY_FILE = "in_progress.json"  # 创建或恢复快照期间存在，记录操作和进程号，磁盘清理据此跳过
+    
+    def __init__(self, project_status, log=log_to_stdout):
+        self.project_status = project_status
+        self.log = log
+    
+    @property
+    def snapshot_dir(self):
+        return os.path.join(self.project_status.get_status("project_path"), "snapshots", "conda_env")
+    
+    def active_operation(self):
+        """正在进行的快照操作（"create" 或 "restore"），没有时返回None；记录的进程已退出时视为没有"""
+        try:
+            with open(os.path.join(self.snapshot_dir, self.BUSY_FILE), 'r', encoding='utf-8') as f:
+                busy = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return busy.get("operation") if process_exists(busy.get("pid")) else None
+    
+    def run_busy(self, operation, func, *args):
+        """执行快照操作，期间写入 BUSY_FILE"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        busy_path = os.path.join(self.snapshot_dir, self.BUSY_FILE)
+        with open(busy_path, 'w', encoding='utf-8') as f:
+            json.dump({"operation": operation, "pid": os.getpid(),
+                       "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, f)
+        try:
+            return func(*args)
+        finally:
+            try:
+                os.remove(busy_path)
+            except OSError:
+                pass
+    
+    def path_variants(self, path):
+        """路径在文件中可能出现的写法（Windows下同时有反斜杠和正斜杠）"""
+        variants = [path]
+        if os.name == 'nt':
+            variants.append(path.replace("\\", "/"))
+        return variants
+    
+    def create(self):
+        """为当前配置的Conda环境创建快照，返回快照记录，失败时返回None"""
+        return self.run_busy("create", self._create)
+    
+    def _create(self):
+        env_name = self.project_status.get_status("conda_env")
+        project_path = self.project_status.get_status("project_path")
+        prefix = find_conda_env_prefix(env_name)
+        if not prefix:
+            self.log(f"⚠️ 未找到Conda环境 {env_name}，跳过环境快照")
+            return None
+        
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        created_at = datetime.now()
+        archive_path = os.path.join(self.snapshot_dir, f"{env_name}-{created_at.strftime('%Y%m%d-%H%M%S')}.tar.gz")
+        metadata = {
+            "env_name": env_name,
+            "prefix": prefix,
+            "project_path": project_path,
+            "platform": sys.platform,
+            "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "git_commit": self.project_status.get_status("git_commit"),
+            "requirements_sha256": file_sha256(os.path.join(project_path, "panda_factor", "requirements.txt")),
+        }
+        self.log(f"📦 正在创建环境快照: {prefix}")
+        try:
+            pack_directory(prefix, archive_path, self.path_variants(prefix) + self.path_variants(project_path),
+                           metadata=metadata, log=self.log)
+        except Exception as e:
+            self.log(f"⚠️ 环境快照创建失败: {str(e)}")
+            if os.path.exists(archive_path + ".part"):
+                os.remove(archive_path + ".part")
+            return None
+        
+        entry = dict(metadata, path=archive_path, size=os.path.getsize(archive_path))
+        snapshots = self.list_snapshots() + [entry]
+        keep = max(1, int(self.project_status.get_status("env_snapshot_keep") or 1))
+        for old in snapshots[:-keep]:
+            os.remove(old["path"])
+            self.log(f"🗑️ 已删除旧的环境快照: {os.path.basename(old['path'])}")
+        self.project_status.update_status(env_snapshots=snapshots[-keep:])
+        self.log(f"✅ 环境快照已保存: {archive_path}")
+        return entry
+    
+    def list_snapshots(self):
+        """当前配置已有的快照，最新的在最后"""
+        return [item for item in self.project_status.get_status("env_snapshots") or [] if os.path.exists(item["path"])]
+    
+    def find_restore_source(self):
+        """创建环境时可以使用的快照：优先使用指定的归档，其次是同名环境的最新快照"""
+        source = self.project_status.get_status("env_snapshot_source")
+        if source and os.path.exists(source):
+            return source
+        env_name = self.project_status.get_status("conda_env")
+        for item in reversed(self.list_snapshots()):
+            if item["env_name"] == env_name and item["platform"] == sys.platform:
+                return item["path"]
+        return None
+    
+    def restore(self, archive_path):
+        """从快照恢复Conda环境（替换同名环境），返回快照元数据，失败时抛出DeployError"""
+        return self.run_busy("restore", self._restore, archive_path)
+    
+    def _restore(self, archive_path):
+        env_name = self.project_status.get_status("conda_env")
+        project_path = self.project_status.get_status("project_path")
+        conda_info = get_conda_info()
+        if not conda_info.get("envs_dirs"):
+            raise DeployError("无法获取Conda环境目录")
+        
+        prefix = find_conda_env_prefix(env_name, conda_info) or os.path.join(conda_info["envs_dirs"][0], env_name)
+        backup = f"{prefix}.rollback"
+        if os.path.exists(backup):
+            shutil.rmtree(backup)
+        if os.path.exists(prefix):
+            # 先移到一旁，恢复失败时还原
+            os.rename(prefix, backup)
+        
+        self.log(f"📦 正在从快照恢复环境: {os.path.basename(archive_path)} → {prefix}")
+        try:
+            manifest = unpack_archive(archive_path, prefix, log=self.log)
+            if manifest.get("platform") != sys.platform:
+                raise DeployError(f"快照来自其他操作系统 ({manifest.get('platform')})，无法使用")
+            replacements = list(zip(self.path_variants(manifest["prefix"]), self.path_variants(prefix)))
+            replacements += list(zip(self.path_variants(manifest["project_path"]), self.path_variants(project_path)))
+            failed = relocate_files(prefix, manifest, replacements)
+        except Exception as e:
+            shutil.rmtree(prefix, ignore_errors=True)
+            if os.path.exists(backup):
+                os.rename(backup, prefix)
+            raise DeployError(f"环境恢复失败: {str(e)}")
+        
+        if os.path.exists(backup):
+            shutil.rmtree(backup, ignore_errors=True)
+        if failed:
+            self.log(f"⚠️ {len(failed)} 个二进制文件中的路径无法替换（新路径比原路径长）:")
+            for path in failed[:10]:
+                self.log(f"   {path}")
+        self.log(f"✅ 环境已恢复 (快照创建于 {manifest.get('created_at')}，提交 {manifest.get('git_commit', '')[:8]})")
+        return manifest
+
+def normalize_package_name(name):
+    """PEP 503 规范化的包名"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+class EnvLockManager:
+    """环境锁定文件：部署成功后记录精确的Conda包列表和带哈希的pip依赖，之后据此重建环境，不再解析依赖
+    
+    conda-<平台>.txt 为 conda list --explicit 的输出，conda create --file 时直接安装其中的包；
+    pip-<平台>.txt 为 名称==版本 --hash=sha256:... 格式，使用 pip install --require-hashes --no-deps 安装。
+    哈希取自解析依赖时 pip install --report 记录的下载文件哈希，没有记录的包才重新下载计算。
+    以可编辑方式安装的子模块和QuantFlow不在锁定文件中，仍由部署步骤安装。
+    """
+    def __init__(self, project_status, runner=None, log=log_to_stdout):
+        self.project_status = project_status
+        self.log = log
+        self.runner = runner or CommandRunner(log=log)
+        self.platform = None
+    
+    @property
+    def lock_dir(self):
+        return (self.project_status.get_status("env_lock_dir")
+                or os.path.join(self.project_status.get_status("project_path"), "locks"))
+    
+    @property
+    def enabled(self):
+        return bool(self.project_status.get_status("use_env_locks"))
+    
+    @property
+    def report_dir(self):
+        return os.path.join(self.project_status.get_status("project_path"), ".cache", "pip_reports")
+    
+    def report_arguments(self, name):
+        """解析依赖的 pip install 附加的参数：把安装的包和下载文件的哈希记录到安装报告中（需要pip 22.2以上）"""
+        if not self.enabled:
+            return []
+        os.makedirs(self.report_dir, exist_ok=True)
+        return ["--report", os.path.join(self.report_dir, f"{name}.json")]
+    
+    def load_report_hashes(self):
+        """安装报告中的下载文件哈希: {(规范化的包名, 版本): {sha256}}，可编辑安装和本地目录没有哈希"""
+        hashes = {}
+        if not os.path.isdir(self.report_dir):
+            return hashes
+        for filename in os.listdir(self.report_dir):
+            try:
+                with open(os.path.join(self.report_dir, filename), 'r', encoding='utf-8') as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for item in report.get("install", []):
+                metadata = item.get("metadata", {})
+                archive = item.get("download_info", {}).get("archive_info")
+                if not archive or not metadata.get("name"):
+                    continue
+                digests = set(filter(None, [archive.get("hashes", {}).get("sha256")]))
+                # 旧版本pip只有 hash 字段（"sha256=..."）
+                if archive.get("hash", "").startswith("sha256="):
+                    digests.add(archive["hash"][len("sha256="):])
+                if digests:
+                    key = (normalize_package_name(metadata["name"]), metadata.get("version"))
+                    hashes.setdefault(key, set()).update(digests)
+        return hashes
+    
+    def mark_stale(self, reason):
+        """标记锁定文件已过期（例如按锁定文件安装失败），之后重新解析依赖，部署成功后重新写入"""
+        info = self.load_info()
+        if info is None:
+            return
+        info["stale"] = reason
+        info_path = self.get_paths()["info"]
+        with open(info_path + ".part", 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+        os.replace(info_path + ".part", info_path)
+    
+    def get_paths(self):
+        """当前平台的锁定文件: {conda, pip, info}"""
+        if self.platform is None:
+            self.platform = get_conda_info().get("platform") or sys.platform
+        return {
+            "conda": os.path.join(self.lock_dir, f"conda-{self.platform}.txt"),
+            "pip": os.path.join(self.lock_dir, f"pip-{self.platform}.txt"),
+            "info": os.path.join(self.lock_dir, f"lock-{self.platform}.json"),
+        }
+    
+    def load_info(self):
+        """锁定文件的元数据，不存在时返回None"""
+        info_path = self.get_paths()["info"]
+        if not os.path.exists(info_path):
+            return None
+        with open(info_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def get_conda_lock(self):
+        """可用于创建环境的Conda锁定文件，没有时返回None"""
+        conda_lock = self.get_paths()["conda"]
+        return conda_lock if self.enabled and os.path.exists(conda_lock) else None
+    
+    def get_pip_lock(self, requirements_path):
+        """与当前requirements.txt对应的pip锁定文件，requirements.txt变化或锁定文件已过期时返回None"""
+        pip_lock = self.get_paths()["pip"]
+        if not self.enabled or not os.path.exists(pip_lock):
+            return None
+        info = self.load_info() or {}
+        if info.get("stale") or info.get("requirements_sha256") != file_sha256(requirements_path):
+            return None
+        return pip_lock
+    
+    def write(self, pip_env=None):
+        """根据当前环境写入锁定文件，成功返回True"""
+        env_name = self.project_status.get_status("conda_env")
+        paths = self.get_paths()
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self.log(f"🔒 正在为环境 {env_name} 写入锁定文件...")
+        
+        # Conda: 带下载地址和MD5的精确包列表
+        result = subprocess.run(['conda', 'list', '-n', env_name, '--explicit', '--md5'],
+                                capture_output=True, text=True)
+        if result.returncode != 0 or "@EXPLICIT" not in result.stdout:
+            self.log(f"⚠️ 无法导出Conda包列表: {result.stderr.strip()}")
+            return False
+        conda_spec = result.stdout
+        
+        # pip: 排除由Conda管理的包、可编辑安装和本地路径安装
+        result = subprocess.run(['conda', 'list', '-n', env_name, '--json'], capture_output=True, text=True)
+        conda_packages = json.loads(result.stdout) if result.returncode == 0 else []
+        conda_names = {normalize_package_name(package["name"]) for package in conda_packages
+                       if package.get("channel") != "pypi"}
+        python, pip_env = env_python_command(self.project_status, base=pip_env, log=self.log)
+        result = subprocess.run(python + ['-m', 'pip', 'freeze', '--exclude-editable'],
+                                capture_output=True, text=True, env=pip_env)
+        if result.returncode != 0:
+            self.log(f"⚠️ pip freeze 失败: {result.stderr.strip()}")
+            return False
+        pins = {}
+        for line in result.stdout.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#") or " @ " in line or "==" not in line:
+                continue
+            name, version = line.split("==", 1)
+            if normalize_package_name(name) not in conda_names:
+                pins[normalize_package_name(name)] = (name, version)
+        
+        # 哈希取自安装报告，报告中没有的包（例如手动安装的）才下载与已安装版本相同的包计算（优先命中pip缓存）
+        reported = self.load_report_hashes()
+        hashes = {key: sorted(reported[(key, version)]) for key, (_, version) in pins.items()
+                  if (key, version) in reported}
+        remaining = {key: pin for key, pin in pins.items() if key not in hashes}
+        if remaining:
+            self.log(f"📥 {len(remaining)} 个包没有安装记录，下载后计算哈希")
+            with tempfile.TemporaryDirectory(dir=self.lock_dir) as download_dir:
+                pinned_path = os.path.join(download_dir, "pinned.txt")
+                with open(pinned_path, 'w', encoding='utf-8') as f:
+                    f.write("".join(f"{name}=={version}\n" for name, version in remaining.values()))
+                command = shell_join(python + ["-m", "pip", "download", "--no-deps", "-d", download_dir,
+                                               "-r", pinned_path])
+                if not self.runner.run(command, retry=True, env=pip_env):
+                    self.log("⚠️ 下载依赖包失败，未写入锁定文件")
+                    return False
+                for filename in os.listdir(download_dir):
+                    if filename == "pinned.txt":
+                        continue
+                    if filename.endswith(".whl"):
+                        name = filename.split("-")[0]
+                    else:
+                        name = re.sub(r"\.(tar\.gz|zip|tar\.bz2)$", "", filename).rsplit("-", 1)[0]
+                    hashes.setdefault(normalize_package_name(name), []).append(
+                        file_sha256(os.path.join(download_dir, filename)))
+        
+        missing = [name for key, (name, _) in pins.items() if key not in hashes]
+        if missing:
+            self.log(f"⚠️ 以下包没有找到下载文件，未写入锁定文件: {', '.join(missing)}")
+            return False
+        
+        pip_lines = [f"{name}=={version} " + " ".join(f"--hash=sha256:{digest}" for digest in sorted(hashes[key]))
+                     for key, (name, version) in sorted(pins.items())]
+        project_path = self.project_status.get_status("project_path")
+        info = {
+            "env_name": env_name,
+            "platform": self.platform,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "git_commit": self.project_status.get_status("git_commit"),
+            "quantflow_commit": self.project_status.get_status("quantflow_commit"),
+            "requirements_sha256": file_sha256(os.path.join(project_path, "panda_factor", "requirements.txt")),
+            "conda_packages": conda_spec.count("\nhttp") + conda_spec.count("\nfile:"),
+            "pip_packages": len(pip_lines),
+        }
+        for path, content in ((paths["conda"], conda_spec),
+                              (paths["pip"], "\n".join(pip_lines) + "\n"),
+                              (paths["info"], json.dumps(info, ensure_ascii=False, indent=2))):
+            with open(path + ".part", 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(path + ".part", path)
+        self.log(f"✅ 锁定文件已写入 {self.lock_dir}: {info['conda_packages']} 个Conda包，{info['pip_packages']} 个pip包")
+        return True
+
+class DeployPipeline:
+    """部署流程：按步骤执行并记录进度，已完成的步骤在下次部署时跳过"""
+    def __init__(self, project_status, log=log_to_stdout, progress=None, on_steps_changed=None,
+                 retry_policy=None):
+        self.project_status = project_status
+        self.log = log
+        self.progress = progress or (lambda value: None)
+        self.on_steps_changed = on_steps_changed or (lambda: None)
+        self.runner = CommandRunner(log=log, retry_policy=retry_policy)
+        self.env_snapshots = EnvSnapshotManager(project_status, log=log)
+        self.env_locks = EnvLockManager(project_status, runner=self.runner, log=log)
+        self.error = None
+        self.current_step = None
+        self.step_started_at = 0
+        self.executed_steps = []
+        self.restored_snapshot = None
+        self.pip_locked = False  # 本次按锁定文件安装了pip依赖
+        self.pip_resolved = False  # 本次重新解析过pip依赖，完成后需要更新锁定文件
+    
+    @property
+    def project_path(self):
+        return self.project_status.get_status("project_path")
+    
+    @property
+    def env_name(self):
+        return self.project_status.get_status("conda_env")
+    
+    @property
+    def factor_path(self):
+        return os.path.join(self.project_path, "panda_factor")
+    
+    @property
+    def quantflow_path(self):
+        return os.path.join(self.project_path, "panda_quantflow")
+    
+    def run(self):
+        """执行部署，成功返回True；失败原因保存在 self.error"""
+        self.error = None
+        try:
+            self.log("🚀 开始部署PandaAI工具...")
+            self.progress(0)
+            
+            # 加载已完成步骤
+            completed_steps = list(self.project_status.get_status("completed_steps"))
+            
+            if completed_steps:
+                self.log("🔄 检测到之前的部署进度，将继续之前的部署...")
+                self.log(f"✅ 已完成步骤: {', '.join(completed_steps)}")
+            
+            for step_id, running_title, done_title, progress in DEPLOY_STEPS:
+                if step_id in completed_steps:
+                    self.log(f"✅ {done_title} (已完成)")
+                else:
+                    self.log(f"📋 {running_title}...")
+                    self.current_step = step_id
+                    self.on_steps_changed()
+                    self.begin_step_telemetry()
+                    result = getattr(self, f"step_{step_id}")()
+                    self.finish_step_telemetry(step_id, result)
+                    self.current_step = None
+                    if result == "failed":
+                        self.project_status.update_status(deployment_status="failed")
+                        self.on_steps_changed()
+                        self.error = f"{running_title}失败"
+                        return False
+                    completed_steps.append(step_id)
+                    self.executed_steps.append(step_id)
+                    self.project_status.update_status(completed_steps=completed_steps)
+                    self.on_steps_changed()
+                self.progress(progress)
+            
+            # 部署完成
+            self.project_status.update_status(
+                deployment_status="completed",
+                last_update=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                completed_steps=completed_steps
+            )
+            
+            # 获取Git提交信息
+            try:
+                result = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                        cwd=self.factor_path, capture_output=True, text=True)
+                if result.returncode == 0:
+                    self.project_status.update_status(git_commit=result.stdout.strip())
+            except Exception:
+                pass
+            
+            # 重新安装过依赖时保存环境快照，下次部署或回滚时直接解包
+            installed = {"install_dependencies", "deploy_quantflow"} & set(self.executed_steps)
+            if installed and not self.restored_snapshot and self.project_status.get_status("env_snapshot_keep"):
+                self.env_snapshots.create()
+            
+            # 依赖重新解析过时更新锁定文件，之后的部署不再解析依赖
+            if self.pip_resolved and self.env_locks.enabled:
+                self.env_locks.write(self.get_pip_env())
+            
+            # 记录环境指纹，之后的状态检查据此发现手动安装或升级的包
+            fingerprint = record_env_fingerprint(self.project_status)
+            if fingerprint:
+                self.log(f"🧬 已记录环境指纹: {len(fingerprint['packages'])} 个包")
+            
+            self.log("🎉 部署完成！")
+            self.log(f"📁 项目位置: {self.factor_path}")
+            self.log(f"🐍 Conda环境: {self.env_name}")
+            return True
+        
+        except Exception as e:
+            self.log(f"❌ 部署过程中出现错误: {str(e)}")
+            self.current_step = None
+            self.project_status.update_status(deployment_status="failed")
+            self.on_steps_changed()
+            self.error = str(e)
+            return False
+    
+    def update(self):
+        """更新两个仓库并重新安装依赖"""
+        completed_steps = [step for step in self.project_status.get_status("completed_steps")
+                           if step not in UPDATE_STEPS]
+        self.project_status.update_status(completed_steps=completed_steps, deployment_status="in_progress")
+        self.on_steps_changed()
+        return self.run()
+    
+    def begin_step_telemetry(self):
+        """开始记录一个部署步骤"""
+        self.runner.attempts = 0
+        self.step_started_at = time.time()
+    
+    def finish_step_telemetry(self, step_id, result):
+        """保存步骤的命令尝试次数和耗时"""
+        self.project_status.record_step_telemetry(
+            step_id,
+            attempts=self.runner.attempts,
+            duration=round(time.time() - self.step_started_at, 2),
+            result=result
+        )
+    
+    # 各步骤返回 "completed" / "skipped" / "failed"
+    
+    def step_check_environment(self):
+        """检查环境状态"""
+        self.log("🔍 检查环境状态...")
+        
+        # 检查Git
+        try:
+            result = subprocess.run(['git', '--version'], capture_output=True, text=True)
+            if result.returncode == 0:
+                self.log(f"✅ Git已安装: {result.stdout.strip()}")
+            else:
+                self.log("❌ Git未安装或不在PATH中")
+                return "failed"
+        except Exception:
+            self.log("❌ Git未安装或不在PATH中")
+            return "failed"
+        
+        # 检查Conda
+        try:
+            result = subprocess.run(['conda', '--version'], capture_output=True, text=True)
+            if result.returncode == 0:
+                self.log(f"✅ Conda已安装: {result.stdout.strip()}")
+            else:
+                self.log("❌ Conda未安装或不在PATH中")
+                return "failed"
+        except Exception:
+            self.log("❌ Conda未安装或不在PATH中")
+            return "failed"
+        
+        return "completed"
+    
+    def step_create_directory(self):
+        """创建安装目录"""
+        os.makedirs(self.project_path, exist_ok=True)
+        self.log(f"✅ 安装目录已创建: {self.project_path}")
+        return "completed"
+    
+    def step_clone_project(self):
+        """下载或更新PandaFactor项目"""
+        panda_factor_path = self.factor_path
+        if os.path.exists(panda_factor_path) and self.is_complete_clone(panda_factor_path):
+            self.log("⚠️ 项目目录已存在，将更新项目...")
+            if not self.update_repository(panda_factor_path):
+                self.log("❌ 项目更新失败")
+                return "failed"
+        else:
+            if not self.clone_repository(self.project_status.get_status("git_url"), panda_factor_path):
+                self.log("❌ 项目下载失败")
+                return "failed"
+        # 服务器连接本配置的MongoDB端口（启动脚本不经过本工具，因此部署时就写入）
+        for path in apply_mongodb_port(panda_factor_path, self.project_status.get_ports()["mongodb"]):
+            self.log(f"🔧 已把MongoDB端口写入 {path}")
+        return "completed"
+    
+    def step_setup_conda_env(self):
+        """创建Conda环境（已存在则跳过）"""
+        env_name = self.env_name
+        result = subprocess.run(['conda', 'env', 'list'], capture_output=True, text=True)
+        if env_name not in result.stdout:
+            # 有环境快照时直接解包，不需要重新解析和下载依赖
+            source = self.env_snapshots.find_restore_source()
+            if source:
+                try:
+                    self.restored_snapshot = self.env_snapshots.restore(source)
+                    self.project_status.update_status(env_snapshot_source="")
+                    return "completed"
+                except DeployError as e:
+                    self.log(f"⚠️ {e}，改为重新创建环境")
+            # 有锁定文件时按精确的包列表创建，不运行依赖解析
+            conda_lock = self.env_locks.get_conda_lock()
+            if conda_lock:
+                self.log(f"🔒 按锁定文件创建Conda环境: {env_name}")
+                if self.runner.run(f'conda create -n {env_name} --file "{conda_lock}" -y', retry=True):
+                    return "completed"
+                self.log("⚠️ 按锁定文件创建失败，改为重新解析依赖")
+                self.runner.run(f'conda env remove -n {env_name} -y')
+            self.log(f"🔧 创建Conda环境: {env_name}")
+            create_env_command = f'conda create -n {env_name} python=3.12 -y'
+            # 已下载的包保留在conda的pkgs缓存中，重试时无需重新下载
+            if not self.runner.run(create_env_command, retry=True):
+                self.log("❌ 环境创建失败")
+                return "failed"
+        else:
+            self.log(f"✅ Conda环境 '{env_name}' 已存在")
+        return "completed"
+    
+    def step_install_dependencies(self):
+        """安装PandaFactor依赖和子模块"""
+        panda_factor_path = self.factor_path
+        requirements_path = os.path.join(panda_factor_path, "requirements.txt")
+        
+        if not os.path.exists(requirements_path):
+            self.log("⚠️ 未找到requirements.txt文件")
+            return "skipped"
+        
+        # 有对应的锁定文件时按精确版本和哈希安装，不解析依赖
+        pip_lock = self.env_locks.get_pip_lock(requirements_path)
+        resolve_command, pip_env = self.pip_command(["install", "-r", requirements_path, "--ignore-installed"]
+                                                    + self.env_locks.report_arguments("requirements"))
+        
+        restored = self.restored_snapshot
+        if restored and restored.get("requirements_sha256") == file_sha256(requirements_path):
+            self.log("⚡ 环境从快照恢复且requirements.txt没有变化，跳过依赖安装")
+        else:
+            installed = False
+            if pip_lock:
+                self.log("🔒 按锁定文件安装依赖")
+                lock_command, _ = self.pip_command(["install", "--no-deps", "--require-hashes", "-r", pip_lock])
+                installed = self.runner.run(lock_command, cwd=panda_factor_path, retry=True, env=pip_env)
+                self.pip_locked = installed
+                if not installed:
+                    # 例如锁定的版本已从索引中删除、哈希不匹配或不支持当前的Python
+                    self.log("⚠️ 按锁定文件安装失败，标记锁定文件已过期，改为按requirements.txt重新解析依赖")
+                    self.env_locks.mark_stale("按锁定文件安装失败")
+            if not installed and self.runner.run(resolve_command, cwd=panda_factor_path, retry=True, env=pip_env):
+                self.pip_resolved = True
+            elif not installed:
+                self.log("⚠️ 部分依赖安装失败，但继续部署...")
+                self.log("💡 提示: 你可以稍后手动安装缺失的依赖包")
+        
+        # 安装所有子模块为可编辑包（按照官方文档的正确方式）
+        self.log("🔧 安装项目子模块为可编辑包...")
+        
+        # 检查子模块是否存在
+        existing_submodules = []
+        for submodule in FACTOR_SUBMODULES:
+            submodule_path = os.path.join(panda_factor_path, submodule.replace("./", ""))
+            if os.path.exists(submodule_path):
+                existing_submodules.append(submodule)
+                self.log(f"✅ 找到子模块: {submodule}")
+            else:
+                self.log(f"⚠️ 子模块目录不存在: {submodule}")
+        
+        if existing_submodules and self.project_status.get_status("fast_editable_install"):
+            existing_submodules = self.fast_editable_install(existing_submodules)
+            if not existing_submodules:
+                return "completed"
+        
+        if existing_submodules:
+            # 使用官方文档推荐的安装方式：一次性安装所有子模块
+            submodules_str = " ".join(existing_submodules)
+            self.log(f"📦 安装子模块: {submodules_str}")
+            
+            # 依赖已按锁定文件安装时不再解析子模块的依赖
+            arguments = ["install"] + (["--no-deps"] if self.pip_locked else
+                                       self.env_locks.report_arguments("submodules"))
+            for submodule in existing_submodules:
+                arguments += ["-e", submodule]
+            install_command, pip_env = self.pip_command(arguments)
+            
+            if not self.runner.run(install_command, cwd=panda_factor_path, retry=True, env=pip_env):
+                self.log("⚠️ 部分子模块安装失败，但继续部署...")
+                self.log("💡 这可能导致模块导入问题，可以手动执行安装")
+        else:
+            self.log("⚠️ 未找到任何子模块目录")
+        
+        return "completed"
+    
+    def fast_editable_install(self, submodules):
+        """不构建wheel，直接把子模块以可编辑方式登记到环境中，返回仍需要用pip安装的子模块"""
+        prefix = find_conda_env_prefix(self.env_name)
+        if not prefix or not os.path.exists(env_python_path(prefix)):
+            return submodules
+        
+        paths = {os.path.abspath(os.path.join(self.factor_path, submodule.replace("./", ""))): submodule
+                 for submodule in submodules}
+        args = (["--no-deps"] if self.pip_locked else []) + list(paths)
+        try:
+            script = install_helper_script(self.project_path, "panda_deploy_editable.py")
+            result = subprocess.run([env_python_path(prefix), script] + args,
+                                    capture_output=True, text=True, encoding='utf-8', errors='replace')
+        except OSError as e:
+            self.log(f"⚠️ 快速安装失败，改用pip安装: {str(e)}")
+            return submodules
+        try:
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            self.log(f"⚠️ 快速安装失败，改用pip安装: {result.stderr.strip()[-300:]}")
+            return submodules
+        
+        if stats["installed"]:
+            self.log(f"⚡ 已直接登记 {len(stats['installed'])} 个子模块（未构建wheel）: {', '.join(stats['installed'])}")
+        if stats["unchanged"]:
+            self.log(f"✅ {len(stats['unchanged'])} 个子模块没有变化: {', '.join(stats['unchanged'])}")
+        for path, reason in stats["fallback"].items():
+            self.log(f"🔧 {paths[path]} 需要使用pip安装: {reason}")
+        self.log(f"⏱️ 快速安装用时 {stats['elapsed']} 秒")
+        return [paths[path] for path in stats["fallback"]]
+    
+    def step_deploy_quantflow(self):
+        """克隆或更新QuantFlow并安装"""
+        quantflow_git_url = self.project_status.get_status("quantflow_git_url")
+        if not quantflow_git_url:
+            self.log("⚠️ 跳过QuantFlow部署（未配置Git地址）")
+            return "skipped"
+        
+        quantflow_path = self.quantflow_path
+        
+        if os.path.exists(quantflow_path) and self.is_complete_clone(quantflow_path):
+            self.log("🔄 更新QuantFlow仓库...")
+            if not self.update_repository(quantflow_path):
+                self.log("⚠️ QuantFlow更新失败，但继续部署...")
+        else:
+            self.log("📥 克隆QuantFlow仓库...")
+            if not self.clone_repository(quantflow_git_url, quantflow_path):
+                self.log("❌ QuantFlow克隆失败")
+                return "failed"
+        
+        # 安装quantflow
+        if os.path.exists(quantflow_path):
+            self.log("🔧 安装QuantFlow...")
+            quantflow_install_command, pip_env = self.pip_command(
+                ["install"] + (["--no-deps"] if self.pip_locked else self.env_locks.report_arguments("quantflow"))
+                + ["-e", "."])
+            
+            if not self.runner.run(quantflow_install_command, cwd=quantflow_path, retry=True, env=pip_env):
+                self.log("⚠️ QuantFlow安装失败，但继续部署...")
+                self.log("💡 你可以稍后手动安装: pip install -e .")
+            else:
+                self.log("✅ QuantFlow安装完成")
+                self.pip_resolved = self.pip_resolved or not self.pip_locked
+        
+        return "completed"
+    
+    def step_precompile_bytecode(self):
+        """用目标环境的解释器并行预编译字节码，首次启动服务时不再编译"""
+        prefix = find_conda_env_prefix(self.env_name)
+        if not prefix or not os.path.exists(env_python_path(prefix)):
+            self.log("⚠️ 未找到Conda环境的Python解释器，跳过预编译")
+            return "skipped"
+        
+        roots = [os.path.join(self.factor_path, submodule.replace("./", "")) for submodule in FACTOR_SUBMODULES]
+        quantflow_src = os.path.join(self.quantflow_path, "src")
+        roots.append(quantflow_src if os.path.isdir(quantflow_src) else self.quantflow_path)
+        args = [root for root in roots if os.path.isdir(root)]
+        if self.project_status.get_status("precompile_site_packages"):
+            args.append("--site-packages")
+        if not args:
+            self.log("⚠️ 没有需要预编译的目录")
+            return "skipped"
+        
+        python = env_python_path(prefix)
+        script = install_helper_script(self.project_path, "panda_deploy_precompile.py")
+        entry = find_factor_server_entry(self.factor_path)
+        entry = os.path.join(self.factor_path, entry) if entry else None
+        # 有需要编译的文件时，预编译前后各测量一次导入服务器入口的耗时，得到实际节省的启动时间
+        before = None
+        pending, _ = self.run_precompile_script(python, [script, "--dry-run"] + args)
+        if entry and pending and pending["stale"]:
+            self.log(f"⏱️ {pending['stale']} 个文件需要编译，先测量导入PandaFactor服务器入口的耗时...")
+            before = self.measure_entry_import(python, script, entry)
+        
+        self.log("⚙️ 预编译Python字节码（只编译有变化的文件）...")
+        # 预编译只影响首次启动速度，失败时不中断部署
+        stats, error = self.run_precompile_script(python, [script] + args)
+        if stats is None:
+            self.log(f"⚠️ 预编译失败，首次启动时会自动编译: {error}")
+            return "skipped"
+        
+        self.log(f"✅ 检查 {stats['files']} 个文件，编译 {stats['compiled']} 个（{stats['workers']} 个进程，"
+                 f"用时 {stats['elapsed']} 秒）")
+        if stats["failed"]:
+            self.log(f"⚠️ {stats['failed']} 个文件无法编译（通常是示例或不兼容的旧代码），不影响启动")
+        if before is not None and stats["compiled"]:
+            after = self.measure_entry_import(python, script, entry)
+            if after is not None:
+                stats["import_before"], stats["import_after"] = before, after
+                self.log(f"⚡ 导入PandaFactor服务器入口: 预编译前 {before} 秒，预编译后 {after} 秒"
+                         f"（实测节省 {max(0.0, round(before - after, 2))} 秒）")
+        stats["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.project_status.update_status(precompile_stats=stats)
+        return "completed"
+    
+    def run_precompile_script(self, python, args, timeout=None):
+        """用环境的解释器运行预编译脚本，返回 (最后一行的JSON, None) 或 (None, 错误信息)
+        
+        使用 -B 运行：测量导入耗时时导入的模块不写入 .pyc，与服务器相同的工作目录和 PYTHONPATH
+        """
+        env = ServiceSupervisor(self.project_status, log=self.log).service_env(self.factor_path)
+        try:
+            result = subprocess.run([python, "-B"] + args, cwd=self.factor_path, env=env, capture_output=True,
+                                    text=True, encoding='utf-8', errors='replace', timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return None, str(e)
+        try:
+            return json.loads(result.stdout.strip().splitlines()[-1]), None
+        except (ValueError, IndexError):
+            return None, result.stderr.strip()[-300:]
+    
+    def measure_entry_import(self, python, script, entry, runs=2):
+        """导入服务器入口（只导入它导入的模块，不启动服务器）的耗时，取多次中最短的一次，无法测量时返回None
+        
+        第一次导入会把文件读入系统缓存，取最短的一次避免磁盘读取影响预编译前后的比较
+        """
+        timings = []
+        for _ in range(runs):
+            stats, error = self.run_precompile_script(python, [script, "--measure-import", entry], timeout=120)
+            if stats is None or stats["errors"]:
+                self.log(f"💡 无法测量服务器的导入耗时: {error or ', '.join(stats['errors'])}")
+                return None
+            timings.append(stats["elapsed"])
+        return round(min(timings), 2)
+    
+    def step_create_scripts(self):
+        """创建启动脚本"""
+        self.create_startup_scripts(self.project_path, self.factor_path, self.env_name)
+        return "completed"
+    
+    def pip_command(self, arguments):
+        """在目标环境中执行pip的命令和环境变量（直接使用环境的解释器，不激活环境）"""
+        python, env = env_python_command(self.project_status, base=self.get_pip_env(), log=self.log)
+        return shell_join(python + ["-m", "pip"] + arguments), env
+    
+    def get_pip_env(self):
+        """pip命令的环境变量：使用安装目录下的持久下载缓存，重试时复用已下载的包"""
+        env = os.environ.copy()
+        env["PIP_CACHE_DIR"] = os.path.join(self.project_path, ".cache", "pip")
+        env.setdefault("PIP_DEFAULT_TIMEOUT", "60")
+        return env
+    
+    def is_complete_clone(self, repo_path):
+        """检查目录是否为已检出的完整Git仓库（中断的克隆没有可解析的HEAD）"""
+        if not os.path.isdir(os.path.join(repo_path, ".git")):
+            return False
+        result = subprocess.run(['git', 'rev-parse', '--verify', '-q', 'HEAD'],
+                                cwd=repo_path, capture_output=True, text=True)
+        return result.returncode == 0
+    
+    def clone_repository(self, git_url, target_path):
+        """克隆仓库，网络中断后通过 git fetch 在已有的部分克隆上续传"""
+        git_dir = os.path.join(target_path, ".git")
+        
+        def resume_command(command):
+            if os.path.isdir(git_dir):
+                self.log("🔁 检测到未完成的克隆，改用 git fetch 续传")
+                return f'git -C "{target_path}" fetch --progress origin'
+            return command
+        
+        if os.path.isdir(git_dir):
+            self.log("🔁 检测到未完成的克隆，改用 git fetch 续传")
+            command = f'git -C "{target_path}" fetch --progress origin'
+        elif os.path.exists(target_path) and os.listdir(target_path):
+            self.log(f"❌ 目标目录已存在且不是Git仓库: {target_path}")
+            return False
+        else:
+            command = f'git clone "{git_url}" "{target_path}"'
+        
+        if not self.runner.run(command, retry=True, prepare_retry=resume_command):
+            return False
+        if self.is_complete_clone(target_path):
+            return True
+        
+        # 续传完成后检出远程默认分支
+        self.log("🔧 检出远程默认分支...")
+        if not self.runner.run(f'git -C "{target_path}" remote set-head origin --auto', retry=True):
+            return False
+        result = subprocess.run(['git', 'symbolic-ref', '--short', 'refs/remotes/origin/HEAD'],
+                                cwd=target_path, capture_output=True, text=True)
+        remote_branch = result.stdout.strip()
+        if result.returncode != 0 or not remote_branch:
+            self.log("❌ 无法确定远程默认分支")
+            return False
+        local_branch = remote_branch.split("/", 1)[-1]
+        return self.runner.run(f'git -C "{target_path}" checkout -B {local_branch} {remote_branch}')
+    
+    def update_repository(self, repo_path):
+        """更新仓库：可重试的 git fetch + 本地快进合并，网络失败不会重复合并"""
+        if not self.runner.run("git fetch --progress", cwd=repo_path, retry=True):
+            return False
+        return self.runner.run("git merge --ff-only @{u}", cwd=repo_path)
+    
+    def create_startup_scripts(self, install_path, project_path, env_name):
+        """创建启动脚本"""
+        try:
+            # 脚本开头设置缓存的激活变量，不再 conda activate（未解析出激活变量时才调用）
+            activation = resolve_env_activation(self.project_status, log=self.log)
+            env_lines = activation_bat_lines(activation)
+            
+            # Windows批处理脚本 - 交互式终端
+            activate = env_lines or f"call conda activate {env_name}"
+            bat_content = f"""@echo off
+chcp 65001 >nul
+echo 启动PandaAI工具...
+cd /d "{project_path}"
+{activate}
+echo 环境已激活: {env_name}
+echo 项目目录: {project_path}
+echo.
+echo 正在设置Python路径...
+set PYTHONPATH=%CD%;%CD%\\panda_factor_server;%CD%\\panda_common;%CD%\\panda_data;%CD%\\panda_data_hub;%CD%\\panda_factor;%CD%\\panda_llm;%PYTHONPATH%
+echo 环境准备完成，所有子模块已在部署阶段安装
+echo.
+echo 你现在可以运行项目中的脚本了！
+echo 例如: python ./panda_factor_server/panda_factor_server/__main__.py
+echo.
+cmd /k
+"""
+            
+            bat_path = os.path.join(install_path, "启动PandaAI.bat")
+            with open(bat_path, 'w', encoding='utf-8') as f:
+                f.write(bat_content)
+            
+            self.log(f"✅ 已创建启动脚本: {bat_path}")
+            
+            # 创建直接启动服务器的脚本，服务输出写入 安装路径/logs/
+            # 服务直接用环境的解释器启动
+            python = subprocess.list2cmdline([activation["python"]] if activation else
+                                             ["conda", "run", "-n", env_name, "--no-capture-output", "python"])
+            capture_script = install_log_capture(install_path)
+            # 服务器经 panda_deploy_serve.py 启动，监听本配置的端口
+            serve_script = install_helper_script(install_path, "panda_deploy_serve.py")
+            capture = {name: subprocess.list2cmdline(
+                get_log_capture_command(self.project_status, capture_script, name,
+                                        python=activation["python"] if activation else "python", echo=True))
+                for name in ("mongodb", "factor", "quantflow")}
+            mongodb_path = self.project_status.get_status("mongodb_path")
+            mongodb_data_path = self.project_status.get_mongodb_data_path()
+            ports = self.project_status.get_ports()
+            if mongodb_path:
+                server_bat_content = f"""@echo off
+chcp 65001 >nul
+title PandaAI Factor Server
+echo 启动PandaAI Factor服务器...
+echo 项目路径: {project_path}
+echo MongoDB路径: {mongodb_path}
+echo.
+{env_lines}
+
+echo ========================================
+echo 步骤1: 启动MongoDB数据库
+echo ========================================
+cd /d "{mongodb_path}"
+echo 创建数据目录...
+if not exist "{mongodb_data_path}" mkdir "{mongodb_data_path}"
+if not exist "conf" mkdir conf
+echo 启动MongoDB副本集...
+start "MongoDB Server" cmd /c "{capture['mongodb']} bin\\mongod.exe --replSet rs0 --dbpath "{mongodb_data_path}" --keyFile conf\\mongo.key --port {ports['mongodb']} --quiet --auth"
+echo MongoDB启动命令已执行
+echo 等待MongoDB初始化...
+timeout /t 5 /nobreak >nul
+echo.
+
+echo ========================================
+echo 步骤2: 启动PandaFactor服务器
+echo ========================================
+cd /d "{project_path}"
+echo 正在设置Python路径...
+set PYTHONPATH=%CD%;%CD%\\panda_factor_server;%CD%\\panda_common;%CD%\\panda_data;%CD%\\panda_data_hub;%CD%\\panda_factor;%CD%\\panda_llm;%PYTHONPATH%
+echo 启动PandaFactor服务器 (后台运行)...
+start "PandaFactor Server" cmd /c "{capture['factor']} {python} "{serve_script}" --port {ports['factor']} ./panda_factor_server/panda_factor_server/__main__.py && pause"
+echo PandaFactor服务器启动命令已执行
+echo 等待服务器初始化...
+timeout /t 3 /nobreak >nul
+echo.
+
+echo ========================================
+echo 步骤3: 启动QuantFlow服务器
+echo ========================================
+cd /d "{install_path}"
+if exist panda_quantflow (
+    cd panda_quantflow
+    echo 启动QuantFlow服务器 (后台运行)...
+    start "QuantFlow Server" cmd /c "{capture['quantflow']} {python} "{serve_script}" --port {ports['quantflow']} src/panda_server/main.py && pause"
+    echo QuantFlow服务器启动命令已执行
+    echo.
+    echo ========================================
+    echo 所有服务启动完成
+    echo ========================================
+    echo Factor服务器: http://localhost:{ports['factor']}
+    echo QuantFlow服务器: http://localhost:{ports['quantflow']}
+    echo MongoDB数据库: localhost:{ports['mongodb']}
+    echo.
+    echo 提示: 
+    echo - 所有服务都在后台运行
+    echo - 关闭此窗口不会停止服务
+    echo - 使用工具的停止项目按钮来停止所有服务
+    echo.
+) else (
+    echo 未找到QuantFlow目录，跳过QuantFlow启动
+    echo 如需使用QuantFlow，请在部署页面重新部署项目
+    echo.
+)
+echo 注意: 所有服务可能仍在后台运行
+echo 如需停止所有服务，请使用工具的"停止项目"按钮
+pause
+"""
+            else:
+                server_bat_content = f"""@echo off
+chcp 65001 >nul
+title PandaAI Factor Server
+echo 启动PandaAI Factor服务器...
+echo 警告: MongoDB路径未配置，跳过MongoDB启动
+echo.
+{env_lines}
+cd /d "{project_path}"
+echo 正在设置Python路径...
+set PYTHONPATH=%CD%;%CD%\\panda_factor_server;%CD%\\panda_common;%CD%\\panda_data;%CD%\\panda_data_hub;%CD%\\panda_factor;%CD%\\panda_llm;%PYTHONPATH%
+echo 启动PandaFactor服务器 (后台运行)...
+start "PandaFactor Server" cmd /c "{capture['factor']} {python} "{serve_script}" --port {ports['factor']} ./panda_factor_server/panda_factor_server/__main__.py && pause"
+echo PandaFactor服务器启动命令已执行
+echo 等待服务器初始化...
+timeout /t 3 /nobreak >nul
+echo.
+
+echo ========================================
+echo 启动QuantFlow服务器
+echo ========================================
+cd /d "{install_path}"
+if exist panda_quantflow (
+    cd panda_quantflow
+    echo 启动QuantFlow服务器 (后台运行)...
+    start "QuantFlow Server" cmd /c "{capture['quantflow']} {python} "{serve_script}" --port {ports['quantflow']} src/panda_server/main.py && pause"
+    echo QuantFlow服务器启动命令已执行
+    echo.
+    echo ========================================
+    echo 所有服务启动完成
+    echo ========================================
+    echo Factor服务器: http://localhost:{ports['factor']}
+    echo QuantFlow服务器: http://localhost:{ports['quantflow']}
+    echo MongoDB数据库: 未配置
+    echo.
+    echo 提示: 
+    echo - 所有服务都在后台运行
+    echo - MongoDB未配置，部分功能可能受限
+    echo - 使用工具的停止项目按钮来停止所有服务
+    echo.
+) else (
+    echo 未找到QuantFlow目录，跳过QuantFlow启动
+    echo 如需使用QuantFlow，请在部署页面重新部署项目
+    echo.
+)
+pause
+"""
+            
+            server_bat_path = os.path.join(install_path, "启动PandaAI服务器.bat")
+            with open(server_bat_path, 'w', encoding='utf-8') as f:
+                f.write(server_bat_content)
+            
+            self.log(f"✅ 已创建服务器启动脚本: {server_bat_path}")
+        
+        except Exception as e:
+            self.log(f"⚠️ 创建启动脚本失败: {str(e)}")
+
+class ServiceSupervisor:
+    """启动和停止 MongoDB、PandaFactor、QuantFlow 三个服务
+
+    Windows下每个服务在独立的控制台窗口中启动，其他平台以后台进程启动；
+    进程号和进程的创建时间保存在安装目录的 service_pids.json 中，停止时只结束本配置启动的进程
+    """
+    PID_FILE = "service_pids.json"
+    
+    def __init__(self, project_status, log=log_to_stdout):
+        self.project_status = project_status
+        self.log = log
+    
+    def build_plan(self):
+        """检查启动条件并返回启动计划，条件不满足时返回None"""
+        project_path = self.project_status.get_status("project_path")
+        env_name = self.project_status.get_status("conda_env")
+        if not project_path or not env_name:
+            self.log("❌ 请先在部署页面完成项目配置")
+            return None
+        
+        # 项目实际路径
+        panda_factor_path = os.path.join(project_path, "panda_factor")
+        panda_quantflow_path = os.path.join(project_path, "panda_quantflow")
+        mongodb_path = self.project_status.get_status("mongodb_path")
+        
+        # 检查MongoDB路径
+        if not mongodb_path or not os.path.exists(mongodb_path):
+            self.log("❌ MongoDB路径未配置或不存在")
+            return None
+        
+        # 检查Factor服务器文件
+        factor_entry = find_factor_server_entry(panda_factor_path)
+        if factor_entry:
+            self.log(f"✅ 找到Factor服务器文件: {os.path.normpath(os.path.join(panda_factor_path, factor_entry))}")
+        else:
+            self.log("❌ Factor服务器启动文件不存在")
+            self.log(f"检查路径1: {os.path.join(panda_factor_path, 'panda_factor_server', 'panda_factor_server', '__main__.py')}")
+            self.log(f"检查路径2: {os.path.join(panda_factor_path, 'panda_factor_server', '__main__.py')}")
+            return None
+        
+        # 检查QuantFlow服务器文件
+        quantflow_main_path = os.path.join(panda_quantflow_path, "src", "panda_server", "main.py")
+        if os.path.exists(quantflow_main_path):
+            quantflow_entry = "src/panda_server/main.py"
+            self.log(f"✅ 找到QuantFlow服务器文件: {quantflow_main_path}")
+        else:
+            quantflow_entry = None
+            self.log("⚠️ 未找到QuantFlow服务器启动文件，跳过QuantFlow启动")
+            self.log(f"检查路径: {quantflow_main_path}")
+        
+        # 直接用环境的解释器启动服务，激活变量只在环境变化后重新解析
+        activation = resolve_env_activation(self.project_status, log=self.log)
+        python = [activation["python"]] if activation else ["conda", "run", "-n", env_name, "--no-capture-output", "python"]
+        
+        return {
+            "project_path": project_path,
+            "env_name": env_name,
+            "activation": activation,
+            "python": python,
+            "mongodb_path": mongodb_path,
+            "mongodb_data_path": self.project_status.get_mongodb_data_path(),
+            "ports": self.project_status.get_ports(),
+            "log_dir": os.path.join(project_path, "logs"),
+            "log_capture": install_log_capture(project_path),
+            "factor_path": panda_factor_path,
+            "factor_entry": factor_entry,
+            "quantflow_path": panda_quantflow_path,
+            "quantflow_entry": quantflow_entry,
+            "serve_script": install_helper_script(project_path, "panda_deploy_serve.py"),
+        }
+    
+    def server_args(self, plan, name):
+        """启动服务器的参数（不含解释器）：经 panda_deploy_serve.py 以本配置的端口运行入口"""
+        return [plan["serve_script"], "--port", str(plan["ports"][name]), plan[f"{name}_entry"]]
+    
+    def apply_ports(self, plan):
+        """把本配置的MongoDB端口写入PandaFactor配置，服务器连接本配置的MongoDB"""
+        for path in apply_mongodb_port(plan["factor_path"], plan["ports"]["mongodb"]):
+            self.log(f"🔧 已把MongoDB端口 {plan['ports']['mongodb']} 写入 {path}")
+    
+    def launch(self):
+        """启动所有服务（本配置的端口已被占用时不启动，例如服务已在运行）"""
+        plan = self.build_plan()
+        if plan is None:
+            return False
+        busy = [f"{name} {port}" for name, port in plan["ports"].items() if probe_port(port)]
+        if busy:
+            self.log(f"❌ 端口已被占用: {', '.join(busy)}，服务可能已在运行（或被其他程序占用），请先停止或在配置中修改端口")
+            return False
+        return self._launch_services(plan)
+    
+    def _launch_services(self, plan):
+        """逐个启动所有服务，输出写入安装目录下的 logs/，进程号记录在 service_pids.json
+
+        Windows下每个服务在单独的控制台窗口中运行（同时显示输出），其他平台以后台进程启动
+        """
+        project_path = plan["project_path"]
+        mongodb_path = plan["mongodb_path"]
+        mongodb_port = plan["ports"]["mongodb"]
+        log_dir = plan["log_dir"]
+        os.makedirs(log_dir, exist_ok=True)
+        pids = {}
+        
+        # 步骤1: 启动MongoDB数据库
+        os.makedirs(plan["mongodb_data_path"], exist_ok=True)
+        os.makedirs(os.path.join(mongodb_path, "conf"), exist_ok=True)
+        self.log("启动MongoDB副本集...")
+        pids["mongodb"] = self._spawn(
+            [os.path.join(mongodb_path, "bin", exe_name("mongod")), "--replSet", "rs0",
+             "--dbpath", plan["mongodb_data_path"], "--keyFile", os.path.join("conf", "mongo.key"),
+             "--port", str(mongodb_port), "--quiet", "--auth"],
+            mongodb_path, plan, "mongodb")
+        self.save_pids(project_path, pids)
+        if not self.wait_for_port(mongodb_port, timeout=10):
+            self.log("⚠️ MongoDB端口未在10秒内就绪，继续启动其他服务")
+        
+        # 步骤2: 启动PandaFactor服务器
+        factor_path = plan["factor_path"]
+        env = self.service_env(factor_path, plan["activation"])
+        self.apply_ports(plan)
+        self.log(f"启动PandaFactor服务器 (后台运行，端口 {plan['ports']['factor']})...")
+        pids["factor"] = self._spawn(plan["python"] + self.server_args(plan, "factor"), factor_path, plan, "factor",
+                                     env=env)
+        
+        # 步骤3: 启动QuantFlow服务器
+        if plan["quantflow_entry"]:
+            self.log(f"启动QuantFlow服务器 (后台运行，端口 {plan['ports']['quantflow']})...")
+            pids["quantflow"] = self._spawn(plan["python"] + self.server_args(plan, "quantflow"),
+                                            plan["quantflow_path"], plan, "quantflow", env=env)
+            if os.name == 'nt':
+                # QuantFlow就绪后打开浏览器访问页面
+                threading.Thread(target=self.open_quantflow_page, args=(plan["ports"]["quantflow"],),
+                                 daemon=True).start()
+        self.save_pids(project_path, pids)
+        
+        self.log(f"✅ 服务器启动命令已执行，日志目录: {log_dir}")
+        self.log('如需停止所有服务，请使用工具的"停止项目"按钮')
+        return True
+    
+    def open_quantflow_page(self, port):
+        """等待QuantFlow端口就绪后在浏览器中打开页面"""
+        if self.wait_for_port(port, timeout=60):
+            webbrowser.open(f"http://127.0.0.1:{port}/quantflow/")
+    
+    def save_pids(self, project_path, pids):
+        """记录本配置启动的服务进程 {名称: {pid, created}}，停止时只结束这些进程"""
+        with open(os.path.join(project_path, self.PID_FILE), 'w', encoding='utf-8') as f:
+            json.dump(pids, f, indent=2)
+    
+    @classmethod
+    def load_pids(cls, project_path):
+        """读取记录的服务进程 {名称: {pid, created}}，没有记录时返回空字典（旧版本只记录了进程号）"""
+        pid_file = os.path.join(project_path, cls.PID_FILE) if project_path else ""
+        pids = {}
+        try:
+            with open(pid_file, 'r', encoding='utf-8') as f:
+                for name, record in json.load(f).items():
+                    record = record if isinstance(record, dict) else {"pid": record, "created": None}
+                    if record.get("pid"):
+                        pids[name] = {"pid": int(record["pid"]), "created": record.get("created")}
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+        return pids
+    
+    @staticmethod
+    def pid_reused(record):
+        """记录的进程号现在是否属于另一个进程（服务退出后Windows很快会复用进程号），无法确认时视为未复用"""
+        created = process_created(record["pid"])
+        return record.get("created") is not None and created is not None and created != record["created"]
+    
+    def service_env(self, factor_path, activation=None):
+        """PandaFactor和QuantFlow进程的环境变量：应用缓存的激活变量，子模块目录加入 PYTHONPATH"""
+        env = activated_environ(activation) if activation else os.environ.copy()
+        env["PYTHONPATH"] = os.pathsep.join(
+            [factor_path] + [os.path.join(factor_path, module.replace("./", "")) for module in FACTOR_SUBMODULES]
+            + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+        return env
+    
+    def _spawn(self, args, cwd, plan, name, env=None):
+        """启动服务，输出经日志捕获进程写入轮转日志，返回 {pid, created}
+        
+        其他平台在独立进程组中启动，捕获进程和服务在同一个进程组中，停止服务时一起结束；
+        Windows下在新的控制台窗口中启动，正常停止时由捕获进程向服务发送 CTRL_BREAK_EVENT，强制停止时结束该进程树
+        """
+        windows = os.name == 'nt'
+        if not getattr(sys, "frozen", False):
+            python = sys.executable
+        elif windows:
+            # 打包后的工具没有可用的解释器，由环境的解释器运行捕获脚本
+            python = plan["activation"]["python"] if plan["activation"] else "python"
+        else:
+            python = "python3"
+        command = get_log_capture_command(self.project_status, plan["log_capture"], name, python=python,
+                                          echo=windows, stop_file=stop_request_path(plan["log_dir"], name)) + args
+        if windows:
+            # 服务异常退出时保留窗口（pause），方便查看错误；按停止标记正常退出时捕获进程返回0，窗口直接关闭
+            process = subprocess.Popen(f'cmd /c "{subprocess.list2cmdline(command)} || pause"', cwd=cwd, env=env,
+                                       creationflags=subprocess.CREATE_NEW_CONSOLE)
+        else:
+            process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True)
+        # 进程尚未被回收，进程号不会被复用，此时记录的创建时间一定属于服务进程
+        return {"pid": process.pid, "created": process_created(process.pid)}
+    
+    def wait_for_port(self, port, timeout=10):
+        """等待端口开始监听"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if probe_port(port):
+                return True
+            time.sleep(0.5)
+        return False
+    
+    def stop(self, graceful=False):
+        """按记录的进程号停止本配置启动的服务（不影响其他配置和无关的进程）
+
+        graceful 时先只发送终止请求并最多等待一分钟，进程仍未退出才强制结束（Windows下默认直接强制结束）；
+        记录的进程号已被其他进程复用时跳过，不会误结束无关的进程
+        """
+        project_path = self.project_status.get_status("project_path")
+        pid_file = os.path.join(project_path, self.PID_FILE) if project_path else ""
+        if not pid_file or not os.path.exists(pid_file):
+            self.log("⚠️ 未找到运行中的服务记录")
+            return True
+        pids = self.load_pids(project_path)
+        
+        # 先停止应用服务器，最后停止MongoDB
+        for name in ("quantflow", "factor", "mongodb"):
+            record = pids.get(name)
+            if not record:
+                continue
+            if self.pid_reused(record):
+                self.log(f"⚠️ 未找到运行中的{name}服务（进程号 {record['pid']} 已属于其他进程）")
+                continue
+            self.log(f"正在停止{name}服务...")
+            if os.name == 'nt':
+                stopped = self._terminate_tree(record["pid"], timeout=60 if graceful else 0,
+                                               stop_file=stop_request_path(os.path.join(project_path, "logs"), name))
+            else:
+                stopped = self._terminate_group(record["pid"], timeout=60 if graceful else 10)
+            if stopped:
+                self.log(f"✅ {name}服务已停止")
+            else:
+                self.log(f"⚠️ 未找到运行中的{name}服务")
+        os.remove(pid_file)
+        return True
+    
+    def _terminate_tree(self, pid, timeout=0, stop_file=None):
+        """Windows: 结束启动时记录的进程及其子进程（服务窗口、日志捕获进程和服务本身）
+
+        timeout 大于0时先写入停止标记，由捕获进程向服务发送 CTRL_BREAK_EVENT 并等待服务退出，超时后才强制结束
+        """
+        if timeout > 0 and stop_file:
+            with open(stop_file, 'w', encoding='utf-8'):
+                pass
+            try:
+                deadline = time.time() + timeout
+                while time.time() < deadline:
+                    if not process_exists(pid):
+                        return True
+                    time.sleep(0.5)
+            finally:
+                if os.path.exists(stop_file):
+                    os.remove(stop_file)
+        result = subprocess.run(['taskkill', '/pid', str(pid), '/t', '/f'], capture_output=True, text=True)
+        return result.returncode == 0
+    
+    def _terminate_group(self, pid, timeout=10):
+        """向进程组发送SIGTERM，超时后发送SIGKILL"""
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return False
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            # 由本进程启动的服务退出后需要回收，否则僵尸进程会让进程组一直存在
+            try:
+                os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                pass
+            try:
+                os.killpg(pid, 0)
+            except ProcessLookupError:
+                return True
+            time.sleep(0.2)
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        return True
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 定时数据更新
+在设置的低峰时间调用PandaFactor数据中心的数据清洗接口，代替手动打开数据清理页面点击更新。
+执行前等待服务器健康检查通过；限制同时执行的任务数量，提交失败时按指数退避重试
+（已被接受的任务不会重新提交，只重试查询进度的请求），
+每次执行的耗时和处理的数据条数记录在状态文件中
+"""
+
+import copy
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+from panda_deploy_core import RetryPolicy, log_to_stdout, probe_url
+
+# 默认的数据更新任务。接口按PandaFactor数据中心的路由设置，不同版本的路径不同时在状态文件的
+# data_hub_schedule 中按任务ID覆盖 start / progress / params（也可以增加新的任务）
+DEFAULT_DATA_HUB_JOBS = [
+    {
+        "id": "stock_market",
+        "title": "股票行情清洗",
+        "start": "/datahub/api/v1/upsert_stockmarket_final",
+        "progress": "/datahub/api/v1/get_progress_stock_final",
+        "params": {"start_date": "{start}", "end_date": "{end}"},
+        "start_timeout": 120,  # 等待开始接口响应的时间（秒），超时后不再重新提交
+        "time": "02:00",
+        "enabled": False,
+    },
+    {
+        "id": "factor",
+        "title": "因子数据清洗",
+        "start": "/datahub/api/v1/upsert_factor_final",
+        "progress": "/datahub/api/v1/get_progress_factor_final",
+        "params": {"start_date": "{start}", "end_date": "{end}"},
+        "start_timeout": 120,
+        "time": "03:00",
+        "enabled": False,
+    },
+]
+
+# 进度接口返回的状态（小写匹配）
+DONE_STATES = {"completed", "complete", "success", "succeeded", "done", "finished"}
+FAILED_STATES = {"failed", "failure", "error", "cancelled"}
+# 处理条数可能使用的字段名，按顺序查找
+ROWS_KEYS = ("processed_count", "processed", "rows", "row_count", "count", "total_count", "total")
+
+# 保留的执行记录数量
+DATA_HUB_HISTORY_KEEP = 100
+
+class DataHubJobError(Exception):
+    """数据更新任务失败，retryable 为 False 时不再重试（例如接口不存在）"""
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+def get_data_hub_jobs(project_status):
+    """默认任务合并状态文件中的设置（按任务ID覆盖字段），返回任务列表"""
+    overrides = project_status.get_status("data_hub_schedule") or {}
+    jobs = []
+    for job in DEFAULT_DATA_HUB_JOBS:
+        merged = copy.deepcopy(job)
+        merged.update(overrides.get(job["id"], {}))
+        jobs.append(merged)
+    default_ids = {job["id"] for job in DEFAULT_DATA_HUB_JOBS}
+    for job_id, settings in overrides.items():
+        if job_id not in default_ids and settings.get("start"):
+            jobs.append(dict({"id": job_id, "title": job_id, "params": {}, "time": "02:00", "enabled": False},
+                             **settings))
+    return jobs
+
+def parse_schedule_time(value):
+    """"HH:MM" 转换为 (时, 分)，格式错误时抛出 ValueError"""
+    hour, minute = (int(part) for part in str(value).split(":"))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"无效的时间: {value}")
+    return hour, minute
+
+def parse_progress(data):
+    """解析进度接口或同步接口的返回值，返回 (进度百分比或None, 状态, 处理条数或None)"""
+    if isinstance(data, dict) and isinstance(data.get("data"), dict):
+        data = dict(data, **data["data"])
+    if not isinstance(data, dict):
+        return None, "", None
+    progress = None
+    for key in ("progress", "percent", "percentage"):
+        try:
+            progress = float(data[key])
+            break
+        except (KeyError, TypeError, ValueError):
+            continue
+    state = str(data.get("status") or data.get("state") or "").lower()
+    rows = None
+    for key in ROWS_KEYS:
+        if isinstance(data.get(key), int) and not isinstance(data.get(key), bool):
+            rows = data[key]
+            break
+    return progress, state, rows
+
+def describe_data_hub_run(run, with_time=True):
+    """一次执行记录的简短说明"""
+    titles = {"ok": "✅ 完成", "failed": "❌ 失败", "skipped": "⏭️ 跳过"}
+    summary = f"{titles.get(run['result'], run['result'])}: {run['title']}"
+    parts = [f"{run['started_at']} {summary}" if with_time else summary, f"耗时 {run['duration']:.0f} 秒"]
+    if run.get("rows") is not None:
+        parts.append(f"{run['rows']} 条")
+    if run.get("attempts", 1) > 1:
+        parts.append(f"尝试 {run['attempts']} 次")
+    if run.get("error"):
+        parts.append(run["error"])
+    return "，".join(parts)
+
+class DataHubScheduler:
+    """定时调用数据中心的数据更新接口
+
+    后台线程每 tick 秒检查一次到期的任务：到了设置的时间、仍在执行窗口内且当天还没有执行过。
+    每个任务在单独的线程中执行，同时执行的数量不超过 data_hub_max_concurrent（每次获取名额时读取，修改后立即生效）
+    """
+    def __init__(self, project_status, on_run=None, log=None, tick=30):
+        self.project_status = project_status
+        self.on_run = on_run or (lambda run: None)
+        self.log = log or log_to_stdout
+        self.tick = tick
+        self.lock = threading.Lock()
+        self.running = set()
+        self.active = 0  # 已获得执行名额的任务数
+        self.slots_changed = threading.Condition(self.lock)
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+    
+    def setting(self, key, default, minimum=0):
+        """读取数字设置，格式错误时使用默认值"""
+        try:
+            return max(minimum, int(self.project_status.get_status(key)))
+        except (TypeError, ValueError):
+            return default
+    
+    @property
+    def base_url(self):
+        return f"http://localhost:{self.project_status.get_ports()['factor']}"
+    
+    def acquire_slot(self):
+        """获取执行名额：执行中的任务数达到当前的并发数量设置时等待（调低设置后，正在执行的任务结束前不会开始新任务）"""
+        with self.slots_changed:
+            while (self.active >= self.setting("data_hub_max_concurrent", 1, minimum=1)
+                   and not self.stop_event.is_set()):
+                # 设置修改后由 reschedule() 唤醒，同时定期重新读取设置
+                self.slots_changed.wait(self.tick)
+            self.active += 1
+    
+    def release_slot(self):
+        """归还执行名额，唤醒等待的任务"""
+        with self.slots_changed:
+            self.active -= 1
+            self.slots_changed.notify_all()
+    
+    def start(self):
+        """启动后台调度线程"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """停止后台调度，正在执行的任务在下一次等待（重试、轮询进度）时结束"""
+        self.stop_event.set()
+        self.wake_event.set()
+        with self.slots_changed:
+            self.slots_changed.notify_all()
+    
+    def reschedule(self):
+        """设置修改后立即重新检查到期的任务和执行名额"""
+        self.wake_event.set()
+        with self.slots_changed:
+            self.slots_changed.notify_all()
+    
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                for job in self.due_jobs(datetime.now()):
+                    self.run_in_background(job, trigger="schedule")
+            except Exception as e:
+                self.log(f"⚠️ 检查定时数据更新失败: {str(e)}")
+            self.wake_event.wait(self.tick)
+            self.wake_event.clear()
+    
+    def due_jobs(self, now):
+        """到期的任务：今天设置的时间已到、未超过执行窗口（data_hub_window_minutes）且今天没有执行过"""
+        window = timedelta(minutes=self.setting("data_hub_window_minutes", 120, minimum=1))
+        last_runs = self.project_status.get_status("data_hub_last_runs") or {}
+        today = now.strftime("%Y-%m-%d")
+        due = []
+        for job in get_data_hub_jobs(self.project_status):
+            if not job.get("enabled") or last_runs.get(job["id"]) == today or job["id"] in self.running:
+                continue
+            if job.get("weekdays") and now.isoweekday() not in job["weekdays"]:
+                continue
+            try:
+                hour, minute = parse_schedule_time(job.get("time"))
+            except ValueError:
+                continue
+            scheduled = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if scheduled <= now < scheduled + window:
+                due.append(job)
+        return due
+    
+    def run_in_background(self, job, trigger="manual"):
+        """在后台线程中执行任务，同一任务正在执行时忽略"""
+        with self.lock:
+            if job["id"] in self.running:
+                return None
+            self.running.add(job["id"])
+        if trigger == "schedule":
+            self.mark_started(job)
+        thread = threading.Thread(target=self._run_job, args=(job, trigger), daemon=True)
+        thread.start()
+        return thread
+    
+    def run_jobs(self, jobs, trigger="manual"):
+        """执行多个任务并等待全部完成（命令行使用），返回执行记录"""
+        runs = []
+        threads = []
+        for job in jobs:
+            with self.lock:
+                if job["id"] in self.running:
+                    continue
+                self.running.add(job["id"])
+            thread = threading.Thread(target=lambda job=job: runs.append(self._run_job(job, trigger)), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return runs
+    
+    def mark_started(self, job):
+        """记录任务今天已经执行，重启工具后不会重复执行"""
+        with self.lock:
+            last_runs = dict(self.project_status.get_status("data_hub_last_runs") or {})
+            last_runs[job["id"]] = datetime.now().strftime("%Y-%m-%d")
+            self.project_status.update_status(data_hub_last_runs=last_runs)
+    
+    def _run_job(self, job, trigger):
+        self.acquire_slot()
+        try:
+            run = self.execute(job, trigger)
+        finally:
+            self.release_slot()
+            with self.lock:
+                self.running.discard(job["id"])
+        self.record_run(run)
+        self.on_run(run)
+        return run
+    
+    def record_run(self, run):
+        """保存执行记录（只保留最近的 DATA_HUB_HISTORY_KEEP 条）"""
+        with self.lock:
+            runs = list(self.project_status.get_status("data_hub_runs") or [])
+            runs.append(run)
+            self.project_status.update_status(data_hub_runs=runs[-DATA_HUB_HISTORY_KEEP:])
+    
+    def wait_until_healthy(self, timeout):
+        """等待Factor服务器的健康检查通过，超时返回False"""
+        deadline = time.monotonic() + timeout
+        reported = False
+        while True:
+            state, detail = probe_url(self.base_url)
+            if state == "ok":
+                return True
+            if time.monotonic() >= deadline or self.stop_event.is_set():
+                return False
+            if not reported:
+                self.log(f"⏳ 等待PandaFactor服务器就绪（{detail}）...")
+                reported = True
+            self.stop_event.wait(min(10, max(0.5, deadline - time.monotonic())))
+    
+    def execute(self, job, trigger="manual"):
+        """执行一个任务（等待服务器就绪、失败重试），返回执行记录"""
+        started = time.monotonic()
+        run = {
+            "job": job["id"],
+            "title": job.get("title", job["id"]),
+            "trigger": trigger,
+            "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "result": "failed",
+            "attempts": 0,
+            "rows": None,
+            "waited": 0.0,
+            "error": "",
+        }
+        retries = self.setting("data_hub_retries", 2)
+        policy = RetryPolicy(max_attempts=retries + 1, base_delay=30.0, max_delay=600.0)
+        health_timeout = self.setting("data_hub_health_timeout", 600)
+        
+        self.log(f"📈 开始数据更新: {run['title']}")
+        for attempt in range(1, policy.max_attempts + 1):
+            run["attempts"] = attempt
+            waiting = time.monotonic()
+            healthy = self.wait_until_healthy(health_timeout)
+            run["waited"] = round(run["waited"] + time.monotonic() - waiting, 1)
+            if not healthy:
+                run["result"] = "skipped"
+                run["error"] = f"PandaFactor服务器 {health_timeout} 秒内未就绪"
+                break
+            try:
+                run["rows"] = self.call_job(job)
+                run["result"] = "ok"
+                run["error"] = ""
+                break
+            except DataHubJobError as e:
+                run["error"] = str(e)
+                if not e.retryable or attempt >= policy.max_attempts:
+                    break
+                delay = policy.get_delay(attempt)
+                self.log(f"🔄 {run['title']} 失败: {str(e)}，{delay:.0f} 秒后重试（{attempt}/{policy.max_attempts}）")
+                if self.stop_event.wait(delay):
+                    break
+        
+        run["duration"] = round(time.monotonic() - started, 1)
+        run["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.log(describe_data_hub_run(run, with_time=False))
+        return run
+    
+    def request(self, path, params=None, timeout=60, resendable=True):
+        """GET请求数据中心接口，返回解析后的JSON（非JSON时返回文本）
+
+        resendable=False 时只有请求确定没有发出（连接被拒绝、无法解析地址）的错误可以重试，
+        发出后的超时或连接中断时服务器可能已经接受了请求
+        """
+        url = self.base_url + path
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                body = response.read().decode("utf-8", errors="replace")
+        except urllib.error.HTTPError as e:
+            # 4xx 表示接口路径或参数错误，重试没有意义
+            raise DataHubJobError(f"{path} 响应异常: {e.code}", retryable=e.code >= 500)
+        except (urllib.error.URLError, OSError) as e:
+            reason = getattr(e, 'reason', e)
+            unsent = isinstance(reason, (ConnectionRefusedError, socket.gaierror))
+            if not resendable and not unsent:
+                raise DataHubJobError(f"{path} 请求已发出但没有收到响应（{reason}），任务可能已开始执行，不再重新提交",
+                                      retryable=False)
+            raise DataHubJobError(f"{path} 请求失败: {reason}")
+        try:
+            return json.loads(body)
+        except ValueError:
+            return body
+    
+    def job_params(self, job):
+        """接口参数，{start} / {end} 替换为更新的起止日期（YYYYMMDD，lookback_days 天前到今天）"""
+        today = datetime.now()
+        dates = {
+            "start": (today - timedelta(days=int(job.get("lookback_days", 1)))).strftime("%Y%m%d"),
+            "end": today.strftime("%Y%m%d"),
+        }
+        return {key: str(value).format(**dates) for key, value in (job.get("params") or {}).items()}
+    
+    def call_job(self, job):
+        """调用开始接口，有进度接口时轮询到完成，返回处理的数据条数（接口没有返回时为None）
+
+        开始接口返回后任务已被服务器接受，之后的错误都不再重试整个任务，避免重复提交
+        """
+        result = self.request(job["start"], self.job_params(job), timeout=float(job.get("start_timeout", 120)),
+                              resendable=False)
+        progress, state, rows = parse_progress(result)
+        if state in FAILED_STATES:
+            raise DataHubJobError(f"接口返回失败: {json.dumps(result, ensure_ascii=False)[:200]}")
+        if not job.get("progress"):
+            return rows
+        
+        deadline = time.monotonic() + float(job.get("timeout", 3 * 3600))
+        interval = float(job.get("poll_interval", 5))
+        poll_policy = RetryPolicy(max_attempts=self.setting("data_hub_poll_retries", 5) + 1,
+                                  base_delay=interval, max_delay=120.0)
+        last_logged = -1
+        while True:
+            result = self.poll(job, poll_policy)
+            progress, state, current_rows = parse_progress(result)
+            if current_rows is not None:
+                rows = current_rows
+            if state in FAILED_STATES:
+                raise DataHubJobError(f"数据更新失败: {json.dumps(result, ensure_ascii=False)[:200]}",
+                                      retryable=False)
+            if state in DONE_STATES or (progress is not None and progress >= 100):
+                return rows
+            if progress is not None and int(progress) // 25 > last_logged:
+                last_logged = int(progress) // 25
+                self.log(f"   {job.get('title', job['id'])}: {progress:.0f}%")
+            if time.monotonic() >= deadline:
+                raise DataHubJobError(f"超过 {job.get('timeout', 3 * 3600)} 秒仍未完成", retryable=False)
+            if self.stop_event.wait(interval):
+                raise DataHubJobError("已停止", retryable=False)
+    
+    def poll(self, job, policy):
+        """查询一次进度，临时失败时按 policy 只重试查询请求，重试用完后任务失败（不重新提交）"""
+        title = job.get("title", job["id"])
+        for attempt in range(1, policy.max_attempts + 1):
+            try:
+                return self.request(job["progress"])
+            except DataHubJobError as e:
+                if not e.retryable or attempt >= policy.max_attempts:
+                    raise DataHubJobError(f"查询进度失败: {str(e)}", retryable=False)
+                delay = policy.get_delay(attempt)
+                self.log(f"🔄 {title} 查询进度失败: {str(e)}，{delay:.0f} 秒后重试（{attempt}/{policy.max_attempts - 1}）")
+                if self.stop_event.wait(delay):
+                    raise DataHubJobError("已停止", retryable=False)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 界面卡顿诊断
+测量Tk主循环的延迟（定时 after() 回调的实际触发时间与预期时间之差），主循环被阻塞超过阈值时
+由监视线程保存所有线程的调用栈；同时记录从 root.update() 中重入执行的回调位置，
+并可以用 cProfile 分析后台任务，每个任务保存一个 pstats 文件
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+def format_thread_stacks(frames=None):
+    """其他所有线程当前的调用栈（文本），主线程在最前面"""
+    frames = frames if frames is not None else sys._current_frames()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    main_ident = threading.main_thread().ident
+    sections = []
+    for ident, frame in sorted(frames.items(), key=lambda item: item[0] != main_ident):
+        if ident == threading.get_ident():
+            continue
+        stack = "".join(traceback.format_stack(frame))
+        sections.append(f"--- 线程 {names.get(ident, ident)} ({ident}) ---\n{stack}")
+    return "\n".join(sections)
+
+def find_update_caller(frame):
+    """当前回调是否在 root.update() 中执行，是则返回调用 update() 的位置 (文件, 行号, 函数)"""
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name in ("update", "update_idletasks") and code.co_filename.endswith(
+                os.path.join("tkinter", "__init__.py")) and frame.f_back is not None:
+            caller = frame.f_back
+            return os.path.basename(caller.f_code.co_filename), caller.f_lineno, caller.f_code.co_name
+        frame = frame.f_back
+    return None
+
+class LoopLagMonitor:
+    """每 interval 毫秒用 after() 触发一次回调，实际触发时间晚于预期的部分就是主循环的延迟
+
+    主循环被阻塞时回调不会执行，因此由单独的监视线程检查：超过 threshold 毫秒没有回调时保存
+    所有线程的调用栈（主线程的栈就是阻塞的位置），写入 output_dir 中的卡顿记录
+    """
+    def __init__(self, root, output_dir, interval=100, threshold=250, log=None):
+        self.root = root
+        self.output_dir = output_dir
+        self.interval = interval
+        self.threshold = threshold
+        self.log = log or (lambda message: None)
+        self.lags = deque(maxlen=600)  # 最近一分钟的延迟（毫秒）
+        self.stalls = []  # [{started_at, duration, stack_file}]
+        self.reentrant = {}  # (文件, 行号, 函数) -> 在 root.update() 中执行回调的次数
+        self.lock = threading.Lock()
+        self.running = False
+        self.after_id = None
+        self.expected = 0.0
+        self.last_tick = 0.0
+        self.captured = False
+        self.stall_log = ""
+        self.stop_event = threading.Event()
+    
+    def start(self):
+        """开始监视"""
+        if self.running:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.stall_log = os.path.join(self.output_dir, f"stalls-{datetime.now().strftime('%Y%m%d-%H%M%S')}.log")
+        self.running = True
+        self.stop_event.clear()
+        self.last_tick = self.expected = time.monotonic()
+        self.schedule()
+        threading.Thread(target=self._watchdog, name="panda-lag-watchdog", daemon=True).start()
+    
+    def stop(self):
+        """停止监视"""
+        self.running = False
+        self.stop_event.set()
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+    
+    def schedule(self):
+        self.expected = time.monotonic() + self.interval / 1000
+        self.after_id = self.root.after(self.interval, self.tick)
+    
+    def tick(self):
+        """主循环中的定时回调：记录延迟，阻塞结束时补全卡顿的持续时间"""
+        now = time.monotonic()
+        lag = max(0.0, (now - self.expected) * 1000)
+        stall = None
+        with self.lock:
+            self.lags.append(lag)
+            self.last_tick = now
+            if self.captured:
+                self.captured = False
+                stall = self.stalls[-1]
+                stall["duration"] = round(lag, 0)
+        if stall:
+            self.log(f"🐢 界面卡顿 {stall['duration']:.0f} 毫秒，调用栈: {self.stall_log}")
+        caller = find_update_caller(sys._getframe().f_back)
+        if caller:
+            self.reentrant[caller] = self.reentrant.get(caller, 0) + 1
+        if self.running:
+            self.schedule()
+    
+    def _watchdog(self):
+        """监视线程：主循环超过阈值没有执行回调时保存一次所有线程的调用栈"""
+        main_ident = threading.main_thread().ident
+        while not self.stop_event.wait(self.threshold / 2000):
+            with self.lock:
+                blocked = (time.monotonic() - self.last_tick) * 1000 - self.interval
+                if blocked < self.threshold or self.captured:
+                    continue
+                self.captured = True
+                self.stalls.append({"started_at": datetime.now().strftime("%H:%M:%S"), "duration": round(blocked, 0),
+                                    "stack_file": self.stall_log})
+                del self.stalls[:-50]
+            frames = sys._current_frames()
+            main_frame = frames.get(main_ident)
+            where = traceback.format_stack(main_frame)[-1].strip().splitlines()[0] if main_frame else ""
+            try:
+                with open(self.stall_log, 'a', encoding='utf-8') as f:
+                    f.write(f"===== {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} 主循环已阻塞 {blocked:.0f} 毫秒"
+                            f"（{where}）=====\n{format_thread_stacks(frames)}\n")
+            except OSError:
+                pass
+    
+    def summary(self):
+        """最近一分钟的延迟统计: {current, p95, max, stalls, reentrant}"""
+        with self.lock:
+            current = self.lags[-1] if self.lags else 0.0
+            lags = sorted(self.lags)
+            stalls = list(self.stalls)
+        if not lags:
+            return {"current": 0.0, "p95": 0.0, "max": 0.0, "stalls": stalls, "reentrant": dict(self.reentrant)}
+        return {
+            "current": current,
+            "p95": lags[min(len(lags) - 1, int(len(lags) * 0.95))],
+            "max": lags[-1],
+            "stalls": stalls,
+            "reentrant": dict(self.reentrant),
+        }
+
+class TaskProfiler:
+    """用 cProfile 执行后台任务，每个任务保存一个 pstats 文件（用 TaskRunner.profiler 接入）
+
+    Python 3.12 起同一时间只能有一个 cProfile 在运行，此时其他同时执行的任务不分析
+    """
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.files = []  # [(任务名, 耗时, 文件)]
+        self.lock = threading.Lock()
+    
+    def __call__(self, name, func, args):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return func(*args)
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - started
+            path = os.path.join(self.output_dir, f"{name}-{datetime.now().strftime('%H%M%S')}-"
+                                                 f"{threading.get_ident()}.pstats")
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                profile.dump_stats(path)
+                with self.lock:
+                    self.files.append((name, elapsed, path))
+            except OSError:
+                pass
+
+def describe_pstats(path, limit=10):
+    """pstats 文件中累计耗时最长的函数（文本）"""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 磁盘占用
+并行统计安装目录、Conda环境、包缓存和MongoDB数据目录的大小（按目录修改时间增量刷新），
+并提供不影响运行中服务的清理策略
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from panda_deploy_core import (
+    EnvSnapshotManager,
+    ProjectStatus,
+    collect_service_status,
+    find_conda_env_prefix,
+    get_conda_info,
+    log_to_stdout,
+)
+
+# 目录统计缓存，和状态文件放在同一目录，所有配置共用
+CACHE_FILE = "disk_usage_cache.json"
+
+# 统计的位置: (ID, 名称)
+DISK_AREAS = [
+    ("install", "安装目录"),
+    ("conda_env", "Conda环境"),
+    ("conda_pkgs", "Conda包缓存"),
+    ("pip_cache", "pip下载缓存"),
+    ("mongodb_data", "MongoDB数据目录"),
+]
+
+# 清理策略: (策略ID, 名称, 说明, 需要停止的服务)
+PRUNE_POLICIES = [
+    ("pip_cache", "清空pip下载缓存", "安装目录下的 .cache/pip 和用户pip缓存，下次安装时重新下载", ()),
+    ("conda_pkgs", "清理Conda包缓存", "conda clean: 已下载的安装包和没有环境使用的已解压包", ()),
+    ("stale_archives", "删除旧的环境快照", "每个环境只保留最新的快照，并删除中断留下的 .part 和本配置环境的 .rollback", ()),
+    ("launch_leftovers", "删除启动残留和服务日志", "temp_launch.bat 和 logs/ 下的服务日志", ("mongodb", "factor", "quantflow")),
+    ("mongodb_diagnostics", "清理MongoDB诊断数据", "数据目录下的 diagnostic.data 和 _tmp（不会删除数据和journal）", ("mongodb",)),
+]
+# 所有配置共用的缓存：任何一个配置正在部署或处理快照时都不能清理
+SHARED_POLICIES = ("pip_cache", "conda_pkgs")
+
+def format_size(size):
+    """把字节数格式化为便于阅读的大小"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def default_pip_cache_dir():
+    """pip默认的用户缓存目录"""
+    if os.environ.get("PIP_CACHE_DIR"):
+        return os.environ["PIP_CACHE_DIR"]
+    if os.name == 'nt':
+        return os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "pip", "Cache")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/pip")
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "pip")
+
+def remove_path(path):
+    """删除文件或目录，返回是否删除成功"""
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        return True
+    except OSError:
+        return False
+
+class DiskUsageScanner:
+    """用 os.scandir 并行统计目录大小
+
+    每个目录缓存 (修改时间, 直接包含的文件大小和数量, 子目录列表)。目录的修改时间只在其中增删、改名文件时变化，
+    修改时间没变的目录不再列出内容，只继续检查子目录。文件原地变大（例如MongoDB数据文件）需要完整刷新才能统计到。
+    大小为文件的实际长度，Conda环境和包缓存之间的硬链接会分别计算。
+    """
+    def __init__(self, cache_file=None, workers=None):
+        self.cache_file = cache_file
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.cache = self.load_cache()
+    
+    def load_cache(self):
+        """加载目录缓存"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_cache(self):
+        """保存目录缓存（先写临时文件再改名）"""
+        if not self.cache_file:
+            return
+        part_path = self.cache_file + ".part"
+        with open(part_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, ensure_ascii=False)
+        os.replace(part_path, self.cache_file)
+    
+    def scan_dir(self, path, full=False):
+        """统计一个目录直接包含的文件，返回 (缓存项, 是否重新列出)，目录无法访问时返回None"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self.cache.get(path)
+        if cached and not full and cached["mtime"] == mtime:
+            return cached, False
+        
+        size = 0
+        count = 0
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        else:
+                            size += entry.stat(follow_symlinks=False).st_size
+                            count += 1
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return {"mtime": mtime, "size": size, "files": count, "dirs": subdirs}, True
+    
+    def measure(self, root, full=False):
+        """统计目录树，返回 {path, exists, size, files, dirs, rescanned, children: [(名称, 大小)]}"""
+        root = os.path.abspath(root)
+        result = {"path": root, "exists": os.path.exists(root), "size": 0, "files": 0,
+                  "dirs": 0, "rescanned": 0, "children": []}
+        if os.path.isfile(root):
+            result.update(size=os.path.getsize(root), files=1)
+            return result
+        if not os.path.isdir(root):
+            return result
+        
+        # 按层并行列出目录，同一层的目录互不依赖
+        entries = {}
+        frontier = [root]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while frontier:
+                next_frontier = []
+                for path, scanned in zip(frontier, executor.map(lambda path: self.scan_dir(path, full), frontier)):
+                    if scanned is None:
+                        continue
+                    entry, rescanned = scanned
+                    entries[path] = entry
+                    result["rescanned"] += rescanned
+                    next_frontier.extend(os.path.join(path, name) for name in entry["dirs"])
+                frontier = next_frontier
+        if root not in entries:
+            return result  # 根目录无法读取
+        
+        # 自底向上汇总：子目录的路径总比父目录长
+        totals = {}
+        for path in sorted(entries, key=len, reverse=True):
+            entry = entries[path]
+            size, files = entry["size"], entry["files"]
+            for name in entry["dirs"]:
+                child = totals.get(os.path.join(path, name))
+                if child:
+                    size += child[0]
+                    files += child[1]
+            totals[path] = (size, files)
+        
+        # 更新缓存并删除已不存在的目录
+        prefix = root + os.sep
+        for path in [path for path in self.cache if path.startswith(prefix) and path not in entries]:
+            del self.cache[path]
+        self.cache.update(entries)
+        
+        children = [(name, totals[os.path.join(root, name)][0])
+                    for name in entries[root]["dirs"] if os.path.join(root, name) in totals]
+        if entries[root]["size"]:
+            children.append(("（文件）", entries[root]["size"]))
+        result.update(size=totals[root][0], files=totals[root][1], dirs=len(entries),
+                      children=sorted(children, key=lambda item: item[1], reverse=True))
+        return result
+
+class DiskFootprint:
+    """当前配置的磁盘占用统计和清理，profiles 为 ProfileManager，用于检查共用缓存是否正被其他配置使用"""
+    def __init__(self, project_status, log=log_to_stdout, cache_file=None, profiles=None):
+        self.project_status = project_status
+        self.log = log
+        self.profiles = profiles
+        if cache_file is None:
+            cache_file = os.path.join(os.path.dirname(os.path.abspath(project_status.status_file)), CACHE_FILE)
+        self.scanner = DiskUsageScanner(cache_file)
+        self._conda_info = None
+    
+    @property
+    def project_path(self):
+        return self.project_status.get_status("project_path")
+    
+    @property
+    def conda_info(self):
+        if self._conda_info is None:
+            self._conda_info = get_conda_info()
+        return self._conda_info
+    
+    def get_area_paths(self, area_id):
+        """统计位置包含的目录"""
+        if area_id == "install":
+            paths = [self.project_path]
+        elif area_id == "conda_env":
+            paths = [find_conda_env_prefix(self.project_status.get_status("conda_env"), self.conda_info)]
+        elif area_id == "conda_pkgs":
+            paths = self.conda_info.get("pkgs_dirs", [])
+        elif area_id == "pip_cache":
+            paths = self.get_pip_cache_dirs()
+        else:
+            paths = [self.project_status.get_mongodb_data_path()]
+        return [path for path in paths if path and os.path.exists(path)]
+    
+    def get_pip_cache_dirs(self):
+        """部署时使用的pip缓存和用户pip缓存"""
+        paths = [default_pip_cache_dir()]
+        if self.project_path:
+            paths.insert(0, os.path.join(self.project_path, ".cache", "pip"))
+        return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+    
+    def analyze(self, full=False):
+        """统计所有位置，返回 {areas: [...], total, elapsed, rescanned, dirs}"""
+        self.conda_info  # 先获取Conda信息（较慢），不计入统计用时
+        started = time.time()
+        areas = []
+        measured = []
+        for area_id, title in DISK_AREAS:
+            results = [self.scanner.measure(path, full=full) for path in self.get_area_paths(area_id)]
+            measured.extend(results)
+            areas.append({"id": area_id, "title": title, "paths": results,
+                          "size": sum(item["size"] for item in results)})
+        try:
+            self.scanner.save_cache()
+        except OSError as e:
+            self.log(f"⚠️ 保存磁盘统计缓存失败: {str(e)}")
+        
+        # 嵌套的目录（例如安装目录下的pip缓存）只计算一次
+        roots = [item for item in measured if not any(
+            other is not item and item["path"].startswith(other["path"] + os.sep) for other in measured)]
+        return {
+            "areas": areas,
+            "total": sum(item["size"] for item in {item["path"]: item for item in roots}.values()),
+            "elapsed": time.time() - started,
+            "rescanned": sum(item["rescanned"] for item in measured),
+            "dirs": sum(item["dirs"] for item in measured),
+        }
+    
+    def other_profiles(self):
+        """其他配置的 [(名称, ProjectStatus)]，每次从文件重新加载（可能由另一个进程正在部署）"""
+        if self.profiles is None:
+            return []
+        others = []
+        for name in self.profiles.names():
+            status_file = self.profiles.get(name).status_file
+            if os.path.abspath(status_file) != os.path.abspath(self.project_status.status_file):
+                others.append((name, ProjectStatus(status_file)))
+        return others
+    
+    def get_blocked_reason(self, policy_id, required_stopped, services):
+        """策略当前不能执行的原因，可以执行时返回空字符串"""
+        statuses = [("", self.project_status)]
+        if policy_id in SHARED_POLICIES:
+            statuses += [(f"配置 {name} ", status) for name, status in self.other_profiles()]
+        for label, status in statuses:
+            if status.get_status("deployment_status") == "in_progress":
+                return f"{label}正在部署"
+            if (policy_id == "stale_archives" or policy_id in SHARED_POLICIES) and status.get_status("project_path"):
+                operation = EnvSnapshotManager(status, log=self.log).active_operation()
+                if operation:
+                    return f"{label}正在创建环境快照" if operation == "create" else f"{label}正在从快照恢复环境"
+        running = [name for name in required_stopped if services.get(name) != "down"]
+        if running:
+            return f"请先停止服务: {', '.join(running)}"
+        return ""
+    
+    def plan(self, policy_ids=None):
+        """估算各清理策略可以释放的空间，返回 [{id, title, description, size, targets, blocked}]"""
+        services = collect_service_status(self.project_status.get_ports())
+        results = []
+        for policy_id, title, description, required_stopped in PRUNE_POLICIES:
+            if policy_id not in (policy_ids or [policy_id]):
+                continue
+            size, targets = getattr(self, f"estimate_{policy_id}")()
+            results.append({
+                "id": policy_id,
+                "title": title,
+                "description": description,
+                "size": size,
+                "targets": targets,
+                "blocked": self.get_blocked_reason(policy_id, required_stopped, services),
+            })
+        return results
+    
+    def prune(self, policy_ids):
+        """执行清理策略（执行前重新检查服务状态），返回释放的空间（字节）"""
+        reclaimed = 0
+        for item in self.plan(policy_ids):
+            if item["blocked"]:
+                self.log(f"⏭️ 跳过 {item['title']}: {item['blocked']}")
+                continue
+            if not item["size"]:
+                self.log(f"✅ {item['title']}: 没有可清理的内容")
+                continue
+            self.log(f"🧹 {item['title']}（约 {format_size(item['size'])}）...")
+            if getattr(self, f"prune_{item['id']}")(item["targets"]):
+                reclaimed += item["size"]
+                self.log(f"✅ {item['title']}: 已释放 {format_size(item['size'])}")
+            else:
+                self.log(f"⚠️ {item['title']}: 部分内容未能删除")
+        return reclaimed
+    
+    def measure_paths(self, paths):
+        """路径的总大小（目录使用统计缓存）"""
+        return sum(self.scanner.measure(path)["size"] for path in paths)
+    
+    def remove_all(self, paths):
+        """删除所有路径，全部成功时返回True"""
+        return all([remove_path(path) for path in paths])
+    
+    def estimate_pip_cache(self):
+        targets = [path for path in self.get_pip_cache_dirs() if os.path.isdir(path)]
+        return self.measure_paths(targets), targets
+    
+    def prune_pip_cache(self, targets):
+        return self.remove_all(targets)
+    
+    def estimate_conda_pkgs(self):
+        try:
+            result = subprocess.run(['conda', 'clean', '--dry-run', '--json', '--tarballs', '--packages'],
+                                    capture_output=True, text=True)
+            report = json.loads(result.stdout) if result.returncode == 0 else {}
+        except Exception:
+            report = {}
+        size = sum((report.get(key) or {}).get("total_size", 0) for key in ("tarballs", "packages"))
+        return size, ["conda clean"] if size else []
+    
+    def prune_conda_pkgs(self, targets):
+        result = subprocess.run(['conda', 'clean', '-y', '--tarballs', '--packages', '--index-cache'],
+                                capture_output=True, text=True)
+        return result.returncode == 0
+    
+    def estimate_stale_archives(self):
+        snapshots = EnvSnapshotManager(self.project_status, log=self.log)
+        keep = set()
+        latest = {}
+        for item in snapshots.list_snapshots():
+            latest[item["env_name"]] = item["path"]
+        keep.update(os.path.abspath(path) for path in latest.values())
+        
+        targets = []
+        if os.path.isdir(snapshots.snapshot_dir):
+            for name in os.listdir(snapshots.snapshot_dir):
+                path = os.path.abspath(os.path.join(snapshots.snapshot_dir, name))
+                if (name.endswith(".tar.gz") or name.endswith(".part")) and path not in keep:
+                    targets.append(path)
+        # 只删除本配置环境恢复时留下的备份，其他环境的备份可能属于其他配置正在进行的恢复
+        env_name = self.project_status.get_status("conda_env")
+        if env_name:
+            prefixes = [os.path.join(envs_dir, env_name) for envs_dir in self.conda_info.get("envs_dirs", [])]
+            prefixes.append(find_conda_env_prefix(env_name, self.conda_info))
+            targets.extend(dict.fromkeys(os.path.abspath(f"{prefix}.rollback") for prefix in prefixes
+                                         if prefix and os.path.exists(f"{prefix}.rollback")))
+        return self.measure_paths(targets), targets
+    
+    def prune_stale_archives(self, targets):
+        removed = self.remove_all(targets)
+        snapshots = EnvSnapshotManager(self.project_status, log=self.log)
+        self.project_status.update_status(env_snapshots=snapshots.list_snapshots())
+        return removed
+    
+    def estimate_launch_leftovers(self):
+        targets = []
+        if self.project_path:
+            targets.append(os.path.join(self.project_path, "temp_launch.bat"))
+            log_dir = os.path.join(self.project_path, "logs")
+            if os.path.isdir(log_dir):
+                targets.extend(os.path.join(log_dir, name) for name in os.listdir(log_dir)
+                               if os.path.isfile(os.path.join(log_dir, name)))
+        targets = [path for path in targets if os.path.exists(path)]
+        return self.measure_paths(targets), targets
+    
+    def prune_launch_leftovers(self, targets):
+        return self.remove_all(targets)
+    
+    def estimate_mongodb_diagnostics(self):
+        data_path = self.project_status.get_mongodb_data_path()
+        targets = []
+        if data_path:
+            targets = [os.path.join(data_path, name) for name in ("diagnostic.data", "_tmp")
+                       if os.path.isdir(os.path.join(data_path, name))]
+        # 诊断数据文件原地追加，目录修改时间不一定变化，这里完整统计
+        return sum(self.scanner.measure(path, full=True)["size"] for path in targets), targets
+    
+    def prune_mongodb_diagnostics(self, targets):
+        return self.remove_all(targets)
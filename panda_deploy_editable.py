@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 快速可编辑安装
+不构建wheel，按子模块的元数据直接在 site-packages 写入 .pth 和 dist-info（与 pip install -e 的结果相同，
+pip list/uninstall 可以正常使用）。有C扩展、自定义构建命令、入口脚本、非setuptools构建后端、
+无法静态读取的元数据或缺少依赖的子模块留给pip安装。
+
+部署时由目标环境的解释器运行（只依赖标准库，会被复制到安装目录的 tools/ 下），最后一行输出 JSON:
+    python panda_deploy_editable.py [--no-deps] 子模块目录... → {installed, unchanged, fallback, elapsed}
+"""
+
+import argparse
+import ast
+import base64
+import hashlib
+import json
+import os
+import pathlib
+import re
+import shutil
+import sys
+import sysconfig
+import time
+from importlib import metadata
+
+try:
+    from packaging.requirements import Requirement
+except ImportError:
+    try:
+        from pip._vendor.packaging.requirements import Requirement
+    except ImportError:
+        Requirement = None
+
+# setup() 中需要执行构建的参数，使用这些参数的子模块留给pip安装
+BUILD_HOOKS = {"ext_modules", "cmdclass", "entry_points", "scripts", "setup_requires", "distclass", "libraries"}
+EXTENSION_SOURCES = (".pyx", ".pxd", ".c", ".cc", ".cpp")
+
+def normalize(name):
+    """规范化的包名（PEP 503）"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def read_setup_py(root):
+    """静态读取 setup.py 中的 setup() 参数，返回 (名称, 版本, 依赖, 包目录)"""
+    with open(os.path.join(root, "setup.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    calls = [node for node in ast.walk(tree) if isinstance(node, ast.Call)
+             and getattr(node.func, "id", getattr(node.func, "attr", None)) == "setup"]
+    if len(calls) != 1:
+        raise ValueError("setup.py 中没有唯一的 setup() 调用")
+    keywords = {keyword.arg: keyword.value for keyword in calls[0].keywords}
+    if None in keywords:
+        raise ValueError("setup() 使用了 **参数")
+    hooks = BUILD_HOOKS & set(keywords)
+    if hooks:
+        raise ValueError(f"setup() 使用了 {', '.join(sorted(hooks))}")
+    info = {}
+    for key in ("name", "version", "install_requires", "package_dir"):
+        if key in keywords:
+            try:
+                info[key] = ast.literal_eval(keywords[key])
+            except ValueError:
+                raise ValueError(f"setup() 的 {key} 不是常量")
+    if "name" not in info or "version" not in info:
+        raise ValueError("setup() 没有 name 或 version")
+    package_dir = (info.get("package_dir") or {}).get("", "")
+    return info["name"], str(info["version"]), list(info.get("install_requires", [])), package_dir
+
+def read_pyproject(root):
+    """读取 pyproject.toml 中的 [project]，没有时返回None"""
+    import tomllib
+    with open(os.path.join(root, "pyproject.toml"), "rb") as f:
+        data = tomllib.load(f)
+    backend = data.get("build-system", {}).get("build-backend", "setuptools.build_meta")
+    if not backend.startswith("setuptools"):
+        raise ValueError(f"构建后端为 {backend}")
+    project = data.get("project")
+    if not project:
+        return None
+    unusual = {"dynamic", "scripts", "gui-scripts", "entry-points"} & set(project)
+    setuptools_config = data.get("tool", {}).get("setuptools", {})
+    if unusual or "ext-modules" in setuptools_config:
+        raise ValueError(f"pyproject.toml 使用了 {', '.join(sorted(unusual) or ['ext-modules'])}")
+    package_dir = setuptools_config.get("package-dir", {}).get("", "")
+    packages = setuptools_config.get("packages")
+    if not package_dir and isinstance(packages, dict):
+        package_dir = (packages.get("find", {}).get("where") or [""])[0]
+    return project["name"], str(project["version"]), list(project.get("dependencies", [])), package_dir
+
+def read_project(root):
+    """子模块的元数据 (名称, 版本, 依赖, 包目录)，需要pip安装时抛出异常说明原因"""
+    if any(filename.endswith(EXTENSION_SOURCES) for dirpath, dirnames, filenames in os.walk(root)
+           if not any(part in (".git", "__pycache__", "build", "node_modules") for part in dirpath.split(os.sep))
+           for filename in filenames):
+        raise ValueError("包含需要编译的扩展源文件")
+    info = read_pyproject(root) if os.path.exists(os.path.join(root, "pyproject.toml")) else None
+    if os.path.exists(os.path.join(root, "setup.py")):
+        # 元数据在 pyproject.toml 中时也要检查 setup.py 中的构建命令
+        setup_info = read_setup_py(root)
+        info = info or setup_info
+    if info is None:
+        raise ValueError("没有可以读取的 setup.py 或 pyproject.toml")
+    return info
+
+def missing_requirements(requires, batch):
+    """环境中没有安装或版本不符的依赖（同一批安装的子模块除外）"""
+    missing = []
+    for line in requires:
+        if Requirement:
+            requirement = Requirement(line)
+            if requirement.marker and not requirement.marker.evaluate():
+                continue
+            name, specifier = requirement.name, requirement.specifier
+        else:
+            name, specifier = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)", line).group(1), None
+        if normalize(name) in batch:
+            continue
+        try:
+            version = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            missing.append(line)
+            continue
+        if specifier and not specifier.contains(version, prereleases=True):
+            missing.append(f"{line} (已安装 {version})")
+    return missing
+
+def record_line(path, data):
+    """dist-info/RECORD 中的一行"""
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+    return f"{path},sha256={digest},{len(data)}"
+
+def uninstall(site_packages, name):
+    """删除已安装的同名包（按 RECORD 删除文件）"""
+    for entry in os.listdir(site_packages):
+        if entry.endswith(".egg-link") and normalize(entry[:-len(".egg-link")]) == normalize(name):
+            raise ValueError("已通过 setup.py develop 安装")
+        if not entry.endswith(".dist-info") or normalize(entry.split("-")[0]) != normalize(name):
+            continue
+        dist_info = os.path.join(site_packages, entry)
+        record = os.path.join(dist_info, "RECORD")
+        if os.path.exists(record):
+            with open(record, encoding="utf-8") as f:
+                for line in f:
+                    path = os.path.normpath(os.path.join(site_packages, line.rsplit(",", 2)[0]))
+                    if path.startswith(sys.prefix + os.sep) and os.path.isfile(path):
+                        os.remove(path)
+        shutil.rmtree(dist_info, ignore_errors=True)
+
+def install(site_packages, root, name, version, requires, package_dir):
+    """写入 .pth 和 dist-info，已安装且内容相同时返回False"""
+    dist_name = re.sub(r"[-_.]+", "_", name)
+    dist_info = f"{dist_name}-{version}.dist-info"
+    text = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    text += "".join(f"Requires-Dist: {requirement}\n" for requirement in requires)
+    files = {
+        f"__editable__.{dist_name}-{version}.pth": os.path.normpath(os.path.join(root, package_dir)) + "\n",
+        f"{dist_info}/METADATA": text,
+        f"{dist_info}/INSTALLER": "panda-deploy\n",
+        f"{dist_info}/direct_url.json": json.dumps({"url": pathlib.Path(root).as_uri(), "dir_info": {"editable": True}}),
+    }
+    files = {path: content.encode("utf-8") for path, content in files.items()}
+    
+    def unchanged(path, data):
+        try:
+            with open(os.path.join(site_packages, path), "rb") as f:
+                return f.read() == data
+        except OSError:
+            return False
+    
+    if all(unchanged(path, data) for path, data in files.items()):
+        return False
+    uninstall(site_packages, name)
+    os.makedirs(os.path.join(site_packages, dist_info))
+    for path, data in files.items():
+        with open(os.path.join(site_packages, path), "wb") as f:
+            f.write(data)
+    lines = [record_line(path, data) for path, data in files.items()] + [f"{dist_info}/RECORD,,"]
+    with open(os.path.join(site_packages, dist_info, "RECORD"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return True
+
+def install_all(roots, check_deps=True, site_packages=None):
+    """登记所有子模块，返回 {installed, unchanged, fallback: {目录: 原因}, elapsed}"""
+    started = time.perf_counter()
+    site_packages = site_packages or sysconfig.get_paths()["purelib"]
+    projects = {}
+    fallback = {}
+    for root in roots:
+        try:
+            projects[root] = read_project(root)
+        except Exception as e:
+            fallback[root] = str(e)
+    batch = {normalize(info[0]) for info in projects.values()}
+    installed, unchanged = [], []
+    for root, (name, version, requires, package_dir) in projects.items():
+        try:
+            missing = missing_requirements(requires, batch) if check_deps else []
+            if missing:
+                fallback[root] = f"缺少依赖: {', '.join(missing)}"
+            elif install(site_packages, root, name, version, requires, package_dir):
+                installed.append(name)
+            else:
+                unchanged.append(name)
+        except Exception as e:
+            fallback[root] = str(e)
+    return {"installed": installed, "unchanged": unchanged, "fallback": fallback,
+            "elapsed": round(time.perf_counter() - started, 2)}
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="不构建wheel，以可编辑方式登记子模块")
+    parser.add_argument("--no-deps", action="store_true", help="不检查依赖")
+    parser.add_argument("roots", nargs="*", help="子模块目录")
+    args = parser.parse_args(argv)
+    stats = install_all([os.path.abspath(root) for root in args.roots], check_deps=not args.no_deps)
+    print(json.dumps(stats, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 环境指纹
+根据 conda-meta/*.json 和 site-packages 中 *.dist-info/RECORD 的哈希生成Conda环境的指纹，
+部署时保存，之后每次状态检查时比较，列出手动安装、升级或删除的包。
+文件哈希按 (修改时间, 大小) 缓存，环境没有变化时只需要列目录和 stat，不读取文件内容
+"""
+
+import glob
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+def site_packages_dirs(prefix):
+    """Conda环境中的 site-packages 目录"""
+    if os.name == 'nt':
+        candidates = [os.path.join(prefix, "Lib", "site-packages")]
+    else:
+        candidates = glob.glob(os.path.join(prefix, "lib", "python*", "site-packages"))
+    return sorted(path for path in candidates if os.path.isdir(path))
+
+def parse_conda_meta_name(filename):
+    """conda-meta 文件名（名称-版本-构建.json）拆分为 (名称, 版本-构建)"""
+    parts = filename[:-len(".json")].rsplit("-", 2)
+    if len(parts) != 3:
+        return None
+    return parts[0], f"{parts[1]}-{parts[2]}"
+
+def parse_dist_info_name(dirname):
+    """dist-info 目录名（名称-版本.dist-info）拆分为 (规范化名称, 版本)"""
+    parts = dirname[:-len(".dist-info")].split("-")
+    if len(parts) < 2:
+        return None
+    return parts[0].replace("_", "-").replace(".", "-").lower(), parts[1]
+
+class EnvFingerprinter:
+    """计算环境指纹，文件哈希按路径缓存: {路径: [修改时间, 大小, 哈希]}
+
+    cache_file 不为空时缓存保存到文件，命令行每次运行也能使用上次的结果
+    """
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self.cache = self.load_cache()
+        self.dirty = False
+    
+    def load_cache(self):
+        """加载哈希缓存"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_cache(self):
+        """保存哈希缓存（有变化时）"""
+        if not self.cache_file or not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file + ".part", 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f)
+            os.replace(self.cache_file + ".part", self.cache_file)
+            self.dirty = False
+        except OSError:
+            pass
+    
+    def hash_file(self, path, stat):
+        """文件内容的哈希（前12位），修改时间和大小没有变化时使用缓存"""
+        cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        value = digest.hexdigest()[:12]
+        self.cache[path] = [stat.st_mtime_ns, stat.st_size, value]
+        self.dirty = True
+        return value
+    
+    def scan(self, prefix):
+        """环境中的包: {"conda:名称" / "pip:名称": "版本 哈希"}"""
+        packages = {}
+        seen = set()
+        conda_meta = os.path.join(prefix, "conda-meta")
+        if os.path.isdir(conda_meta):
+            for entry in os.scandir(conda_meta):
+                parsed = parse_conda_meta_name(entry.name) if entry.name.endswith(".json") else None
+                if parsed:
+                    seen.add(entry.path)
+                    packages[f"conda:{parsed[0]}"] = f"{parsed[1]} {self.hash_file(entry.path, entry.stat())}"
+        for site_packages in site_packages_dirs(prefix):
+            for entry in os.scandir(site_packages):
+                parsed = parse_dist_info_name(entry.name) if entry.name.endswith(".dist-info") else None
+                record = os.path.join(entry.path, "RECORD")
+                if not parsed or not os.path.isfile(record):
+                    continue
+                seen.add(record)
+                packages[f"pip:{parsed[0]}"] = f"{parsed[1]} {self.hash_file(record, os.stat(record))}"
+        # 删除已不存在的文件的缓存（只删除本环境中的）
+        for path in [path for path in self.cache if path.startswith(prefix + os.sep) and path not in seen]:
+            del self.cache[path]
+            self.dirty = True
+        return packages
+    
+    def fingerprint(self, prefix):
+        """环境指纹: {prefix, digest, packages, created_at}"""
+        with self.lock:
+            packages = self.scan(prefix)
+            self.save_cache()
+        digest = hashlib.sha1(json.dumps(packages, sort_keys=True).encode("utf-8")).hexdigest()
+        return {
+            "prefix": prefix,
+            "digest": digest,
+            "packages": packages,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+# 每个缓存文件对应一个实例，图形界面反复检查时使用内存中的缓存
+_fingerprinters = {}
+_fingerprinters_lock = threading.Lock()
+
+def get_fingerprinter(cache_file):
+    """cache_file 对应的 EnvFingerprinter（同一进程中共用）"""
+    with _fingerprinters_lock:
+        if cache_file not in _fingerprinters:
+            _fingerprinters[cache_file] = EnvFingerprinter(cache_file)
+        return _fingerprinters[cache_file]
+
+def diff_fingerprints(old, new):
+    """比较两个指纹，返回 {added: {包: 版本}, removed: {包: 版本}, changed: {包: [旧版本, 新版本]}}
+
+    版本相同但文件变化的包（例如重新安装或手动修改）显示为 "版本*"
+    """
+    old_packages = old.get("packages", {})
+    new_packages = new.get("packages", {})
+    
+    def version(value):
+        return value.rsplit(" ", 1)[0]
+    
+    changed = {}
+    for key in sorted(set(old_packages) & set(new_packages)):
+        if old_packages[key] != new_packages[key]:
+            old_version, new_version = version(old_packages[key]), version(new_packages[key])
+            changed[key] = [old_version, new_version if new_version != old_version else f"{new_version}*"]
+    return {
+        "added": {key: version(new_packages[key]) for key in sorted(set(new_packages) - set(old_packages))},
+        "removed": {key: version(old_packages[key]) for key in sorted(set(old_packages) - set(new_packages))},
+        "changed": changed,
+    }
+
+def describe_env_drift(drift, limit=8):
+    """环境变化的简短说明，没有变化时返回空字符串"""
+    if not drift:
+        return ""
+    parts = [f"+{key} {value}" for key, value in drift.get("added", {}).items()]
+    parts += [f"-{key} {value}" for key, value in drift.get("removed", {}).items()]
+    parts += [f"{key} {old} → {new}" for key, (old, new) in drift.get("changed", {}).items()]
+    if len(parts) > limit:
+        parts = parts[:limit] + [f"等共 {len(parts)} 项"]
+    return "，".join(parts)
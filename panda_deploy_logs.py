@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 服务日志
+捕获服务的标准输出和错误输出，按大小轮转写入日志目录，同时增量建立倒排索引；
+搜索时只读取可能包含关键词的数据块，不需要把日志载入内存
+
+启动服务时作为独立脚本运行（只依赖标准库，会被复制到安装目录的 tools/ 下）:
+    python panda_deploy_logs.py capture --dir logs --name factor [--echo] -- python server.py
+"""
+
+import argparse
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+# 索引的最小单位：搜索时按块读取和匹配
+BLOCK_SIZE = 16 * 1024
+# 默认每个日志段 20 MB，每个服务保留 50 段
+MAX_MB = 20
+KEEP_SEGMENTS = 50
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+|[\u4e00-\u9fff]")
+# 数据块中有不索引的词时记录的标记（不会与索引词重复），搜索时这些数据块可能包含任意英文和数字的查询词
+UNINDEXED = "*"
+# 索引文件格式版本，旧版本的索引没有 UNINDEXED 标记
+INDEX_VERSION = 2
+SEGMENT_PATTERN = re.compile(r"^(\w+?)-(\d{6})\.log$")
+
+def tokenize(text):
+    """提取索引词：小写的单词和数字、单个汉字
+
+    长数字、含数字的长随机串（ID、哈希）和超过40个字符的词不索引，改为记录 UNINDEXED 标记
+    """
+    tokens = set()
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if len(token) < 2 and token.isascii():
+            continue
+        if (token.isdigit() and len(token) > 4) or len(token) > 40 or (
+                len(token) > 8 and any(char.isdigit() for char in token)):
+            tokens.add(UNINDEXED)
+            continue
+        tokens.add(token)
+    return tokens
+
+def list_segments(log_dir, name=None):
+    """日志段列表 [(服务名, 序号, 路径)]，按服务名和序号排序"""
+    segments = []
+    if not os.path.isdir(log_dir):
+        return segments
+    for file_name in os.listdir(log_dir):
+        match = SEGMENT_PATTERN.match(file_name)
+        if match and (name is None or match.group(1) == name):
+            segments.append((match.group(1), int(match.group(2)), os.path.join(log_dir, file_name)))
+    return sorted(segments)
+
+def index_path(segment_path):
+    """已完成的日志段的索引文件"""
+    return segment_path[:-len(".log")] + ".idx"
+
+def journal_path(segment_path):
+    """正在写入的日志段的索引日志（每行一个数据块，只追加）"""
+    return segment_path[:-len(".log")] + ".idx.jsonl"
+
+def write_index(segment_path, blocks, bitmaps):
+    """写入日志段的索引：数据块位置和 索引词 → 数据块位图（十六进制）"""
+    data = {"version": INDEX_VERSION, "blocks": blocks, "tokens": {token: format(bitmap, "x") for token, bitmap in bitmaps.items()}}
+    part_path = index_path(segment_path) + ".part"
+    with open(part_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(part_path, index_path(segment_path))
+
+def build_index(segment_path):
+    """为没有索引的日志段（例如捕获进程被强制结束）重新建立索引"""
+    blocks = []
+    bitmaps = {}
+    with open(segment_path, 'rb') as f:
+        offset = 0
+        while True:
+            data = f.read(BLOCK_SIZE)
+            if not data:
+                break
+            data += f.readline()  # 数据块在行尾结束
+            for token in tokenize(data.decode("utf-8", errors="replace")):
+                bitmaps[token] = bitmaps.get(token, 0) | (1 << len(blocks))
+            blocks.append([offset, len(data)])
+            offset += len(data)
+    write_index(segment_path, blocks, bitmaps)
+    if os.path.exists(journal_path(segment_path)):
+        os.remove(journal_path(segment_path))
+
+class RotatingLogWriter:
+    """按大小轮转的日志文件，写入时增量建立索引
+
+    每个日志段为 名称-000001.log。写满一个数据块（约16KB）时把块中的索引词追加到 .idx.jsonl；
+    日志段写满或关闭时整理为 .idx（索引词 → 数据块位图），并删除超出保留数量的旧日志段
+    """
+    def __init__(self, log_dir, name, max_bytes=MAX_MB * 1024 * 1024, keep=KEEP_SEGMENTS):
+        self.log_dir = log_dir
+        self.name = name
+        self.max_bytes = max_bytes
+        self.keep = keep
+        os.makedirs(log_dir, exist_ok=True)
+        
+        # 上次没有正常结束的日志段补建索引
+        segments = list_segments(log_dir, name)
+        for _, _, path in segments:
+            if not os.path.exists(index_path(path)):
+                build_index(path)
+        self.number = segments[-1][1] if segments else 0
+        self.file = None
+        self.open_segment()
+    
+    def open_segment(self):
+        """开始新的日志段"""
+        self.number += 1
+        self.path = os.path.join(self.log_dir, f"{self.name}-{self.number:06d}.log")
+        self.file = open(self.path, 'ab')
+        self.journal = open(journal_path(self.path), 'a', encoding='utf-8')
+        self.offset = 0
+        self.blocks = []
+        self.bitmaps = {}
+        self.block_start = 0
+        self.block_lines = []
+    
+    def write(self, text):
+        """写入一行（加上时间戳），数据块写满时更新索引，日志段写满时轮转"""
+        line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {text.rstrip()}\n"
+        data = line.encode("utf-8")
+        self.file.write(data)
+        self.file.flush()
+        self.offset += len(data)
+        # 索引写入文件的完整内容（包括时间戳），与 build_index 重建的索引一致
+        self.block_lines.append(line)
+        if self.offset - self.block_start >= BLOCK_SIZE:
+            self.flush_block()
+        if self.offset >= self.max_bytes:
+            self.rotate()
+    
+    def flush_block(self):
+        """把当前数据块的索引词追加到索引日志"""
+        if self.offset == self.block_start:
+            return
+        block = [self.block_start, self.offset - self.block_start]
+        tokens = tokenize("".join(self.block_lines))
+        bit = 1 << len(self.blocks)
+        for token in tokens:
+            self.bitmaps[token] = self.bitmaps.get(token, 0) | bit
+        self.blocks.append(block)
+        self.journal.write(json.dumps(block + [sorted(tokens)], ensure_ascii=False) + "\n")
+        self.journal.flush()
+        self.block_start = self.offset
+        self.block_lines = []
+    
+    def finish_segment(self):
+        """整理当前日志段的索引并关闭文件"""
+        self.flush_block()
+        self.file.close()
+        self.journal.close()
+        try:
+            write_index(self.path, self.blocks, self.bitmaps)
+            os.remove(journal_path(self.path))
+        except OSError:
+            pass  # Windows下文件正被搜索读取时无法替换，保留索引日志，下次启动时补建索引
+    
+    def rotate(self):
+        """开始新的日志段并删除旧的日志段"""
+        self.finish_segment()
+        self.open_segment()
+        for _, _, path in list_segments(self.log_dir, self.name)[:-self.keep]:
+            for old_path in (path, index_path(path), journal_path(path)):
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+    
+    def close(self):
+        self.finish_segment()
+
+class LogSearcher:
+    """在日志目录中搜索（不区分大小写的子串匹配）
+
+    查询中的每个词先在索引词表中查找包含它的索引词，合并它们的数据块位图，多个词取交集，
+    只读取交集中的数据块逐行确认；正在写入的日志段中还没有建立索引的末尾部分直接读取。
+    已完成日志段的索引按修改时间缓存在内存中，重复搜索时不再读取。
+    """
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.index_cache = {}
+        self.journal_cache = {}
+    
+    def load_index(self, segment_path):
+        """已完成日志段的索引: (数据块列表, 索引词 → 位图)"""
+        path = index_path(segment_path)
+        mtime = os.path.getmtime(path)
+        cached = self.index_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        bitmaps = {token: int(bitmap, 16) for token, bitmap in data["tokens"].items()}
+        if data.get("version") != INDEX_VERSION:
+            # 旧版本的索引不知道哪些数据块有不索引的词，全部作为候选
+            bitmaps[UNINDEXED] = (1 << len(data["blocks"])) - 1
+        index = (data["blocks"], bitmaps)
+        self.index_cache[path] = (mtime, index)
+        return index
+    
+    def load_journal(self, segment_path):
+        """正在写入的日志段的索引，只读取上次之后追加的部分"""
+        path = journal_path(segment_path)
+        position, blocks, bitmaps = self.journal_cache.get(path, (0, [], {}))
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # 正在写入的行
+                    position += len(line)
+                    offset, length, tokens = json.loads(line)
+                    for token in tokens:
+                        bitmaps[token] = bitmaps.get(token, 0) | (1 << len(blocks))
+                    blocks.append([offset, length])
+        self.journal_cache[path] = (position, blocks, bitmaps)
+        return blocks, bitmaps
+    
+    def match_blocks(self, terms, bitmaps, block_count):
+        """可能包含所有查询词的数据块序号
+
+        英文和数字的查询词可能是不索引的长词（ID、哈希）的一部分，有 UNINDEXED 标记的数据块也作为候选
+        """
+        if not terms:
+            return list(range(block_count))
+        result = None
+        for term in terms:
+            mask = bitmaps.get(term, 0)
+            if term.isascii():
+                mask |= bitmaps.get(UNINDEXED, 0)
+            for token, bitmap in bitmaps.items():
+                if term in token:
+                    mask |= bitmap
+            result = mask if result is None else result & mask
+            if not result:
+                return []
+        return [index for index in range(block_count) if result >> index & 1]
+    
+    def search(self, query, services=None, limit=200):
+        """返回 {matches: [(服务名, 行)], elapsed, blocks_read, bytes_read, segments}，匹配行按时间从新到旧"""
+        started = time.perf_counter()
+        needle = query.lower().encode("utf-8")
+        terms = tokenize(query) - {UNINDEXED}  # 不索引的长词不能用来筛选数据块
+        matches = []
+        blocks_read = 0
+        bytes_read = 0
+        segments = [segment for segment in list_segments(self.log_dir)
+                    if not services or segment[0] in services]
+        # 从最新的日志段开始搜索，找到足够的结果即停止
+        segments.sort(key=lambda segment: os.path.getmtime(segment[2]), reverse=True)
+        
+        for name, _, path in segments:
+            if len(matches) >= limit:
+                break
+            ranges = []
+            try:
+                if os.path.exists(index_path(path)):
+                    blocks, bitmaps = self.load_index(path)
+                else:
+                    blocks, bitmaps = self.load_journal(path)
+                    indexed_end = blocks[-1][0] + blocks[-1][1] if blocks else 0
+                    ranges.append([indexed_end, os.path.getsize(path) - indexed_end])
+                ranges += [blocks[index] for index in reversed(self.match_blocks(terms, bitmaps, len(blocks)))]
+                
+                with open(path, 'rb') as f:
+                    for offset, length in ranges:
+                        if len(matches) >= limit or length <= 0:
+                            continue
+                        f.seek(offset)
+                        data = f.read(length)
+                        blocks_read += 1
+                        bytes_read += len(data)
+                        if needle not in data.lower():
+                            continue
+                        for line in reversed(data.splitlines()):
+                            if needle in line.lower():
+                                matches.append((name, line.decode("utf-8", errors="replace")))
+                                if len(matches) >= limit:
+                                    break
+            except (OSError, ValueError):
+                continue  # 日志段正在轮转或已被删除
+        
+        return {
+            "matches": matches,
+            "elapsed": time.perf_counter() - started,
+            "blocks_read": blocks_read,
+            "bytes_read": bytes_read,
+            "segments": len(segments),
+        }
+
+def stop_request_path(log_dir, name):
+    """请求停止服务的标记文件：捕获进程发现该文件后让服务正常退出"""
+    return os.path.join(log_dir, f"{name}.stop")
+
+def capture_command(script_path, log_dir, name, python=None, max_mb=MAX_MB, keep=KEEP_SEGMENTS, echo=False,
+                    stop_file=None):
+    """启动服务时放在服务命令之前的捕获命令（参数列表）"""
+    command = [python or sys.executable, script_path, "capture", "--dir", log_dir, "--name", name,
+               "--max-mb", str(max_mb), "--keep", str(keep)]
+    if echo:
+        command.append("--echo")
+    if stop_file:
+        command += ["--stop-file", stop_file]
+    return command + ["--"]
+
+def watch_stop_request(process, stop_file, requested, interval=0.5):
+    """等待停止标记文件出现，然后请求服务退出（Windows下发送 CTRL_BREAK_EVENT，其他平台发送SIGTERM）
+
+    Windows下 taskkill 不带 /f 只会向有窗口的程序发送关闭消息，控制台程序收不到，因此由同一控制台中的捕获进程发送
+    """
+    while process.poll() is None:
+        if os.path.exists(stop_file):
+            requested.set()
+            try:
+                os.remove(stop_file)
+            except OSError:
+                pass
+            process.send_signal(signal.CTRL_BREAK_EVENT if os.name == 'nt' else signal.SIGTERM)
+            return
+        time.sleep(interval)
+
+def capture(log_dir, name, command, max_mb=MAX_MB, keep=KEEP_SEGMENTS, echo=False, stop_file=None):
+    """启动服务并把输出写入轮转日志，返回服务的退出码（按停止标记正常停止时返回0）"""
+    writer = RotatingLogWriter(log_dir, name, max_bytes=max_mb * 1024 * 1024, keep=keep)
+    env = os.environ.copy()
+    env["PYTHONUNBUFFERED"] = "1"  # Python服务立即输出，不在缓冲区中积压
+    env.setdefault("PYTHONIOENCODING", "utf-8")
+    if stop_file and os.path.exists(stop_file):
+        os.remove(stop_file)  # 上次停止时留下的标记
+    try:
+        # Windows下服务在单独的进程组中运行才能单独收到 CTRL_BREAK_EVENT
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, env=env,
+                                   creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == 'nt' else 0)
+    except OSError as e:
+        writer.write(f"无法启动服务: {e}")
+        writer.close()
+        return 1
+    
+    requested = threading.Event()
+    if stop_file:
+        threading.Thread(target=watch_stop_request, args=(process, stop_file, requested), daemon=True).start()
+    # 停止服务时整个进程组都会收到SIGTERM：继续读取输出，直到服务退出
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    try:
+        for line in iter(process.stdout.readline, b""):
+            text = line.decode("utf-8", errors="replace")
+            writer.write(text)
+            if echo:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        # Windows下服务在单独的进程组中，收不到控制台窗口中的 Ctrl+C，由捕获进程转发
+        if os.name == 'nt':
+            process.send_signal(signal.CTRL_BREAK_EVENT)
+    finally:
+        writer.close()
+    code = process.wait()
+    return 0 if requested.is_set() else code
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="捕获服务输出到轮转日志并建立索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    capture_parser = subparsers.add_parser("capture", help="启动服务并捕获输出")
+    capture_parser.add_argument("--dir", required=True, help="日志目录")
+    capture_parser.add_argument("--name", required=True, help="服务名称（日志文件名前缀）")
+    capture_parser.add_argument("--max-mb", type=int, default=MAX_MB, help="每个日志段的大小（MB）")
+    capture_parser.add_argument("--keep", type=int, default=KEEP_SEGMENTS, help="保留的日志段数量")
+    capture_parser.add_argument("--echo", action="store_true", help="同时输出到控制台")
+    capture_parser.add_argument("--stop-file", help="出现该文件时让服务正常退出")
+    capture_parser.add_argument("service", nargs=argparse.REMAINDER, help="-- 之后为服务的启动命令")
+    args = parser.parse_args(argv)
+    
+    service = args.service[1:] if args.service[:1] == ["--"] else args.service
+    if not service:
+        parser.error("缺少服务的启动命令")
+    return capture(args.dir, args.name, service, max_mb=args.max_mb, keep=args.keep, echo=args.echo,
+                   stop_file=args.stop_file)
+
+if __name__ == "__main__":
+    sys.exit(main())
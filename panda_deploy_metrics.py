@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 监控指标
+在本机端口以Prometheus文本格式提供工具和服务的指标：检查耗时、服务状态、重启次数、部署步骤耗时、
+距上次更新检查的时间，以及MongoDB和两个服务器的CPU和内存（Linux读取 /proc，Windows通过Win32 API读取）。
+指标由后台线程定期采集，HTTP请求只格式化最近一次的结果，不会阻塞图形界面
+"""
+
+import ctypes
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from panda_deploy_core import ServiceSupervisor, log_to_stdout, probe_port, probe_url
+
+# 指标说明: 名称 -> (类型, 说明)
+METRICS = {
+    "panda_tool_info": ("gauge", "工具当前使用的配置和Conda环境"),
+    "panda_service_up": ("gauge", "服务是否正常（1正常，0未启动或响应异常）"),
+    "panda_probe_duration_seconds": ("gauge", "最近一次服务检查的耗时"),
+    "panda_service_restarts_total": ("counter", "采集期间观察到的服务重新启动次数"),
+    "panda_service_cpu_seconds_total": ("counter", "服务进程组累计使用的CPU时间"),
+    "panda_service_memory_rss_bytes": ("gauge", "服务进程组的常驻内存"),
+    "panda_service_processes": ("gauge", "服务进程组中的进程数量"),
+    "panda_deploy_step_duration_seconds": ("gauge", "上次执行部署步骤的耗时"),
+    "panda_deploy_step_attempts": ("gauge", "上次执行部署步骤时命令的尝试次数"),
+    "panda_deploy_step_success": ("gauge", "上次执行部署步骤是否成功（完成或跳过为1）"),
+    "panda_update_check_age_seconds": ("gauge", "距上次检查远程更新的时间"),
+    "panda_data_hub_last_run_duration_seconds": ("gauge", "数据更新任务上次执行的耗时"),
+    "panda_data_hub_last_run_rows": ("gauge", "数据更新任务上次处理的数据条数"),
+    "panda_data_hub_last_run_success": ("gauge", "数据更新任务上次执行是否成功"),
+    "panda_metrics_sample_duration_seconds": ("gauge", "最近一次采集指标的耗时"),
+    "panda_metrics_last_sample_timestamp_seconds": ("gauge", "最近一次采集指标的时间"),
+}
+
+SERVICES = ("mongodb", "factor", "quantflow")
+
+def escape_label(value):
+    """Prometheus标签值转义"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value):
+    """指标值：整数原样输出（内存字节数不使用科学计数法），其他保留浮点数"""
+    if isinstance(value, bool) or isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def format_metrics(samples):
+    """[(名称, {标签}, 值)] 转换为Prometheus文本格式，同名指标放在一起并带有 HELP/TYPE"""
+    grouped = {}
+    for name, labels, value in samples:
+        grouped.setdefault(name, []).append((labels, value))
+    lines = []
+    for name, items in grouped.items():
+        metric_type, help_text = METRICS.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in items:
+            label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+            lines.append(f"{name}{{{label_text}}} {format_value(value)}" if label_text else f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+def parse_timestamp(value):
+    """状态文件中的时间（%Y-%m-%d %H:%M:%S）转换为时间戳，格式错误时返回None"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def read_process_groups(pgids):
+    """读取 /proc 中属于指定进程组的进程，返回 {进程组: {cpu, rss, processes}}（只支持Linux）"""
+    if not pgids or not os.path.isdir("/proc"):
+        return {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    groups = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(os.path.join(entry.path, "stat"), "rb") as f:
+                stat = f.read().decode("utf-8", errors="replace")
+        except OSError:
+            continue
+        # 进程名可能包含空格和括号，从最后一个右括号之后开始按空格拆分
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) < 22 or int(fields[2]) not in pgids:
+            continue
+        group = groups.setdefault(int(fields[2]), {"cpu": 0.0, "rss": 0, "processes": 0})
+        group["cpu"] += (int(fields[11]) + int(fields[12])) / ticks
+        group["rss"] += int(fields[21]) * page_size
+        group["processes"] += 1
+    return groups
+
+def read_process_trees(roots):
+    """Windows: 读取指定进程及其所有子进程（服务窗口、日志捕获进程和服务本身），返回 {进程号: {cpu, rss, processes}}
+
+    用 Toolhelp32 快照找出子进程，GetProcessTimes 和 K32GetProcessMemoryInfo 读取CPU时间和工作集；
+    父进程号可能被已退出的进程复用，因此只计入晚于父进程创建的子进程
+    """
+    if not roots or os.name != 'nt':
+        return {}
+    from ctypes import wintypes
+    
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [("dwSize", wintypes.DWORD), ("cntUsage", wintypes.DWORD), ("th32ProcessID", wintypes.DWORD),
+                    ("th32DefaultHeapID", ctypes.c_size_t), ("th32ModuleID", wintypes.DWORD),
+                    ("cntThreads", wintypes.DWORD), ("th32ParentProcessID", wintypes.DWORD),
+                    ("pcPriClassBase", ctypes.c_long), ("dwFlags", wintypes.DWORD),
+                    ("szExeFile", ctypes.c_wchar * 260)]
+    
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in ("PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                                                 "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                                                 "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+    
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    
+    children = {}
+    snapshot = kernel32.CreateToolhelp32Snapshot(0x2, 0)  # TH32CS_SNAPPROCESS
+    if snapshot in (None, wintypes.HANDLE(-1).value):
+        return {}
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(entry)
+        more = kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while more:
+            children.setdefault(entry.th32ParentProcessID, []).append(entry.th32ProcessID)
+            more = kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+    
+    def process_info(pid):
+        """(创建时间, CPU秒数, 工作集字节数)，进程已退出或无权访问时返回None"""
+        handle = kernel32.OpenProcess(0x1000 | 0x0010, False, pid)  # QUERY_LIMITED_INFORMATION | VM_READ
+        if not handle:
+            return None
+        try:
+            created, exited, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+            if not kernel32.GetProcessTimes(handle, ctypes.byref(created), ctypes.byref(exited),
+                                            ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            rss = counters.WorkingSetSize if kernel32.K32GetProcessMemoryInfo(
+                handle, ctypes.byref(counters), counters.cb) else 0
+            # FILETIME 的单位是100纳秒
+            return created.value, (kernel.value + user.value) / 1e7, rss
+        finally:
+            kernel32.CloseHandle(handle)
+    
+    trees = {}
+    for root in roots:
+        info = process_info(root)
+        if info is None:
+            continue
+        tree = {"cpu": info[1], "rss": info[2], "processes": 1}
+        pending = [(root, info[0])]
+        while pending:
+            parent, parent_created = pending.pop()
+            for pid in children.get(parent, []):
+                info = process_info(pid)
+                if info is None or info[0] < parent_created:
+                    continue
+                tree["cpu"] += info[1]
+                tree["rss"] += info[2]
+                tree["processes"] += 1
+                pending.append((pid, info[0]))
+        trees[root] = tree
+    return trees
+
+class MetricsCollector:
+    """每 interval 秒在后台采集一次指标，保存最近一次的结果供HTTP请求使用
+
+    服务检查（3个本机请求）和读取进程资源都在采集线程中进行，图形界面线程和HTTP线程不参与
+    """
+    def __init__(self, project_status, interval=15, log=None):
+        self.project_status = project_status
+        self.interval = interval
+        self.log = log or log_to_stdout
+        self.lock = threading.Lock()
+        self.samples = []
+        self.restarts = {name: 0 for name in SERVICES}
+        self.last_seen = {}  # 服务 -> (是否正常, 进程号)
+        self.sampled = threading.Event()  # 第一次采集完成后设置
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        """启动后台采集线程"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """停止后台采集"""
+        self.stop_event.set()
+    
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                self.log(f"⚠️ 采集监控指标失败: {str(e)}")
+            self.stop_event.wait(self.interval)
+    
+    def render(self, timeout=10):
+        """最近一次采集结果的Prometheus文本，第一次采集还没有完成时最多等待 timeout 秒，仍没有结果时返回空文本
+
+        HTTP线程不自己采集，重启次数等状态只由采集线程修改
+        """
+        self.sampled.wait(timeout)
+        with self.lock:
+            samples = self.samples
+        return format_metrics(samples) if samples else ""
+    
+    def read_pids(self):
+        """本工具启动的服务进程号（记录在 service_pids.json，已被其他进程复用的不计入）"""
+        pids = ServiceSupervisor.load_pids(self.project_status.get_status("project_path"))
+        return {name: record["pid"] for name, record in pids.items() if not ServiceSupervisor.pid_reused(record)}
+    
+    def sample(self):
+        """采集一次所有指标并保存，返回 [(名称, {标签}, 值)]"""
+        started = time.perf_counter()
+        now = time.time()
+        status = self.project_status
+        ports = status.get_ports()
+        samples = [("panda_tool_info", {"profile": status.get_status("profile_name") or "default",
+                                        "conda_env": status.get_status("conda_env")}, 1)]
+        
+        pids = self.read_pids()
+        for name in SERVICES:
+            probe_started = time.perf_counter()
+            if name == "mongodb":
+                up = probe_port(ports["mongodb"])
+            else:
+                up = probe_url(f"http://localhost:{ports[name]}")[0] == "ok"
+            samples.append(("panda_probe_duration_seconds", {"service": name},
+                            round(time.perf_counter() - probe_started, 4)))
+            samples.append(("panda_service_up", {"service": name}, 1 if up else 0))
+            # 服务从停止变为正常、或进程号变化时记为一次重新启动（工具启动时已在运行的不计入）
+            previous = self.last_seen.get(name)
+            if up and previous and (not previous[0] or (previous[1] and pids.get(name) != previous[1])):
+                self.restarts[name] += 1
+            self.last_seen[name] = (up, pids.get(name))
+            samples.append(("panda_service_restarts_total", {"service": name}, self.restarts[name]))
+        
+        # 其他平台的服务在独立进程组中运行，Windows下统计记录的进程（服务窗口）及其子进程
+        read_resources = read_process_trees if os.name == 'nt' else read_process_groups
+        groups = read_resources(set(pids.values()))
+        for name, pid in pids.items():
+            if pid in groups:
+                samples.append(("panda_service_cpu_seconds_total", {"service": name}, round(groups[pid]["cpu"], 2)))
+                samples.append(("panda_service_memory_rss_bytes", {"service": name}, groups[pid]["rss"]))
+                samples.append(("panda_service_processes", {"service": name}, groups[pid]["processes"]))
+        
+        for step_id, telemetry in (status.get_status("step_telemetry") or {}).items():
+            labels = {"step": step_id}
+            samples.append(("panda_deploy_step_duration_seconds", labels, telemetry.get("duration", 0)))
+            samples.append(("panda_deploy_step_attempts", labels, telemetry.get("attempts", 0)))
+            samples.append(("panda_deploy_step_success", labels,
+                            1 if telemetry.get("result") in ("completed", "skipped") else 0))
+        
+        checked = parse_timestamp(status.get_status("last_update_check")) or parse_timestamp(status.get_status("last_update"))
+        if checked:
+            samples.append(("panda_update_check_age_seconds", {}, round(now - checked, 1)))
+        
+        last_runs = {}
+        for run in status.get_status("data_hub_runs") or []:
+            last_runs[run["job"]] = run
+        for job_id, run in last_runs.items():
+            labels = {"job": job_id}
+            samples.append(("panda_data_hub_last_run_duration_seconds", labels, run.get("duration", 0)))
+            if run.get("rows") is not None:
+                samples.append(("panda_data_hub_last_run_rows", labels, run["rows"]))
+            samples.append(("panda_data_hub_last_run_success", labels, 1 if run.get("result") == "ok" else 0))
+        
+        samples.append(("panda_metrics_sample_duration_seconds", {}, round(time.perf_counter() - started, 4)))
+        samples.append(("panda_metrics_last_sample_timestamp_seconds", {}, round(now, 3)))
+        with self.lock:
+            self.samples = samples
+        self.sampled.set()
+        return samples
+
+class MetricsServer:
+    """在后台线程中提供 /metrics，只监听本机地址"""
+    def __init__(self, collector, port, host="127.0.0.1"):
+        self.collector = collector
+        self.port = port
+        self.host = host
+        self.server = None
+        self.thread = None
+    
+    def start(self):
+        """启动HTTP服务和指标采集，端口被占用时抛出 OSError"""
+        collector = self.collector
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = collector.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        collector.start()
+    
+    def stop(self):
+        """停止HTTP服务和指标采集"""
+        self.collector.stop()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - MongoDB维护
+通过MongoDB自带的shell执行管理命令，以及数据目录的增量快照（按内容哈希去重，只复制变化的文件）
+"""
+
+import glob
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from panda_deploy_archive import compress_file, extract_file
+from panda_deploy_core import DeployError, exe_name, file_sha256, log_to_stdout, probe_port
+
+# 快照中不包含的文件：进程锁和可以重新生成的诊断数据
+SNAPSHOT_EXCLUDES = {"mongod.lock", "diagnostic.data", "_tmp"}
+
+class MongoShell:
+    """用 mongosh（或旧版 mongo）连接本配置启动的MongoDB，工具环境中不需要安装pymongo
+
+    用户名和密码从PandaFactor的 config.yaml 中读取（MONGO_USER / MONGO_PASSWORD / MONGO_AUTH_DB），
+    在脚本开头用 db.auth 登录，脚本写入只有当前用户可读的临时文件，密码不会出现在命令行（进程列表）中
+    """
+    def __init__(self, project_status):
+        self.project_status = project_status
+        self._credentials = None
+    
+    @property
+    def port(self):
+        return self.project_status.get_ports()["mongodb"]
+    
+    def find_shell(self):
+        """MongoDB安装目录下的shell，找不到时返回None"""
+        bin_path = os.path.join(self.project_status.get_status("mongodb_path"), "bin")
+        for name in ("mongosh", "mongo"):
+            path = os.path.join(bin_path, exe_name(name))
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def load_credentials(self):
+        """读取PandaFactor配置中的MongoDB用户，返回 {MONGO_USER, MONGO_PASSWORD, MONGO_AUTH_DB, MONGO_DB}"""
+        if self._credentials is not None:
+            return self._credentials
+        credentials = {}
+        factor_path = os.path.join(self.project_status.get_status("project_path"), "panda_factor")
+        paths = glob.glob(os.path.join(factor_path, "panda_common", "**", "config.yaml"), recursive=True)
+        if paths:
+            with open(paths[0], 'r', encoding='utf-8') as f:
+                for line in f:
+                    match = re.match(r"\s*(MONGO_\w+)\s*:\s*['\"]?([^'\"#\n]*)['\"]?", line)
+                    if match:
+                        credentials[match.group(1)] = match.group(2).strip()
+        self._credentials = credentials
+        return credentials
+    
+    @property
+    def database(self):
+        return self.load_credentials().get("MONGO_DB") or "panda"
+    
+    def command(self, script_path):
+        """执行脚本文件的 mongosh 命令行"""
+        shell = self.find_shell()
+        if not shell:
+            raise DeployError("未找到 mongosh 或 mongo，请检查MongoDB安装目录")
+        return [shell, "--quiet", "--host", "127.0.0.1", "--port", str(self.port), script_path]
+    
+    def login_script(self):
+        """用配置中的用户登录的脚本（JSON编码的字符串也是合法的JS字符串），没有配置用户时为空"""
+        credentials = self.load_credentials()
+        if not credentials.get("MONGO_USER"):
+            return ""
+        auth_db = json.dumps(credentials.get("MONGO_AUTH_DB") or "admin")
+        user, password = json.dumps(credentials["MONGO_USER"]), json.dumps(credentials.get("MONGO_PASSWORD", ""))
+        return f"db.getSiblingDB({auth_db}).auth({user}, {password});\n"
+    
+    def run(self, script, timeout=120):
+        """在登录后执行脚本，返回 subprocess.CompletedProcess，超时抛出 subprocess.TimeoutExpired"""
+        # mkstemp 创建的文件只有当前用户可读写
+        fd, script_path = tempfile.mkstemp(prefix="panda_mongo_", suffix=".js")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.login_script() + script + "\n")
+            return subprocess.run(self.command(script_path), capture_output=True, text=True, encoding='utf-8',
+                                  errors='replace', timeout=timeout)
+        finally:
+            os.remove(script_path)
+    
+    def eval(self, script, timeout=120):
+        """执行脚本，脚本最后用 print(JSON.stringify(...)) 输出结果，返回解析后的JSON"""
+        try:
+            result = self.run(script, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise DeployError(f"MongoDB命令超时（{timeout}秒）")
+        lines = [line for line in result.stdout.splitlines() if line.strip()]
+        if result.returncode != 0 or not lines:
+            raise DeployError(f"MongoDB命令失败: {(result.stderr or result.stdout).strip()[-500:]}")
+        try:
+            return json.loads(lines[-1])
+        except ValueError:
+            raise DeployError(f"无法解析MongoDB输出: {lines[-1][:200]}")
+    
+    def shutdown(self, timeout=60):
+        """用 shutdown 命令正常关闭MongoDB（写完检查点后退出），返回端口是否在超时前关闭
+
+        关闭时连接会被服务器断开，shell 的退出码和输出都不能说明结果，因此只检查端口；
+        单节点副本集没有可以接替的从节点，需要 force
+        """
+        deadline = time.time() + timeout
+        try:
+            self.run("db.adminCommand({shutdown: 1, force: true})", timeout=timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        while probe_port(self.port, timeout=0.2):
+            if time.time() > deadline:
+                return False
+            time.sleep(0.2)
+        return True
+
+class MongoSnapshotManager:
+    """MongoDB数据目录的增量快照
+
+    快照库中每个文件按SHA256保存为一个压缩对象，每个快照是一份清单（相对路径 → 大小、修改时间、哈希）。
+    大小和修改时间都没变的文件直接沿用上次的哈希，内容没变的文件不再复制；
+    恢复时只重写内容不同的文件，并把修改时间恢复为快照时的值，下次比较时同样不需要重新计算哈希。
+    MongoDB运行中时先执行 fsyncLock 暂停写入，完成后解锁；恢复必须在MongoDB停止后进行。
+    """
+    def __init__(self, project_status, log=log_to_stdout):
+        self.project_status = project_status
+        self.log = log
+        self.shell = MongoShell(project_status)
+    
+    @property
+    def store_dir(self):
+        store_dir = self.project_status.get_status("mongodb_snapshot_dir")
+        return store_dir or os.path.join(self.project_status.get_status("project_path"), "snapshots", "mongodb")
+    
+    @property
+    def data_path(self):
+        return self.project_status.get_mongodb_data_path()
+    
+    def object_path(self, sha256):
+        return os.path.join(self.store_dir, "objects", sha256[:2], f"{sha256}.gz")
+    
+    def manifest_path(self, snapshot_id):
+        return os.path.join(self.store_dir, "manifests", f"{snapshot_id}.json")
+    
+    def list_snapshots(self):
+        """已有的快照清单，最新的在最后"""
+        manifest_dir = os.path.join(self.store_dir, "manifests")
+        if not os.path.isdir(manifest_dir):
+            return []
+        snapshots = []
+        for name in os.listdir(manifest_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(manifest_dir, name), 'r', encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        # 同一秒内创建的快照ID带有 -2、-3 后缀
+        return sorted(snapshots, key=lambda item: (item["created_at"], len(item["id"]), item["id"]))
+    
+    def find_snapshot(self, selector=None):
+        """按ID、序号（从1开始）或 latest 查找快照，默认为最新的快照"""
+        snapshots = self.list_snapshots()
+        if not snapshots:
+            raise DeployError("没有MongoDB数据快照")
+        if not selector or selector == "latest":
+            return snapshots[-1]
+        if selector.isdigit() and 0 < int(selector) <= len(snapshots):
+            return snapshots[int(selector) - 1]
+        for snapshot in snapshots:
+            if snapshot["id"] == selector:
+                return snapshot
+        raise DeployError(f"快照不存在: {selector}")
+    
+    def list_data_files(self):
+        """数据目录中的文件: 相对路径 → (大小, 修改时间)"""
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(self.data_path):
+            if dirpath == self.data_path:
+                dirnames[:] = [name for name in dirnames if name not in SNAPSHOT_EXCLUDES]
+            for name in filenames:
+                if dirpath == self.data_path and name in SNAPSHOT_EXCLUDES:
+                    continue
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                relpath = os.path.relpath(path, self.data_path).replace(os.sep, "/")
+                files[relpath] = (stat.st_size, stat.st_mtime_ns)
+        return files
+    
+    def known_hashes(self):
+        """所有快照中记录的 (相对路径, 大小, 修改时间) → 哈希"""
+        known = {}
+        for snapshot in self.list_snapshots():
+            for relpath, (size, mtime_ns, sha256) in snapshot["files"].items():
+                known[(relpath, size, mtime_ns)] = sha256
+        return known
+    
+    def hash_files(self, files, known):
+        """计算文件哈希，大小和修改时间与快照记录相同的文件直接使用记录的哈希"""
+        hashes = {}
+        pending = []
+        for relpath, (size, mtime_ns) in files.items():
+            sha256 = known.get((relpath, size, mtime_ns))
+            if sha256:
+                hashes[relpath] = sha256
+            else:
+                pending.append(relpath)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            paths = [os.path.join(self.data_path, relpath) for relpath in pending]
+            for relpath, sha256 in zip(pending, executor.map(file_sha256, paths)):
+                hashes[relpath] = sha256
+        return hashes, len(pending)
+    
+    def create(self, label="", prune=True):
+        """创建快照，返回快照清单；MongoDB运行中时在 fsyncLock 期间复制"""
+        if not os.path.isdir(self.data_path or ""):
+            raise DeployError(f"MongoDB数据目录不存在: {self.data_path}")
+        locked = False
+        if probe_port(self.shell.port):
+            self.log("🔒 MongoDB正在运行，暂停写入 (fsyncLock)...")
+            self.shell.eval("print(JSON.stringify(db.fsyncLock()))")
+            locked = True
+        try:
+            snapshot = self._create(label, locked)
+        finally:
+            if locked:
+                self.shell.eval("print(JSON.stringify(db.fsyncUnlock()))")
+                self.log("🔓 已恢复写入 (fsyncUnlock)")
+        if prune:
+            self.prune()
+        return snapshot
+    
+    def _create(self, label, locked):
+        started = time.time()
+        files = self.list_data_files()
+        hashes, hashed = self.hash_files(files, self.known_hashes())
+        
+        copied_bytes = 0
+        stored_bytes = 0
+        for relpath, sha256 in hashes.items():
+            target = self.object_path(sha256)
+            if os.path.exists(target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            stored_bytes += compress_file(os.path.join(self.data_path, relpath), target, level=3)
+            copied_bytes += files[relpath][0]
+        
+        created_at = datetime.now()
+        snapshot_id = created_at.strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while os.path.exists(self.manifest_path(snapshot_id)):
+            suffix += 1
+            snapshot_id = f"{created_at.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+        snapshot = {
+            "id": snapshot_id,
+            "label": label,
+            "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "data_path": self.data_path,
+            "fsync_locked": locked,
+            "total_size": sum(size for size, _ in files.values()),
+            "copied_size": copied_bytes,
+            "stored_size": stored_bytes,
+            "files": {relpath: [files[relpath][0], files[relpath][1], sha256] for relpath, sha256 in hashes.items()},
+        }
+        manifest_path = self.manifest_path(snapshot["id"])
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path + ".part", 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(manifest_path + ".part", manifest_path)
+        
+        self.log(f"✅ MongoDB数据快照 {snapshot['id']}: {len(files)} 个文件 {snapshot['total_size'] / 1024 / 1024:.1f} MB，"
+                 f"计算哈希 {hashed} 个，新复制 {copied_bytes / 1024 / 1024:.1f} MB "
+                 f"(压缩后 {stored_bytes / 1024 / 1024:.1f} MB)，用时 {time.time() - started:.1f} 秒")
+        return snapshot
+    
+    def restore(self, selector=None, backup=True):
+        """把数据目录恢复到快照的状态（只重写内容不同的文件），返回快照清单"""
+        snapshot = self.find_snapshot(selector)
+        if probe_port(self.shell.port):
+            raise DeployError("MongoDB正在运行，请先停止服务再恢复数据")
+        missing = [sha256 for _, _, sha256 in snapshot["files"].values() if not os.path.exists(self.object_path(sha256))]
+        if missing:
+            raise DeployError(f"快照库缺少 {len(missing)} 个文件，无法恢复 {snapshot['id']}")
+        
+        os.makedirs(self.data_path, exist_ok=True)
+        if backup and self.list_data_files():
+            # 增量快照很快，恢复前先保存当前数据，误操作时可以再恢复回来
+            self.log("📸 恢复前备份当前数据...")
+            self.create(label="恢复前自动备份", prune=False)
+        
+        started = time.time()
+        files = self.list_data_files()
+        hashes, _ = self.hash_files(files, self.known_hashes())
+        restored = 0
+        restored_bytes = 0
+        for relpath, (size, mtime_ns, sha256) in snapshot["files"].items():
+            path = os.path.join(self.data_path, *relpath.split("/"))
+            if hashes.get(relpath) != sha256:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                extract_file(self.object_path(sha256), path)
+                restored += 1
+                restored_bytes += size
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        removed = [relpath for relpath in files if relpath not in snapshot["files"]]
+        for relpath in removed:
+            os.remove(os.path.join(self.data_path, *relpath.split("/")))
+        
+        self.log(f"✅ 已恢复到快照 {snapshot['id']} ({snapshot['created_at']}): 重写 {restored} 个文件 "
+                 f"{restored_bytes / 1024 / 1024:.1f} MB，删除 {len(removed)} 个文件，用时 {time.time() - started:.1f} 秒")
+        return snapshot
+    
+    def prune(self):
+        """只保留最近的快照，并删除不再被任何快照引用的文件"""
+        keep = max(1, int(self.project_status.get_status("mongodb_snapshot_keep") or 1))
+        snapshots = self.list_snapshots()
+        for snapshot in snapshots[:-keep]:
+            os.remove(self.manifest_path(snapshot["id"]))
+            self.log(f"🗑️ 已删除旧的MongoDB数据快照: {snapshot['id']}")
+        referenced = {sha256 for snapshot in snapshots[-keep:] for _, _, sha256 in snapshot["files"].values()}
+        freed = 0
+        for path in glob.glob(os.path.join(self.store_dir, "objects", "*", "*.gz")):
+            if os.path.basename(path)[:-3] not in referenced:
+                freed += os.path.getsize(path)
+                os.remove(path)
+        if freed:
+            self.log(f"🗑️ 已清理快照库中不再使用的文件: {freed / 1024 / 1024:.1f} MB")
+        return freed
+
+# 扫描的文档少于该数量时全表扫描代价很小，不推荐索引
+MIN_DOCS_EXAMINED = 1000
+
+# 收集集合统计、索引使用次数和全表扫描的查询；查询条件只保留字段名和类型（等值 eq / 范围 range）
+ADVISOR_SCRIPT = """
+const dbName = %(database)s;
+const target = db.getSiblingDB(dbName);
+const rangeOps = ['$gt', '$gte', '$lt', '$lte', '$ne', '$nin', '$regex', '$exists', '$not'];
+function kind(value) {
+  if (value && typeof value === 'object' && !Array.isArray(value)) {
+    return Object.keys(value).some(op => rangeOps.indexOf(op) >= 0) ? 'range' : 'eq';
+  }
+  return 'eq';
+}
+function shape(filter) {
+  const result = {};
+  Object.keys(filter || {}).forEach(function (key) {
+    if (!key.startsWith('$')) result[key] = kind(filter[key]);
+  });
+  return result;
+}
+const collections = [];
+target.getCollectionInfos({type: 'collection'}).forEach(function (info) {
+  if (info.name.startsWith('system.')) return;
+  const stats = target.runCommand({collStats: info.name});
+  let indexes = [];
+  try {
+    indexes = target.getCollection(info.name).aggregate([{$indexStats: {}}]).toArray().map(function (index) {
+      return {name: index.name, key: index.key, ops: Number(index.accesses.ops), since: String(index.accesses.since)};
+    });
+  } catch (e) {}
+  collections.push({name: info.name, count: Number(stats.count || 0), size: Number(stats.size || 0),
+                    storage_size: Number(stats.storageSize || 0), index_size: Number(stats.totalIndexSize || 0),
+                    indexes: indexes});
+});
+const queries = [];
+if (target.getCollectionNames().indexOf('system.profile') >= 0) {
+  target.system.profile.find({planSummary: /COLLSCAN/}).sort({ts: -1}).limit(1000).forEach(function (entry) {
+    const command = entry.command || {};
+    queries.push({ns: entry.ns, filter: shape(command.filter || command.q || {}), sort: Object.keys(command.sort || {}),
+                  millis: Number(entry.millis || 0), docs_examined: Number(entry.docsExamined || 0)});
+  });
+}
+try {
+  db.adminCommand({getLog: 'global'}).log.forEach(function (line) {
+    let entry;
+    try { entry = JSON.parse(line); } catch (e) { return; }
+    const attr = entry.attr || {};
+    if (entry.msg !== 'Slow query' || !String(attr.planSummary || '').startsWith('COLLSCAN')) return;
+    if (!String(attr.ns || '').startsWith(dbName + '.')) return;
+    const command = attr.command || {};
+    queries.push({ns: attr.ns, filter: shape(command.filter || {}), sort: Object.keys(command.sort || {}),
+                  millis: Number(attr.durationMillis || 0), docs_examined: Number(attr.docsExamined || 0)});
+  });
+} catch (e) {}
+const profiling = target.getProfilingStatus();
+print(JSON.stringify({database: dbName, profiling_level: profiling.was, slowms: profiling.slowms,
+                      collections: collections, queries: queries}));
+"""
+
+class MongoAdvisor:
+    """索引和慢查询诊断
+
+    读取集合统计（collStats）、索引使用次数（$indexStats），以及慢查询分析器（system.profile）和
+    MongoDB日志中的慢查询，找出占用空间大的集合、从未使用的索引和全表扫描（COLLSCAN）的查询形状，
+    按“等值字段 → 排序字段 → 范围字段”的顺序给出推荐索引。
+    """
+    def __init__(self, project_status, log=log_to_stdout):
+        self.project_status = project_status
+        self.log = log
+        self.shell = MongoShell(project_status)
+    
+    def collect(self):
+        """从MongoDB读取原始统计数据"""
+        return self.shell.eval(ADVISOR_SCRIPT % {"database": json.dumps(self.shell.database)}, timeout=300)
+    
+    def analyze(self, report=None):
+        """返回 {database, profiling_level, collections, unused_indexes, scan_shapes}"""
+        report = report or self.collect()
+        collections = {item["name"]: item for item in report["collections"]}
+        
+        unused_indexes = []
+        for item in report["collections"]:
+            for index in item["indexes"]:
+                if index["name"] != "_id_" and index["ops"] == 0:
+                    unused_indexes.append({"collection": item["name"], "name": index["name"],
+                                           "key": index["key"], "since": index["since"]})
+        
+        shapes = {}
+        prefix = report["database"] + "."
+        for query in report["queries"]:
+            collection = query["ns"][len(prefix):] if query["ns"].startswith(prefix) else query["ns"]
+            key = (collection, json.dumps(query["filter"], sort_keys=True), tuple(query["sort"]))
+            shape = shapes.setdefault(key, {"collection": collection, "filter": query["filter"], "sort": query["sort"],
+                                            "count": 0, "total_millis": 0, "max_docs_examined": 0})
+            shape["count"] += 1
+            shape["total_millis"] += query["millis"]
+            shape["max_docs_examined"] = max(shape["max_docs_examined"], query["docs_examined"])
+        
+        scan_shapes = sorted(shapes.values(), key=lambda item: item["total_millis"], reverse=True)
+        for shape in scan_shapes:
+            indexes = collections.get(shape["collection"], {}).get("indexes", [])
+            shape["recommended"] = None
+            if shape["max_docs_examined"] >= MIN_DOCS_EXAMINED:
+                shape["recommended"] = self.recommend_index(shape["filter"], shape["sort"], indexes)
+        
+        return {
+            "database": report["database"],
+            "profiling_level": report["profiling_level"],
+            "slowms": report.get("slowms"),
+            "collections": sorted(report["collections"], key=lambda item: item["storage_size"], reverse=True),
+            "unused_indexes": unused_indexes,
+            "scan_shapes": scan_shapes,
+        }
+    
+    def recommend_index(self, filter_shape, sort, indexes):
+        """推荐索引的键（{字段: 1}），已有索引能覆盖这些字段前缀或没有可用字段时返回None"""
+        fields = [name for name, kind in filter_shape.items() if kind == "eq"]
+        fields += [name for name in sort if name not in fields]
+        fields += [name for name, kind in filter_shape.items() if kind == "range" and name not in fields]
+        if not fields:
+            return None
+        for index in indexes:
+            if list(index["key"])[:len(fields)] == fields:
+                return None
+        return {name: 1 for name in fields}
+    
+    def set_profiling(self, level=1, slowms=100):
+        """开启（level=1）或关闭（level=0）慢查询分析器，只记录超过 slowms 毫秒的操作"""
+        script = (f"print(JSON.stringify(db.getSiblingDB({json.dumps(self.shell.database)})"
+                  f".setProfilingLevel({int(level)}, {{slowms: {int(slowms)}}})))")
+        self.shell.eval(script)
+        if level:
+            self.log(f"✅ 已开启慢查询分析器（{self.shell.database}，记录超过 {int(slowms)} 毫秒的操作）")
+        else:
+            self.log(f"✅ 已关闭慢查询分析器（{self.shell.database}）")
+    
+    def create_index(self, collection, keys):
+        """在后台创建索引（MongoDB 4.2起索引构建只在开始和结束时短暂加锁）"""
+        self.log(f"⏳ 正在创建索引 {collection} {json.dumps(keys)}...")
+        script = (f"print(JSON.stringify(db.getSiblingDB({json.dumps(self.shell.database)})"
+                  f".getCollection({json.dumps(collection)}).createIndex({json.dumps(keys)}, {{background: true}})))")
+        result = self.shell.eval(script, timeout=3600)
+        self.log(f"✅ 索引已创建: {collection} {json.dumps(keys)}")
+        return result
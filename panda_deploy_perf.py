@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 启动性能
+用 -X importtime 分析PandaFactor和QuantFlow服务器的导入耗时，并反复冷启动、热启动整套服务
+测量各服务就绪的时间；结果按提交和机器保存，便于找出让启动变慢的上游改动
+"""
+
+import hashlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+from panda_deploy_core import (
+    DeployError,
+    ServiceSupervisor,
+    log_to_stdout,
+    probe_port,
+    probe_url,
+    run_git,
+)
+from panda_deploy_mongo import MongoShell
+
+# -X importtime 的输出行: 自身耗时 | 累计耗时 | 缩进（每层两个空格）+ 模块名，单位为微秒
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$")
+
+# 分析的服务: (服务名, 显示名称)
+PROFILE_SERVICES = [("factor", "PandaFactor"), ("quantflow", "QuantFlow")]
+
+# 保存和显示的最慢导入数量
+TOP_IMPORTS = 30
+
+# 启动基准测试的测量项: (服务名, 显示名称)，MongoDB为端口开始接受连接，服务器为首次返回200
+BENCHMARK_TARGETS = [("mongodb", "MongoDB"), ("factor", "PandaFactor"), ("quantflow", "QuantFlow")]
+
+def parse_importtime(lines):
+    """把 -X importtime 的输出解析为导入树: [{name, self, cumulative, children}]（微秒）
+
+    子模块的行先于父模块输出，因此按缩进层级暂存，遇到上一层的行时作为它的子节点
+    """
+    pending = {}
+    for line in lines:
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        level = len(match.group(3)) // 2
+        node = {
+            "name": match.group(4),
+            "self": int(match.group(1)),
+            "cumulative": int(match.group(2)),
+            "children": pending.pop(level + 1, []),
+        }
+        pending.setdefault(level, []).append(node)
+    # 进程在导入过程中被停止时，尚未完成的导入没有父节点，作为顶层节点返回
+    roots = []
+    for level in sorted(pending):
+        roots += pending[level]
+    return roots
+
+def iter_imports(tree):
+    """遍历导入树中的所有模块"""
+    for node in tree:
+        yield node
+        yield from iter_imports(node["children"])
+
+def summarize_imports(tree, count=TOP_IMPORTS):
+    """总导入时间和最慢的导入（按累计耗时和自身耗时），单位为毫秒"""
+    nodes = list(iter_imports(tree))
+    return {
+        "total_ms": round(sum(node["cumulative"] for node in tree) / 1000, 1),
+        "modules": len(nodes),
+        "top_cumulative": [[node["name"], round(node["cumulative"] / 1000, 1), round(node["self"] / 1000, 1)]
+                           for node in sorted(nodes, key=lambda node: node["cumulative"], reverse=True)[:count]],
+        "top_self": [[node["name"], round(node["self"] / 1000, 1)]
+                     for node in sorted(nodes, key=lambda node: node["self"], reverse=True)[:count]],
+    }
+
+def diff_imports(previous, current, count=10):
+    """两次分析之间累计耗时变化最大的模块: [(模块名, 之前ms, 现在ms)]"""
+    before = {node["name"]: node["cumulative"] for node in iter_imports(previous["tree"])}
+    after = {node["name"]: node["cumulative"] for node in iter_imports(current["tree"])}
+    changes = [(name, before.get(name, 0), after.get(name, 0)) for name in set(before) | set(after)]
+    changes.sort(key=lambda item: abs(item[2] - item[1]), reverse=True)
+    return [(name, round(old / 1000, 1), round(new / 1000, 1)) for name, old, new in changes[:count]]
+
+class StartupProfiler:
+    """分析服务器的启动导入耗时
+
+    每个服务在部署的Conda环境中以 -X importtime 启动一次，端口开始监听（或进程退出、超时）后停止，
+    结果保存到 安装路径/profiles/startup/<服务>-<提交>.json，同一提交重复分析时覆盖
+    """
+    def __init__(self, project_status, log=log_to_stdout):
+        self.project_status = project_status
+        self.log = log
+        self.supervisor = ServiceSupervisor(project_status, log=lambda message: None)
+    
+    @property
+    def profile_dir(self):
+        return os.path.join(self.project_status.get_status("project_path"), "profiles", "startup")
+    
+    def run(self, services=None, timeout=120):
+        """分析指定的服务（默认为全部），返回结果列表"""
+        plan = self.supervisor.build_plan()
+        if not plan:
+            raise DeployError("项目尚未完成部署或MongoDB路径无效")
+        if not plan["activation"]:
+            raise DeployError(f"未找到Conda环境: {plan['env_name']}")
+        python = plan["activation"]["python"]
+        self.supervisor.apply_ports(plan)
+        
+        results = []
+        for name, title in PROFILE_SERVICES:
+            if services and name not in services:
+                continue
+            if not plan[f"{name}_entry"]:
+                self.log(f"⚠️ 未找到{title}服务器入口，跳过")
+                continue
+            if probe_port(plan["ports"][name]):
+                raise DeployError(f"{title}端口 {plan['ports'][name]} 已被占用，请先停止服务")
+            self.log(f"⏱️ 正在分析{title}的启动导入耗时...")
+            result = self.profile_service(name, plan, python, timeout)
+            self.save(result)
+            results.append(result)
+        return results
+    
+    def profile_service(self, name, plan, python, timeout):
+        """以 -X importtime 启动一个服务，等到端口开始监听后停止"""
+        repo_path = plan[f"{name}_path"]
+        port = plan["ports"][name]
+        process = subprocess.Popen([python, "-X", "importtime"] + self.supervisor.server_args(plan, name),
+                                   cwd=repo_path,
+                                   env=self.supervisor.service_env(plan["factor_path"], plan["activation"]),
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                   text=True, encoding='utf-8', errors='replace')
+        lines = []
+        reader = threading.Thread(target=lambda: lines.extend(process.stderr), daemon=True)
+        reader.start()
+        
+        started = time.perf_counter()
+        ready = None
+        while time.perf_counter() - started < timeout and process.poll() is None:
+            if probe_port(port, timeout=0.2):
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.1)
+        exit_code = process.poll()
+        if exit_code is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        reader.join(timeout=5)
+        
+        tree = parse_importtime(lines)
+        _, commit, _ = run_git(repo_path, 'log', '-1', '--format=%H')
+        _, commit_desc, _ = run_git(repo_path, 'log', '-1', '--format=%h %s')
+        result = {
+            "service": name,
+            "commit": commit,
+            "commit_desc": commit_desc,
+            "profiled_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ready_seconds": round(ready, 2) if ready is not None else None,
+            "exit_code": exit_code,
+            # 服务提前退出时保留最后的错误输出
+            "error_tail": [line.rstrip() for line in lines if not IMPORTTIME_PATTERN.match(line)][-20:]
+                          if exit_code is not None else [],
+            "tree": tree,
+        }
+        result.update(summarize_imports(tree))
+        return result
+    
+    def save(self, result):
+        """按服务和提交保存分析结果"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{result['service']}-{(result['commit'] or 'unknown')[:12]}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        return path
+    
+    def history(self, name):
+        """服务各提交的分析结果，按分析时间从旧到新"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        results = []
+        for filename in os.listdir(self.profile_dir):
+            if filename.startswith(f"{name}-") and filename.endswith(".json"):
+                with open(os.path.join(self.profile_dir, filename), 'r', encoding='utf-8') as f:
+                    results.append(json.load(f))
+        results.sort(key=lambda result: result["profiled_at"])
+        return results
+    
+    def previous(self, result):
+        """同一服务在其他提交上最近一次的分析结果，用于对比"""
+        for item in reversed(self.history(result["service"])):
+            if item["commit"] != result["commit"]:
+                return item
+        return None
+
+def describe_profile(result, previous=None, count=10):
+    """分析结果的文字说明（命令行和图形界面共用）"""
+    title = dict(PROFILE_SERVICES)[result["service"]]
+    ready = f"{result['ready_seconds']} 秒后端口就绪" if result["ready_seconds"] is not None else "端口未就绪"
+    lines = [f"{title} ({result['commit_desc'] or '未知提交'}): 导入 {result['modules']} 个模块，"
+             f"共 {result['total_ms']} 毫秒，{ready}"]
+    if result["exit_code"] is not None and result["ready_seconds"] is None:
+        lines.append(f"  ⚠️ 服务提前退出（返回码 {result['exit_code']}）:")
+        lines += [f"    {line}" for line in result["error_tail"][-5:]]
+    lines.append("  最慢的导入（累计 / 自身，毫秒）:")
+    lines += [f"    {name:<48}{cumulative:>10}{own:>10}" for name, cumulative, own in result["top_cumulative"][:count]]
+    if previous:
+        lines.append(f"  与 {previous['commit_desc'] or '未知提交'} 相比（{previous['total_ms']} → {result['total_ms']} 毫秒）:")
+        lines += [f"    {name:<48}{old:>10} → {new}" for name, old, new in diff_imports(previous, result, count=5)]
+    return lines
+
+def machine_fingerprint():
+    """机器特征（系统、CPU、内存），id 用于只和同一台机器的结果比较；主机名只保存哈希"""
+    memory = None
+    if hasattr(os, "sysconf"):
+        try:
+            memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        except (ValueError, OSError):
+            pass
+    fingerprint = {
+        "system": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "memory_gb": round(memory / 1024 ** 3, 1) if memory else None,
+        "host": hashlib.sha256(platform.node().encode("utf-8")).hexdigest()[:12],
+    }
+    fingerprint["id"] = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return fingerprint
+
+def drop_page_cache():
+    """清空系统文件缓存（Linux且有权限时），返回是否成功"""
+    if not os.path.exists("/proc/sys/vm/drop_caches"):
+        return False
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", 'w') as f:
+            f.write("3")
+        return True
+    except OSError:
+        return False
+
+class LaunchBenchmark:
+    """启动基准测试：反复启动、停止整套服务，测量从点击启动到各服务就绪的时间
+
+    第一次为冷启动（能清空系统文件缓存时先清空），之后为热启动；结果连同两个仓库的提交和机器特征
+    保存到 安装路径/profiles/launch/
+    """
+    def __init__(self, project_status, log=log_to_stdout):
+        self.project_status = project_status
+        self.log = log
+        self.supervisor = ServiceSupervisor(project_status, log=lambda message: None)
+        self.mongo = MongoShell(project_status)
+    
+    @property
+    def result_dir(self):
+        return os.path.join(self.project_status.get_status("project_path"), "profiles", "launch")
+    
+    def run(self, warm_runs=3, cold=True, timeout=180):
+        """执行基准测试并保存结果，返回结果字典"""
+        plan = self.supervisor.build_plan()
+        if not plan:
+            raise DeployError("项目尚未完成部署或MongoDB路径无效")
+        ports = plan["ports"]
+        busy = [name for name, _ in BENCHMARK_TARGETS if probe_port(ports[name])]
+        if busy:
+            raise DeployError(f"服务正在运行（{', '.join(busy)}），请先停止服务")
+        targets = [name for name, _ in BENCHMARK_TARGETS if name != "quantflow" or plan["quantflow_entry"]]
+        
+        commits = {}
+        for name in ("factor", "quantflow"):
+            _, commits[name], _ = run_git(plan[f"{name}_path"], 'log', '-1', '--format=%H')
+        result = {
+            "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "commits": commits,
+            "fingerprint": machine_fingerprint(),
+            "runs": [],
+        }
+        
+        kinds = (["cold"] if cold else []) + ["warm"] * warm_runs
+        for index, kind in enumerate(kinds, 1):
+            self.log(f"🏁 第 {index}/{len(kinds)} 次（{'冷启动' if kind == 'cold' else '热启动'}）...")
+            run = self.run_once(kind, plan, targets, timeout)
+            result["runs"].append(run)
+            self.log("    " + "，".join(f"{title} {run[name]} 秒" if run.get(name) is not None else f"{title} 超时"
+                                        for name, title in BENCHMARK_TARGETS if name in targets)
+                     + f"，停止用时 {run['stop']} 秒")
+        
+        result["summary"] = self.summarize(result["runs"])
+        os.makedirs(self.result_dir, exist_ok=True)
+        path = os.path.join(self.result_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        self.log(f"✅ 基准测试结果已保存: {path}")
+        return result
+    
+    def run_once(self, kind, plan, targets, timeout):
+        """启动一次整套服务，记录各服务就绪的时间（秒），然后停止并等待端口释放"""
+        ports = plan["ports"]
+        run = {"kind": kind, "cache_dropped": drop_page_cache() if kind == "cold" else False}
+        started = time.perf_counter()
+        if not self.supervisor.launch():
+            raise DeployError("启动失败")
+        
+        pending = set(targets)
+        while pending and time.perf_counter() - started < timeout:
+            for name in list(pending):
+                ready = probe_port(ports[name], timeout=0.2) if name == "mongodb" else \
+                    probe_url(f"http://127.0.0.1:{ports[name]}", timeout=1)[0] == "ok"
+                if ready:
+                    run[name] = round(time.perf_counter() - started, 2)
+                    pending.discard(name)
+            time.sleep(0.1)
+        for name in pending:
+            run[name] = None
+        
+        stopping = time.perf_counter()
+        self.stop_services()
+        while any(probe_port(ports[name], timeout=0.2) for name in targets):
+            if time.perf_counter() - stopping > 60:
+                raise DeployError("服务停止后端口仍被占用，基准测试中止")
+            time.sleep(0.2)
+        run["stop"] = round(time.perf_counter() - stopping, 2)
+        return run
+    
+    def stop_services(self):
+        """正常停止服务：MongoDB用 shutdown 命令关闭，再向记录的进程发送终止信号，超时才强制结束
+
+        强制结束的MongoDB下次启动需要恢复日志，会让后面的启动时间偏长
+        """
+        try:
+            if not self.mongo.shutdown():
+                self.log("⚠️ MongoDB未在规定时间内关闭，改为发送终止信号")
+        except DeployError as e:
+            self.log(f"⚠️ 无法通过shutdown命令关闭MongoDB（{e}），改为发送终止信号")
+        self.supervisor.stop(graceful=True)
+    
+    def summarize(self, runs):
+        """按冷、热启动分别计算各服务就绪时间的中位数"""
+        summary = {}
+        for kind in ("cold", "warm"):
+            selected = [run for run in runs if run["kind"] == kind]
+            if not selected:
+                continue
+            summary[kind] = {}
+            for name, _ in BENCHMARK_TARGETS:
+                values = [run[name] for run in selected if run.get(name) is not None]
+                summary[kind][name] = round(statistics.median(values), 2) if values else None
+        return summary
+    
+    def history(self):
+        """保存的基准测试结果，按时间从旧到新"""
+        if not os.path.isdir(self.result_dir):
+            return []
+        results = []
+        for filename in sorted(os.listdir(self.result_dir)):
+            if filename.endswith(".json"):
+                with open(os.path.join(self.result_dir, filename), 'r', encoding='utf-8') as f:
+                    results.append(json.load(f))
+        return results
+
+def describe_benchmark(result, previous=None):
+    """基准测试结果的文字说明，previous 为同一台机器上一次的结果"""
+    commits = "  ".join(f"{name} {commit[:8]}" for name, commit in result["commits"].items() if commit)
+    lines = [f"{result['started_at']}  {commits}  机器 {result['fingerprint']['id']}"]
+    for kind, title in (("cold", "冷启动"), ("warm", "热启动")):
+        if kind not in result["summary"]:
+            continue
+        parts = []
+        for name, target_title in BENCHMARK_TARGETS:
+            value = result["summary"][kind].get(name)
+            if value is None:
+                continue
+            text = f"{target_title} {value} 秒"
+            old = ((previous or {}).get("summary", {}).get(kind) or {}).get(name)
+            if old:
+                text += f"（{'+' if value >= old else ''}{round(value - old, 2)}）"
+            parts.append(text)
+        lines.append(f"  {title}中位数: {'，'.join(parts) or '未就绪'}")
+    return lines
+
+def previous_benchmark(history, result):
+    """同一台机器上在 result 之前的最近一次结果"""
+    earlier = [item for item in history
+               if item["fingerprint"]["id"] == result["fingerprint"]["id"] and item["started_at"] < result["started_at"]]
+    return earlier[-1] if earlier else None
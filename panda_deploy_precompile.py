@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 预编译字节码
+只编译 .pyc 已过期的文件（与导入时相同，比较源文件的修改时间和大小），使用所有CPU核心；
+还可以测量导入服务器入口所需的时间，用来比较预编译前后的实际启动耗时。
+
+部署时由目标环境的解释器运行（只依赖标准库，会被复制到安装目录的 tools/ 下），最后一行输出 JSON:
+    python panda_deploy_precompile.py [--site-packages] 目录...   → {files, compiled, failed, workers, elapsed, cpu}
+    python panda_deploy_precompile.py --dry-run 目录...           → {files, stale}
+    python -B panda_deploy_precompile.py --measure-import 入口.py → {elapsed, modules, errors}
+"""
+
+import argparse
+import ast
+import compileall
+import functools
+import importlib
+import importlib.util
+import json
+import os
+import struct
+import sys
+import sysconfig
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SKIPPED_DIRS = ("__pycache__", ".git", "node_modules")
+
+def is_fresh(path):
+    """源文件的 .pyc 是否存在且未过期"""
+    try:
+        stat = os.stat(path)
+        expect = struct.pack("<4sLLL", importlib.util.MAGIC_NUMBER, 0,
+                             int(stat.st_mtime) & 0xFFFFFFFF, stat.st_size & 0xFFFFFFFF)
+        with open(importlib.util.cache_from_source(path), "rb") as f:
+            return f.read(16) == expect
+    except OSError:
+        return False
+
+def find_stale(roots):
+    """目录中的 .py 文件总数和需要编译的文件"""
+    total = 0
+    stale = []
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name not in SKIPPED_DIRS]
+            for filename in filenames:
+                if not filename.endswith(".py"):
+                    continue
+                total += 1
+                path = os.path.join(dirpath, filename)
+                if not is_fresh(path):
+                    stale.append(path)
+    return total, stale
+
+def precompile(roots):
+    """并行编译过期的文件，返回 {files, compiled, failed, workers, elapsed, cpu}"""
+    started = time.perf_counter()
+    total, stale = find_stale(roots)
+    failed = 0
+    # Windows下进程池最多61个进程
+    workers = min(61, os.cpu_count() or 1)
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            compile_file = functools.partial(compileall.compile_file, quiet=2, force=True)
+            failed = sum(1 for ok in executor.map(compile_file, stale, chunksize=32) if not ok)
+    times = os.times()
+    return {"files": total, "compiled": len(stale) - failed, "failed": failed, "workers": workers,
+            "elapsed": round(time.perf_counter() - started, 2),
+            "cpu": round(times.children_user + times.children_system, 2)}
+
+def entry_imports(entry):
+    """入口文件顶层导入的模块（不执行入口本身，避免启动服务器）"""
+    with open(entry, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def measure_import(entry):
+    """导入入口文件顶层导入的模块，返回 {elapsed, modules, errors}
+
+    与直接运行入口时一样把入口所在目录放在 sys.path 最前面；应使用 -B 运行，测量本身不写入 .pyc
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(entry)))
+    modules = entry_imports(entry)
+    errors = {}
+    started = time.perf_counter()
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            errors[module] = f"{type(e).__name__}: {e}"
+    return {"elapsed": round(time.perf_counter() - started, 3), "modules": len(modules), "errors": errors}
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="并行预编译过期的字节码")
+    parser.add_argument("--site-packages", action="store_true", help="同时编译环境的 site-packages")
+    parser.add_argument("--dry-run", action="store_true", help="只统计需要编译的文件数量")
+    parser.add_argument("--measure-import", metavar="ENTRY", help="只测量导入服务器入口的耗时")
+    parser.add_argument("roots", nargs="*", help="需要编译的目录")
+    args = parser.parse_args(argv)
+    
+    roots = list(args.roots)
+    if args.site_packages:
+        roots.append(sysconfig.get_paths()["purelib"])
+    if args.measure_import:
+        stats = measure_import(args.measure_import)
+    elif args.dry_run:
+        total, stale = find_stale(roots)
+        stats = {"files": total, "stale": len(stale)}
+    else:
+        stats = precompile(roots)
+    # 导入的模块可能有输出，统计结果单独占最后一行
+    print("\n" + json.dumps(stats, ensure_ascii=False), flush=True)
+    if args.measure_import:
+        # 导入的模块可能启动了非守护线程（例如数据库连接），不等待它们结束
+        os._exit(0)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 按配置的端口启动服务器
+PandaFactor和QuantFlow的入口在代码中固定了 uvicorn 的监听端口，同一台电脑上运行多套配置时端口会冲突。
+这里先替换 uvicorn.Config 的端口，再以 __main__ 运行入口文件，不需要修改项目代码。
+
+启动服务时由目标环境的解释器运行（只依赖标准库，会被复制到安装目录的 tools/ 下）:
+    python panda_deploy_serve.py --port 8112 ./panda_factor_server/panda_factor_server/__main__.py
+"""
+
+import argparse
+import os
+import runpy
+import sys
+
+def override_port(port):
+    """让之后创建的 uvicorn.Config（uvicorn.run 也通过它）使用指定的端口，环境中没有 uvicorn 时返回False"""
+    try:
+        import uvicorn
+    except ImportError:
+        return False
+    original = uvicorn.Config.__init__
+    
+    def __init__(self, app, *args, **kwargs):
+        # Config(app, host, port, ...) 也可能按位置传入端口
+        if len(args) >= 2:
+            args = args[:1] + (port,) + args[2:]
+        else:
+            kwargs["port"] = port
+        original(self, app, *args, **kwargs)
+    
+    uvicorn.Config.__init__ = __init__
+    return True
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="按指定端口运行服务器入口")
+    parser.add_argument("--port", type=int, required=True, help="服务器监听的端口")
+    parser.add_argument("entry", help="服务器入口文件")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="传给入口的参数")
+    args = parser.parse_args(argv)
+    
+    if not override_port(args.port):
+        print(f"⚠️ 环境中没有 uvicorn，无法把端口改为 {args.port}", file=sys.stderr, flush=True)
+    # 与直接运行入口时一样：sys.path 的第一项为入口所在目录（而不是 tools/），sys.argv[0] 为入口文件
+    entry = os.path.abspath(args.entry)
+    sys.path[0] = os.path.dirname(entry)
+    sys.argv = [entry] + args.args
+    runpy.run_path(entry, run_name="__main__")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,8 @@ a = Analysis(
     ['panda_deploy_tool_v2.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('panda_deploy_logs.py', '.'), ('panda_deploy_editable.py', '.'),
+           ('panda_deploy_precompile.py', '.'), ('panda_deploy_serve.py', '.')],
     hiddenimports=[
         'tkinter',
         'tkinter.ttk',
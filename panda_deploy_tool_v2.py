@@ -6,81 +6,117 @@ PandaAI工具部署助手 V2.0
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
-import subprocess
+from tkinter import ttk, messagebox, filedialog, scrolledtext, simpledialog
 import os
-import sys
 import threading
-from pathlib import Path
 import time
-import json
 import webbrowser
 from datetime import datetime
 
-class ProjectStatus:
-    """项目状态管理类"""
-    def __init__(self, status_file="project_status.json"):
-        self.status_file = status_file
-        self.default_status = {
-            "project_path": "",
-            "conda_env": "pandaaitool",
-            "git_url": "https://github.com/PandaAI-Tech/panda_factor.git",
-            "quantflow_git_url": "https://github.com/PandaAI-Tech/panda_quantflow.git",
-            "mongodb_path": "",
-            "mongodb_status": "unknown",  # unknown, ok, error, not_configured
-            "deployment_status": "not_started",  # not_started, in_progress, completed, failed
-            "last_update": "",
-            "git_commit": "",
-            "quantflow_commit": "",
-            "environment_status": "unknown",  # unknown, ok, error
-            "server_status": "stopped",  # stopped, running, error
-            "completed_steps": [],
-            "last_check": ""
-        }
-        self.status = self.load_status()
-    
-    def load_status(self):
-        """加载状态"""
-        try:
-            if os.path.exists(self.status_file):
-                with open(self.status_file, 'r', encoding='utf-8') as f:
-                    status = json.load(f)
-                # 合并默认状态和已保存状态
-                merged_status = self.default_status.copy()
-                merged_status.update(status)
-                return merged_status
-            return self.default_status.copy()
-        except Exception as e:
-            print(f"加载状态失败: {e}")
-            return self.default_status.copy()
-    
-    def save_status(self):
-        """保存状态"""
-        try:
-            self.status["last_check"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(self.status_file, 'w', encoding='utf-8') as f:
-                json.dump(self.status, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存状态失败: {e}")
-    
-    def update_status(self, **kwargs):
-        """更新状态"""
-        self.status.update(kwargs)
-        self.save_status()
-    
-    def get_status(self, key):
-        """获取状态"""
-        return self.status.get(key, self.default_status.get(key))
+from panda_deploy_core import (
+    DeployError,
+    DeployPipeline,
+    EnvSnapshotManager,
+    ProfileManager,
+    RemoteWatcher,
+    ServiceSupervisor,
+    TaskRunner,
+    check_updates,
+    describe_remote_updates,
+    environment_watch_paths,
+    get_update_targets,
+    probe_url,
+)
+from panda_deploy_datahub import DataHubScheduler, describe_data_hub_run, get_data_hub_jobs, parse_schedule_time
+from panda_deploy_diag import LoopLagMonitor, TaskProfiler, describe_pstats
+from panda_deploy_disk import DiskFootprint, format_size
+from panda_deploy_fingerprint import describe_env_drift
+from panda_deploy_logs import LogSearcher
+from panda_deploy_metrics import MetricsCollector, MetricsServer
+from panda_deploy_mongo import MongoAdvisor, MongoSnapshotManager
+from panda_deploy_perf import (
+    LaunchBenchmark,
+    StartupProfiler,
+    describe_benchmark,
+    describe_profile,
+    previous_benchmark,
+)
+from panda_deploy_watch import FileWatcher
+
+# 部署页的状态指示器: (显示名称, 步骤ID)
+STATUS_STEPS = [
+    ("环境检查", "check_environment"),
+    ("创建目录", "create_directory"),
+    ("克隆项目", "clone_project"),
+    ("配置环境", "setup_conda_env"),
+    ("安装依赖", "install_dependencies"),
+    ("创建脚本", "create_scripts")
+]
 
 class PandaDeployToolV2:
     def __init__(self, root):
+        # 启动耗时记录（time.perf_counter），供启动基准测试读取
+        self.startup_marks = {"init": time.perf_counter()}
+        
         self.root = root
         self.root.title("PandaAI工具管理助手 V2.0")
         self.root.geometry("900x700")
         self.root.configure(bg='#f0f0f0')
         
-        # 状态管理
-        self.project_status = ProjectStatus()
+        # 状态管理：每套配置（profile）有独立的状态文件，已加载的配置缓存在内存中
+        self.profiles = ProfileManager()
+        self.project_status = self.profiles.get()
+        self.deploy_thread = None
+        
+        # 延迟构建的页面：启动页和操作页在第一次切换到时才创建
+        self.built_pages = set()
+        self.env_status = None
+        self.env_drift = None  # Python环境与部署时相比变化的包
+        self.server_probe = None
+        self.pending_operations_log = []
+        self.disk_busy = False
+        self.db_advice = None
+        self.log_searcher = None
+        self.log_search_serial = 0
+        
+        # 所有后台操作共用一个线程池，重复点击时合并到正在执行的任务（部署仍使用独立线程）
+        self.tasks = TaskRunner(log=lambda message: self.root.after(0, self.log_deploy, message))
+        
+        # 视图模型：标签只创建一次，刷新时只重新配置变化的字段
+        self.widget_options = {}
+        self.refresh_pending = False
+        self.current_step = None
+        
+        # 后台用 git ls-remote 轮询远程仓库，发现更新时在状态栏显示提示
+        self.remote_watcher = RemoteWatcher(
+            self.project_status,
+            on_change=lambda updates: self.root.after(0, self.update_remote_badge, updates),
+            log=lambda message: self.root.after(0, self.log_deploy, message)
+        )
+        
+        # 在设置的低峰时间调用数据中心的更新接口，结果写入操作日志
+        self.data_hub = DataHubScheduler(
+            self.project_status,
+            on_run=lambda run: self.root.after(0, self.on_data_hub_run, run),
+            log=lambda message: self.root.after(0, self.log_operations, message)
+        )
+        
+        # 设置了指标端口时在后台线程提供Prometheus指标
+        self.metrics_collector = MetricsCollector(
+            self.project_status,
+            log=lambda message: self.root.after(0, self.log_deploy, message)
+        )
+        self.metrics_server = None
+        
+        # 界面卡顿诊断（状态栏中的开关），开启时才创建
+        self.lag_monitor = None
+        self.task_profiler = None
+        
+        # 监视项目文件和MongoDB目录，文件出现或消失时立即更新指示器（不定期重新检查）
+        self.file_watcher = FileWatcher(
+            on_change=lambda changed: self.root.after(0, self.on_files_changed, changed),
+            log=lambda message: self.root.after(0, self.log_deploy, message)
+        )
         
         # 设置样式
         self.setup_styles()
@@ -88,8 +124,10 @@ class PandaDeployToolV2:
         # 创建主界面
         self.create_main_interface()
         
-        # 启动时检查状态
-        self.root.after(1000, self.check_all_status)
+        # 先显示上次的检查结果，窗口首次绘制后再在后台重新检查
+        self.show_cached_probes()
+        self.update_remote_badge(self.remote_watcher.updates)
+        self.root.bind("<Map>", self.on_first_map, add="+")
     
     def setup_styles(self):
         """设置界面样式"""
@@ -116,6 +154,22 @@ class PandaDeployToolV2:
         
         ttk.Label(title_frame, text="🐼 PandaAI工具管理助手", style='Title.TLabel').pack()
         
+        # 配置选择
+        profile_frame = ttk.Frame(self.root)
+        profile_frame.pack(fill=tk.X, padx=20)
+        ttk.Label(profile_frame, text="当前配置：").pack(side=tk.LEFT)
+        self.profile_var = tk.StringVar(value=self.profiles.active)
+        self.profile_box = ttk.Combobox(profile_frame, textvariable=self.profile_var, values=self.profiles.names(),
+                                        state='readonly', width=16)
+        self.profile_box.pack(side=tk.LEFT, padx=5)
+        self.profile_box.bind("<<ComboboxSelected>>", lambda event: self.switch_profile(self.profile_var.get()))
+        ttk.Button(profile_frame, text="➕ 新建配置", command=self.create_profile).pack(side=tk.LEFT, padx=5)
+        ttk.Button(profile_frame, text="🗑️ 删除配置", command=self.delete_profile).pack(side=tk.LEFT, padx=5)
+        
+        # 所有配置的服务状态（一次并行检查的结果）
+        self.profile_summary_var = tk.StringVar()
+        ttk.Label(profile_frame, textvariable=self.profile_summary_var).pack(side=tk.RIGHT)
+        
         # 创建选项卡
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -128,16 +182,221 @@ class PandaDeployToolV2:
         # 启动页面
         self.launch_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.launch_frame, text="🚀 项目启动")
-        self.create_launch_page()
         
         # 操作页面
         self.operations_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.operations_frame, text="⚙️ 数据操作")
-        self.create_operations_page()
+        
+        # 磁盘占用页面
+        self.disk_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.disk_frame, text="💽 磁盘占用")
+        
+        # 服务日志页面
+        self.service_log_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.service_log_frame, text="📜 服务日志")
+        
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         # 状态栏
         self.create_status_bar()
     
+    def on_tab_changed(self, event=None):
+        """切换选项卡时构建尚未创建的页面"""
+        selected = self.notebook.select()
+        if selected == str(self.launch_frame):
+            self.ensure_page("launch")
+        elif selected == str(self.operations_frame):
+            self.ensure_page("operations")
+        elif selected == str(self.disk_frame):
+            self.ensure_page("disk")
+        elif selected == str(self.service_log_frame):
+            self.ensure_page("service_log")
+    
+    def ensure_page(self, name):
+        """第一次需要时创建页面，并显示已有的检查结果"""
+        if name in self.built_pages:
+            return
+        self.built_pages.add(name)
+        if name == "launch":
+            self.create_launch_page()
+            if self.env_status:
+                self.update_status_ui(*self.env_status)
+        elif name == "operations":
+            self.create_operations_page()
+            if self.server_probe:
+                self.apply_server_probe(*self.server_probe)
+            for log_message in self.pending_operations_log:
+                self.operations_log.insert(tk.END, log_message)
+            self.operations_log.see(tk.END)
+            self.pending_operations_log = []
+        elif name == "disk":
+            self.create_disk_page()
+            self.refresh_disk_usage()
+        elif name == "service_log":
+            self.create_service_log_page()
+            self.search_service_logs()
+    
+    def on_first_map(self, event):
+        """主窗口首次显示后，等界面绘制完成再开始后台检查"""
+        if event.widget is not self.root or "first_paint" in self.startup_marks:
+            return
+        self.startup_marks["first_paint"] = None
+        self.root.after_idle(self.start_deferred_probes)
+    
+    def start_deferred_probes(self):
+        """首次绘制完成：启动状态检查和服务器检查"""
+        self.startup_marks["first_paint"] = time.perf_counter()
+        self.check_all_status()
+        self.check_server_status()
+        self.remote_watcher.start()
+        self.data_hub.start()
+        self.start_metrics_server()
+        self.watch_project_files()
+        for var in (self.project_path_var, self.mongodb_path_var):
+            var.trace_add("write", lambda *args: self.watch_project_files())
+        self.root.after(0, lambda: self.startup_marks.setdefault("interactive", time.perf_counter()))
+    
+    def start_metrics_server(self):
+        """状态文件中设置了 metrics_port 时启动本机指标服务"""
+        try:
+            port = int(self.project_status.get_status("metrics_port") or 0)
+        except (TypeError, ValueError):
+            port = 0
+        if port <= 0 or self.metrics_server:
+            return
+        server = MetricsServer(self.metrics_collector, port)
+        try:
+            server.start()
+        except OSError as e:
+            self.log_deploy(f"⚠️ 无法启动监控指标服务（端口 {port}）: {str(e)}")
+            return
+        self.metrics_server = server
+        self.log_deploy(f"📊 监控指标: http://127.0.0.1:{port}/metrics")
+    
+    def watch_project_files(self):
+        """按当前配置的路径监视项目文件和MongoDB可执行文件"""
+        base_path = self.project_status.get_status("project_path") or self.project_path_var.get()
+        mongodb_path = self.project_status.get_status("mongodb_path") or self.mongodb_path_var.get()
+        self.file_watcher.watch(environment_watch_paths(base_path, mongodb_path))
+    
+    def on_files_changed(self, changed):
+        """项目文件或MongoDB文件出现、消失时更新指示器和检查缓存"""
+        if not self.env_status:
+            return  # 还没有完成第一次检查，由检查结果显示
+        status = dict(zip(("git", "conda", "python_env", "project_files", "mongodb"), self.env_status))
+        status.update(changed)
+        self.update_status_ui(status["git"], status["conda"], status["python_env"],
+                              status["project_files"], status["mongodb"])
+        cache = self.project_status.get_status("probe_cache") or {}
+        if cache.get("environment"):
+            self.project_status.update_status(probe_cache=dict(cache, environment=dict(cache["environment"], **changed)))
+    
+    def show_cached_probes(self):
+        """显示上次保存的检查结果"""
+        cache = self.project_status.get_status("probe_cache") or {}
+        environment = cache.get("environment")
+        self.env_drift = cache.get("env_drift")
+        if environment:
+            self.update_status_ui(environment["git"], environment["conda"], environment["python_env"],
+                                  environment["project_files"], environment["mongodb"])
+        if cache.get("factor_server"):
+            self.server_probe = (cache["factor_server"]["state"], cache["factor_server"]["detail"], False)
+        if cache.get("checked_at"):
+            self.last_check_var.set(f"上次检查: {cache['checked_at']}（正在刷新）")
+        self.update_profile_summary()
+    
+    def update_profile_summary(self):
+        """显示所有配置上次检查时的服务状态"""
+        parts = []
+        for name in self.profiles.names():
+            services = (self.profiles.get(name).get_status("probe_cache") or {}).get("services")
+            if services:
+                parts.append(f"{name}: {'🟢' if services['factor'] == 'ok' else '⚪'}")
+        self.profile_summary_var.set("  ".join(parts) if len(parts) > 1 else "")
+    
+    def load_config_vars(self):
+        """把当前配置的设置填入部署页面"""
+        self.git_url_var.set(self.project_status.get_status("git_url"))
+        self.quantflow_git_url_var.set(self.project_status.get_status("quantflow_git_url"))
+        self.project_path_var.set(self.project_status.get_status("project_path"))
+        self.conda_env_var.set(self.project_status.get_status("conda_env"))
+        self.mongodb_path_var.set(self.project_status.get_status("mongodb_path"))
+        self.mongodb_data_path_var.set(self.project_status.get_status("mongodb_data_path"))
+        for key, var in self.port_vars.items():
+            var.set(str(self.project_status.get_status(key)))
+        self.remote_interval_var.set(str(self.project_status.get_status("remote_watch_interval")))
+    
+    def switch_profile(self, name):
+        """切换配置：直接显示该配置缓存的状态，不重新检查"""
+        if name == self.profiles.active:
+            return
+        if self.deploy_thread and self.deploy_thread.is_alive():
+            messagebox.showwarning("提示", "部署进行中，完成后再切换配置")
+            self.profile_var.set(self.profiles.active)
+            return
+        
+        self.project_status = self.profiles.switch(name)
+        self.current_step = None
+        self.load_config_vars()
+        
+        # 后台更新检查也切换到新配置
+        self.remote_watcher.project_status = self.project_status
+        self.remote_watcher.updates = dict(self.project_status.get_status("remote_updates") or {})
+        self.update_remote_badge(self.remote_watcher.updates)
+        self.remote_watcher.poll_now()
+        self.data_hub.project_status = self.project_status
+        self.data_hub.reschedule()
+        self.metrics_collector.project_status = self.project_status
+        
+        self.server_probe = None
+        self.show_cached_probes()
+        if self.server_probe:
+            self.apply_server_probe(*self.server_probe)
+        self.refresh_views()
+        if "disk" in self.built_pages:
+            self.refresh_disk_usage()
+        if "service_log" in self.built_pages:
+            self.search_service_logs()
+        if "operations" in self.built_pages:
+            self.load_data_hub_settings()
+        
+        # 新建后还没有检查过的配置立即检查一次
+        if not (self.project_status.get_status("probe_cache") or {}).get("environment"):
+            self.check_all_status()
+        self.status_var.set(f"已切换到配置: {name}")
+    
+    def create_profile(self):
+        """新建配置（复制当前配置的设置，自动分配不冲突的端口）"""
+        name = simpledialog.askstring("新建配置", "配置名称（字母、数字、下划线）：", parent=self.root)
+        if not name:
+            return
+        try:
+            self.profiles.create(name, copy_from=self.profiles.active)
+        except DeployError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        self.profile_box.configure(values=self.profiles.names())
+        self.profile_var.set(name)
+        self.switch_profile(name)
+        self.log_deploy(f"✅ 已创建配置 {name}，请设置安装路径后开始部署")
+    
+    def delete_profile(self):
+        """删除当前以外的配置"""
+        others = [name for name in self.profiles.names() if name not in (self.profiles.active, ProfileManager.DEFAULT_PROFILE)]
+        if not others:
+            messagebox.showinfo("提示", "没有可以删除的配置（默认配置和当前配置不能删除）")
+            return
+        name = simpledialog.askstring("删除配置", f"输入要删除的配置名称：\n{', '.join(others)}", parent=self.root)
+        if not name:
+            return
+        if name not in others:
+            messagebox.showerror("错误", f"不能删除配置: {name}")
+            return
+        if messagebox.askyesno("确认", f"确定删除配置 {name} 吗？\n只删除配置记录，不会删除安装目录和数据"):
+            self.profiles.delete(name)
+            self.profile_box.configure(values=self.profiles.names())
+            self.update_profile_summary()
+    
     def create_deploy_page(self):
         """创建部署页面"""
         # 项目配置区域
@@ -173,6 +432,15 @@ class PandaDeployToolV2:
         self.conda_env_var = tk.StringVar(value=self.project_status.get_status("conda_env"))
         ttk.Entry(env_frame, textvariable=self.conda_env_var, width=20).pack(side=tk.LEFT, padx=5)
         
+        # 自动检查更新间隔
+        ttk.Label(env_frame, text="自动检查更新（分钟，0为关闭）：").pack(side=tk.LEFT, padx=(20, 0))
+        self.remote_interval_var = tk.StringVar(value=str(self.project_status.get_status("remote_watch_interval")))
+        interval_box = ttk.Spinbox(env_frame, from_=0, to=1440, increment=10, width=6,
+                                   textvariable=self.remote_interval_var, command=self.save_remote_watch_interval)
+        interval_box.pack(side=tk.LEFT, padx=5)
+        interval_box.bind("<Return>", lambda event: self.save_remote_watch_interval())
+        interval_box.bind("<FocusOut>", lambda event: self.save_remote_watch_interval())
+        
         # MongoDB路径
         mongodb_frame = ttk.Frame(config_frame)
         mongodb_frame.pack(fill=tk.X, pady=2)
@@ -181,6 +449,18 @@ class PandaDeployToolV2:
         ttk.Entry(mongodb_frame, textvariable=self.mongodb_path_var, width=50).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         ttk.Button(mongodb_frame, text="浏览", command=self.browse_mongodb_path).pack(side=tk.RIGHT)
         
+        # MongoDB数据目录和端口（多套配置同时运行时需要互不相同）
+        ports_frame = ttk.Frame(config_frame)
+        ports_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(ports_frame, text="数据目录：").pack(side=tk.LEFT)
+        self.mongodb_data_path_var = tk.StringVar(value=self.project_status.get_status("mongodb_data_path"))
+        ttk.Entry(ports_frame, textvariable=self.mongodb_data_path_var, width=30).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.port_vars = {}
+        for key, label in (("mongodb_port", "MongoDB端口"), ("factor_port", "Factor端口"), ("quantflow_port", "QuantFlow端口")):
+            ttk.Label(ports_frame, text=f"{label}：").pack(side=tk.LEFT, padx=(10, 0))
+            self.port_vars[key] = tk.StringVar(value=str(self.project_status.get_status(key)))
+            ttk.Entry(ports_frame, textvariable=self.port_vars[key], width=6).pack(side=tk.LEFT, padx=2)
+        
         # 部署状态区域
         status_frame = ttk.LabelFrame(self.deploy_frame, text="📊 部署状态", padding=10)
         status_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -198,6 +478,7 @@ class PandaDeployToolV2:
         ttk.Button(button_frame, text="🚀 开始部署", command=self.start_deployment, style='Deploy.TButton').pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="🔄 检查更新", command=self.check_git_updates).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="🗑️ 清除状态", command=self.clear_status).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="♻️ 恢复环境快照", command=self.restore_env_snapshot).pack(side=tk.LEFT, padx=5)
         
         # 进度条
         self.deploy_progress = ttk.Progressbar(self.deploy_frame, mode='determinate')
@@ -245,6 +526,25 @@ class PandaDeployToolV2:
         ttk.Button(button_frame, text="🌐 打开浏览器", command=self.open_browser).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="🔄 刷新状态", command=self.check_all_status).pack(side=tk.LEFT, padx=5)
         
+        # MongoDB数据快照（增量备份，可以一键回到之前的数据）
+        data_frame = ttk.LabelFrame(self.launch_frame, text="💾 数据快照", padding=10)
+        data_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Button(data_frame, text="📸 备份数据", command=self.create_data_snapshot).pack(side=tk.LEFT, padx=5)
+        self.data_snapshot_var = tk.StringVar()
+        self.data_snapshot_box = ttk.Combobox(data_frame, textvariable=self.data_snapshot_var, state='readonly', width=40)
+        self.data_snapshot_box.pack(side=tk.LEFT, padx=5)
+        ttk.Button(data_frame, text="⏪ 恢复到所选快照", command=self.restore_data_snapshot).pack(side=tk.LEFT, padx=5)
+        self.refresh_data_snapshots()
+        
+        # 启动性能：分析服务器启动时各模块的导入耗时（结果按提交保存）
+        perf_frame = ttk.LabelFrame(self.launch_frame, text="⏱️ 启动性能", padding=10)
+        perf_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Button(perf_frame, text="🔬 分析启动耗时", command=self.profile_startup).pack(side=tk.LEFT, padx=5)
+        ttk.Button(perf_frame, text="🏁 启动基准测试", command=self.benchmark_launch).pack(side=tk.LEFT, padx=5)
+        ttk.Label(perf_frame, text="需要先停止服务，结果显示在启动日志中", foreground='#666').pack(side=tk.LEFT, padx=5)
+        
         # 服务器状态
         server_frame = ttk.LabelFrame(self.launch_frame, text="🖥️ 服务器状态", padding=10)
         server_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -269,13 +569,13 @@ class PandaDeployToolV2:
         info_text = """
         📊 数据操作功能：
         • 数据更新：访问数据清理页面，管理和更新数据源
+        • 定时数据更新：在设置的低峰时间自动调用数据更新接口（失败自动重试）
         • 数据列表：查看当前系统中的所有数据列表
         • 超级图表：使用QuantFlow的可视化图表功能
         • 工作流：创建和管理QuantFlow量化工作流
         
         ⚠️ 注意：
-        • Factor功能需要服务器运行在 localhost:8111
-        • QuantFlow功能需要服务器运行在 localhost:8000
+        • Factor和QuantFlow功能需要对应的服务器正在运行（端口见当前配置，默认配置为8111和8000）
         """
         
         ttk.Label(info_frame, text=info_text, justify=tk.LEFT, font=('Arial', 10)).pack(anchor=tk.W)
@@ -387,6 +687,39 @@ class PandaDeployToolV2:
             foreground='#666'
         ).pack()
         
+        # 定时数据更新区域
+        data_hub_frame = ttk.LabelFrame(self.operations_frame, text="⏰ 定时数据更新（服务器就绪后在设置的时间调用更新接口）",
+                                        padding=10)
+        data_hub_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        self.data_hub_vars = {}
+        self.data_hub_labels = {}
+        for row, job in enumerate(get_data_hub_jobs(self.project_status)):
+            enabled_var = tk.BooleanVar()
+            time_var = tk.StringVar()
+            ttk.Checkbutton(data_hub_frame, text=job["title"], variable=enabled_var).grid(row=row, column=0, sticky=tk.W)
+            ttk.Label(data_hub_frame, text="每天").grid(row=row, column=1, padx=(10, 2))
+            ttk.Entry(data_hub_frame, textvariable=time_var, width=6).grid(row=row, column=2)
+            self.data_hub_labels[job["id"]] = ttk.Label(data_hub_frame, text="", foreground='#666')
+            self.data_hub_labels[job["id"]].grid(row=row, column=3, sticky=tk.W, padx=10)
+            self.data_hub_vars[job["id"]] = (enabled_var, time_var)
+        
+        data_hub_buttons = ttk.Frame(data_hub_frame)
+        data_hub_buttons.grid(row=len(self.data_hub_vars), column=0, columnspan=4, sticky=tk.W, pady=(5, 0))
+        ttk.Button(data_hub_buttons, text="💾 保存定时设置", command=self.save_data_hub_settings).pack(side=tk.LEFT, padx=5)
+        ttk.Button(data_hub_buttons, text="▶️ 立即更新", command=self.run_data_hub_now).pack(side=tk.LEFT, padx=5)
+        self.load_data_hub_settings()
+        
+        # 数据库诊断区域
+        advisor_frame = ttk.LabelFrame(self.operations_frame, text="🩺 数据库诊断（数据页面变慢时使用）", padding=10)
+        advisor_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        ttk.Button(advisor_frame, text="🔍 分析索引和慢查询", command=self.analyze_database).pack(side=tk.LEFT, padx=5)
+        ttk.Button(advisor_frame, text="⏱️ 开启慢查询记录", command=self.enable_profiler).pack(side=tk.LEFT, padx=5)
+        self.create_index_button = ttk.Button(advisor_frame, text="➕ 创建推荐索引", command=self.create_recommended_indexes,
+                                              state='disabled')
+        self.create_index_button.pack(side=tk.LEFT, padx=5)
+        
         # 服务器状态检查区域
         status_frame = ttk.LabelFrame(self.operations_frame, text="🔍 服务器状态", padding=10)
         status_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -408,9 +741,162 @@ class PandaDeployToolV2:
         
         self.operations_log = scrolledtext.ScrolledText(log_frame, height=8, wrap=tk.WORD, font=('Consolas', 9))
         self.operations_log.pack(fill=tk.BOTH, expand=True)
+    
+    def create_disk_page(self):
+        """创建磁盘占用页面"""
+        toolbar = ttk.Frame(self.disk_frame)
+        toolbar.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Button(toolbar, text="🔄 重新统计", command=self.refresh_disk_usage).pack(side=tk.LEFT)
+        self.disk_full_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text="完整统计（不使用目录缓存）", variable=self.disk_full_var).pack(side=tk.LEFT, padx=10)
+        self.disk_summary_var = tk.StringVar(value="")
+        ttk.Label(toolbar, textvariable=self.disk_summary_var).pack(side=tk.RIGHT)
+        
+        # 各位置的占用，展开后显示最大的子目录
+        usage_frame = ttk.LabelFrame(self.disk_frame, text="📊 磁盘占用", padding=10)
+        usage_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.disk_tree = ttk.Treeview(usage_frame, columns=("size", "files"), height=10)
+        self.disk_tree.heading("#0", text="位置")
+        self.disk_tree.heading("size", text="大小")
+        self.disk_tree.heading("files", text="文件数")
+        self.disk_tree.column("#0", width=520)
+        self.disk_tree.column("size", width=100, anchor=tk.E)
+        self.disk_tree.column("files", width=80, anchor=tk.E)
+        scrollbar = ttk.Scrollbar(usage_frame, orient=tk.VERTICAL, command=self.disk_tree.yview)
+        self.disk_tree.configure(yscrollcommand=scrollbar.set)
+        self.disk_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # 清理策略，每次统计后重新生成
+        self.disk_policy_frame = ttk.LabelFrame(self.disk_frame, text="🧹 一键清理（不影响正在运行的服务）", padding=10)
+        self.disk_policy_frame.pack(fill=tk.X, padx=10, pady=5)
+    
+    def refresh_disk_usage(self):
+        """在后台统计磁盘占用和各清理策略可以释放的空间"""
+        if self.disk_busy:
+            return
+        self.disk_busy = True
+        self.disk_summary_var.set("正在统计...")
+        footprint = DiskFootprint(self.project_status, log=lambda message: self.root.after(0, self.log_deploy, message),
+                                  profiles=self.profiles)
+        full = self.disk_full_var.get()
         
-        # 初始化时检查服务器状态
-        self.check_server_status()
+        def analyze():
+            try:
+                report = footprint.analyze(full=full)
+                plan = footprint.plan()
+                self.root.after(0, self.show_disk_usage, report, plan)
+            except Exception as e:
+                self.root.after(0, self.disk_summary_var.set, f"❌ 统计失败: {str(e)}")
+            finally:
+                self.disk_busy = False
+        
+        self.tasks.submit("disk_usage", analyze, key=("disk_usage", self.profiles.active))
+    
+    def show_disk_usage(self, report, plan):
+        """显示统计结果和清理策略"""
+        self.disk_tree.delete(*self.disk_tree.get_children())
+        for area in report["areas"]:
+            area_item = self.disk_tree.insert("", tk.END, text=area["title"], open=True,
+                                              values=(format_size(area["size"]), ""))
+            for entry in area["paths"]:
+                path_item = self.disk_tree.insert(area_item, tk.END, text=entry["path"],
+                                                  values=(format_size(entry["size"]), entry["files"]))
+                for name, size in entry["children"][:10]:
+                    self.disk_tree.insert(path_item, tk.END, text=name, values=(format_size(size), ""))
+        self.disk_summary_var.set(f"合计 {format_size(report['total'])}，统计 {report['dirs']} 个目录"
+                                  f"（重新列出 {report['rescanned']} 个），用时 {report['elapsed']:.2f} 秒")
+        
+        for widget in self.disk_policy_frame.winfo_children():
+            widget.destroy()
+        for row, item in enumerate(plan):
+            if item["blocked"]:
+                state_text = f"⏸️ {item['blocked']}"
+            else:
+                state_text = f"可释放 {format_size(item['size'])}"
+            ttk.Label(self.disk_policy_frame, text=item["title"], style='Status.TLabel').grid(
+                row=row, column=0, sticky=tk.W, pady=2)
+            ttk.Label(self.disk_policy_frame, text=state_text, width=24).grid(row=row, column=1, sticky=tk.W, padx=10)
+            ttk.Label(self.disk_policy_frame, text=item["description"], foreground='#666').grid(
+                row=row, column=2, sticky=tk.W)
+            button = ttk.Button(self.disk_policy_frame, text="🧹 清理",
+                                command=lambda item=item: self.prune_disk(item))
+            button.grid(row=row, column=3, padx=5)
+            if item["blocked"] or not item["size"]:
+                button.configure(state='disabled')
+        self.disk_policy_frame.columnconfigure(2, weight=1)
+    
+    def prune_disk(self, item):
+        """执行一个清理策略，完成后重新统计"""
+        if not messagebox.askyesno("确认", f"{item['title']}\n{item['description']}\n\n"
+                                           f"预计释放 {format_size(item['size'])}，确定继续吗？"):
+            return
+        footprint = DiskFootprint(self.project_status, log=lambda message: self.root.after(0, self.log_deploy, message),
+                                  profiles=self.profiles)
+        self.disk_summary_var.set(f"正在清理: {item['title']}...")
+        
+        def prune():
+            reclaimed = footprint.prune([item["id"]])
+            self.root.after(0, self.status_var.set, f"🧹 {item['title']}: 已释放 {format_size(reclaimed)}")
+            self.root.after(0, self.refresh_disk_usage)
+        
+        self.tasks.submit("disk_prune", prune, key=("disk_prune", item["id"]))
+    
+    def create_service_log_page(self):
+        """创建服务日志搜索页面"""
+        toolbar = ttk.Frame(self.service_log_frame)
+        toolbar.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Label(toolbar, text="搜索:").pack(side=tk.LEFT)
+        self.log_query_var = tk.StringVar()
+        query_entry = ttk.Entry(toolbar, textvariable=self.log_query_var, width=40)
+        query_entry.pack(side=tk.LEFT, padx=5)
+        query_entry.bind("<Return>", lambda event: self.search_service_logs())
+        self.log_service_var = tk.StringVar(value="全部")
+        ttk.Combobox(toolbar, textvariable=self.log_service_var, state="readonly", width=10,
+                     values=["全部", "mongodb", "factor", "quantflow"]).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="🔍 搜索", command=self.search_service_logs).pack(side=tk.LEFT, padx=5)
+        self.log_search_summary_var = tk.StringVar(value="")
+        ttk.Label(toolbar, textvariable=self.log_search_summary_var).pack(side=tk.RIGHT)
+        
+        result_frame = ttk.LabelFrame(self.service_log_frame, text="📄 匹配的日志（最新的在最下方）", padding=10)
+        result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.log_search_text = scrolledtext.ScrolledText(result_frame, wrap=tk.NONE, font=('Consolas', 9))
+        self.log_search_text.pack(fill=tk.BOTH, expand=True)
+    
+    def search_service_logs(self):
+        """在后台搜索服务日志，查询为空时显示最新的日志"""
+        log_dir = os.path.join(self.project_status.get_status("project_path"), "logs")
+        if self.log_searcher is None or self.log_searcher.log_dir != log_dir:
+            self.log_searcher = LogSearcher(log_dir)  # 保留已加载的索引，重复搜索不再读取
+        searcher = self.log_searcher
+        query = self.log_query_var.get().strip()
+        service = self.log_service_var.get()
+        services = None if service == "全部" else [service]
+        self.log_search_serial += 1
+        serial = self.log_search_serial
+        self.log_search_summary_var.set("正在搜索...")
+        
+        def search():
+            try:
+                result = searcher.search(query, services=services, limit=500)
+            except Exception as e:
+                self.root.after(0, self.log_search_summary_var.set, f"❌ 搜索失败: {str(e)}")
+                return
+            self.root.after(0, self.show_log_search_result, serial, result)
+        
+        self.tasks.submit("log_search", search, key=("log_search", log_dir, query, service))
+    
+    def show_log_search_result(self, serial, result):
+        """显示搜索结果，忽略已被新搜索取代的结果"""
+        if serial != self.log_search_serial:
+            return
+        self.log_search_text.delete(1.0, tk.END)
+        for name, line in reversed(result["matches"]):
+            self.log_search_text.insert(tk.END, f"[{name}] {line}\n")
+        self.log_search_text.see(tk.END)
+        self.log_search_summary_var.set(
+            f"{len(result['matches'])} 行，搜索 {result['segments']} 个日志文件，读取 {result['blocks_read']} 个数据块 "
+            f"{format_size(result['bytes_read'])}，用时 {result['elapsed'] * 1000:.0f} 毫秒")
     
     def create_status_bar(self):
         """创建状态栏"""
@@ -423,41 +909,175 @@ class PandaDeployToolV2:
         # 最后检查时间
         self.last_check_var = tk.StringVar()
         ttk.Label(self.status_bar, textvariable=self.last_check_var).pack(side=tk.RIGHT, padx=10, pady=5)
-    
-    def create_status_indicators(self):
-        """创建状态指示器"""
-        # 清除现有内容
-        for widget in self.deploy_status_frame.winfo_children():
-            widget.destroy()
         
-        steps = [
-            ("环境检查", "check_environment"),
-            ("创建目录", "create_directory"),
-            ("克隆项目", "clone_project"),
-            ("配置环境", "setup_conda_env"),
-            ("安装依赖", "install_dependencies"),
-            ("创建脚本", "create_scripts")
-        ]
+        # 远程更新提示，点击后执行完整的更新检查
+        self.remote_badge = ttk.Label(self.status_bar, text="", foreground='#d35400', cursor='hand2')
+        self.remote_badge.pack(side=tk.RIGHT, padx=10, pady=5)
+        self.remote_badge.bind("<Button-1>", lambda event: self.check_git_updates())
+        
+        # 后台任务数量，点击查看每类任务的等待和执行时间
+        self.task_summary_var = tk.StringVar()
+        task_label = ttk.Label(self.status_bar, textvariable=self.task_summary_var, foreground='#666', cursor='hand2')
+        task_label.pack(side=tk.RIGHT, padx=10, pady=5)
+        task_label.bind("<Button-1>", lambda event: self.show_task_stats())
+        
+        # 卡顿诊断开关：测量主循环延迟、保存卡顿时的调用栈、分析后台任务
+        self.diag_var = tk.StringVar(value="🩺 诊断: 关")
+        diag_label = ttk.Label(self.status_bar, textvariable=self.diag_var, foreground='#666', cursor='hand2')
+        diag_label.pack(side=tk.RIGHT, padx=10, pady=5)
+        diag_label.bind("<Button-1>", lambda event: self.toggle_diagnostics())
+        self.update_task_summary()
+    
+    def update_task_summary(self):
+        """每秒刷新状态栏中的后台任务数量"""
+        state = self.tasks.describe()
+        if state["running"] or state["pending"]:
+            self.task_summary_var.set(f"⚙️ 后台任务 {state['running']} 个执行中，{state['pending']} 个排队")
+        else:
+            self.task_summary_var.set("⚙️ 后台空闲")
+        self.root.after(1000, self.update_task_summary)
+    
+    def show_task_stats(self):
+        """显示后台任务的统计信息"""
+        state = self.tasks.describe()
+        lines = [f"线程 {state['workers']}/{self.tasks.max_workers}（快速检查 {state['quick_workers']}/"
+                 f"{self.tasks.quick_workers}），执行中 {state['running']}，排队 {state['pending']}", ""]
+        for name, stats in sorted(state["tasks"].items()):
+            lines.append(f"{name}: 执行 {stats['count']} 次，合并 {stats['coalesced']} 次，出错 {stats['errors']} 次，"
+                         f"平均等待 {stats['avg_wait'] * 1000:.0f} 毫秒，平均执行 {stats['avg_run']:.2f} 秒，"
+                         f"最长 {stats['max_run']:.2f} 秒")
+        messagebox.showinfo("后台任务", "\n".join(lines))
+    
+    def toggle_diagnostics(self):
+        """开启或关闭卡顿诊断，关闭时显示结果"""
+        if self.lag_monitor:
+            self.lag_monitor.stop()
+            self.tasks.profiler = None
+            self.show_diagnostics(self.lag_monitor, self.task_profiler)
+            self.lag_monitor = self.task_profiler = None
+            self.diag_var.set("🩺 诊断: 关")
+            return
         
-        completed_steps = self.project_status.get_status("completed_steps")
+        output_dir = os.path.join(self.project_status.get_status("project_path") or os.getcwd(), "profiles", "diag")
+        # 日志通过 after(0) 写入，log_deploy 中的 root.update() 不会在诊断回调中重入
+        self.lag_monitor = LoopLagMonitor(self.root, output_dir,
+                                          log=lambda message: self.root.after(0, self.log_deploy, message))
+        self.task_profiler = TaskProfiler(output_dir)
+        self.lag_monitor.start()
+        self.tasks.profiler = self.task_profiler
+        self.log_deploy(f"🩺 已开启卡顿诊断，卡顿时的调用栈和后台任务的分析结果保存在: {output_dir}")
+        self.update_diagnostics()
+    
+    def update_diagnostics(self):
+        """诊断开启时每秒刷新状态栏中的主循环延迟"""
+        if not self.lag_monitor:
+            return
+        summary = self.lag_monitor.summary()
+        self.diag_var.set(f"🩺 主循环延迟 {summary['current']:.0f}/{summary['p95']:.0f}/{summary['max']:.0f} 毫秒"
+                          f"（当前/P95/最大），卡顿 {len(summary['stalls'])} 次")
+        self.root.after(1000, self.update_diagnostics)
+    
+    def show_diagnostics(self, monitor, profiler):
+        """显示诊断结果：卡顿记录、在 root.update() 中执行回调的位置和最慢的后台任务"""
+        summary = monitor.summary()
+        lines = [f"最近一分钟主循环延迟: P95 {summary['p95']:.0f} 毫秒，最大 {summary['max']:.0f} 毫秒", ""]
+        for stall in summary["stalls"][-10:]:
+            lines.append(f"🐢 {stall['started_at']} 阻塞 {stall['duration']:.0f} 毫秒")
+        if summary["stalls"]:
+            lines.append(f"调用栈: {monitor.stall_log}")
+        if summary["reentrant"]:
+            lines.append("")
+            lines.append("在 root.update() 中执行的回调（重入）:")
+            for (filename, lineno, function), count in sorted(summary["reentrant"].items(), key=lambda item: -item[1])[:5]:
+                lines.append(f"  {filename}:{lineno} {function}: {count} 次")
+        if profiler.files:
+            lines.append("")
+            lines.append("后台任务分析（pstats）:")
+            slowest = sorted(profiler.files, key=lambda item: -item[1])
+            for name, elapsed, path in slowest[:5]:
+                lines.append(f"  {name}: {elapsed:.2f} 秒 {os.path.basename(path)}")
+            self.log_deploy(f"🔬 最慢的后台任务 {slowest[0][0]}:\n{describe_pstats(slowest[0][2])}")
+        messagebox.showinfo("卡顿诊断", "\n".join(lines))
+    
+    def update_remote_badge(self, updates):
+        """根据后台轮询结果显示或隐藏远程更新提示"""
+        description = describe_remote_updates(updates)
+        self.set_widget(self.remote_badge, text=f"🔔 有可用更新: {description}" if description else "")
+    
+    def save_remote_watch_interval(self):
+        """保存自动检查更新间隔并立即按新间隔检查一次"""
+        try:
+            interval = max(0.0, float(self.remote_interval_var.get()))
+        except ValueError:
+            self.remote_interval_var.set(str(self.project_status.get_status("remote_watch_interval")))
+            return
+        if interval != self.project_status.get_status("remote_watch_interval"):
+            self.project_status.update_status(remote_watch_interval=interval)
+            self.remote_watcher.poll_now()
+    
+    def create_status_indicators(self):
+        """创建状态指示器（只创建一次，之后由 refresh_views 更新）"""
+        self.step_icon_labels = {}
+        self.step_name_labels = {}
         
-        for i, (step_name, step_id) in enumerate(steps):
+        for i, (step_name, step_id) in enumerate(STATUS_STEPS):
             row = i // 3
             col = i % 3
             
             frame = ttk.Frame(self.deploy_status_frame)
             frame.grid(row=row, column=col, padx=10, pady=5, sticky='w')
             
+            self.step_icon_labels[step_id] = ttk.Label(frame, text="⭕", style='Warning.TLabel')
+            self.step_icon_labels[step_id].pack(side=tk.LEFT)
+            self.step_name_labels[step_id] = ttk.Label(frame, text=step_name, style='Status.TLabel')
+            self.step_name_labels[step_id].pack(side=tk.LEFT, padx=5)
+        
+        self.update_status_indicators()
+    
+    def update_status_indicators(self):
+        """根据已完成步骤和步骤遥测更新指示器"""
+        completed_steps = self.project_status.get_status("completed_steps")
+        telemetry = self.project_status.get_status("step_telemetry") or {}
+        
+        for step_name, step_id in STATUS_STEPS:
             # 状态指示器
             if step_id in completed_steps:
-                status_text = "✅"
-                style = 'Success.TLabel'
+                self.set_widget(self.step_icon_labels[step_id], text="✅", style='Success.TLabel')
+            elif step_id == self.current_step:
+                self.set_widget(self.step_icon_labels[step_id], text="🔄", style='Warning.TLabel')
             else:
-                status_text = "⭕"
-                style = 'Warning.TLabel'
+                self.set_widget(self.step_icon_labels[step_id], text="⭕", style='Warning.TLabel')
             
-            ttk.Label(frame, text=status_text, style=style).pack(side=tk.LEFT)
-            ttk.Label(frame, text=step_name, style='Status.TLabel').pack(side=tk.LEFT, padx=5)
+            # 耗时和重试次数
+            text = step_name
+            step_telemetry = telemetry.get(step_id)
+            if step_id in completed_steps and step_telemetry:
+                text += f" · {step_telemetry.get('duration', 0):.1f}s"
+                if step_telemetry.get("attempts", 0) > 1:
+                    text += f" · {step_telemetry['attempts']}次尝试"
+            self.set_widget(self.step_name_labels[step_id], text=text)
+    
+    def set_widget(self, widget, **options):
+        """只在值变化时重新配置控件"""
+        shown = self.widget_options.setdefault(str(widget), {})
+        changed = {key: value for key, value in options.items() if shown.get(key) != value}
+        if changed:
+            widget.configure(**changed)
+            shown.update(changed)
+    
+    def refresh_views(self):
+        """请求刷新状态指示器和项目信息，多次请求合并到一次Tk空闲回调中执行"""
+        if self.refresh_pending:
+            return
+        self.refresh_pending = True
+        self.root.after_idle(self._do_refresh_views)
+    
+    def _do_refresh_views(self):
+        """执行合并后的刷新"""
+        self.refresh_pending = False
+        self.update_status_indicators()
+        if "launch" in self.built_pages:
+            self.update_project_info()
     
     def create_env_status_indicators(self):
         """创建环境状态指示器"""
@@ -496,17 +1116,27 @@ class PandaDeployToolV2:
         self.mongodb_status_label.pack(side=tk.LEFT)
     
     def create_project_info(self):
-        """创建项目信息显示"""
-        # 清除现有内容
-        for widget in self.project_info_frame.winfo_children():
-            widget.destroy()
+        """创建项目信息显示（只创建一次，之后由 refresh_views 更新）"""
+        self.project_info_labels = {}
+        
+        for label, _ in self.get_project_info_items():
+            frame = ttk.Frame(self.project_info_frame)
+            frame.pack(fill=tk.X, pady=1)
+            
+            ttk.Label(frame, text=f"{label}:", style='Status.TLabel').pack(side=tk.LEFT)
+            self.project_info_labels[label] = ttk.Label(frame, text="", style='Status.TLabel')
+            self.project_info_labels[label].pack(side=tk.LEFT, padx=10)
         
+        self.update_project_info()
+    
+    def get_project_info_items(self):
+        """项目信息显示的内容"""
         # 获取项目实际路径
         base_path = self.project_status.get_status("project_path")
         actual_panda_factor_path = os.path.join(base_path, "panda_factor") if base_path else "未设置"
         actual_panda_quantflow_path = os.path.join(base_path, "panda_quantflow") if base_path else "未设置"
         
-        info_items = [
+        return [
             ("安装目录", base_path or "未设置"),
             ("项目factor路径", actual_panda_factor_path),
             ("项目QuantFlow路径", actual_panda_quantflow_path),
@@ -516,20 +1146,17 @@ class PandaDeployToolV2:
             ("最后更新", self.project_status.get_status("last_update")),
             ("Git提交", self.project_status.get_status("git_commit")[:8] if self.project_status.get_status("git_commit") else "未知")
         ]
-        
-        for i, (label, value) in enumerate(info_items):
-            frame = ttk.Frame(self.project_info_frame)
-            frame.pack(fill=tk.X, pady=1)
-            
-            ttk.Label(frame, text=f"{label}:", style='Status.TLabel').pack(side=tk.LEFT)
-            
+    
+    def update_project_info(self):
+        """更新项目信息中变化的字段"""
+        for label, value in self.get_project_info_items():
             # 根据内容设置不同颜色
             if label == "部署状态":
                 style = 'Success.TLabel' if value == "部署完成" else 'Warning.TLabel' if value == "部署中" else 'Error.TLabel'
             else:
                 style = 'Status.TLabel'
-                
-            ttk.Label(frame, text=value or "未设置", style=style).pack(side=tk.LEFT, padx=10)
+            
+            self.set_widget(self.project_info_labels[label], text=value or "未设置", style=style)
     
     def browse_project_path(self):
         """浏览项目路径"""
@@ -555,6 +1182,7 @@ class PandaDeployToolV2:
     
     def log_launch(self, message):
         """启动日志"""
+        self.ensure_page("launch")
         timestamp = time.strftime("%H:%M:%S")
         log_message = f"[{timestamp}] {message}\n"
         self.launch_log.insert(tk.END, log_message)
@@ -565,127 +1193,78 @@ class PandaDeployToolV2:
         """检查所有状态"""
         self.status_var.set("正在检查状态...")
         
-        # 在新线程中检查状态
-        thread = threading.Thread(target=self._check_status_thread)
-        thread.daemon = True
-        thread.start()
+        # 在后台检查状态，检查还没有完成时再次点击不会重复检查；部署等长任务占满线程池时也能立即执行
+        self.tasks.submit("check_status", self._check_status_thread, quick=True)
     
     def _check_status_thread(self):
-        """状态检查线程"""
+        """状态检查线程：所有配置一起并行检查，结果保存到各配置的缓存中"""
         try:
-            # 检查Git
-            git_ok = self.check_git_status()
-            
-            # 检查Conda
-            conda_ok = self.check_conda_status()
-            
-            # 检查Python环境
-            python_ok = self.check_python_env()
-            
-            # 检查项目文件
-            project_ok = self.check_project_files()
-            
-            # 检查MongoDB
-            mongodb_ok = self.check_mongodb_status()
+            active = self.profiles.active
+            overrides = {active: {
+                "project_path": self.project_status.get_status("project_path") or self.project_path_var.get(),
+                "mongodb_path": self.project_status.get_status("mongodb_path") or self.mongodb_path_var.get(),
+                "conda_env": self.conda_env_var.get(),
+            }}
+            results = self.profiles.sweep(overrides=overrides)
+            # 检查期间切换了配置时显示新配置的结果
+            result = results.get(self.profiles.active, results[active])
+            status = result["environment"]
+            self.env_drift = result["env_drift"]
+            self.startup_marks.setdefault("probes_done", time.perf_counter())
+            self.root.after(0, self.update_profile_summary)
             
             # 更新UI
-            self.root.after(0, self.update_status_ui, git_ok, conda_ok, python_ok, project_ok, mongodb_ok)
+            self.root.after(0, self.update_status_ui, status["git"], status["conda"], status["python_env"],
+                            status["project_files"], status["mongodb"])
             
             # 更新最后检查时间
             self.last_check_var.set(f"最后检查: {datetime.now().strftime('%H:%M:%S')}")
             
-            self.status_var.set("状态检查完成")
-            
+            if self.env_drift:
+                self.status_var.set(f"状态检查完成，Python环境与部署时不一致: {describe_env_drift(self.env_drift, limit=3)}")
+            else:
+                self.status_var.set("状态检查完成")
+        
         except Exception as e:
             error_msg = f"状态检查失败: {str(e)}"
             self.root.after(0, lambda: self.status_var.set(error_msg))
     
-    def check_git_status(self):
-        """检查Git状态"""
-        try:
-            result = subprocess.run(['git', '--version'], capture_output=True, text=True)
-            return result.returncode == 0
-        except:
-            return False
-    
-    def check_conda_status(self):
-        """检查Conda状态"""
-        try:
-            result = subprocess.run(['conda', '--version'], capture_output=True, text=True)
-            return result.returncode == 0
-        except:
-            return False
-    
-    def check_python_env(self):
-        """检查Python环境"""
-        env_name = self.conda_env_var.get()
-        if not env_name:
-            return False
-        
-        try:
-            result = subprocess.run(['conda', 'env', 'list'], capture_output=True, text=True)
-            return env_name in result.stdout
-        except:
-            return False
-    
-    def check_project_files(self):
-        """检查项目文件"""
-        # 从状态文件获取项目路径
-        base_path = self.project_status.get_status("project_path")
-        if not base_path:
-            base_path = self.project_path_var.get()
-        
-        if not base_path or not os.path.exists(base_path):
-            return False
-        
-        # 实际项目路径应该是 base_path/panda_factor
-        project_path = os.path.join(base_path, "panda_factor")
-        if not os.path.exists(project_path):
-            return False
-        
-        # 检查关键文件
-        server_path1 = os.path.join(project_path, "panda_factor_server", "panda_factor_server", "__main__.py")
-        server_path2 = os.path.join(project_path, "panda_factor_server", "__main__.py")
-        
-        return os.path.exists(server_path1) or os.path.exists(server_path2)
-    
-    def check_mongodb_status(self):
-        """检查MongoDB状态"""
-        mongodb_path = self.project_status.get_status("mongodb_path")
-        if not mongodb_path:
-            mongodb_path = self.mongodb_path_var.get()
-        
-        if not mongodb_path or not os.path.exists(mongodb_path):
-            return False
-        
-        # 检查MongoDB可执行文件
-        mongod_path = os.path.join(mongodb_path, "bin", "mongod.exe")
-        mongo_path = os.path.join(mongodb_path, "bin", "mongo.exe")
-        mongosh_path = os.path.join(mongodb_path, "bin", "mongosh.exe")
-        
-        return os.path.exists(mongod_path) and (os.path.exists(mongo_path) or os.path.exists(mongosh_path))
+    def save_probe_cache(self, **results):
+        """保存检查结果，下次启动时立即显示"""
+        cache = dict(self.project_status.get_status("probe_cache") or {})
+        cache.update(results)
+        cache["checked_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.project_status.update_status(probe_cache=cache)
     
     def update_status_ui(self, git_ok, conda_ok, python_ok, project_ok, mongodb_ok):
         """更新状态UI"""
+        self.env_status = (git_ok, conda_ok, python_ok, project_ok, mongodb_ok)
+        if "launch" not in self.built_pages:
+            return
+        
         # 更新环境状态指示器
-        self.git_status_label.config(text="✅ Git" if git_ok else "❌ Git", 
-                                    style='Success.TLabel' if git_ok else 'Error.TLabel')
+        self.set_widget(self.git_status_label, text="✅ Git" if git_ok else "❌ Git",
+                       style='Success.TLabel' if git_ok else 'Error.TLabel')
         
-        self.conda_status_label.config(text="✅ Conda" if conda_ok else "❌ Conda",
-                                     style='Success.TLabel' if conda_ok else 'Error.TLabel')
+        self.set_widget(self.conda_status_label, text="✅ Conda" if conda_ok else "❌ Conda",
+                       style='Success.TLabel' if conda_ok else 'Error.TLabel')
         
-        self.python_status_label.config(text="✅ Python环境" if python_ok else "❌ Python环境",
-                                      style='Success.TLabel' if python_ok else 'Error.TLabel')
+        if python_ok and self.env_drift:
+            # 手动安装或升级过包，仍然可以启动
+            self.set_widget(self.python_status_label, text="⚠️ Python环境（已变化）", style='Warning.TLabel')
+        else:
+            self.set_widget(self.python_status_label, text="✅ Python环境" if python_ok else "❌ Python环境",
+                           style='Success.TLabel' if python_ok else 'Error.TLabel')
         
-        self.project_status_label.config(text="✅ 项目文件" if project_ok else "❌ 项目文件",
-                                       style='Success.TLabel' if project_ok else 'Error.TLabel')
+        self.set_widget(self.project_status_label, text="✅ 项目文件" if project_ok else "❌ 项目文件",
+                       style='Success.TLabel' if project_ok else 'Error.TLabel')
         
-        self.mongodb_status_label.config(text="✅ MongoDB" if mongodb_ok else "❌ MongoDB",
-                                       style='Success.TLabel' if mongodb_ok else 'Error.TLabel')
+        self.set_widget(self.mongodb_status_label, text="✅ MongoDB" if mongodb_ok else "❌ MongoDB",
+                       style='Success.TLabel' if mongodb_ok else 'Error.TLabel')
         
         # 更新启动按钮状态
         can_launch = all([git_ok, conda_ok, python_ok, project_ok, mongodb_ok])
-        self.launch_button.config(state='normal' if can_launch else 'disabled')
+        self.set_widget(self.launch_button, state='normal' if can_launch else 'disabled')
     
     def check_git_updates(self):
         """检查Git更新"""
@@ -694,135 +1273,31 @@ class PandaDeployToolV2:
         if not base_path:
             base_path = self.project_path_var.get()
         
-        if not base_path or not os.path.exists(base_path):
-            messagebox.showerror("错误", "项目路径不存在")
-            return
-        
-        # 实际的Git仓库路径应该是 base_path/panda_factor
-        panda_factor_path = os.path.join(base_path, "panda_factor")
-        
-        if not os.path.exists(panda_factor_path):
-            messagebox.showerror("错误", f"PandaFactor项目目录不存在: {panda_factor_path}")
-            return
-        
-        # 检查是否是Git仓库
-        git_dir = os.path.join(panda_factor_path, ".git")
-        if not os.path.exists(git_dir):
-            messagebox.showerror("错误", f"目录不是Git仓库: {panda_factor_path}")
+        try:
+            get_update_targets(base_path)
+        except DeployError as e:
+            messagebox.showerror("错误", str(e))
             return
         
-        self.log_deploy("检查Git更新...")
-        self.log_deploy(f"检查路径: {panda_factor_path}")
+        def log(message):
+            self.root.after(0, self.log_deploy, message)
         
-        def check_updates():
+        def check_updates_thread():
             try:
-                # 获取远程更新
-                self.root.after(0, lambda: self.log_deploy("正在获取远程更新..."))
-                result = subprocess.run(['git', 'fetch'], cwd=panda_factor_path, capture_output=True, text=True)
-                if result.returncode != 0:
-                    error_msg = f"获取远程更新失败: {result.stderr}"
-                    self.root.after(0, lambda: self.log_deploy(error_msg))
+                result = check_updates(base_path, self.project_status, log=log)
+                if result is None:
                     return
                 
-                # 检查是否有更新
-                self.root.after(0, lambda: self.log_deploy("检查本地与远程版本差异..."))
-                result = subprocess.run(['git', 'status', '-uno'], cwd=panda_factor_path, capture_output=True, text=True)
-                if "behind" in result.stdout:
-                    self.root.after(0, lambda: self.log_deploy("发现新版本，可以更新"))
-                    # 获取最新提交信息
-                    result = subprocess.run(['git', 'log', 'HEAD..origin/main', '--oneline'], 
-                                          cwd=panda_factor_path, capture_output=True, text=True)
-                    if result.stdout:
-                        update_content = f"更新内容:\n{result.stdout}"
-                        self.root.after(0, lambda: self.log_deploy(update_content))
-                else:
-                    self.root.after(0, lambda: self.log_deploy("项目已是最新版本"))
-                
-                # 获取当前提交信息并更新状态
-                self.root.after(0, lambda: self.log_deploy("获取当前版本信息..."))
-                result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=panda_factor_path, capture_output=True, text=True)
-                if result.returncode == 0:
-                    commit = result.stdout.strip()
-                    # 获取提交的简短描述
-                    desc_result = subprocess.run(['git', 'log', '-1', '--oneline'], cwd=panda_factor_path, capture_output=True, text=True)
-                    commit_desc = desc_result.stdout.strip() if desc_result.returncode == 0 else "未知"
-                    
-                    # 更新项目状态
-                    self.project_status.update_status(
-                        git_commit=commit,
-                        project_path=base_path,  # 确保路径被保存
-                        last_update=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    )
-                    
-                    self.root.after(0, lambda: self.log_deploy(f"✅ 当前版本: {commit[:8]} - {commit_desc}"))
-                    self.root.after(0, lambda: self.log_deploy("✅ 项目状态已更新到 project_status.json"))
-                    
-                    # 刷新UI显示
-                    self.root.after(0, self.create_project_info)
-                else:
-                    self.root.after(0, lambda: self.log_deploy("⚠️ 无法获取当前版本信息"))
-                
-                # 同时检查QuantFlow的更新（如果存在）
-                panda_quantflow_path = os.path.join(base_path, "panda_quantflow")
-                if os.path.exists(panda_quantflow_path) and os.path.exists(os.path.join(panda_quantflow_path, ".git")):
-                    self.root.after(0, lambda: self.log_deploy("检查QuantFlow更新..."))
-                    
-                    # 获取QuantFlow远程更新
-                    result = subprocess.run(['git', 'fetch'], cwd=panda_quantflow_path, capture_output=True, text=True)
-                    if result.returncode == 0:
-                        # 检查QuantFlow是否有更新
-                        status_result = subprocess.run(['git', 'status', '-uno'], cwd=panda_quantflow_path, capture_output=True, text=True)
-                        if "behind" in status_result.stdout:
-                            self.root.after(0, lambda: self.log_deploy("📦 QuantFlow发现新版本"))
-                        else:
-                            self.root.after(0, lambda: self.log_deploy("✅ QuantFlow已是最新版本"))
-                        
-                        # 获取QuantFlow当前提交
-                        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=panda_quantflow_path, capture_output=True, text=True)
-                        if result.returncode == 0:
-                            quantflow_commit = result.stdout.strip()
-                            # 获取提交描述
-                            desc_result = subprocess.run(['git', 'log', '-1', '--oneline'], cwd=panda_quantflow_path, capture_output=True, text=True)
-                            quantflow_desc = desc_result.stdout.strip() if desc_result.returncode == 0 else "未知"
-                            
-                            self.project_status.update_status(quantflow_commit=quantflow_commit)
-                            self.root.after(0, lambda: self.log_deploy(f"✅ QuantFlow版本: {quantflow_commit[:8]} - {quantflow_desc}"))
-                    else:
-                        self.root.after(0, lambda: self.log_deploy("⚠️ QuantFlow更新检查失败"))
-                else:
-                    self.root.after(0, lambda: self.log_deploy("ℹ️ 未找到QuantFlow项目，跳过检查"))
-                
-                # 检查完成
-                self.root.after(0, lambda: self.log_deploy(""))
-                self.root.after(0, lambda: self.log_deploy("🎉 Git更新检查完成！"))
-                
-                # 智能检查部署状态（不仅检查状态文件，还检查实际项目文件）
-                deployment_status = self.project_status.get_status("deployment_status")
-                
-                # 实际检查项目文件是否存在
-                actual_deployed = False
-                if base_path and os.path.exists(base_path):
-                    factor_path = os.path.join(base_path, "panda_factor")
-                    if os.path.exists(factor_path):
-                        # 检查关键文件
-                        server_path1 = os.path.join(factor_path, "panda_factor_server", "panda_factor_server", "__main__.py")
-                        server_path2 = os.path.join(factor_path, "panda_factor_server", "__main__.py")
-                        if os.path.exists(server_path1) or os.path.exists(server_path2):
-                            actual_deployed = True
+                # 刷新UI显示
+                self.refresh_views()
                 
-                # 如果实际已部署但状态文件显示未部署，更新状态
-                if actual_deployed and deployment_status != "completed":
-                    self.root.after(0, lambda: self.log_deploy("🔍 检测到项目已手动部署，更新状态..."))
-                    self.project_status.update_status(deployment_status="completed")
-                    deployment_status = "completed"
-                
-                if actual_deployed or deployment_status == "completed":
-                    self.root.after(0, lambda: self.log_deploy("✅ 项目已完成部署，可以直接启动！"))
-                    self.root.after(0, lambda: self.log_deploy("💡 提示：切换到'🚀 项目启动'页面点击'启动项目'按钮"))
+                if result["deployed"]:
+                    log("✅ 项目已完成部署，可以直接启动！")
+                    log("💡 提示：切换到'🚀 项目启动'页面点击'启动项目'按钮")
                     
                     # 提供用户选项
                     def show_completion_options():
-                        result = messagebox.askyesnocancel(
+                        answer = messagebox.askyesnocancel(
                             "检查完成", 
                             "🎉 Git更新检查完成！\n\n项目已完成部署，你可以选择：\n\n" +
                             "• 点击'是' - 切换到启动页面\n" +
@@ -831,28 +1306,26 @@ class PandaDeployToolV2:
                             icon='question'
                         )
                         
-                        if result is True:  # 是 - 切换到启动页面
+                        if answer is True:  # 是 - 切换到启动页面
                             self.notebook.select(1)
-                        elif result is None:  # 取消 - 直接启动项目
+                        elif answer is None:  # 取消 - 直接启动项目
                             self.notebook.select(1)  # 先切换到启动页面
                             self.root.after(500, self.launch_project)  # 然后启动项目
-                        # result is False - 否 - 什么都不做，留在当前页面
+                        # answer is False - 否 - 什么都不做，留在当前页面
                     
                     self.root.after(1000, show_completion_options)  # 延迟1秒后显示选项
                 else:
-                    self.root.after(0, lambda: self.log_deploy("💡 提示：请先完成项目部署，然后再启动服务"))
+                    log("💡 提示：请先完成项目部署，然后再启动服务")
                 
                 # 刷新状态检查，确保启动按钮可用
                 self.root.after(100, self.check_all_status)
-                    
+                self.remote_watcher.poll_now()
+            
             except Exception as e:
-                error_msg = f"检查更新失败: {str(e)}"
-                self.root.after(0, lambda: self.log_deploy(error_msg))
-                self.root.after(0, lambda: self.log_deploy("❌ 更新检查过程中出现错误"))
+                log(f"检查更新失败: {str(e)}")
+                log("❌ 更新检查过程中出现错误")
         
-        thread = threading.Thread(target=check_updates)
-        thread.daemon = True
-        thread.start()
+        self.tasks.submit("check_updates", check_updates_thread, key=("check_updates", base_path))
     
     def start_deployment(self):
         """开始部署"""
@@ -869,14 +1342,23 @@ class PandaDeployToolV2:
             messagebox.showerror("错误", "请设置Git仓库地址")
             return
         
+        ports = {key: var.get().strip() for key, var in self.port_vars.items()}
+        if not all(port.isdigit() and 0 < int(port) < 65536 for port in ports.values()):
+            messagebox.showerror("错误", "端口必须是1-65535之间的数字")
+            return
+        
         # 保存配置
         self.project_status.update_status(
             project_path=self.project_path_var.get(),
             conda_env=self.conda_env_var.get(),
             git_url=self.git_url_var.get(),
+            quantflow_git_url=self.quantflow_git_url_var.get(),
             mongodb_path=self.mongodb_path_var.get(),
+            mongodb_data_path=self.mongodb_data_path_var.get(),
+            **{key: int(port) for key, port in ports.items()},
             deployment_status="in_progress"
         )
+        self.refresh_views()
         
         # 禁用部署按钮
         for widget in self.deploy_frame.winfo_children():
@@ -886,239 +1368,48 @@ class PandaDeployToolV2:
                         child.config(state='disabled')
         
         # 在新线程中执行部署
-        thread = threading.Thread(target=self.deploy_process)
-        thread.daemon = True
-        thread.start()
+        self.deploy_thread = threading.Thread(target=self.deploy_process)
+        self.deploy_thread.daemon = True
+        self.deploy_thread.start()
+    
+    def restore_env_snapshot(self):
+        """选择环境快照并恢复Conda环境（用于回滚或在新电脑上快速部署）"""
+        snapshots = EnvSnapshotManager(self.project_status, log=lambda message: self.root.after(0, self.log_deploy, message))
+        initial_dir = snapshots.snapshot_dir if os.path.isdir(snapshots.snapshot_dir) else None
+        archive = filedialog.askopenfilename(title="选择环境快照", initialdir=initial_dir,
+                                             filetypes=[("环境快照", "*.tar.gz"), ("所有文件", "*.*")])
+        if not archive:
+            return
+        env_name = self.project_status.get_status("conda_env")
+        if not messagebox.askyesno("确认", f"将用快照替换Conda环境 {env_name}\n\n请先停止正在运行的服务，确定继续吗？"):
+            return
+        
+        def restore():
+            try:
+                snapshots.restore(archive)
+                self.root.after(0, self.check_all_status)
+            except DeployError as e:
+                self.root.after(0, messagebox.showerror, "恢复失败", str(e))
+        
+        self.tasks.submit("env_snapshot_restore", restore)
     
     def deploy_process(self):
         """部署过程"""
+        def set_progress(value):
+            self.deploy_progress['value'] = value
+        
+        pipeline = DeployPipeline(
+            self.project_status,
+            log=self.log_deploy,
+            progress=set_progress,
+            on_steps_changed=lambda: self.on_pipeline_step_changed(pipeline)
+        )
         try:
-            self.log_deploy("🚀 开始部署PandaAI工具...")
-            self.deploy_progress['value'] = 0
-            
-            # 获取配置
-            project_path = self.project_path_var.get()
-            env_name = self.conda_env_var.get()
-            git_url = self.git_url_var.get()
-            
-            # 加载已完成步骤
-            completed_steps = self.project_status.get_status("completed_steps")
-            
-            if completed_steps:
-                self.log_deploy("🔄 检测到之前的部署进度，将继续之前的部署...")
-                self.log_deploy(f"✅ 已完成步骤: {', '.join(completed_steps)}")
-            
-            # 步骤1: 检查环境
-            if not self.is_step_completed("check_environment", completed_steps):
-                self.log_deploy("📋 步骤1: 检查环境...")
-                if not self.check_environment_v2():
-                    self.log_deploy("❌ 环境检查失败，请先安装Git和Conda")
-                    return
-                completed_steps.append("check_environment")
-                self.update_completed_steps(completed_steps)
-            else:
-                self.log_deploy("✅ 步骤1: 环境检查 (已完成)")
-            self.deploy_progress['value'] = 15
-            
-            # 步骤2: 创建安装目录
-            if not self.is_step_completed("create_directory", completed_steps):
-                self.log_deploy("📋 步骤2: 创建安装目录...")
-                os.makedirs(project_path, exist_ok=True)
-                self.log_deploy(f"✅ 安装目录已创建: {project_path}")
-                completed_steps.append("create_directory")
-                self.update_completed_steps(completed_steps)
-            else:
-                self.log_deploy("✅ 步骤2: 创建安装目录 (已完成)")
-            self.deploy_progress['value'] = 30
-            
-            # 步骤3: 克隆项目
-            if not self.is_step_completed("clone_project", completed_steps):
-                self.log_deploy("📋 步骤3: 下载PandaFactor项目...")
-                panda_factor_path = os.path.join(project_path, "panda_factor")
-                
-                if os.path.exists(panda_factor_path):
-                    self.log_deploy("⚠️ 项目目录已存在，将更新项目...")
-                    if not self.run_command_v2("git pull", cwd=panda_factor_path):
-                        self.log_deploy("❌ 项目更新失败")
-                        return
-                else:
-                    clone_command = f'git clone "{git_url}" "{panda_factor_path}"'
-                    if not self.run_command_v2(clone_command):
-                        self.log_deploy("❌ 项目下载失败")
-                        return
-                
-                completed_steps.append("clone_project")
-                self.update_completed_steps(completed_steps)
-            else:
-                self.log_deploy("✅ 步骤3: 下载PandaFactor项目 (已完成)")
-                panda_factor_path = os.path.join(project_path, "panda_factor")
-            self.deploy_progress['value'] = 50
-            
-            # 步骤4: 创建或激活Conda环境
-            if not self.is_step_completed("setup_conda_env", completed_steps):
-                self.log_deploy("📋 步骤4: 配置Conda环境...")
-                
-                # 检查环境是否存在
-                result = subprocess.run(['conda', 'env', 'list'], capture_output=True, text=True)
-                if env_name not in result.stdout:
-                    self.log_deploy(f"🔧 创建Conda环境: {env_name}")
-                    create_env_command = f'conda create -n {env_name} python=3.12 -y'
-                    if not self.run_command_v2(create_env_command):
-                        self.log_deploy("❌ 环境创建失败")
-                        return
-                else:
-                    self.log_deploy(f"✅ Conda环境 '{env_name}' 已存在")
-                
-                completed_steps.append("setup_conda_env")
-                self.update_completed_steps(completed_steps)
-            else:
-                self.log_deploy("✅ 步骤4: 配置Conda环境 (已完成)")
-            self.deploy_progress['value'] = 65
+            if not pipeline.run():
+                if pipeline.error:
+                    messagebox.showerror("部署失败", f"部署过程中出现错误:\n{pipeline.error}")
+                return
             
-            # 步骤5: 安装依赖
-            if not self.is_step_completed("install_dependencies", completed_steps):
-                self.log_deploy("📋 步骤5: 安装项目依赖...")
-                requirements_path = os.path.join(panda_factor_path, "requirements.txt")
-                
-                if os.path.exists(requirements_path):
-                    # 激活环境并安装依赖
-                    if os.name == 'nt':  # Windows
-                        activate_command = f'conda activate {env_name} && pip install -r "{requirements_path}" --ignore-installed'
-                    else:  # Linux/Mac
-                        activate_command = f'source activate {env_name} && pip install -r "{requirements_path}" --ignore-installed'
-                    
-                    if not self.run_command_v2(activate_command, cwd=panda_factor_path):
-                        self.log_deploy("⚠️ 部分依赖安装失败，但继续部署...")
-                        self.log_deploy("💡 提示: 你可以稍后手动安装缺失的依赖包")
-                    
-                    # 安装所有子模块为可编辑包（按照官方文档的正确方式）
-                    self.log_deploy("🔧 安装项目子模块为可编辑包...")
-                    submodules = [
-                        "./panda_common",
-                        "./panda_factor", 
-                        "./panda_data",
-                        "./panda_data_hub",
-                        "./panda_llm",
-                        "./panda_factor_server"
-                    ]
-                    
-                    # 检查子模块是否存在
-                    existing_submodules = []
-                    for submodule in submodules:
-                        submodule_path = os.path.join(panda_factor_path, submodule.replace("./", ""))
-                        if os.path.exists(submodule_path):
-                            existing_submodules.append(submodule)
-                            self.log_deploy(f"✅ 找到子模块: {submodule}")
-                        else:
-                            self.log_deploy(f"⚠️ 子模块目录不存在: {submodule}")
-                    
-                    if existing_submodules:
-                        # 使用官方文档推荐的安装方式：一次性安装所有子模块
-                        submodules_str = " ".join(existing_submodules)
-                        self.log_deploy(f"📦 安装子模块: {submodules_str}")
-                        
-                        if os.name == 'nt':  # Windows
-                            install_command = f'conda activate {env_name} && pip install -e {submodules_str}'
-                        else:  # Linux/Mac
-                            install_command = f'source activate {env_name} && pip install -e {submodules_str}'
-                        
-                        if not self.run_command_v2(install_command, cwd=panda_factor_path):
-                            self.log_deploy("⚠️ 部分子模块安装失败，但继续部署...")
-                            self.log_deploy("💡 这可能导致模块导入问题，可以手动执行安装")
-                    else:
-                        self.log_deploy("⚠️ 未找到任何子模块目录")
-                    
-                    completed_steps.append("install_dependencies")
-                    self.update_completed_steps(completed_steps)
-                else:
-                    self.log_deploy("⚠️ 未找到requirements.txt文件")
-                    completed_steps.append("install_dependencies")
-                    self.update_completed_steps(completed_steps)
-            else:
-                self.log_deploy("✅ 步骤5: 安装项目依赖 (已完成)")
-            self.deploy_progress['value'] = 70
-            
-            # 步骤6: 部署QuantFlow
-            if not self.is_step_completed("deploy_quantflow", completed_steps):
-                self.log_deploy("📋 步骤6: 部署PandaQuantFlow...")
-                
-                # 保存quantflow git url
-                quantflow_git_url = self.quantflow_git_url_var.get()
-                if quantflow_git_url:
-                    self.project_status.update_status(quantflow_git_url=quantflow_git_url)
-                    
-                    # 克隆或更新quantflow
-                    quantflow_path = os.path.join(project_path, "panda_quantflow")
-                    
-                    if os.path.exists(quantflow_path):
-                        self.log_deploy("🔄 更新QuantFlow仓库...")
-                        git_pull_command = "git pull"
-                        if not self.run_command_v2(git_pull_command, cwd=quantflow_path):
-                            self.log_deploy("⚠️ QuantFlow更新失败，但继续部署...")
-                    else:
-                        self.log_deploy("📥 克隆QuantFlow仓库...")
-                        git_clone_command = f'git clone "{quantflow_git_url}" panda_quantflow'
-                        if not self.run_command_v2(git_clone_command, cwd=project_path):
-                            self.log_deploy("❌ QuantFlow克隆失败")
-                            raise Exception("QuantFlow克隆失败")
-                    
-                    # 安装quantflow
-                    if os.path.exists(quantflow_path):
-                        self.log_deploy("🔧 安装QuantFlow...")
-                        if os.name == 'nt':  # Windows
-                            quantflow_install_command = f'conda activate {env_name} && pip install -e .'
-                        else:  # Linux/Mac
-                            quantflow_install_command = f'source activate {env_name} && pip install -e .'
-                        
-                        if not self.run_command_v2(quantflow_install_command, cwd=quantflow_path):
-                            self.log_deploy("⚠️ QuantFlow安装失败，但继续部署...")
-                            self.log_deploy("💡 你可以稍后手动安装: pip install -e .")
-                        else:
-                            self.log_deploy("✅ QuantFlow安装完成")
-                    
-                    completed_steps.append("deploy_quantflow")
-                    self.update_completed_steps(completed_steps)
-                else:
-                    self.log_deploy("⚠️ 跳过QuantFlow部署（未配置Git地址）")
-                    completed_steps.append("deploy_quantflow")
-                    self.update_completed_steps(completed_steps)
-            else:
-                self.log_deploy("✅ 步骤6: 部署PandaQuantFlow (已完成)")
-            self.deploy_progress['value'] = 85
-            
-            # 步骤7: 完成部署
-            if not self.is_step_completed("create_scripts", completed_steps):
-                self.log_deploy("📋 步骤7: 完成部署配置...")
-                
-                # 创建启动脚本
-                self.create_startup_scripts_v2(project_path, panda_factor_path, env_name)
-                
-                completed_steps.append("create_scripts")
-                self.update_completed_steps(completed_steps)
-            else:
-                self.log_deploy("✅ 步骤7: 完成部署配置 (已完成)")
-            
-            self.deploy_progress['value'] = 100
-            
-            # 部署完成
-            self.project_status.update_status(
-                deployment_status="completed",
-                last_update=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                completed_steps=completed_steps
-            )
-            
-            # 获取Git提交信息
-            try:
-                result = subprocess.run(['git', 'rev-parse', 'HEAD'], 
-                                      cwd=panda_factor_path, capture_output=True, text=True)
-                if result.returncode == 0:
-                    self.project_status.update_status(git_commit=result.stdout.strip())
-            except:
-                pass
-            
-            self.log_deploy("🎉 部署完成！")
-            self.log_deploy(f"📁 项目位置: {panda_factor_path}")
-            self.log_deploy(f"🐍 Conda环境: {env_name}")
             self.log_deploy("")
             self.log_deploy("🚀 快速开始:")
             self.log_deploy("1. 切换到 '🚀 项目启动' 页面")
@@ -1126,20 +1417,20 @@ class PandaDeployToolV2:
             self.log_deploy("3. 系统会自动打开浏览器访问项目界面")
             
             # 更新UI
-            self.root.after(0, self.create_status_indicators)
-            self.root.after(0, self.create_project_info)
-            
-            messagebox.showinfo("部署完成", f"PandaAI工具部署成功！\n\n项目位置: {panda_factor_path}\nConda环境: {env_name}")
+            self.refresh_views()
+            self.remote_watcher.poll_now()
             
-        except Exception as e:
-            self.log_deploy(f"❌ 部署过程中出现错误: {str(e)}")
-            self.project_status.update_status(deployment_status="failed")
-            messagebox.showerror("部署失败", f"部署过程中出现错误:\n{str(e)}")
+            messagebox.showinfo("部署完成", f"PandaAI工具部署成功！\n\n项目位置: {pipeline.factor_path}\nConda环境: {pipeline.env_name}")
         
         finally:
             # 重新启用部署按钮
             self.root.after(0, self.enable_deploy_button)
     
+    def on_pipeline_step_changed(self, pipeline):
+        """部署步骤开始或完成时刷新指示器"""
+        self.current_step = pipeline.current_step
+        self.refresh_views()
+    
     def launch_project(self):
         """启动项目"""
         # 从状态文件读取配置
@@ -1166,196 +1457,122 @@ class PandaDeployToolV2:
             return
         
         self.log_launch("启动项目...")
+        supervisor = ServiceSupervisor(self.project_status, log=lambda message: self.root.after(0, self.log_launch, message))
         
         def launch():
             try:
-                # 项目实际路径
-                panda_factor_path = os.path.join(project_path, "panda_factor")
-                panda_quantflow_path = os.path.join(project_path, "panda_quantflow")
-                mongodb_path = self.project_status.get_status("mongodb_path")
-                
-                # 检查MongoDB路径
-                if not mongodb_path or not os.path.exists(mongodb_path):
-                    self.root.after(0, lambda: self.log_launch("❌ MongoDB路径未配置或不存在"))
-                    return
-                
-                # 检查Factor服务器文件
-                server_path1 = os.path.join(panda_factor_path, "panda_factor_server", "panda_factor_server", "__main__.py")
-                server_path2 = os.path.join(panda_factor_path, "panda_factor_server", "__main__.py")
-                
-                if os.path.exists(server_path1):
-                    start_factor_command = "python ./panda_factor_server/panda_factor_server/__main__.py"
-                    self.root.after(0, lambda: self.log_launch(f"✅ 找到Factor服务器文件: {server_path1}"))
-                elif os.path.exists(server_path2):
-                    start_factor_command = "python ./panda_factor_server/__main__.py"
-                    self.root.after(0, lambda: self.log_launch(f"✅ 找到Factor服务器文件: {server_path2}"))
-                else:
-                    self.root.after(0, lambda: self.log_launch("❌ Factor服务器启动文件不存在"))
-                    self.root.after(0, lambda: self.log_launch(f"检查路径1: {server_path1}"))
-                    self.root.after(0, lambda: self.log_launch(f"检查路径2: {server_path2}"))
-                    return
-
-                # 检查QuantFlow服务器文件
-                quantflow_main_path = os.path.join(panda_quantflow_path, "src", "panda_server", "main.py")
-                if os.path.exists(quantflow_main_path):
-                    start_quantflow_command = "python src/panda_server/main.py"
-                    self.root.after(0, lambda: self.log_launch(f"✅ 找到QuantFlow服务器文件: {quantflow_main_path}"))
-                else:
-                    start_quantflow_command = None
-                    self.root.after(0, lambda: self.log_launch("⚠️ 未找到QuantFlow服务器启动文件，跳过QuantFlow启动"))
-                    self.root.after(0, lambda: self.log_launch(f"检查路径: {quantflow_main_path}"))
-
-                # 创建启动脚本
-                temp_script = os.path.join(project_path, "temp_launch.bat")
-                
-                script_content = f"""@echo off
-chcp 65001 >nul
-title PandaAI Factor Server
-echo 启动PandaAI Factor服务器...
-echo Factor路径: {panda_factor_path}
-echo QuantFlow路径: {panda_quantflow_path}
-echo MongoDB路径: {mongodb_path}
-echo Conda环境: {env_name}
-echo.
-
-echo ========================================
-echo 步骤1: 启动MongoDB数据库
-echo ========================================
-cd /d "{mongodb_path}"
-echo 创建数据目录...
-if not exist "data\\db" mkdir data\\db
-if not exist "conf" mkdir conf
-echo 启动MongoDB副本集...
-start "MongoDB Server" bin\\mongod.exe --replSet rs0 --dbpath data\\db --keyFile conf\\mongo.key --port 27017 --quiet --auth
-echo MongoDB启动命令已执行
-echo 等待MongoDB初始化...
-timeout /t 5 /nobreak >nul
-echo.
-
-echo ========================================
-echo 步骤2: 启动PandaFactor服务器
-echo ========================================
-cd /d "{panda_factor_path}"
-REM 直接用start启动cmd窗口并执行命令
-call conda activate {env_name}
-if errorlevel 1 (
-    echo 激活Conda环境失败，请检查环境名称是否正确: {env_name}
-    pause
-    exit /b 1
-)
-set PYTHONPATH=%CD%;%CD%\panda_factor_server;%CD%\panda_common;%CD%\panda_data;%CD%\panda_data_hub;%CD%\panda_factor;%CD%\panda_llm;%PYTHONPATH%
-echo 启动PandaFactor服务器 (后台运行)...
-start "PandaFactor Server" cmd /c "{start_factor_command} & pause"
-if errorlevel 1 (
-    echo 启动PandaFactor服务器时发生错误，可能是Python环境或路径问题。
-    echo 请检查Conda环境和PYTHONPATH设置。
-    pause
-    exit /b 1
-)
-echo PandaFactor服务器启动命令已执行
-echo 等待服务器初始化...
-timeout /t 5 /nobreak >nul
-echo.
-
-echo ========================================
-echo 步骤3: 启动QuantFlow服务器
-echo ========================================
-cd /d "{project_path}"
-cd /d "{panda_quantflow_path}"
-REM 直接用start启动cmd窗口并执行命令
-call conda activate {env_name}
-if errorlevel 1 (
-    echo 激活Conda环境失败，请检查环境名称是否正确: {env_name}
-    pause
-    exit /b 1
-)
-set PYTHONPATH=%CD%;%CD%\panda_factor_server;%CD%\panda_common;%CD%\panda_data;%CD%\panda_data_hub;%CD%\panda_factor;%CD%\panda_llm;%PYTHONPATH%
-echo 启动QuantFlow服务器 (后台运行)...
-start "QuantFlow Server" cmd /c "{start_quantflow_command} & pause"
-if errorlevel 1 (
-    echo 启动QuantFlow服务器时发生错误，可能是Python环境或路径问题。
-    echo 请检查Conda环境和PYTHONPATH设置。
-    pause
-    exit /b 1
-)
-timeout /t 10 /nobreak >nul
-echo 如需停止所有服务，请使用工具的"停止项目"按钮
-
-REM 启动浏览器访问QuantFlow页面
-start "" "http://127.0.0.1:8000/quantflow/"
-
-pause
-"""
-                
-                with open(temp_script, 'w', encoding='utf-8') as f:
-                    f.write(script_content)
-                
-                # 启动服务器
-                subprocess.Popen(f'start "PandaAI Server" "{temp_script}"', shell=True)
-                
-                self.root.after(0, lambda: self.log_launch("✅ 服务器启动命令已执行"))
-                self.root.after(0, lambda: self.server_status_var.set("启动中..."))
-                
-                # 延迟打开浏览器
-                # self.root.after(5000, self.open_browser)
-                
+                if supervisor.launch():
+                    self.root.after(0, lambda: self.server_status_var.set("启动中..."))
             except Exception as e:
                 error_msg = f"❌ 启动失败: {str(e)}"
                 self.root.after(0, lambda: self.log_launch(error_msg))
         
-        thread = threading.Thread(target=launch)
-        thread.daemon = True
-        thread.start()
+        self.tasks.submit("launch", launch, key=("launch", project_path))
+    
+    def refresh_data_snapshots(self):
+        """更新数据快照列表，默认选中最新的快照"""
+        items = MongoSnapshotManager(self.project_status).list_snapshots()
+        values = [f"{item['id']}  {item['created_at']}  {item.get('label', '')}".strip() for item in reversed(items)]
+        self.data_snapshot_box.configure(values=values)
+        self.data_snapshot_var.set(values[0] if values else "")
+    
+    def create_data_snapshot(self):
+        """创建MongoDB数据快照（运行中时短暂暂停写入）"""
+        snapshots = MongoSnapshotManager(self.project_status, log=lambda message: self.root.after(0, self.log_launch, message))
+        self.log_launch("📸 正在备份MongoDB数据...")
+        
+        def create():
+            try:
+                snapshots.create(label="手动备份")
+            except DeployError as e:
+                self.root.after(0, self.log_launch, f"❌ 备份失败: {str(e)}")
+            self.root.after(0, self.refresh_data_snapshots)
+        
+        self.tasks.submit("data_snapshot_create", create)
+    
+    def restore_data_snapshot(self):
+        """把MongoDB数据目录恢复到所选快照（需要先停止服务）"""
+        selected = self.data_snapshot_var.get().split()
+        if not selected:
+            messagebox.showinfo("提示", "还没有数据快照，请先备份数据")
+            return
+        if not messagebox.askyesno("确认", f"将MongoDB数据恢复到快照 {selected[0]}\n"
+                                           f"恢复前会自动备份当前数据，确定继续吗？"):
+            return
+        snapshots = MongoSnapshotManager(self.project_status, log=lambda message: self.root.after(0, self.log_launch, message))
+        
+        def restore():
+            try:
+                snapshots.restore(selected[0])
+            except DeployError as e:
+                self.root.after(0, messagebox.showerror, "恢复失败", str(e))
+            self.root.after(0, self.refresh_data_snapshots)
+        
+        self.tasks.submit("data_snapshot_restore", restore)
+    
+    def profile_startup(self):
+        """以 -X importtime 各启动一次服务器，在启动日志中显示最慢的导入和与上一个提交的对比"""
+        profiler = StartupProfiler(self.project_status, log=lambda message: self.root.after(0, self.log_launch, message))
+        
+        def profile():
+            try:
+                for result in profiler.run():
+                    for line in describe_profile(result, profiler.previous(result)):
+                        self.root.after(0, self.log_launch, line)
+            except DeployError as e:
+                self.root.after(0, self.log_launch, f"❌ 启动分析失败: {str(e)}")
+        
+        self.tasks.submit("startup_profile", profile)
+    
+    def benchmark_launch(self):
+        """冷启动一次、热启动三次整套服务，在启动日志中显示各服务就绪时间和与上次的对比"""
+        if not messagebox.askyesno("启动基准测试", "将反复启动和停止所有服务4次（约需几分钟），\n"
+                                               "请先停止正在运行的服务，确定开始吗？"):
+            return
+        benchmark = LaunchBenchmark(self.project_status, log=lambda message: self.root.after(0, self.log_launch, message))
+        
+        def run():
+            try:
+                result = benchmark.run()
+            except DeployError as e:
+                self.root.after(0, self.log_launch, f"❌ 基准测试失败: {str(e)}")
+                return
+            for line in describe_benchmark(result, previous_benchmark(benchmark.history(), result)):
+                self.root.after(0, self.log_launch, line)
+        
+        self.tasks.submit("launch_benchmark", run)
     
     def stop_project(self):
         """停止项目"""
         self.log_launch("正在停止项目...")
+        supervisor = ServiceSupervisor(self.project_status, log=lambda message: self.root.after(0, self.log_launch, message))
         
         def stop():
             try:
-                # 停止MongoDB进程
-                self.log_launch("正在停止MongoDB服务...")
-                result = subprocess.run(['taskkill', '/f', '/im', 'mongod.exe'], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
-                    self.root.after(0, lambda: self.log_launch("✅ MongoDB服务已停止"))
-                else:
-                    self.root.after(0, lambda: self.log_launch("⚠️ 未找到运行中的MongoDB服务"))
-                
-                # 停止所有Python进程（PandaFactor和QuantFlow）
-                self.log_launch("正在停止PandaFactor和QuantFlow服务...")
-                result = subprocess.run(['taskkill', '/f', '/im', 'python.exe'], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
-                    self.root.after(0, lambda: self.log_launch("✅ PandaFactor和QuantFlow服务已停止"))
-                else:
-                    self.root.after(0, lambda: self.log_launch("⚠️ 未找到运行中的Python服务"))
-                
+                supervisor.stop()
                 self.root.after(0, lambda: self.server_status_var.set("已停止"))
                 self.root.after(0, lambda: self.log_launch("🎉 项目停止完成"))
-                
+            
             except Exception as e:
                 error_msg = f"❌ 停止项目时出错: {str(e)}"
                 self.root.after(0, lambda: self.log_launch(error_msg))
         
-        thread = threading.Thread(target=stop)
-        thread.daemon = True
-        thread.start()
+        self.tasks.submit("stop", stop, key=("stop", self.project_status.get_status("project_path")))
     
     def open_browser(self):
         """打开浏览器"""
         # 优先打开Factor服务器，然后尝试QuantFlow
         urls = [
-            "http://localhost:8111",  # Factor服务器
-            "http://127.0.0.1:8111",  # Factor服务器
-            "http://localhost:8000",  # QuantFlow服务器
-            "http://127.0.0.1:8000"   # QuantFlow服务器
+            self.service_url("factor"),  # Factor服务器
+            self.service_url("factor", host="127.0.0.1"),  # Factor服务器
+            self.service_url("quantflow"),  # QuantFlow服务器
+            self.service_url("quantflow", host="127.0.0.1")  # QuantFlow服务器
         ]
         
         for url in urls:
             try:
                 webbrowser.open(url)
-                if "8111" in url:
+                if url in urls[:2]:
                     self.log_launch(f"✅ 已打开Factor服务器: {url}")
                 else:
                     self.log_launch(f"✅ 已打开QuantFlow服务器: {url}")
@@ -1367,7 +1584,7 @@ pause
     
     def open_data_update(self):
         """打开数据更新页面"""
-        url = "http://localhost:8111/factor/#/datahubdataclean"
+        url = self.service_url("factor", "/factor/#/datahubdataclean")
         try:
             webbrowser.open(url)
             self.log_operations(f"✅ 已打开数据更新页面: {url}")
@@ -1376,9 +1593,53 @@ pause
             self.log_operations(f"❌ 打开数据更新页面失败: {str(e)}")
             messagebox.showerror("错误", f"无法打开浏览器\n{url}\n\n请手动复制链接到浏览器打开")
     
+    def load_data_hub_settings(self):
+        """把当前配置的定时数据更新设置和上次结果填入操作页面"""
+        last_runs = {}
+        for run in self.project_status.get_status("data_hub_runs") or []:
+            last_runs[run["job"]] = run
+        for job in get_data_hub_jobs(self.project_status):
+            if job["id"] not in self.data_hub_vars:
+                continue
+            enabled_var, time_var = self.data_hub_vars[job["id"]]
+            enabled_var.set(bool(job.get("enabled")))
+            time_var.set(job.get("time", ""))
+            run = last_runs.get(job["id"])
+            self.data_hub_labels[job["id"]].configure(text=f"上次: {describe_data_hub_run(run)}" if run else "")
+    
+    def save_data_hub_settings(self):
+        """保存定时数据更新设置"""
+        schedule = dict(self.project_status.get_status("data_hub_schedule") or {})
+        for job_id, (enabled_var, time_var) in self.data_hub_vars.items():
+            try:
+                parse_schedule_time(time_var.get().strip())
+            except ValueError:
+                messagebox.showerror("错误", f"无效的时间: {time_var.get()}\n\n格式为 HH:MM，例如 02:30")
+                return
+            schedule[job_id] = dict(schedule.get(job_id, {}), enabled=enabled_var.get(), time=time_var.get().strip())
+        self.project_status.update_status(data_hub_schedule=schedule)
+        self.data_hub.reschedule()
+        enabled = [f"{job['title']} {job['time']}" for job in get_data_hub_jobs(self.project_status) if job.get("enabled")]
+        self.log_operations(f"✅ 定时数据更新: {', '.join(enabled)}" if enabled else "✅ 已关闭定时数据更新")
+    
+    def run_data_hub_now(self):
+        """立即执行已勾选的数据更新任务（没有勾选时执行全部）"""
+        jobs = get_data_hub_jobs(self.project_status)
+        selected = [job for job in jobs if job["id"] in self.data_hub_vars and self.data_hub_vars[job["id"]][0].get()] or jobs
+        for job in selected:
+            if self.data_hub.run_in_background(job) is None:
+                self.log_operations(f"⏳ {job['title']} 正在执行中")
+    
+    def on_data_hub_run(self, run):
+        """数据更新完成：更新操作页面上的上次结果"""
+        if "operations" in self.built_pages:
+            self.load_data_hub_settings()
+        if run["result"] != "ok":
+            self.status_var.set(f"数据更新{'跳过' if run['result'] == 'skipped' else '失败'}: {run['title']}")
+    
     def open_data_list(self):
         """打开数据列表页面"""
-        url = "http://localhost:8111/factor/#/datahublist"
+        url = self.service_url("factor", "/factor/#/datahublist")
         try:
             webbrowser.open(url)
             self.log_operations(f"✅ 已打开数据列表页面: {url}")
@@ -1389,7 +1650,7 @@ pause
     
     def open_charts(self):
         """打开QuantFlow超级图表页面"""
-        url = "http://127.0.0.1:8000/charts/"
+        url = self.service_url("quantflow", "/charts/", host="127.0.0.1")
         try:
             webbrowser.open(url)
             self.log_operations(f"✅ 已打开超级图表页面: {url}")
@@ -1400,7 +1661,7 @@ pause
     
     def open_quantflow(self):
         """打开QuantFlow工作流页面"""
-        url = "http://127.0.0.1:8000/quantflow/"
+        url = self.service_url("quantflow", "/quantflow/", host="127.0.0.1")
         try:
             webbrowser.open(url)
             self.log_operations(f"✅ 已打开工作流页面: {url}")
@@ -1409,66 +1670,140 @@ pause
             self.log_operations(f"❌ 打开工作流页面失败: {str(e)}")
             messagebox.showerror("错误", f"无法打开浏览器\n{url}\n\n请手动复制链接到浏览器打开")
     
+    def service_url(self, service, path="", host="localhost"):
+        """当前配置中服务的地址"""
+        return f"http://{host}:{self.project_status.get_ports()[service]}{path}"
+    
     def check_server_status(self):
         """检查服务器状态"""
         def check():
             try:
-                import urllib.request
-                import socket
-                
                 # 检查端口是否开放
                 self.root.after(0, lambda: self.log_operations("🔍 正在检查服务器状态..."))
-                
-                # 设置超时
-                socket.setdefaulttimeout(3)
-                
-                # 尝试连接服务器
-                url = "http://localhost:8111"
-                try:
-                    response = urllib.request.urlopen(url)
-                    if response.getcode() == 200:
-                        self.root.after(0, lambda: self.server_url_status.set("✅ 服务器运行正常 (localhost:8111)"))
-                        self.root.after(0, lambda: self.server_url_label.configure(foreground='green'))
-                        self.root.after(0, lambda: self.log_operations("✅ 服务器状态：运行正常"))
-                    else:
-                        self.root.after(0, lambda: self.server_url_status.set("⚠️ 服务器响应异常"))
-                        self.root.after(0, lambda: self.server_url_label.configure(foreground='orange'))
-                        self.root.after(0, lambda: self.log_operations("⚠️ 服务器响应异常"))
-                except urllib.error.URLError:
-                    self.root.after(0, lambda: self.server_url_status.set("❌ 服务器未启动 (localhost:8111)"))
-                    self.root.after(0, lambda: self.server_url_label.configure(foreground='red'))
-                    self.root.after(0, lambda: self.log_operations("❌ 服务器未启动，请先在启动页面启动项目"))
-                except Exception as e:
-                    error_msg = f"❌ 检查服务器状态失败: {str(e)}"
-                    self.root.after(0, lambda: self.server_url_status.set("❌ 连接失败"))
-                    self.root.after(0, lambda: self.server_url_label.configure(foreground='red'))
-                    self.root.after(0, lambda: self.log_operations(error_msg))
-                    
+                state, detail = probe_url(self.service_url("factor"), timeout=3)
+                self.save_probe_cache(factor_server={"state": state, "detail": detail})
+                self.root.after(0, self.on_server_probe_done, state, detail)
+            
             except Exception as e:
                 outer_error_msg = f"❌ 检查服务器状态时出错: {str(e)}"
-                self.root.after(0, lambda: self.server_url_status.set("❌ 检查失败"))
-                self.root.after(0, lambda: self.server_url_label.configure(foreground='red'))
-                self.root.after(0, lambda: self.log_operations(outer_error_msg))
+                self.root.after(0, self.on_server_probe_done, "failed", outer_error_msg)
         
-        # 在后台线程中检查
-        threading.Thread(target=check, daemon=True).start()
+        # 在后台检查，切换配置后按新配置的端口重新检查
+        self.tasks.submit("check_server", check, key=("check_server", self.service_url("factor")), quick=True)
+    
+    def on_server_probe_done(self, state, detail):
+        """记录服务器检查结果"""
+        if state == "ok":
+            self.log_operations("✅ 服务器状态：运行正常")
+        elif state == "error":
+            self.log_operations(f"⚠️ 服务器{detail}")
+        elif state == "down":
+            self.log_operations("❌ 服务器未启动，请先在启动页面启动项目")
+        else:
+            self.log_operations(detail)
+        self.apply_server_probe(state, detail, fresh=True)
+    
+    def apply_server_probe(self, state, detail, fresh=False):
+        """显示服务器检查结果；操作页尚未创建时先保存，创建时再显示"""
+        self.server_probe = (state, detail, fresh)
+        if "operations" not in self.built_pages:
+            return
+        
+        suffix = "" if fresh else "（上次检查）"
+        address = f"localhost:{self.project_status.get_ports()['factor']}"
+        if state == "ok":
+            self.server_url_status.set(f"✅ 服务器运行正常 ({address}){suffix}")
+            self.server_url_label.configure(foreground='green')
+        elif state == "error":
+            self.server_url_status.set(f"⚠️ 服务器响应异常{suffix}")
+            self.server_url_label.configure(foreground='orange')
+        elif state == "down":
+            self.server_url_status.set(f"❌ 服务器未启动 ({address}){suffix}")
+            self.server_url_label.configure(foreground='red')
+        else:
+            self.server_url_status.set("❌ 检查失败")
+            self.server_url_label.configure(foreground='red')
+    
+    def analyze_database(self):
+        """读取集合统计、索引使用情况和慢查询，结果写入操作日志"""
+        advisor = MongoAdvisor(self.project_status, log=lambda message: self.root.after(0, self.log_operations, message))
+        self.log_operations("🔍 正在分析MongoDB索引和慢查询...")
+        
+        def analyze():
+            try:
+                advice = advisor.analyze()
+                self.root.after(0, self.show_database_advice, advice)
+            except DeployError as e:
+                self.root.after(0, self.log_operations, f"❌ 数据库诊断失败: {str(e)}")
+        
+        self.tasks.submit("db_advisor", analyze)
+    
+    def show_database_advice(self, advice):
+        """显示数据库诊断结果"""
+        self.db_advice = advice
+        self.log_operations(f"📊 数据库 {advice['database']} 占用最多的集合:")
+        for item in advice["collections"][:5]:
+            self.log_operations(f"   {item['name']}: {item['count']} 条，数据 {format_size(item['storage_size'])}，"
+                                f"索引 {format_size(item['index_size'])}")
+        for item in advice["unused_indexes"]:
+            self.log_operations(f"💤 未使用的索引: {item['collection']}.{item['name']}")
+        for shape in advice["scan_shapes"][:10]:
+            recommended = f"，推荐索引 {shape['recommended']}" if shape["recommended"] else ""
+            self.log_operations(f"🐢 全表扫描: {shape['collection']} 条件 {shape['filter']}，{shape['count']} 次，"
+                                f"共 {shape['total_millis']} 毫秒{recommended}")
+        if not advice["scan_shapes"] and not advice["profiling_level"]:
+            self.log_operations("💡 慢查询记录未开启，点击“开启慢查询记录”并使用一段时间后再分析")
+        has_recommendation = any(shape["recommended"] for shape in advice["scan_shapes"])
+        self.create_index_button.configure(state='normal' if has_recommendation else 'disabled')
+    
+    def enable_profiler(self):
+        """开启慢查询分析器（超过100毫秒的操作）"""
+        advisor = MongoAdvisor(self.project_status, log=lambda message: self.root.after(0, self.log_operations, message))
+        
+        def enable():
+            try:
+                advisor.set_profiling(1, 100)
+            except DeployError as e:
+                self.root.after(0, self.log_operations, f"❌ 开启失败: {str(e)}")
+        
+        self.tasks.submit("db_profiling", enable)
+    
+    def create_recommended_indexes(self):
+        """在后台创建诊断结果中推荐的索引"""
+        shapes = [shape for shape in (self.db_advice or {}).get("scan_shapes", []) if shape["recommended"]]
+        if not shapes:
+            return
+        text = "\n".join(f"{shape['collection']}: {shape['recommended']}" for shape in shapes)
+        if not messagebox.askyesno("确认", f"将在后台创建以下索引，创建期间服务可以继续使用：\n\n{text}"):
+            return
+        self.create_index_button.configure(state='disabled')
+        advisor = MongoAdvisor(self.project_status, log=lambda message: self.root.after(0, self.log_operations, message))
+        
+        def create():
+            for shape in shapes:
+                try:
+                    advisor.create_index(shape["collection"], shape["recommended"])
+                except DeployError as e:
+                    self.root.after(0, self.log_operations, f"❌ 创建索引失败: {str(e)}")
+        
+        self.tasks.submit("db_create_index", create)
     
     def log_operations(self, message):
         """记录操作日志"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         log_message = f"[{timestamp}] {message}\n"
         
-        if hasattr(self, 'operations_log'):
-            self.operations_log.insert(tk.END, log_message)
-            self.operations_log.see(tk.END)
+        if "operations" not in self.built_pages:
+            self.pending_operations_log.append(log_message)
+            return
+        self.operations_log.insert(tk.END, log_message)
+        self.operations_log.see(tk.END)
     
     def clear_status(self):
         """清除状态"""
         if messagebox.askyesno("确认", "确定要清除所有状态记录吗？"):
-            self.project_status.status = self.project_status.default_status.copy()
-            self.project_status.save_status()
-            self.create_status_indicators()
-            self.create_project_info()
+            self.project_status.reset()
+            self.refresh_views()
             self.log_deploy("状态已清除")
     
     def get_deployment_status_text(self):
@@ -1482,248 +1817,6 @@ pause
         }
         return status_map.get(status, "未知")
     
-    def is_step_completed(self, step_name, completed_steps):
-        """检查步骤是否已完成"""
-        return step_name in completed_steps
-    
-    def update_completed_steps(self, completed_steps):
-        """更新已完成步骤"""
-        self.project_status.update_status(completed_steps=completed_steps)
-        # 更新UI显示
-        self.root.after(0, self.create_status_indicators)
-    
-    def check_environment_v2(self):
-        """检查环境状态"""
-        self.log_deploy("🔍 检查环境状态...")
-        
-        # 检查Git
-        try:
-            result = subprocess.run(['git', '--version'], capture_output=True, text=True)
-            if result.returncode == 0:
-                self.log_deploy(f"✅ Git已安装: {result.stdout.strip()}")
-            else:
-                self.log_deploy("❌ Git未安装或不在PATH中")
-                return False
-        except:
-            self.log_deploy("❌ Git未安装或不在PATH中")
-            return False
-        
-        # 检查Conda
-        try:
-            result = subprocess.run(['conda', '--version'], capture_output=True, text=True)
-            if result.returncode == 0:
-                self.log_deploy(f"✅ Conda已安装: {result.stdout.strip()}")
-            else:
-                self.log_deploy("❌ Conda未安装或不在PATH中")
-                return False
-        except:
-            self.log_deploy("❌ Conda未安装或不在PATH中")
-            return False
-        
-        return True
-    
-    def run_command_v2(self, command, cwd=None):
-        """执行命令并实时显示输出"""
-        try:
-            self.log_deploy(f"执行命令: {command}")
-            
-            process = subprocess.Popen(
-                command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                cwd=cwd,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    self.log_deploy(output.strip())
-            
-            return_code = process.poll()
-            if return_code == 0:
-                self.log_deploy("✅ 命令执行成功")
-                return True
-            else:
-                self.log_deploy(f"❌ 命令执行失败，返回码: {return_code}")
-                return False
-                
-        except Exception as e:
-            self.log_deploy(f"❌ 执行命令时出错: {str(e)}")
-            return False
-    
-    def create_startup_scripts_v2(self, install_path, project_path, env_name):
-        """创建启动脚本"""
-        try:
-            # Windows批处理脚本 - 交互式终端
-            bat_content = f"""@echo off
-chcp 65001 >nul
-echo 启动PandaAI工具...
-cd /d "{project_path}"
-call conda activate {env_name}
-echo 环境已激活: {env_name}
-echo 项目目录: {project_path}
-echo.
-echo 正在设置Python路径...
-set PYTHONPATH=%CD%;%CD%\\panda_factor_server;%CD%\\panda_common;%CD%\\panda_data;%CD%\\panda_data_hub;%CD%\\panda_factor;%CD%\\panda_llm;%PYTHONPATH%
-echo 环境准备完成，所有子模块已在部署阶段安装
-echo.
-echo 你现在可以运行项目中的脚本了！
-echo 例如: python ./panda_factor_server/panda_factor_server/__main__.py
-echo.
-cmd /k
-"""
-            
-            bat_path = os.path.join(install_path, "启动PandaAI.bat")
-            with open(bat_path, 'w', encoding='utf-8') as f:
-                f.write(bat_content)
-            
-            self.log_deploy(f"✅ 已创建启动脚本: {bat_path}")
-            
-            # 创建直接启动服务器的脚本
-            mongodb_path = self.project_status.get_status("mongodb_path")
-            if mongodb_path:
-                server_bat_content = f"""@echo off
-chcp 65001 >nul
-title PandaAI Factor Server
-echo 启动PandaAI Factor服务器...
-echo 项目路径: {project_path}
-echo MongoDB路径: {mongodb_path}
-echo.
-
-echo ========================================
-echo 步骤1: 启动MongoDB数据库
-echo ========================================
-cd /d "{mongodb_path}"
-echo 创建数据目录...
-if not exist "data\\db" mkdir data\\db
-if not exist "conf" mkdir conf
-echo 启动MongoDB副本集...
-start "MongoDB Server" bin\\mongod.exe --replSet rs0 --dbpath data\\db --keyFile conf\\mongo.key --port 27017 --quiet --auth
-echo MongoDB启动命令已执行
-echo 等待MongoDB初始化...
-timeout /t 5 /nobreak >nul
-echo.
-
-echo ========================================
-echo 步骤2: 启动PandaFactor服务器
-echo ========================================
-cd /d "{project_path}"
-call conda activate {env_name}
-if errorlevel 1 (
-    echo 激活Conda环境失败，请检查环境名称是否正确: {env_name}
-    pause
-    exit /b 1
-)
-echo 环境已激活
-echo 正在设置Python路径...
-set PYTHONPATH=%CD%;%CD%\\panda_factor_server;%CD%\\panda_common;%CD%\\panda_data;%CD%\\panda_data_hub;%CD%\\panda_factor;%CD%\\panda_llm;%PYTHONPATH%
-echo 启动PandaFactor服务器 (后台运行)...
-start "PandaFactor Server" cmd /c "call conda activate {env_name} && python ./panda_factor_server/panda_factor_server/__main__.py && pause"
-echo PandaFactor服务器启动命令已执行
-echo 等待服务器初始化...
-timeout /t 3 /nobreak >nul
-echo.
-
-echo ========================================
-echo 步骤3: 启动QuantFlow服务器
-echo ========================================
-cd /d "{install_path}"
-if exist panda_quantflow (
-    cd panda_quantflow
-    echo 启动QuantFlow服务器 (后台运行)...
-    start "QuantFlow Server" cmd /c "call conda activate {env_name} && python src/panda_server/main.py && pause"
-    echo QuantFlow服务器启动命令已执行
-    echo.
-    echo ========================================
-    echo 所有服务启动完成
-    echo ========================================
-    echo Factor服务器: http://localhost:8111
-    echo QuantFlow服务器: http://localhost:8000
-    echo MongoDB数据库: localhost:27017
-    echo.
-    echo 提示: 
-    echo - 所有服务都在后台运行
-    echo - 关闭此窗口不会停止服务
-    echo - 使用工具的停止项目按钮来停止所有服务
-    echo.
-) else (
-    echo 未找到QuantFlow目录，跳过QuantFlow启动
-    echo 如需使用QuantFlow，请在部署页面重新部署项目
-    echo.
-)
-echo 注意: 所有服务可能仍在后台运行
-echo 如需停止所有服务，请使用工具的"停止项目"按钮
-pause
-"""
-            else:
-                server_bat_content = f"""@echo off
-chcp 65001 >nul
-title PandaAI Factor Server
-echo 启动PandaAI Factor服务器...
-echo 警告: MongoDB路径未配置，跳过MongoDB启动
-echo.
-cd /d "{project_path}"
-call conda activate {env_name}
-if errorlevel 1 (
-    echo 激活Conda环境失败，请检查环境名称是否正确: {env_name}
-    pause
-    exit /b 1
-)
-echo 环境已激活
-echo 正在设置Python路径...
-set PYTHONPATH=%CD%;%CD%\\panda_factor_server;%CD%\\panda_common;%CD%\\panda_data;%CD%\\panda_data_hub;%CD%\\panda_factor;%CD%\\panda_llm;%PYTHONPATH%
-echo 启动PandaFactor服务器 (后台运行)...
-start "PandaFactor Server" cmd /c "call conda activate {env_name} && python ./panda_factor_server/panda_factor_server/__main__.py && pause"
-echo PandaFactor服务器启动命令已执行
-echo 等待服务器初始化...
-timeout /t 3 /nobreak >nul
-echo.
-
-echo ========================================
-echo 启动QuantFlow服务器
-echo ========================================
-cd /d "{install_path}"
-if exist panda_quantflow (
-    cd panda_quantflow
-    echo 启动QuantFlow服务器 (后台运行)...
-    start "QuantFlow Server" cmd /c "call conda activate {env_name} && python src/panda_server/main.py && pause"
-    echo QuantFlow服务器启动命令已执行
-    echo.
-    echo ========================================
-    echo 所有服务启动完成
-    echo ========================================
-    echo Factor服务器: http://localhost:8111
-    echo QuantFlow服务器: http://localhost:8000
-    echo MongoDB数据库: 未配置
-    echo.
-    echo 提示: 
-    echo - 所有服务都在后台运行
-    echo - MongoDB未配置，部分功能可能受限
-    echo - 使用工具的停止项目按钮来停止所有服务
-    echo.
-) else (
-    echo 未找到QuantFlow目录，跳过QuantFlow启动
-    echo 如需使用QuantFlow，请在部署页面重新部署项目
-    echo.
-)
-pause
-"""
-            
-            server_bat_path = os.path.join(install_path, "启动PandaAI服务器.bat")
-            with open(server_bat_path, 'w', encoding='utf-8') as f:
-                f.write(server_bat_content)
-            
-            self.log_deploy(f"✅ 已创建服务器启动脚本: {server_bat_path}")
-            
-        except Exception as e:
-            self.log_deploy(f"⚠️ 创建启动脚本失败: {str(e)}")
-    
     def enable_deploy_button(self):
         """重新启用部署按钮"""
         for widget in self.deploy_frame.winfo_children():
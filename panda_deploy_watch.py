@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PandaAI工具部署助手 - 文件监视
+监视安装目录、仓库和MongoDB目录中检查所依赖的文件，文件出现或消失时立即重新检查；
+Linux上使用inotify，其他系统每秒比较一次被监视目录的 stat 信息（只有几个目录，不会遍历文件）
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+
+# inotify 事件：目录中的条目增加、删除、移动，以及被监视的目录本身被删除或移动
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# 事件合并时间（秒）：解压、git checkout 等操作会连续产生大量事件
+DEBOUNCE = 0.2
+
+def load_inotify():
+    """返回 libc（支持inotify时），否则返回None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+def watch_dirs(root, paths):
+    """需要监视的目录：根目录的上级、根目录以及根目录到每个路径之间已存在的目录"""
+    root = os.path.normpath(root)
+    dirs = {os.path.dirname(root), root}
+    for path in paths:
+        directory = os.path.dirname(os.path.normpath(path))
+        while directory.startswith(root) and directory not in dirs:
+            dirs.add(directory)
+            directory = os.path.dirname(directory)
+    return {directory for directory in dirs if directory and os.path.isdir(directory)}
+
+def stat_dir(directory):
+    """目录的 stat 信息，条目增加或删除时修改时间会变化"""
+    try:
+        stat = os.stat(directory)
+        return stat.st_ino, stat.st_mtime_ns
+    except OSError:
+        return None
+
+class FileWatcher:
+    """监视检查项依赖的文件，结果变化时调用 on_change({检查项: 结果})
+
+    检查项为 {名称: (检查函数, 根目录, [路径])}，只在被监视的目录发生变化时重新执行检查函数；
+    目录被创建或删除后自动调整监视的目录
+    """
+    def __init__(self, on_change, log=None, interval=1.0):
+        self.on_change = on_change
+        self.log = log or (lambda message: None)
+        self.interval = interval
+        self.checks = {}
+        self.results = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.reload_event = threading.Event()
+        self.thread = None
+        self.libc = load_inotify()
+        self.fd = -1
+        self.watches = {}  # 目录 -> inotify watch描述符（或 stat 信息）
+    
+    @property
+    def mode(self):
+        """当前的监视方式"""
+        return "inotify" if self.fd >= 0 else "stat"
+    
+    def watch(self, checks):
+        """替换检查项（例如切换配置或修改路径后），立即检查一次"""
+        with self.lock:
+            self.checks = dict(checks)
+        self.reload_event.set()
+        if not self.thread or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="panda-file-watcher", daemon=True)
+            self.thread.start()
+    
+    def stop(self):
+        """停止监视"""
+        self.stop_event.set()
+        self.reload_event.set()
+    
+    def _run(self):
+        if self.libc:
+            self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self.fd < 0:
+                self.log(f"⚠️ inotify不可用（{os.strerror(ctypes.get_errno())}），改为比较目录状态")
+        try:
+            while not self.stop_event.is_set():
+                self.reload_event.clear()
+                self.evaluate()
+                self.wait_for_change()
+        finally:
+            if self.fd >= 0:
+                os.close(self.fd)
+                self.fd = -1
+            self.watches = {}
+    
+    def evaluate(self):
+        """执行检查并调整监视的目录，结果变化时通知"""
+        with self.lock:
+            checks = dict(self.checks)
+        while True:
+            results = {}
+            dirs = set()
+            for name, (check, root, paths) in checks.items():
+                results[name] = bool(check())
+                dirs |= watch_dirs(root, paths)
+            added = dirs - set(self.watches)
+            self.update_watches(dirs)
+            # 新监视的目录在开始监视之前可能已经有了变化，再检查一次
+            if not added:
+                break
+        if results != self.results:
+            changed = {name: value for name, value in results.items() if self.results.get(name) != value}
+            self.results = results
+            self.on_change(changed)
+    
+    def update_watches(self, dirs):
+        """增加新出现的目录，移除不再需要的目录"""
+        for directory in set(self.watches) - dirs:
+            watch = self.watches.pop(directory)
+            if self.fd >= 0:
+                self.libc.inotify_rm_watch(self.fd, watch)  # 目录已删除时内核已经移除，忽略错误
+        for directory in dirs:
+            if self.fd >= 0:
+                # 无法监视的目录（例如没有权限）记为 -1，不再重复尝试
+                self.watches[directory] = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            else:
+                self.watches[directory] = stat_dir(directory)
+    
+    def wait_for_change(self):
+        """阻塞到被监视的目录发生变化、检查项被替换或停止"""
+        while not self.stop_event.is_set() and not self.reload_event.is_set():
+            if self.fd >= 0:
+                readable, _, _ = select.select([self.fd], [], [], self.interval)
+                if not readable:
+                    continue
+                # 合并短时间内的连续事件，只检查一次
+                self.stop_event.wait(DEBOUNCE)
+                try:
+                    while os.read(self.fd, 65536):
+                        pass
+                except BlockingIOError:
+                    pass
+                return
+            if self.reload_event.wait(self.interval):
+                return
+            if any(stat_dir(directory) != state for directory, state in self.watches.items()):
+                return
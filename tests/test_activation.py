@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from panda_deploy_core import (DeployPipeline, ProjectStatus, activated_environ, activation_bat_lines,
+                               env_python_command)
+
+class ActivationTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.activation = {"env_name": "pandaaitool", "prefix": self.temp_dir.name, "python": sys.executable,
+                           "stamp": None, "variables": {"CONDA_PREFIX": self.temp_dir.name, "SSL_CERT": "C:\\100%"},
+                           "path": [os.path.join(self.temp_dir.name, "bin")]}
+        self.project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        self.project_status.update_status(conda_env="pandaaitool", env_activation=self.activation)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_activated_environ(self):
+        env = activated_environ(self.activation, base={"PATH": "/usr/bin", "HOME": "/root"})
+        self.assertEqual(env["PATH"], os.pathsep.join([os.path.join(self.temp_dir.name, "bin"), "/usr/bin"]))
+        self.assertEqual((env["CONDA_PREFIX"], env["HOME"]), (self.temp_dir.name, "/root"))
+        self.assertEqual(activated_environ(self.activation, base={})["PATH"], os.path.join(self.temp_dir.name, "bin"))
+    
+    def test_cached_activation_is_used(self):
+        # 缓存有效（解释器存在、环境没有变化）时不调用conda
+        command, env = env_python_command(self.project_status, base={}, log=lambda message: None)
+        self.assertEqual(command, [sys.executable])
+        self.assertEqual(env["CONDA_PREFIX"], self.temp_dir.name)
+    
+    def test_bat_lines_escape_percent(self):
+        self.assertEqual(activation_bat_lines(None), "")
+        lines = activation_bat_lines(self.activation).splitlines()
+        self.assertIn('set "SSL_CERT=C:\\100%%"', lines)
+        self.assertEqual(lines[-1], f'set "PATH={os.path.join(self.temp_dir.name, "bin")};%PATH%"')
+    
+    def test_startup_scripts_do_not_call_conda_activate(self):
+        pipeline = DeployPipeline(self.project_status, log=lambda message: None)
+        pipeline.create_startup_scripts(self.temp_dir.name, self.temp_dir.name, "pandaaitool")
+        with open(os.path.join(self.temp_dir.name, "启动PandaAI.bat"), encoding="utf-8") as f:
+            script = f.read()
+        self.assertNotIn("conda activate", script)
+        self.assertIn(activation_bat_lines(self.activation), script)
+
+if __name__ == "__main__":
+    unittest.main()
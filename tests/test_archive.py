@@ -0,0 +1,106 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+
+from panda_deploy_archive import (ParallelGzipWriter, compress_file, extract_file, pack_directory, relocate_files,
+                                  replace_in_binary, unpack_archive)
+
+class ReplaceInBinaryTest(unittest.TestCase):
+    def test_shorter_path_is_padded(self):
+        data = b"\x7fELF\0/opt/conda/envs/old/lib\0\0\0rest"
+        result = replace_in_binary(data, b"/opt/conda/envs/old", b"/opt/new")
+        self.assertEqual(len(result), len(data))
+        self.assertEqual(result, b"\x7fELF\0/opt/new/lib" + b"\0" * 14 + b"rest")
+    
+    def test_every_occurrence_in_string(self):
+        data = b"/old/a:/old/b\0\0"
+        self.assertEqual(replace_in_binary(data, b"/old", b"/n"), b"/n/a:/n/b" + b"\0" * 6)
+    
+    def test_longer_path_fails(self):
+        with self.assertRaises(ValueError):
+            replace_in_binary(b"/old/lib\0rest", b"/old", b"/much/longer")
+
+class ParallelGzipTest(unittest.TestCase):
+    def test_blocks_form_one_gzip_stream(self):
+        data = os.urandom(50000) + b"panda" * 20000
+        output = io.BytesIO()
+        with ParallelGzipWriter(output, workers=4, block_size=4096) as writer:
+            for start in range(0, len(data), 3000):
+                writer.write(data[start:start + 3000])
+        # 每块一个gzip成员，标准gzip按顺序解压后与原数据相同
+        self.assertEqual(gzip.decompress(output.getvalue()), data)
+        self.assertEqual(writer.bytes_in, len(data))
+        self.assertEqual(writer.bytes_out, len(output.getvalue()))
+    
+    def test_compress_and_extract_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = os.path.join(temp_dir, "data.bin")
+            with open(source, "wb") as f:
+                f.write(b"0123456789" * 100000)
+            size = compress_file(source, os.path.join(temp_dir, "data.gz"), workers=2)
+            self.assertEqual(size, os.path.getsize(os.path.join(temp_dir, "data.gz")))
+            extract_file(os.path.join(temp_dir, "data.gz"), os.path.join(temp_dir, "restored.bin"))
+            with open(os.path.join(temp_dir, "restored.bin"), "rb") as f:
+                self.assertEqual(f.read(), b"0123456789" * 100000)
+            self.assertEqual(sorted(os.listdir(temp_dir)), ["data.bin", "data.gz", "restored.bin"])
+
+class RelocateFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write(self, name, data):
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(data)
+    
+    def read(self, name):
+        with open(os.path.join(self.root, name), "rb") as f:
+            return f.read()
+    
+    def test_text_and_binary(self):
+        self.write("activate.sh", b"export PREFIX=/old/env\nexport PROJECT=/old/env/project\n")
+        self.write("lib.so", b"\0/old/env/lib\0\0\0\0")
+        self.write("too_long.so", b"\0/old/env\0")
+        manifest = {"files": [{"path": "activate.sh", "binary": False}, {"path": "lib.so", "binary": True},
+                              {"path": "too_long.so", "binary": True}]}
+        failed = relocate_files(self.root, manifest, [("/old/env", "/new/environment"), ("/old/env/project", "/p")])
+        # 较长的原路径先替换
+        self.assertEqual(self.read("activate.sh"), b"export PREFIX=/new/environment\nexport PROJECT=/p\n")
+        self.assertEqual(failed, ["lib.so", "too_long.so"])
+        self.assertEqual(self.read("lib.so"), b"\0/old/env/lib\0\0\0\0")
+    
+    def test_binary_with_shorter_path(self):
+        self.write("lib.so", b"\0/old/env/lib\0\0\0\0")
+        failed = relocate_files(self.root, {"files": [{"path": "lib.so", "binary": True}]}, [("/old/env", "/n")])
+        self.assertEqual(failed, [])
+        self.assertEqual(self.read("lib.so"), b"\0/n/lib" + b"\0" * 10)
+    
+    def test_unchanged_paths_are_skipped(self):
+        self.write("a.txt", b"/same")
+        self.assertEqual(relocate_files(self.root, {"files": [{"path": "missing.txt"}]}, [("/same", "/same")]), [])
+    
+    def test_pack_and_relocate(self):
+        source = os.path.join(self.root, "env")
+        os.makedirs(os.path.join(source, "bin"))
+        with open(os.path.join(source, "bin", "activate"), "w", encoding="utf-8") as f:
+            f.write(f"PREFIX={source}\n")
+        with open(os.path.join(source, "data.txt"), "w", encoding="utf-8") as f:
+            f.write("nothing to replace\n")
+        archive = os.path.join(self.root, "env.tar.gz")
+        manifest = pack_directory(source, archive, needles=[source])
+        self.assertEqual(manifest["file_count"], 2)
+        self.assertEqual(manifest["files"], [{"path": "bin/activate", "binary": False}])
+        
+        target = os.path.join(self.root, "restored")
+        manifest = unpack_archive(archive, target)
+        self.assertEqual(relocate_files(target, manifest, [(source, target)]), [])
+        with open(os.path.join(target, "bin", "activate"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), f"PREFIX={target}\n")
+
+if __name__ == "__main__":
+    unittest.main()
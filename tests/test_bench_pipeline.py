@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.bench_deploy_pipeline import SHIM_PROFILES, compare, measure_overlap, run_benchmark
+
+class MeasureOverlapTest(unittest.TestCase):
+    def test_overlap_and_concurrency(self):
+        records = [
+            {"command": "git ls-remote", "start": 0.0, "end": 2.0},
+            {"command": "git ls-remote", "start": 1.0, "end": 3.0},
+            # 与前两个命令之间有1秒空闲，空闲时间不计入
+            {"command": "git fetch", "start": 4.0, "end": 5.0},
+        ]
+        self.assertEqual(measure_overlap(records), {"commands": 3, "overlap": 1.25, "max_concurrency": 2})
+        self.assertEqual(measure_overlap([]), {"commands": 0, "overlap": 0.0, "max_concurrency": 0})
+
+class CompareTest(unittest.TestCase):
+    def test_regressions_by_direction(self):
+        baseline = {"deploy": {"lines_per_second": 1000, "status_writes": 10},
+                    "sweep": {"median_ms": 100}, "check_updates": {"median_ms": 0}}
+        current = {"deploy": {"lines_per_second": 700, "status_writes": 4},
+                   "sweep": {"median_ms": 120}, "check_updates": {"median_ms": 500}}
+        # 吞吐量下降30%为退化；写入次数减少、延迟在容差内和基准为0的项都不算
+        self.assertEqual(compare(current, baseline, 0.25), ["deploy.lines_per_second: 1000 → 700"])
+
+@unittest.skipIf(os.name == 'nt', "模拟命令为shell脚本")
+class RunBenchmarkTest(unittest.TestCase):
+    def test_offline_deploy(self):
+        config = {command: dict(settings, seconds=0) for command, settings in SHIM_PROFILES["fast"].items()}
+        saved_environ = dict(os.environ)
+        with tempfile.TemporaryDirectory() as workdir:
+            result = run_benchmark(config, 1, workdir)
+        self.assertEqual(dict(os.environ), saved_environ)
+        
+        deploy = result["deploy"]
+        self.assertTrue(deploy["ok"])
+        self.assertGreater(deploy["log_lines"], config["pip install"]["lines"])
+        self.assertIn("precompile_bytecode", deploy["steps"])
+        self.assertGreater(deploy["commands"], 0)
+        for name in ("sweep", "check_updates"):
+            self.assertGreater(result[name]["commands"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from panda_deploy_cli import main
+
+class MissingProjectPathTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.status_file = os.path.join(self.temp_dir.name, "project_status.json")
+        with open(self.status_file, "w", encoding="utf-8") as f:
+            json.dump({"project_path": None}, f)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def run_cli(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = main(["--status-file", self.status_file] + list(argv))
+        return code, output.getvalue()
+    
+    def test_commands_report_missing_path(self):
+        for argv in (["logs", "list"], ["logs", "search", "error"], ["env-snapshot", "list"], ["db-snapshot", "list"],
+                     ["env-fingerprint", "diff"], ["lock", "show"], ["startup-profile", "history"]):
+            code, output = self.run_cli(*argv)
+            self.assertEqual(code, 1, argv)
+            self.assertIn("请设置项目安装路径", output)
+    
+    def test_lock_dir_without_project_path(self):
+        with open(self.status_file, "w", encoding="utf-8") as f:
+            json.dump({"project_path": None, "env_lock_dir": os.path.join(self.temp_dir.name, "locks")}, f)
+        code, output = self.run_cli("lock", "show")
+        self.assertEqual(code, 0)
+        self.assertIn("没有当前平台的锁定文件", output)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from panda_deploy_core import ProjectStatus
+from panda_deploy_datahub import DataHubJobError, DataHubScheduler, parse_progress
+
+class ParseProgressTest(unittest.TestCase):
+    def test_nested_data(self):
+        data = {"code": 200, "data": {"progress": "45.5", "status": "Running", "processed_count": 1200}}
+        self.assertEqual(parse_progress(data), (45.5, "running", 1200))
+    
+    def test_top_level_keys(self):
+        self.assertEqual(parse_progress({"percent": 100, "state": "DONE", "rows": 30}), (100.0, "done", 30))
+    
+    def test_missing_or_invalid_values(self):
+        self.assertEqual(parse_progress({"progress": "n/a", "count": True}), (None, "", None))
+        self.assertEqual(parse_progress({"percentage": None, "percent": 20}), (20.0, "", None))
+    
+    def test_not_a_dict(self):
+        self.assertEqual(parse_progress("ok"), (None, "", None))
+        self.assertEqual(parse_progress(None), (None, "", None))
+
+class DataHubSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        self.project_status.update_status(data_hub_poll_retries=2)
+        self.scheduler = DataHubScheduler(self.project_status, log=lambda message: None, tick=1)
+        self.job = {"id": "test", "start": "/start", "progress": "/progress", "poll_interval": 0.01}
+        self.requests = []
+    
+    def tearDown(self):
+        self.scheduler.stop()
+        self.temp_dir.cleanup()
+    
+    def fake_request(self, responses):
+        def request(path, params=None, timeout=60, resendable=True):
+            self.requests.append(path)
+            response = responses.pop(0) if path == "/progress" else {"status": "running"}
+            if isinstance(response, Exception):
+                raise response
+            return response
+        self.scheduler.request = request
+    
+    def test_poll_failures_do_not_resubmit(self):
+        self.fake_request([DataHubJobError("超时"), {"progress": 50}, DataHubJobError("超时"),
+                           {"status": "done", "rows": 7}])
+        self.assertEqual(self.scheduler.call_job(self.job), 7)
+        self.assertEqual(self.requests.count("/start"), 1)
+    
+    def test_poll_gives_up_without_retrying_job(self):
+        self.fake_request([DataHubJobError("超时")] * 3)
+        with self.assertRaises(DataHubJobError) as context:
+            self.scheduler.call_job(self.job)
+        self.assertFalse(context.exception.retryable)
+        self.assertEqual(self.requests, ["/start"] + ["/progress"] * 3)
+    
+    def test_start_timeout_is_not_resubmitted(self):
+        starts = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/start"):
+                    starts.append(self.path)
+                    time.sleep(1)
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"{}")
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.project_status.update_status(factor_port=server.server_address[1], data_hub_retries=2)
+        run = self.scheduler.execute(dict(self.job, start_timeout=0.2))
+        self.assertEqual((run["result"], run["attempts"], len(starts)), ("failed", 1, 1))
+        self.assertIn("不再重新提交", run["error"])
+    
+    def test_due_jobs_window_weekdays_and_last_run(self):
+        self.project_status.update_status(data_hub_window_minutes=60, data_hub_schedule={
+            "stock_market": {"enabled": True, "time": "02:00"},
+            "factor": {"enabled": True, "time": "03:00", "weekdays": [1, 2, 3, 4, 5]},
+            "custom": {"start": "/custom/start", "enabled": True, "time": "02:30"},
+            "invalid": {"start": "/invalid/start", "enabled": True, "time": "25:00"},
+        })
+        
+        def due(now):
+            return [job["id"] for job in self.scheduler.due_jobs(now)]
+        
+        # 2026-03-06 为星期五，2026-03-07 为星期六
+        self.assertEqual(due(datetime(2026, 3, 6, 1, 59)), [])
+        self.assertEqual(due(datetime(2026, 3, 6, 2, 45)), ["stock_market", "custom"])
+        self.assertEqual(due(datetime(2026, 3, 6, 3, 0)), ["factor", "custom"])
+        self.assertEqual(due(datetime(2026, 3, 7, 3, 0)), ["custom"])
+        # 今天已经执行过的任务不再执行，第二天照常执行
+        self.project_status.update_status(data_hub_last_runs={"custom": "2026-03-06"})
+        self.assertEqual(due(datetime(2026, 3, 6, 3, 0)), ["factor"])
+        self.assertEqual(due(datetime(2026, 3, 7, 3, 0)), ["custom"])
+    
+    def test_concurrency_follows_current_setting(self):
+        self.project_status.update_status(data_hub_max_concurrent=2)
+        self.scheduler.acquire_slot()
+        self.scheduler.acquire_slot()
+        # 调低设置后，正在执行的任务结束前不会开始新任务
+        self.project_status.update_status(data_hub_max_concurrent=1)
+        acquired = threading.Event()
+        threading.Thread(target=lambda: (self.scheduler.acquire_slot(), acquired.set()), daemon=True).start()
+        self.scheduler.release_slot()
+        time.sleep(0.1)
+        self.assertFalse(acquired.is_set())
+        self.scheduler.release_slot()
+        self.assertTrue(acquired.wait(5))
+        self.assertEqual(self.scheduler.active, 1)
+
+if __name__ == "__main__":
+    unittest.main()
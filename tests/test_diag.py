@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+import unittest
+
+from panda_deploy_diag import LoopLagMonitor, TaskProfiler, describe_pstats
+
+class FakeRoot:
+    """代替Tk根窗口：after() 只记录回调，由测试在主线程中调用"""
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+    
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.pending[f"after#{self.next_id}"] = callback
+        return f"after#{self.next_id}"
+    
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+    
+    def run_pending(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
+def block_main_loop(seconds):
+    """卡顿记录中应能找到的阻塞位置"""
+    time.sleep(seconds)
+
+class LoopLagMonitorTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = FakeRoot()
+        self.messages = []
+        self.monitor = LoopLagMonitor(self.root, self.temp_dir.name, interval=20, threshold=100,
+                                      log=self.messages.append)
+    
+    def tearDown(self):
+        self.monitor.stop()
+        self.temp_dir.cleanup()
+    
+    def test_stall_captures_main_thread_stack(self):
+        self.monitor.start()
+        time.sleep(0.02)
+        self.root.run_pending()
+        self.assertEqual(self.monitor.stalls, [])
+        
+        # 阻塞主线程，监视线程应保存调用栈；恢复后的回调补全卡顿的持续时间
+        block_main_loop(0.5)
+        self.root.run_pending()
+        summary = self.monitor.summary()
+        self.assertEqual(len(summary["stalls"]), 1)
+        self.assertGreaterEqual(summary["stalls"][0]["duration"], 400)
+        self.assertEqual(summary["max"], summary["current"])
+        self.assertEqual(len(self.messages), 1)
+        with open(self.monitor.stall_log, 'r', encoding='utf-8') as f:
+            self.assertIn("block_main_loop", f.read())
+        
+        self.monitor.stop()
+        self.assertEqual(self.root.pending, {})
+    
+    def test_summary_without_ticks(self):
+        self.assertEqual(self.monitor.summary(),
+                         {"current": 0.0, "p95": 0.0, "max": 0.0, "stalls": [], "reentrant": {}})
+
+class TaskProfilerTest(unittest.TestCase):
+    def test_profile_file_per_task(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            profiler = TaskProfiler(os.path.join(temp_dir, "tasks"))
+            self.assertEqual(profiler("sum_task", sum, (range(1000),)), 499500)
+            self.assertEqual(len(profiler.files), 1)
+            name, _, path = profiler.files[0]
+            self.assertEqual(name, "sum_task")
+            self.assertIn("function calls", describe_pstats(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from panda_deploy_core import EnvSnapshotManager, ProfileManager, ProjectStatus
+from panda_deploy_disk import DiskFootprint, DiskUsageScanner
+
+class DiskUsageScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "root")
+        self.cache_file = os.path.join(self.temp_dir.name, "cache.json")
+        self.write("a.bin", 100)
+        self.write(os.path.join("big", "b.bin"), 1000)
+        self.write(os.path.join("big", "deep", "c.bin"), 2000)
+        self.write(os.path.join("small", "d.bin"), 10)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write(self, name, size):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+    
+    def test_totals_and_children(self):
+        result = DiskUsageScanner().measure(self.root)
+        self.assertTrue(result["exists"])
+        self.assertEqual((result["size"], result["files"], result["dirs"]), (3110, 4, 4))
+        self.assertEqual(result["children"], [("big", 3000), ("（文件）", 100), ("small", 10)])
+    
+    def test_cache_only_rescans_changed_dirs(self):
+        scanner = DiskUsageScanner(self.cache_file)
+        self.assertEqual(scanner.measure(self.root)["rescanned"], 4)
+        scanner.save_cache()
+        
+        # 新增文件改变目录的修改时间，只重新列出这个目录
+        time.sleep(0.01)
+        self.write(os.path.join("small", "e.bin"), 5)
+        scanner = DiskUsageScanner(self.cache_file)
+        result = scanner.measure(self.root)
+        self.assertEqual(result["rescanned"], 1)
+        self.assertEqual(result["size"], 3115)
+        self.assertEqual(scanner.measure(self.root, full=True)["rescanned"], 4)
+    
+    def test_missing_and_file(self):
+        scanner = DiskUsageScanner()
+        missing = scanner.measure(os.path.join(self.temp_dir.name, "missing"))
+        self.assertEqual((missing["exists"], missing["size"]), (False, 0))
+        single = scanner.measure(os.path.join(self.root, "a.bin"))
+        self.assertEqual((single["size"], single["files"]), (100, 1))
+    
+    def test_unreadable_root(self):
+        # 没有权限列出根目录时 scan_dir 返回None，结果为空而不是抛出异常
+        scanner = DiskUsageScanner()
+        scanner.scan_dir = lambda path, full: None
+        result = scanner.measure(self.root)
+        self.assertEqual((result["exists"], result["size"], result["files"], result["children"]), (True, 0, 0, []))
+
+class MongoDiagnosticsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.temp_dir.name, "db")
+        for name, size in ((os.path.join("diagnostic.data", "metrics.1"), 3000), (os.path.join("_tmp", "x"), 500),
+                           ("collection-0.wt", 100), (os.path.join("journal", "WiredTigerLog.1"), 200)):
+            os.makedirs(os.path.dirname(os.path.join(self.data_path, name)), exist_ok=True)
+            with open(os.path.join(self.data_path, name), "wb") as f:
+                f.write(b"x" * size)
+        project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        project_status.update_status(mongodb_data_path=self.data_path)
+        self.footprint = DiskFootprint(project_status, log=lambda message: None)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def prune(self, mongodb):
+        services = {"mongodb": mongodb, "factor": "down", "quantflow": "down"}
+        with mock.patch("panda_deploy_disk.collect_service_status", return_value=services):
+            return self.footprint.prune(["mongodb_diagnostics"])
+    
+    def test_only_diagnostics_are_removed_after_stop(self):
+        # MongoDB运行时不清理
+        self.assertEqual(self.prune("up"), 0)
+        self.assertTrue(os.path.isdir(os.path.join(self.data_path, "diagnostic.data")))
+        
+        self.assertEqual(self.prune("down"), 3500)
+        self.assertEqual(sorted(os.listdir(self.data_path)), ["collection-0.wt", "journal"])
+
+class StaleArchivesTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project_path = os.path.join(self.temp_dir.name, "project")
+        self.envs_dir = os.path.join(self.temp_dir.name, "envs")
+        for name in ("pandaaitool.rollback", "other.rollback"):
+            os.makedirs(os.path.join(self.envs_dir, name))
+        self.project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        self.project_status.update_status(project_path=self.project_path, conda_env="pandaaitool")
+        self.snapshots = EnvSnapshotManager(self.project_status)
+        self.footprint = DiskFootprint(self.project_status, log=lambda message: None)
+        self.footprint._conda_info = {"envs_dirs": [self.envs_dir], "envs": []}
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_only_this_profiles_rollback(self):
+        _, targets = self.footprint.estimate_stale_archives()
+        self.assertEqual(targets, [os.path.join(self.envs_dir, "pandaaitool.rollback")])
+    
+    def test_blocked_while_snapshot_is_running(self):
+        self.assertEqual(self.footprint.get_blocked_reason("stale_archives", (), {}), "")
+        reason = self.snapshots.run_busy("restore", self.footprint.get_blocked_reason, "stale_archives", (), {})
+        self.assertEqual(reason, "正在从快照恢复环境")
+        self.assertEqual(self.footprint.get_blocked_reason("pip_cache", (), {}), "")
+        # 进程已退出时留下的标记不阻止清理
+        with open(os.path.join(self.snapshots.snapshot_dir, EnvSnapshotManager.BUSY_FILE), "w") as f:
+            json.dump({"operation": "create", "pid": 2 ** 22 + 1}, f)
+        self.assertIsNone(self.snapshots.active_operation())
+
+class SharedCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.profiles = ProfileManager(os.path.join(self.temp_dir.name, "project_status.json"))
+        self.other = self.profiles.create("other")
+        self.other.update_status(project_path=os.path.join(self.temp_dir.name, "other"))
+        self.footprint = DiskFootprint(self.profiles.get(), log=lambda message: None, profiles=self.profiles)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_other_profile_blocks_shared_caches(self):
+        self.other.update_status(deployment_status="in_progress")
+        for policy_id in ("pip_cache", "conda_pkgs"):
+            self.assertEqual(self.footprint.get_blocked_reason(policy_id, (), {}), "配置 other 正在部署")
+        # 只属于本配置的内容不受其他配置影响
+        self.assertEqual(self.footprint.get_blocked_reason("stale_archives", (), {}), "")
+        
+        self.other.update_status(deployment_status="completed")
+        self.assertEqual(self.footprint.get_blocked_reason("conda_pkgs", (), {}), "")
+        reason = EnvSnapshotManager(self.other).run_busy("create", self.footprint.get_blocked_reason, "conda_pkgs", (), {})
+        self.assertEqual(reason, "配置 other 正在创建环境快照")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from panda_deploy_editable import install_all, read_project
+
+class EditableInstallTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.site_packages = os.path.join(self.temp_dir.name, "site-packages")
+        os.makedirs(self.site_packages)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def project(self, name, setup_py):
+        root = os.path.join(self.temp_dir.name, name)
+        os.makedirs(os.path.join(root, name))
+        with open(os.path.join(root, "setup.py"), "w", encoding="utf-8") as f:
+            f.write(setup_py)
+        return root
+    
+    def test_read_setup_py(self):
+        root = self.project("panda_common", 'from setuptools import setup\n'
+                                            'setup(name="panda_common", version="0.1", install_requires=["pyyaml"])\n')
+        self.assertEqual(read_project(root), ("panda_common", "0.1", ["pyyaml"], ""))
+    
+    def test_build_hooks_need_pip(self):
+        root = self.project("panda_ext", 'from setuptools import setup\n'
+                                         'setup(name="panda_ext", version="0.1", ext_modules=[])\n')
+        with self.assertRaisesRegex(ValueError, "ext_modules"):
+            read_project(root)
+    
+    def test_install_and_unchanged(self):
+        common = self.project("panda_common", 'from setuptools import setup\n'
+                                              'setup(name="panda_common", version="0.1")\n')
+        data = self.project("panda_data", 'from setuptools import setup\n'
+                                          'setup(name="panda_data", version="0.2", install_requires=["panda_common"])\n')
+        missing = self.project("panda_llm", 'from setuptools import setup\n'
+                                            'setup(name="panda_llm", version="0.1", '
+                                            'install_requires=["surely-not-installed-package"])\n')
+        stats = install_all([common, data, missing], site_packages=self.site_packages)
+        # 依赖同一批安装的子模块时不需要pip
+        self.assertEqual(stats["installed"], ["panda_common", "panda_data"])
+        self.assertIn("缺少依赖", stats["fallback"][missing])
+        with open(os.path.join(self.site_packages, "__editable__.panda_data-0.2.pth"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), data + "\n")
+        self.assertTrue(os.path.exists(os.path.join(self.site_packages, "panda_data-0.2.dist-info", "RECORD")))
+        
+        stats = install_all([common, data], site_packages=self.site_packages)
+        self.assertEqual((stats["installed"], stats["unchanged"]), ([], ["panda_common", "panda_data"]))
+        self.assertEqual(install_all([missing], check_deps=False, site_packages=self.site_packages)["installed"],
+                         ["panda_llm"])
+
+if __name__ == "__main__":
+    unittest.main()
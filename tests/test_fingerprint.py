@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from panda_deploy_fingerprint import EnvFingerprinter, describe_env_drift, diff_fingerprints
+
+class DiffFingerprintsTest(unittest.TestCase):
+    def test_added_removed_changed(self):
+        old = {"packages": {"pip:numpy": "1.26.4 aaa", "pip:pandas": "2.2.0 bbb", "conda:openssl": "3.0.13 ccc"}}
+        new = {"packages": {"pip:numpy": "2.0.0 ddd", "pip:pandas": "2.2.0 eee", "pip:pyarrow": "16.0.0 fff"}}
+        drift = diff_fingerprints(old, new)
+        self.assertEqual(drift["added"], {"pip:pyarrow": "16.0.0"})
+        self.assertEqual(drift["removed"], {"conda:openssl": "3.0.13"})
+        # 版本相同但文件变化的包标记为 "版本*"
+        self.assertEqual(drift["changed"], {"pip:numpy": ["1.26.4", "2.0.0"], "pip:pandas": ["2.2.0", "2.2.0*"]})
+    
+    def test_no_changes(self):
+        fingerprint = {"packages": {"pip:numpy": "1.26.4 aaa"}}
+        drift = diff_fingerprints(fingerprint, dict(fingerprint))
+        self.assertEqual(drift, {"added": {}, "removed": {}, "changed": {}})
+        self.assertEqual(describe_env_drift({}), "")
+    
+    def test_describe_limit(self):
+        drift = {"added": {f"pip:p{i}": "1.0" for i in range(10)}, "removed": {}, "changed": {}}
+        description = describe_env_drift(drift, limit=3)
+        self.assertEqual(description, "+pip:p0 1.0，+pip:p1 1.0，+pip:p2 1.0，等共 10 项")
+
+class EnvFingerprinterTest(unittest.TestCase):
+    """在临时目录中模拟Conda环境，哈希按 (修改时间, 大小) 缓存到文件"""
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.prefix = os.path.join(self.temp_dir.name, "envs", "panda")
+        if os.name == 'nt':
+            self.site_packages = os.path.join(self.prefix, "Lib", "site-packages")
+        else:
+            self.site_packages = os.path.join(self.prefix, "lib", "python3.11", "site-packages")
+        os.makedirs(os.path.join(self.prefix, "conda-meta"))
+        self.write(os.path.join(self.prefix, "conda-meta", "openssl-3.0.13-h2bbff1b_0.json"), "{}")
+        self.write(os.path.join(self.prefix, "conda-meta", "history"), "")
+        self.write(os.path.join(self.site_packages, "Flask_Cors-4.0.0.dist-info", "RECORD"), "flask_cors/__init__.py\n")
+        # 没有 RECORD 的 dist-info 不计入
+        os.makedirs(os.path.join(self.site_packages, "broken-1.0.dist-info"))
+        self.cache_file = os.path.join(self.temp_dir.name, "cache", "fingerprint_cache.json")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    
+    def test_cached_hashes_and_drift(self):
+        first = EnvFingerprinter(self.cache_file).fingerprint(self.prefix)
+        self.assertEqual(sorted(first["packages"]), ["conda:openssl", "pip:flask-cors"])
+        self.assertTrue(first["packages"]["pip:flask-cors"].startswith("4.0.0 "))
+        self.assertTrue(os.path.exists(self.cache_file))
+        
+        # 新的实例从缓存文件加载哈希，环境没有变化时不读取文件内容
+        fingerprinter = EnvFingerprinter(self.cache_file)
+        with mock.patch("builtins.open", side_effect=AssertionError("不应读取文件")):
+            second = fingerprinter.fingerprint(self.prefix)
+        self.assertEqual(second["digest"], first["digest"])
+        
+        # 手动修改包的文件、删除conda包
+        self.write(os.path.join(self.site_packages, "Flask_Cors-4.0.0.dist-info", "RECORD"), "flask_cors/core.py\n")
+        os.remove(os.path.join(self.prefix, "conda-meta", "openssl-3.0.13-h2bbff1b_0.json"))
+        third = fingerprinter.fingerprint(self.prefix)
+        self.assertEqual(diff_fingerprints(first, third),
+                         {"added": {}, "removed": {"conda:openssl": "3.0.13-h2bbff1b_0"},
+                          "changed": {"pip:flask-cors": ["4.0.0", "4.0.0*"]}})
+        self.assertEqual(len(fingerprinter.cache), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+
+from panda_deploy_core import EnvLockManager, ProjectStatus, file_sha256
+
+class EnvLockManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.project_path = self.temp_dir.name
+        status = ProjectStatus(os.path.join(self.project_path, "project_status.json"))
+        status.update_status(project_path=self.project_path, use_env_locks=True)
+        self.locks = EnvLockManager(status, log=lambda message: None)
+        self.locks.platform = "linux-64"
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write_report(self, name, items):
+        arguments = self.locks.report_arguments(name)
+        self.assertEqual(arguments[0], "--report")
+        with open(arguments[1], "w", encoding="utf-8") as f:
+            json.dump({"version": "1", "install": items}, f)
+    
+    def test_report_hashes(self):
+        self.write_report("requirements", [
+            {"metadata": {"name": "Python_Dateutil", "version": "2.9.0"},
+             "download_info": {"url": "https://x/python_dateutil-2.9.0.whl",
+                               "archive_info": {"hash": "sha256=aaa", "hashes": {"sha256": "aaa"}}}},
+            {"metadata": {"name": "six", "version": "1.16.0"},
+             "download_info": {"url": "https://x/six-1.16.0.tar.gz", "archive_info": {"hash": "sha256=bbb"}}},
+            {"metadata": {"name": "panda_common", "version": "0.1"},
+             "download_info": {"url": "file:///p/panda_common", "dir_info": {"editable": True}}},
+        ])
+        self.write_report("quantflow", [
+            {"metadata": {"name": "six", "version": "1.16.0"},
+             "download_info": {"url": "https://y/six-1.16.0-py3-none-any.whl", "archive_info": {"hashes": {"sha256": "ccc"}}}},
+        ])
+        self.assertEqual(self.locks.load_report_hashes(), {
+            ("python-dateutil", "2.9.0"): {"aaa"},
+            ("six", "1.16.0"): {"bbb", "ccc"},
+        })
+    
+    def test_disabled_without_reports(self):
+        self.locks.project_status.update_status(use_env_locks=False)
+        self.assertEqual(self.locks.report_arguments("requirements"), [])
+    
+    def test_stale_lock_is_not_used(self):
+        requirements = os.path.join(self.project_path, "requirements.txt")
+        with open(requirements, "w", encoding="utf-8") as f:
+            f.write("six\n")
+        paths = self.locks.get_paths()
+        os.makedirs(self.locks.lock_dir)
+        with open(paths["pip"], "w", encoding="utf-8") as f:
+            f.write("six==1.16.0 --hash=sha256:bbb\n")
+        with open(paths["info"], "w", encoding="utf-8") as f:
+            json.dump({"requirements_sha256": file_sha256(requirements)}, f)
+        self.assertEqual(self.locks.get_pip_lock(requirements), paths["pip"])
+        
+        self.locks.mark_stale("按锁定文件安装失败")
+        self.assertEqual(self.locks.load_info()["stale"], "按锁定文件安装失败")
+        self.assertIsNone(self.locks.get_pip_lock(requirements))
+
+if __name__ == "__main__":
+    unittest.main()
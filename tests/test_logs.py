@@ -0,0 +1,118 @@
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from panda_deploy_logs import (UNINDEXED, LogSearcher, RotatingLogWriter, build_index, capture, index_path,
+                               stop_request_path, tokenize)
+
+# 模拟服务：收到终止信号后输出一行再以非0退出码退出
+FAKE_SERVICE = '''
+import signal, sys, time
+def stop(signum, frame):
+    print("shutting down", flush=True)
+    sys.exit(3)
+signal.signal(signal.SIGTERM, stop)
+print("ready", flush=True)
+time.sleep(60)
+'''
+
+class TokenizeTest(unittest.TestCase):
+    def test_words_and_chinese(self):
+        self.assertEqual(tokenize("Server 启动 OK port 8111"), {"server", "启", "动", "ok", "port", "8111"})
+    
+    def test_long_ids_are_marked(self):
+        tokens = tokenize("trace=a1b2c3d4e5f6 id 1234567")
+        self.assertIn("trace", tokens)
+        self.assertIn("id", tokens)
+        self.assertIn(UNINDEXED, tokens)
+        self.assertNotIn("a1b2c3d4e5f6", tokens)
+        self.assertNotIn(UNINDEXED, tokenize("plain words only"))
+
+class LogSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_dir = self.temp_dir.name
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write(self, lines, name="factor", max_bytes=100000):
+        writer = RotatingLogWriter(self.log_dir, name, max_bytes=max_bytes)
+        for line in lines:
+            writer.write(line)
+        writer.close()
+    
+    def test_finds_only_matching_blocks(self):
+        self.write([f"INFO request {i} handled" for i in range(3000)] + ["ERROR database timeout"])
+        result = LogSearcher(self.log_dir).search("database timeout")
+        self.assertEqual([line.split("] ", 1)[1] for _, line in result["matches"]], ["ERROR database timeout"])
+        self.assertLess(result["blocks_read"], 3)
+    
+    def test_partial_id_is_found(self):
+        self.write([f"INFO request {i} trace=a1b2c3d4e5f6" for i in range(3000)])
+        searcher = LogSearcher(self.log_dir)
+        for query in ("a1b2c3d4e5f6", "a1b2c3", "trace=a1b2", "c3d4"):
+            self.assertEqual(len(searcher.search(query)["matches"]), 200, query)
+    
+    def test_timestamp_is_found(self):
+        self.write([f"INFO request {i} handled" for i in range(2000)])
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.assertEqual(len(LogSearcher(self.log_dir).search(today)["matches"]), 200)
+    
+    def test_live_index_matches_rebuilt_index(self):
+        self.write([f"INFO request {i} handled trace=a1b2c3d4e5f6" for i in range(2000)])
+        path = os.path.join(self.log_dir, "factor-000001.log")
+        with open(index_path(path), encoding="utf-8") as f:
+            live = json.load(f)
+        build_index(path)
+        with open(index_path(path), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), live)
+    
+    def test_limit_and_services(self):
+        self.write(["factor started"] * 10, name="factor")
+        self.write(["quantflow started"] * 10, name="quantflow")
+        searcher = LogSearcher(self.log_dir)
+        self.assertEqual(len(searcher.search("started", limit=5)["matches"]), 5)
+        result = searcher.search("started", services=["quantflow"])
+        self.assertEqual({name for name, _ in result["matches"]}, {"quantflow"})
+    
+    def test_current_segment_without_index(self):
+        writer = RotatingLogWriter(self.log_dir, "factor")
+        for i in range(2000):
+            writer.write(f"line {i} trace=ff00ee11dd22")
+        writer.write("last line")
+        try:
+            searcher = LogSearcher(self.log_dir)
+            self.assertEqual(len(searcher.search("last line")["matches"]), 1)
+            self.assertEqual(len(searcher.search("ff00ee")["matches"]), 200)
+        finally:
+            writer.close()
+
+class CaptureStopTest(unittest.TestCase):
+    def test_stop_request_shuts_service_down(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            stop_file = stop_request_path(log_dir, "factor")
+            timer = threading.Timer(1, lambda: open(stop_file, "w").close())
+            timer.start()
+            started = time.time()
+            handler = signal.getsignal(signal.SIGTERM)
+            try:
+                code = capture(log_dir, "factor", [sys.executable, "-c", FAKE_SERVICE], stop_file=stop_file)
+            finally:
+                signal.signal(signal.SIGTERM, handler)
+            timer.join()
+            
+            # 服务收到终止请求后正常退出，按停止标记停止时返回0（Windows下服务窗口不会暂停）
+            self.assertEqual(code, 0)
+            self.assertLess(time.time() - started, 20)
+            self.assertFalse(os.path.exists(stop_file))
+            self.assertEqual(len(LogSearcher(log_dir).search("shutting down")["matches"]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from panda_deploy_core import ProjectStatus
+from panda_deploy_metrics import MetricsCollector, escape_label, format_metrics, format_value, read_process_groups
+
+class FormatMetricsTest(unittest.TestCase):
+    def test_grouped_with_help_and_type(self):
+        text = format_metrics([
+            ("panda_service_up", {"service": "mongodb"}, 1),
+            ("panda_update_check_age_seconds", {}, 12.5),
+            ("panda_service_up", {"service": "factor"}, 0),
+        ])
+        self.assertEqual(text.splitlines(), [
+            "# HELP panda_service_up 服务是否正常（1正常，0未启动或响应异常）",
+            "# TYPE panda_service_up gauge",
+            'panda_service_up{service="mongodb"} 1',
+            'panda_service_up{service="factor"} 0',
+            "# HELP panda_update_check_age_seconds 距上次检查远程更新的时间",
+            "# TYPE panda_update_check_age_seconds gauge",
+            "panda_update_check_age_seconds 12.5",
+        ])
+        self.assertTrue(text.endswith("\n"))
+    
+    def test_unknown_metric_is_untyped(self):
+        self.assertIn("# TYPE custom_metric untyped", format_metrics([("custom_metric", {}, 1)]))
+    
+    def test_values(self):
+        self.assertEqual(format_value(True), "1")
+        self.assertEqual(format_value(3 * 1024 ** 3), "3221225472")
+        self.assertEqual(format_value(2.0e9), "2000000000")
+        self.assertEqual(format_value(0.25), "0.25")
+    
+    def test_label_escaping(self):
+        self.assertEqual(escape_label('a"b\\c\nd'), 'a\\"b\\\\c\\nd')
+
+class MetricsCollectorTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.collector = MetricsCollector(ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json")))
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_render_does_not_sample(self):
+        self.collector.sample = lambda: self.fail("HTTP线程不应采集")
+        self.assertEqual(self.collector.render(timeout=0), "")
+    
+    def test_render_waits_for_first_sample(self):
+        def publish():
+            with self.collector.lock:
+                self.collector.samples = [("panda_service_up", {"service": "mongodb"}, 1)]
+            self.collector.sampled.set()
+        
+        threading.Timer(0.05, publish).start()
+        self.assertIn('panda_service_up{service="mongodb"} 1', self.collector.render(timeout=5))
+    
+    def test_sample_counts_restarts_and_reports_status(self):
+        self.collector.project_status.update_status(
+            step_telemetry={"clone_project": {"duration": 3.5, "attempts": 2, "result": "completed"}},
+            data_hub_runs=[{"job": "factor", "result": "failed", "duration": 5},
+                           {"job": "factor", "result": "ok", "duration": 60, "rows": 1200}])
+        up = {"mongodb": True}
+        pids = {"mongodb": 100}
+        self.collector.read_pids = lambda: dict(pids)
+        
+        def sample():
+            with mock.patch("panda_deploy_metrics.probe_port", lambda port: up["mongodb"]), \
+                    mock.patch("panda_deploy_metrics.probe_url", lambda url: ("error", None)):
+                return {(name, tuple(labels.items())): value for name, labels, value in self.collector.sample()}
+        
+        restarts = ("panda_service_restarts_total", (("service", "mongodb"),))
+        # 工具启动时已在运行的服务不计入重启
+        self.assertEqual(sample()[restarts], 0)
+        up["mongodb"] = False
+        self.assertEqual(sample()[restarts], 0)
+        up["mongodb"] = True
+        self.assertEqual(sample()[restarts], 1)
+        pids["mongodb"] = 200
+        values = sample()
+        self.assertEqual(values[restarts], 2)
+        self.assertEqual(values[("panda_service_up", (("service", "factor"),))], 0)
+        self.assertEqual(values[("panda_deploy_step_attempts", (("step", "clone_project"),))], 2)
+        self.assertEqual(values[("panda_deploy_step_success", (("step", "clone_project"),))], 1)
+        # 每个数据更新任务只报告最后一次执行
+        self.assertEqual(values[("panda_data_hub_last_run_success", (("job", "factor"),))], 1)
+        self.assertEqual(values[("panda_data_hub_last_run_rows", (("job", "factor"),))], 1200)
+    
+    @unittest.skipUnless(os.path.isdir("/proc"), "需要 /proc")
+    def test_read_process_groups(self):
+        pgid = os.getpgid(0)
+        groups = read_process_groups({pgid})
+        self.assertEqual(list(groups), [pgid])
+        self.assertGreaterEqual(groups[pgid]["processes"], 1)
+        self.assertGreater(groups[pgid]["rss"], 0)
+        self.assertEqual(read_process_groups(set()), {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import socket
+import stat
+import sys
+import tempfile
+import unittest
+
+from panda_deploy_core import ProjectStatus
+from panda_deploy_mongo import MongoAdvisor, MongoShell, MongoSnapshotManager
+
+# 模拟 mongosh：输出命令行参数、脚本文件的权限和内容
+FAKE_SHELL = '''#!{python}
+import json, os, stat, sys
+path = sys.argv[-1]
+with open(path, encoding="utf-8") as f:
+    print(json.dumps({{"argv": sys.argv[1:], "mode": stat.S_IMODE(os.stat(path).st_mode), "script": f.read()}}))
+'''
+
+@unittest.skipIf(os.name == 'nt', "模拟的 mongosh 是Python脚本")
+class MongoShellTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        mongodb_path = os.path.join(self.temp_dir.name, "mongodb")
+        config_path = os.path.join(self.temp_dir.name, "project", "panda_factor", "panda_common", "config.yaml")
+        os.makedirs(os.path.join(mongodb_path, "bin"))
+        os.makedirs(os.path.dirname(config_path))
+        shell_path = os.path.join(mongodb_path, "bin", "mongosh")
+        with open(shell_path, "w", encoding="utf-8") as f:
+            f.write(FAKE_SHELL.format(python=sys.executable))
+        os.chmod(shell_path, 0o755)
+        with open(config_path, "w", encoding="utf-8") as f:
+            f.write('MONGO_USER: "panda"\nMONGO_PASSWORD: "s3cret pw!"\nMONGO_AUTH_DB: "admin"\n')
+        project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        project_status.update_status(mongodb_path=mongodb_path,
+                                     project_path=os.path.join(self.temp_dir.name, "project"))
+        self.shell = MongoShell(project_status)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_password_is_not_on_command_line(self):
+        result = self.shell.eval("print(JSON.stringify(db.stats()))")
+        self.assertFalse(any("s3cret" in arg for arg in result["argv"]))
+        self.assertNotIn("-p", result["argv"])
+        # 脚本文件只有当前用户可读，先登录再执行，执行后删除
+        self.assertEqual(result["mode"] & (stat.S_IRWXG | stat.S_IRWXO), 0)
+        self.assertEqual(result["script"].splitlines(), [
+            'db.getSiblingDB("admin").auth("panda", "s3cret pw!");',
+            "print(JSON.stringify(db.stats()))"])
+        self.assertFalse(os.path.exists(result["argv"][-1]))
+
+class MongoAdvisorTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.advisor = MongoAdvisor(ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json")),
+                                    log=lambda message: None)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def query(self, ns, filter_shape, sort=(), millis=10, docs=50000):
+        return {"ns": ns, "filter": filter_shape, "sort": list(sort), "millis": millis, "docs_examined": docs}
+    
+    def test_queries_grouped_by_shape(self):
+        indexes = [{"name": "_id_", "key": {"_id": 1}, "ops": 0, "since": ""},
+                   {"name": "date_1", "key": {"date": 1}, "ops": 0, "since": ""},
+                   {"name": "symbol_1_date_1", "key": {"symbol": 1, "date": 1}, "ops": 12, "since": ""}]
+        report = {"database": "panda", "profiling_level": 1, "slowms": 100, "collections": [
+            {"name": "stock_market", "count": 10 ** 6, "size": 1, "storage_size": 2, "index_size": 1,
+             "indexes": indexes},
+            {"name": "factors", "count": 10, "size": 1, "storage_size": 1, "index_size": 1, "indexes": []},
+        ], "queries": [
+            # 字段顺序不同的同一形状合并为一组
+            self.query("panda.factors", {"date": "range", "factor_name": "eq"}, sort=["symbol"], millis=30),
+            self.query("panda.factors", {"factor_name": "eq", "date": "range"}, sort=["symbol"], millis=20),
+            self.query("panda.factors", {"factor_name": "eq"}, millis=5, docs=10),
+            self.query("panda.stock_market", {"symbol": "eq", "date": "range"}, millis=40),
+        ]}
+        advice = self.advisor.analyze(report)
+        
+        self.assertEqual([(item["collection"], item["name"]) for item in advice["unused_indexes"]],
+                         [("stock_market", "date_1")])
+        shapes = [(shape["collection"], shape["count"], shape["total_millis"], shape["recommended"])
+                  for shape in advice["scan_shapes"]]
+        self.assertEqual(shapes, [
+            # 推荐顺序：等值字段、排序字段、范围字段
+            ("factors", 2, 50, {"factor_name": 1, "symbol": 1, "date": 1}),
+            # 已有索引覆盖
+            ("stock_market", 1, 40, None),
+            # 扫描的文档很少
+            ("factors", 1, 5, None),
+        ])
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class MongoSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.temp_dir.name, "db")
+        project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        project_status.update_status(mongodb_data_path=self.data_path, mongodb_port=unused_port(),
+                                     mongodb_snapshot_dir=os.path.join(self.temp_dir.name, "store"),
+                                     mongodb_snapshot_keep=5)
+        self.snapshots = MongoSnapshotManager(project_status, log=lambda message: None)
+        self.write("collection-0.wt", b"a" * 1000)
+        self.write("index-1.wt", b"b" * 2000)
+        self.write("journal/WiredTigerLog.1", b"c" * 300)
+        self.write("mongod.lock", b"1")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write(self, relpath, data):
+        path = os.path.join(self.data_path, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    
+    def read_all(self):
+        contents = {}
+        for relpath in self.snapshots.list_data_files():
+            with open(os.path.join(self.data_path, relpath), "rb") as f:
+                contents[relpath] = f.read()
+        return contents
+    
+    def test_incremental_create_and_restore(self):
+        first = self.snapshots.create()
+        self.assertEqual((first["total_size"], first["copied_size"]), (3300, 3300))
+        self.assertNotIn("mongod.lock", first["files"])
+        original = self.read_all()
+        
+        # 只复制变化和新增的文件
+        self.write("collection-0.wt", b"x" * 1000)
+        self.write("collection-2.wt", b"y" * 50)
+        os.remove(os.path.join(self.data_path, "journal", "WiredTigerLog.1"))
+        second = self.snapshots.create()
+        self.assertEqual((second["total_size"], second["copied_size"]), (3050, 1050))
+        
+        self.snapshots.restore(first["id"], backup=False)
+        self.assertEqual(self.read_all(), original)
+        # 恢复后修改时间与快照一致，下次创建快照不需要重新计算哈希，也不复制文件
+        _, hashed = self.snapshots.hash_files(self.snapshots.list_data_files(), self.snapshots.known_hashes())
+        self.assertEqual(hashed, 0)
+        self.assertEqual(self.snapshots.create()["copied_size"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from panda_deploy_core import ProjectStatus
+from panda_deploy_perf import (
+    StartupProfiler,
+    describe_profile,
+    diff_imports,
+    iter_imports,
+    parse_importtime,
+    summarize_imports,
+)
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:        80 |         80 |   marshal
+import time:       300 |        550 | _frozen_importlib_external
+import time:        50 |         50 |       pandas._libs.tslibs
+import time:       900 |        950 |     pandas._libs
+import time:      1500 |       2450 |   pandas.core
+import time:      2000 |       4450 | pandas
+Traceback (most recent call last):
+"""
+
+class ParseImporttimeTest(unittest.TestCase):
+    def test_tree(self):
+        tree = parse_importtime(IMPORTTIME_OUTPUT.splitlines())
+        self.assertEqual([node["name"] for node in tree], ["_frozen_importlib_external", "pandas"])
+        self.assertEqual([child["name"] for child in tree[0]["children"]], ["_io", "marshal"])
+        pandas = tree[1]
+        self.assertEqual((pandas["self"], pandas["cumulative"]), (2000, 4450))
+        self.assertEqual(pandas["children"][0]["name"], "pandas.core")
+        self.assertEqual(pandas["children"][0]["children"][0]["children"][0]["name"], "pandas._libs.tslibs")
+        self.assertEqual(len(list(iter_imports(tree))), 7)
+    
+    def test_unfinished_imports_become_roots(self):
+        # 进程在导入 pandas 的过程中被停止，pandas 本身的行没有输出
+        tree = parse_importtime(IMPORTTIME_OUTPUT.splitlines()[:7])
+        self.assertEqual([node["name"] for node in tree], ["_frozen_importlib_external", "pandas.core"])
+    
+    def test_summary(self):
+        summary = summarize_imports(parse_importtime(IMPORTTIME_OUTPUT.splitlines()), count=2)
+        self.assertEqual(summary["total_ms"], 5.0)
+        self.assertEqual(summary["modules"], 7)
+        self.assertEqual(summary["top_cumulative"][0], ["pandas", 4.5, 2.0])
+        self.assertEqual(summary["top_self"], [["pandas", 2.0], ["pandas.core", 1.5]])
+
+def profile_result(commit, profiled_at, output=IMPORTTIME_OUTPUT):
+    tree = parse_importtime(output.splitlines())
+    result = {"service": "factor", "commit": commit, "commit_desc": f"{commit[:7]} change", "profiled_at": profiled_at,
+              "ready_seconds": 1.5, "exit_code": None, "error_tail": [], "tree": tree}
+    result.update(summarize_imports(tree))
+    return result
+
+class StartupProfileHistoryTest(unittest.TestCase):
+    """按提交保存的分析结果：同一提交覆盖，与其他提交最近的结果对比"""
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        project_status.update_status(project_path=self.temp_dir.name)
+        self.profiler = StartupProfiler(project_status)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_previous_is_latest_other_commit(self):
+        slower = IMPORTTIME_OUTPUT.replace("2000 |       4450 | pandas", "5000 |       7450 | pandas")
+        self.profiler.save(profile_result("a" * 40, "2026-01-01 10:00:00"))
+        self.profiler.save(profile_result("b" * 40, "2026-01-02 10:00:00"))
+        self.profiler.save(profile_result("b" * 40, "2026-01-03 10:00:00"))
+        current = profile_result("c" * 40, "2026-01-04 10:00:00", output=slower)
+        path = self.profiler.save(current)
+        
+        self.assertEqual(os.path.basename(path), "factor-cccccccccccc.json")
+        self.assertEqual([item["profiled_at"] for item in self.profiler.history("factor")],
+                         ["2026-01-01 10:00:00", "2026-01-03 10:00:00", "2026-01-04 10:00:00"])
+        self.assertEqual(self.profiler.history("quantflow"), [])
+        previous = self.profiler.previous(current)
+        self.assertEqual(previous["commit"], "b" * 40)
+        
+        self.assertEqual(diff_imports(previous, current, count=1), [("pandas", 4.5, 7.5)])
+        lines = describe_profile(current, previous)
+        self.assertEqual(lines[0], "PandaFactor (ccccccc change): 导入 7 个模块，共 8.0 毫秒，1.5 秒后端口就绪")
+        self.assertIn("  与 bbbbbbb change 相比（5.0 → 8.0 毫秒）:", lines)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from panda_deploy_precompile import entry_imports, find_stale, precompile
+
+class PrecompileTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+    
+    def test_entry_imports_without_running(self):
+        entry = self.write("__main__.py", "import os, json\nfrom panda_common import config\nfrom . import local\n"
+                                          "if True:\n    import skipped\nraise SystemExit('started')\n")
+        self.assertEqual(entry_imports(entry), ["os", "json", "panda_common"])
+    
+    def test_only_stale_files_are_compiled(self):
+        self.write(os.path.join("pkg", "a.py"), "x = 1\n")
+        self.write(os.path.join("pkg", "b.py"), "y = 2\n")
+        self.write(os.path.join("pkg", "node_modules", "c.py"), "z = 3\n")
+        self.assertEqual(len(find_stale([self.root])[1]), 2)
+        stats = precompile([self.root])
+        self.assertEqual((stats["files"], stats["compiled"], stats["failed"]), (2, 2, 0))
+        self.assertEqual(find_stale([self.root]), (2, []))
+        
+        self.write(os.path.join("pkg", "b.py"), "y = 22\n")
+        self.assertEqual(find_stale([self.root])[1], [os.path.join(self.root, "pkg", "b.py")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from panda_deploy_core import DeployError, ProfileManager, ServiceSupervisor, apply_mongodb_port
+
+# 模拟 uvicorn：打印最终使用的端口
+FAKE_UVICORN = '''
+class Config:
+    def __init__(self, app, host="127.0.0.1", port=8000, **kwargs):
+        self.port = port
+
+def run(app, **kwargs):
+    print(Config(app, **kwargs).port)
+'''
+
+class ProfileManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.status_file = os.path.join(self.temp_dir.name, "project_status.json")
+        self.manager = ProfileManager(self.status_file)
+        self.manager.get().update_status(conda_env="pandaaitool", mongodb_path="/opt/mongodb", project_path="/opt/p",
+                                         factor_port=8111)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_default_profile(self):
+        self.assertEqual(self.manager.names(), ["default"])
+        self.assertEqual(self.manager.active, "default")
+    
+    def test_create_copies_settings(self):
+        status = self.manager.create("test")
+        self.assertEqual(status.get_status("profile_name"), "test")
+        self.assertEqual(status.get_status("conda_env"), "pandaaitool_test")
+        self.assertEqual(status.get_status("mongodb_path"), "/opt/mongodb")
+        # 安装路径不复制，端口与已有配置都不相同
+        self.assertEqual(status.get_status("project_path"), "")
+        default_ports = set(self.manager.get("default").get_ports().values())
+        self.assertFalse(set(status.get_ports().values()) & default_ports)
+        other = self.manager.create("other")
+        self.assertFalse(set(other.get_ports().values()) & (default_ports | set(status.get_ports().values())))
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, "profiles", "test.json")))
+        
+        # 重新加载索引后仍然存在
+        reloaded = ProfileManager(self.status_file)
+        self.assertEqual(reloaded.names(), ["default", "other", "test"])
+        self.assertEqual(reloaded.get("test").get_status("conda_env"), "pandaaitool_test")
+    
+    def test_separate_data_directories_survive_reset(self):
+        status = self.manager.create("test")
+        self.assertEqual(self.manager.get().get_mongodb_data_path(), os.path.join("/opt/mongodb", "data", "db"))
+        self.assertEqual(status.get_mongodb_data_path(), os.path.join("/opt/mongodb", "data", "db_test"))
+        
+        # 清除状态后仍是同一套配置：名称、端口和数据目录不变
+        ports = status.get_ports()
+        status.reset()
+        self.assertEqual(status.get_status("profile_name"), "test")
+        self.assertEqual(status.get_ports(), ports)
+    
+    def test_create_rejects_invalid_names(self):
+        self.manager.create("test")
+        for name in ("test", "a b", "../x", ""):
+            with self.assertRaises(DeployError):
+                self.manager.create(name)
+    
+    def test_switch_and_delete(self):
+        status = self.manager.create("test")
+        self.manager.switch("test")
+        with self.assertRaises(DeployError):
+            self.manager.delete("test")
+        with self.assertRaises(DeployError):
+            self.manager.delete("default")
+        
+        self.manager.switch("default")
+        self.manager.delete("test")
+        self.assertEqual(self.manager.names(), ["default"])
+        self.assertFalse(os.path.exists(status.status_file))
+        with open(os.path.join(self.temp_dir.name, "profiles.json"), encoding="utf-8") as f:
+            self.assertNotIn("test", json.load(f)["profiles"])
+        with self.assertRaises(DeployError):
+            self.manager.get("test")
+
+class ProfilePortsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manager = ProfileManager(os.path.join(self.temp_dir.name, "project_status.json"))
+        self.fake_path = os.path.join(self.temp_dir.name, "fake")
+        os.makedirs(self.fake_path)
+        with open(os.path.join(self.fake_path, "uvicorn.py"), "w", encoding="utf-8") as f:
+            f.write(FAKE_UVICORN)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    
+    def make_profile(self, status, name):
+        """在临时目录中准备一个最小的安装，环境激活信息预先缓存，不调用conda"""
+        project_path = os.path.join(self.temp_dir.name, name)
+        self.write(os.path.join(project_path, "panda_factor", "panda_factor_server", "__main__.py"),
+                   'import uvicorn\nuvicorn.run("app", host="0.0.0.0", port=8111)\n')
+        self.write(os.path.join(project_path, "panda_quantflow", "src", "panda_server", "main.py"),
+                   'import uvicorn\nprint(uvicorn.Config("app", "0.0.0.0", 8000).port)\n')
+        self.write(os.path.join(project_path, "panda_factor", "panda_common", "panda_common", "config.yaml"),
+                   'MONGO_URI: "127.0.0.1:27017"\nMONGO_PORT: 27017\n')
+        os.makedirs(os.path.join(project_path, "mongodb"))
+        status.update_status(project_path=project_path, mongodb_path=os.path.join(project_path, "mongodb"),
+                             env_activation={"env_name": status.get_status("conda_env"), "python": sys.executable,
+                                             "prefix": project_path, "stamp": None, "variables": {}, "path": []})
+        return status
+    
+    def run_server(self, plan, name):
+        env = dict(os.environ, PYTHONPATH=self.fake_path)
+        result = subprocess.run(plan["python"] + ServiceSupervisor(None).server_args(plan, name),
+                                cwd=plan[f"{name}_path"], env=env, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return int(result.stdout.strip())
+    
+    def test_two_profiles_start_without_port_clash(self):
+        default = self.make_profile(self.manager.get(), "default")
+        test = self.make_profile(self.manager.create("test"), "test")
+        
+        used = set()
+        for status in (default, test):
+            supervisor = ServiceSupervisor(status, log=lambda message: None)
+            plan = supervisor.build_plan()
+            ports = status.get_ports()
+            self.assertEqual(plan["ports"], ports)
+            self.assertFalse(set(ports.values()) & used)
+            used |= set(ports.values())
+            
+            # 两个服务器都按本配置的端口启动（入口中写死的端口被替换）
+            self.assertEqual(self.run_server(plan, "factor"), ports["factor"])
+            self.assertEqual(self.run_server(plan, "quantflow"), ports["quantflow"])
+            
+            # 服务器连接本配置的MongoDB
+            supervisor.apply_ports(plan)
+            with open(os.path.join(plan["factor_path"], "panda_common", "panda_common", "config.yaml"),
+                      encoding="utf-8") as f:
+                config = f.read()
+            self.assertIn(f'MONGO_URI: "127.0.0.1:{ports["mongodb"]}"', config)
+            self.assertIn(f'MONGO_PORT: {ports["mongodb"]}', config)
+    
+    def test_default_port_leaves_config_unchanged(self):
+        path = os.path.join(self.temp_dir.name, "factor", "panda_common", "config.yaml")
+        self.write(path, 'MONGO_URI: "localhost:27017"\nMONGO_PORT: "27017"\n')
+        self.assertEqual(apply_mongodb_port(os.path.dirname(os.path.dirname(path)), 27017), [])
+        self.assertEqual(apply_mongodb_port(os.path.dirname(os.path.dirname(path)), 27018), [path])
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), 'MONGO_URI: "localhost:27018"\nMONGO_PORT: "27018"\n')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from panda_deploy_core import RetryPolicy
+
+class RetryPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=4, base_delay=2.0, max_delay=60.0)
+    
+    def test_network_errors(self):
+        for line in [
+            "fatal: unable to access 'https://github.com/x.git/': Could not resolve host: github.com",
+            "fatal: unable to access 'https://github.com/x.git/': Failed to connect to github.com port 443: Connection timed out",
+            "error: RPC failed; curl 56 GnuTLS recv error (-9): A TLS packet with unexpected length was received.",
+            "fatal: early EOF",
+            "The requested URL returned error: 502",
+            "CondaHTTPError: HTTP 000 CONNECTION FAILED for url <https://repo.anaconda.com/pkgs/main>",
+            "pip._vendor.urllib3.exceptions.ReadTimeoutError: HTTPSConnectionPool(host='files.pythonhosted.org', "
+            "port=443): Read timed out.",
+            "ERROR: HTTP error 503 while getting https://files.pythonhosted.org/packages/x.whl",
+            "requests.exceptions.HTTPError: 504 Server Error: Gateway Timeout",
+        ]:
+            self.assertTrue(self.policy.is_network_failure(1, ["Cloning into 'x'...", line]), line)
+    
+    def test_other_errors_are_not_retried(self):
+        for line in [
+            "ERROR: Could not find a version that satisfies the requirement foo==9.9",
+            "ERROR: No matching distribution found for foo==9.9",
+            "PackagesNotFoundError: The following packages are not available from current channels",
+            "error: subprocess-exited-with-error: test run timed out",
+            "fatal: destination path 'x' already exists and is not an empty directory.",
+            "Processing ./http5_client-1.0.tar.gz",
+        ]:
+            self.assertFalse(self.policy.is_network_failure(1, [line]), line)
+    
+    def test_exit_code_alone_is_not_network_failure(self):
+        for return_code in (6, 7, 28, 35, 56):
+            self.assertFalse(self.policy.is_network_failure(return_code, ["error: something went wrong"]))
+    
+    def test_success_is_never_retried(self):
+        self.assertFalse(self.policy.is_network_failure(0, ["Could not resolve host: github.com"]))
+    
+    def test_delays(self):
+        for attempt, full_delay in ((1, 2.0), (2, 4.0), (3, 8.0), (6, 60.0), (10, 60.0)):
+            for _ in range(20):
+                delay = self.policy.get_delay(attempt)
+                self.assertGreaterEqual(delay, full_delay / 2)
+                self.assertLessEqual(delay, full_delay)
+
+if __name__ == "__main__":
+    unittest.main()
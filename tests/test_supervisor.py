@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from panda_deploy_core import ProjectStatus, ServiceSupervisor, process_created
+
+@unittest.skipUnless(os.path.exists("/proc/self/stat") or os.name == 'nt', "无法查询进程的创建时间")
+class ServicePidsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        self.status.update_status(project_path=self.temp_dir.name)
+        self.messages = []
+        self.supervisor = ServiceSupervisor(self.status, log=self.messages.append)
+        self.process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"],
+                                        start_new_session=os.name != 'nt')
+    
+    def tearDown(self):
+        self.process.kill()
+        self.process.wait()
+        self.temp_dir.cleanup()
+    
+    def write_pids(self, pids):
+        with open(os.path.join(self.temp_dir.name, ServiceSupervisor.PID_FILE), "w", encoding="utf-8") as f:
+            json.dump(pids, f)
+    
+    def test_load_pids_reads_old_format(self):
+        self.write_pids({"mongodb": self.process.pid, "factor": None})
+        self.assertEqual(ServiceSupervisor.load_pids(self.temp_dir.name),
+                         {"mongodb": {"pid": self.process.pid, "created": None}})
+    
+    def test_pid_reused(self):
+        created = process_created(self.process.pid)
+        self.assertIsNotNone(created)
+        self.assertFalse(ServiceSupervisor.pid_reused({"pid": self.process.pid, "created": created}))
+        self.assertFalse(ServiceSupervisor.pid_reused({"pid": self.process.pid, "created": None}))
+        self.assertTrue(ServiceSupervisor.pid_reused({"pid": self.process.pid, "created": created - 1}))
+    
+    def test_stop_skips_reused_pid(self):
+        # 记录的创建时间与现在的进程不同：进程号已被无关的进程复用，不能结束它
+        self.write_pids({"factor": {"pid": self.process.pid, "created": process_created(self.process.pid) - 1}})
+        self.supervisor.stop()
+        self.assertIsNone(self.process.poll())
+        self.assertTrue(any("已属于其他进程" in message for message in self.messages))
+        
+        self.write_pids({"factor": {"pid": self.process.pid, "created": process_created(self.process.pid)}})
+        self.supervisor.stop()
+        self.assertIsNotNone(self.process.wait(timeout=15))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import threading
+import unittest
+
+from panda_deploy_core import TaskRunner
+
+class TaskRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.tasks = TaskRunner(max_workers=2, quick_workers=1)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+    
+    def test_quick_tasks_run_while_pool_is_busy(self):
+        for index in range(3):
+            self.tasks.submit(f"long-{index}", self.release.wait)
+        self.assertEqual(self.tasks.submit("probe", lambda: "ok", quick=True).result(timeout=5), "ok")
+        state = self.tasks.describe()
+        self.assertEqual((state["workers"], state["quick_workers"]), (2, 1))
+    
+    def test_single_flight(self):
+        first = self.tasks.submit("probe", self.release.wait, quick=True)
+        self.assertIs(self.tasks.submit("probe", self.release.wait, quick=True), first)
+        self.release.set()
+        self.assertTrue(first.result(timeout=5))
+        self.assertEqual(self.tasks.describe()["tasks"]["probe"]["coalesced"], 1)
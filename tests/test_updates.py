@@ -0,0 +1,96 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+import panda_deploy_core
+from panda_deploy_core import ProjectStatus, RemoteWatcher, check_updates
+
+# 测试中提交时使用的身份，不依赖本机的git配置
+GIT_ENV = dict(os.environ, GIT_AUTHOR_NAME="test", GIT_AUTHOR_EMAIL="test@example.com", GIT_COMMITTER_NAME="test",
+               GIT_COMMITTER_EMAIL="test@example.com")
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, env=GIT_ENV, capture_output=True, text=True, check=True).stdout
+
+class GitReposTestCase(unittest.TestCase):
+    """在临时目录中创建上游仓库（默认分支为 develop）和克隆出的 panda_factor、panda_quantflow"""
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_path = os.path.join(self.temp_dir.name, "project")
+        self.upstreams = {}
+        for name in ("panda_factor", "panda_quantflow"):
+            upstream = os.path.join(self.temp_dir.name, f"{name}.git")
+            git(self.temp_dir.name, "init", "-q", "--bare", "-b", "develop", upstream)
+            work = os.path.join(self.temp_dir.name, f"{name}_work")
+            git(self.temp_dir.name, "clone", "-q", upstream, work)
+            git(work, "checkout", "-q", "-b", "develop")
+            self.commit(work, "initial")
+            git(work, "push", "-q", "origin", "develop")
+            git(self.temp_dir.name, "clone", "-q", upstream, os.path.join(self.base_path, name))
+            self.upstreams[name] = work
+        self.project_status = ProjectStatus(os.path.join(self.temp_dir.name, "project_status.json"))
+        self.project_status.update_status(project_path=self.base_path)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def commit(self, repo_path, message):
+        git(repo_path, "commit", "-q", "--allow-empty", "-m", message)
+    
+    def push_upstream(self, name, *messages):
+        for message in messages:
+            self.commit(self.upstreams[name], message)
+        git(self.upstreams[name], "push", "-q", "origin", "develop")
+
+class CheckUpdatesTest(GitReposTestCase):
+    def test_compares_against_tracked_branch(self):
+        self.push_upstream("panda_factor", "fix a", "fix b")
+        self.commit(os.path.join(self.base_path, "panda_factor"), "local change")
+        
+        result = check_updates(self.base_path, self.project_status, log=lambda message: None)
+        factor = result["repositories"]["factor"]
+        self.assertTrue(result["factor_behind"])
+        self.assertFalse(result["quantflow_behind"])
+        self.assertEqual((factor["branch"], factor["upstream"]), ("develop", "origin/develop"))
+        self.assertEqual((factor["ahead"], factor["behind"]), (1, 2))
+        self.assertEqual([line.split(" ", 1)[1] for line in factor["incoming"]], ["fix b", "fix a"])
+        self.assertEqual(factor["commit_desc"].split(" ", 1)[1], "local change")
+        self.assertEqual(self.project_status.get_status("git_commit"), factor["commit"])
+        self.assertEqual(result["repositories"]["quantflow"]["behind"], 0)
+
+class RemoteWatcherTest(GitReposTestCase):
+    def test_fetches_only_after_remote_moves(self):
+        changes = []
+        watcher = RemoteWatcher(self.project_status, on_change=changes.append)
+        commands = []
+        run_git = panda_deploy_core.run_git
+        
+        def record(repo_path, *args):
+            commands.append(args[0])
+            return run_git(repo_path, *args)
+        
+        with mock.patch.object(panda_deploy_core, "run_git", side_effect=record):
+            updates = watcher.poll_once()
+            self.assertEqual((updates["factor"]["behind"], updates["quantflow"]["behind"]), (0, 0))
+            self.assertEqual(len(changes), 1)
+            
+            # 远程没有变化：只执行 ls-remote，不fetch，也不通知
+            commands.clear()
+            watcher.poll_once()
+            self.assertIn("ls-remote", commands)
+            self.assertNotIn("fetch", commands)
+            self.assertEqual(len(changes), 1)
+            
+            self.push_upstream("panda_quantflow", "new feature")
+            commands.clear()
+            updates = watcher.poll_once()
+            self.assertEqual(commands.count("fetch"), 1)
+            self.assertEqual((updates["factor"]["behind"], updates["quantflow"]["behind"]), (0, 1))
+            self.assertEqual(changes[-1], updates)
+        # 结果保存在状态文件中，下次启动时直接显示
+        self.assertEqual(ProjectStatus(self.project_status.status_file).get_status("remote_updates"), updates)
+
+if __name__ == "__main__":
+    unittest.main()
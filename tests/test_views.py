@@ -0,0 +1,61 @@
+import os
+import tempfile
+import types
+import unittest
+
+from panda_deploy_core import DEPLOY_STEPS, DeployPipeline, ProjectStatus
+
+try:
+    from panda_deploy_tool_v2 import PandaDeployToolV2
+except ImportError:  # 没有安装tkinter
+    PandaDeployToolV2 = None
+
+class FakeWidget:
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+    
+    def __str__(self):
+        return self.name
+    
+    def configure(self, **options):
+        self.calls.append(options)
+
+@unittest.skipIf(PandaDeployToolV2 is None, "没有安装tkinter")
+class IncrementalViewTest(unittest.TestCase):
+    def test_set_widget_only_reconfigures_changes(self):
+        view = types.SimpleNamespace(widget_options={})
+        widget = FakeWidget(".status.git")
+        PandaDeployToolV2.set_widget(view, widget, text="✅ Git", style="Success.TLabel")
+        PandaDeployToolV2.set_widget(view, widget, text="✅ Git", style="Success.TLabel")
+        PandaDeployToolV2.set_widget(view, widget, text="❌ Git", style="Success.TLabel")
+        self.assertEqual(widget.calls, [{"text": "✅ Git", "style": "Success.TLabel"}, {"text": "❌ Git"}])
+    
+    def test_refresh_requests_are_coalesced(self):
+        callbacks = []
+        view = types.SimpleNamespace(refresh_pending=False, root=types.SimpleNamespace(after_idle=callbacks.append))
+        view._do_refresh_views = lambda: setattr(view, "refresh_pending", False)
+        for _ in range(3):
+            PandaDeployToolV2.refresh_views(view)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        PandaDeployToolV2.refresh_views(view)
+        self.assertEqual(len(callbacks), 2)
+
+class StepNotificationTest(unittest.TestCase):
+    def test_running_and_failed_step_are_reported(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            project_status = ProjectStatus(os.path.join(temp_dir, "project_status.json"))
+            project_status.update_status(completed_steps=[step[0] for step in DEPLOY_STEPS[:-2]])
+            changes = []
+            pipeline = DeployPipeline(project_status, log=lambda message: None, on_steps_changed=lambda: changes.append(
+                (pipeline.current_step, project_status.get_status("deployment_status"))))
+            pipeline.step_precompile_bytecode = lambda: "failed"
+            
+            self.assertFalse(pipeline.run())
+            # 开始执行时显示正在运行的步骤，失败后清除并显示失败状态
+            self.assertEqual(changes[0][0], "precompile_bytecode")
+            self.assertEqual(changes[-1], (None, "failed"))
+
+if __name__ == "__main__":
+    unittest.main()
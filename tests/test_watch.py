@@ -0,0 +1,65 @@
+import os
+import queue
+import tempfile
+import unittest
+
+from panda_deploy_watch import FileWatcher, watch_dirs
+
+class WatchDirsTest(unittest.TestCase):
+    def test_only_existing_dirs_between_root_and_paths(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = os.path.join(temp_dir, "project")
+            os.makedirs(os.path.join(root, "panda_factor"))
+            paths = [os.path.join(root, "panda_factor", "server", "__main__.py"), os.path.join(root, "mongodb", "bin")]
+            self.assertEqual(watch_dirs(root, paths), {temp_dir, root, os.path.join(root, "panda_factor")})
+
+class FileWatcherTest(unittest.TestCase):
+    """在临时目录中创建、删除被检查的文件，结果变化时应收到通知"""
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "project")
+        os.makedirs(self.root)
+        self.target = os.path.join(self.root, "repo", "requirements.txt")
+        self.changes = queue.Queue()
+    
+    def tearDown(self):
+        self.watcher.stop()
+        self.watcher.thread.join(5)
+        self.temp_dir.cleanup()
+    
+    def start(self, use_inotify):
+        self.watcher = FileWatcher(self.changes.put, interval=0.05)
+        if not use_inotify:
+            self.watcher.libc = None
+        self.watcher.watch({"repo": (lambda: os.path.exists(self.target), self.root, [self.target])})
+        self.assertEqual(self.changes.get(timeout=5), {"repo": False})
+    
+    def assert_follows_file(self):
+        # 上级目录也是新创建的，需要先开始监视它才能发现文件
+        os.makedirs(os.path.dirname(self.target))
+        with open(self.target, "w") as f:
+            f.write("fastapi\n")
+        self.assertEqual(self.changes.get(timeout=5), {"repo": True})
+        os.remove(self.target)
+        self.assertEqual(self.changes.get(timeout=5), {"repo": False})
+        self.assertTrue(self.changes.empty())
+    
+    def test_inotify(self):
+        self.start(use_inotify=True)
+        if self.watcher.libc is None:
+            self.skipTest("inotify不可用")
+        self.assert_follows_file()
+        self.assertEqual(self.watcher.mode, "inotify")
+    
+    def test_stat_polling(self):
+        self.start(use_inotify=False)
+        self.assert_follows_file()
+        self.assertEqual(self.watcher.mode, "stat")
+    
+    def test_replacing_checks_reevaluates(self):
+        self.start(use_inotify=False)
+        self.watcher.watch({"repo": (lambda: True, self.root, [self.target])})
+        self.assertEqual(self.changes.get(timeout=5), {"repo": True})
+
+if __name__ == "__main__":
+    unittest.main()